@@ -1,42 +1,111 @@
 from flask import Blueprint, request, jsonify, g
 from functools import wraps
-from datetime import datetime
-import supabase
+from core.supabase_client import supabase
+from core.token_verifier import get_token_verifier
+from service.last_login_buffer import get_last_login_buffer
+from service.profile_service import get_user
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
-# 用戶註冊
-@auth_bp.route("/register", methods=["POST"])
-def register():
-    data = request.json
+# ============================================
+# 與 ASGI 模式（api/auth_async.py）共用的請求 / 回應邏輯
+# ============================================
+
+def sign_up_params(data):
+    """註冊參數；缺少必要欄位時回傳 None"""
     email = data.get("email")
     password = data.get("password")
     username = data.get("username")
 
     if not email or not password or not username:
+        return None
+
+    return {
+        "email": email,
+        "password": password,
+        "options": {
+            "data": {"username": username}
+            # 驗證後跳轉頁面<url>
+            # "email_redirect_to": "<url>"
+        }
+    }
+
+
+def register_response(result):
+    # 驗證用戶信箱
+    # Supabase -> Sign In / Providers -> Supabase Auth -> Confirm email(Open)
+    if result.user and not result.session:
+        return {
+            "message": "註冊成功！請檢查您的信箱以驗證帳號。",
+            "needsConfirmation": True
+        }, 201
+
+    return {"message": "註冊成功"}, 201
+
+
+def sign_in_params(data):
+    """登入參數；缺少帳號或密碼時回傳 None"""
+    email = data.get("email")
+    password = data.get("password")
+
+    if not email or not password:
+        return None
+
+    return {"email": email, "password": password}
+
+
+def login_response(result):
+    user = result.user
+    session = result.session
+
+    if not user:
+        return {"message": "Invalid credentials"}, 401
+
+    # 更新最後登入時間（write-behind：先記在記憶體，背景批次寫回 users）
+    get_last_login_buffer().record(user.id)
+
+    # 回傳指定格式
+    return {
+        "user": {
+            "id": user.id,
+            "role": user.role or "user"
+        },
+        "auth": {
+            "accessToken": session.access_token,
+            "refreshToken": session.refresh_token,
+            "expiresIn": session.expires_in
+        },
+        "security": {
+            "mfaRequired": False,
+            "passwordExpired": False
+        }
+    }, 200
+
+
+def bearer_token(auth_header):
+    """從 Authorization header 取出 token；格式不符時回傳 None"""
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.replace("Bearer ", "")
+
+
+def profile_response(user_data):
+    if user_data is None:
+        return {"message": "查無此用戶"}, 404
+    return user_data, 200
+
+
+# 用戶註冊
+@auth_bp.route("/register", methods=["POST"])
+def register():
+    params = sign_up_params(request.json)
+    if params is None:
         return jsonify({"message": "Missing required fields"}), 400
 
     try:
         # 呼叫 Supabase Auth 註冊
-        result = supabase.auth.sign_up({
-            "email": email,
-            "password": password,
-            "options": {
-                "data": {"username": username}
-                # 驗證後跳轉頁面<url>
-                # "email_redirect_to": "<url>"
-            }
-        })
-
-        # 驗證用戶信箱
-        # Supabase -> Sign In / Providers -> Supabase Auth -> Confirm email(Open)
-        if result.user and not result.session:
-            return jsonify({
-                "message": "註冊成功！請檢查您的信箱以驗證帳號。",
-                "needsConfirmation": True
-            }), 201
-            
-        return jsonify({"message": "註冊成功"}), 201
+        body, status = register_response(supabase.auth.sign_up(params))
+        return jsonify(body), status
 
     except Exception as e:
         return jsonify({"message": str(e)}), 400
@@ -46,47 +115,14 @@ def register():
 # 用戶登入
 @auth_bp.route("/login", methods=["POST"])
 def login():
-    data = request.json
-    email = data.get("email")
-    password = data.get("password")
-
-    if not email or not password:
+    params = sign_in_params(request.json)
+    if params is None:
         return jsonify({"message": "Missing credentials"}), 400
 
     try:
         # 呼叫 Supabase Auth 登入
-        result = supabase.auth.sign_in_with_password({
-            "email": email,
-            "password": password
-        })
-
-        user = result.user
-        session = result.session
-
-        if not user:
-            return jsonify({"message": "Invalid credentials"}), 401
-
-        # 更新最後登入時間
-        supabase.table("users").update({
-            "last_login": datetime.utcnow().isoformat()
-        }).eq("id", user.id).execute()
-
-        # 回傳指定格式
-        return jsonify({
-            "user": {
-                "id": user.id,
-                "role": user.role or "user"
-            },
-            "auth": {
-                "accessToken": session.access_token,
-                "refreshToken": session.refresh_token,
-                "expiresIn": session.expires_in
-            },
-            "security": {
-                "mfaRequired": False,
-                "passwordExpired": False
-            }
-        }), 200
+        body, status = login_response(supabase.auth.sign_in_with_password(params))
+        return jsonify(body), status
 
     except Exception as e:
         return jsonify({"message": str(e)}), 500
@@ -95,24 +131,23 @@ def login():
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        
-        if not auth_header or not auth_header.startswith("Bearer "):
+        token = bearer_token(request.headers.get("Authorization"))
+
+        if token is None:
             return jsonify({"message": "請先登入"}), 401
-        
-        token = auth_header.replace("Bearer ", "")       
-        
+
         try:
-            # 使用 Supabase SDK 驗證用戶資訊
-            # 以get_user驗證JWT並回傳用戶資訊
-            user_info = supabase.auth.get_user(token)
+            # 驗證 JWT 並取得 user_id
+            # local 模式：本機驗證簽章與到期時間（含已驗證 token 快取）
+            # remote 模式：呼叫 supabase.auth.get_user 遠端驗證（AUTH_VERIFY_MODE=remote）
+            user_id = get_token_verifier().verify(token)
 
             # 將 user_id 存入 Flask 的全域變數 g，供後續業務流程使用
-            g.user_id = user_info.user.id
+            g.user_id = user_id
 
-        except Exception as e:
+        except Exception:
             return jsonify({"message": "Token 無效 / 逾期"}), 401
-            
+
         return f(*args, **kwargs)
     return decorated
 
@@ -121,7 +156,8 @@ def login_required(f):
 @login_required
 def get_profile():
     try:
-        user_data = supabase.table("users").select("*").eq("id", g.user_id).single().execute()
-        return jsonify(user_data.data), 200
+        # read-through 快取（明確欄位，見 service/profile_service.py）
+        body, status = profile_response(get_user(g.user_id))
+        return jsonify(body), status
     except Exception as e:
-        return jsonify({"message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"message": str(e)}), 500
@@ -0,0 +1,89 @@
+"""
+auth_bp 的 ASGI（Quart）版本
+
+路由、參數檢查與回應格式與 api/auth.py 相同（共用其中的 sign_up_params、login_response 等函數），
+差別只在 Supabase 呼叫改用非同步的 AsyncClient：等待 Supabase 回應時不佔用 worker，
+同一個 worker 可以同時處理大量請求。
+"""
+
+import asyncio
+from functools import wraps
+
+from quart import Blueprint, request, jsonify, g
+
+from api.auth import (
+    bearer_token, login_response, profile_response, register_response, sign_in_params, sign_up_params,
+)
+from core.supabase_client import get_async_supabase_client
+from core.token_verifier import MODE_REMOTE, get_token_verifier
+from service.profile_service import aget_user
+
+auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
+
+
+# 用戶註冊
+@auth_bp.route("/register", methods=["POST"])
+async def register():
+    params = sign_up_params(await request.get_json())
+    if params is None:
+        return jsonify({"message": "Missing required fields"}), 400
+
+    try:
+        client = await get_async_supabase_client()
+        body, status = register_response(await client.auth.sign_up(params))
+        return jsonify(body), status
+
+    except Exception as e:
+        return jsonify({"message": str(e)}), 400
+
+
+# 用戶登入
+@auth_bp.route("/login", methods=["POST"])
+async def login():
+    params = sign_in_params(await request.get_json())
+    if params is None:
+        return jsonify({"message": "Missing credentials"}), 400
+
+    try:
+        client = await get_async_supabase_client()
+        body, status = login_response(await client.auth.sign_in_with_password(params))
+        return jsonify(body), status
+
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+
+# 權限驗證
+def login_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = bearer_token(request.headers.get("Authorization"))
+
+        if token is None:
+            return jsonify({"message": "請先登入"}), 401
+
+        try:
+            verifier = get_token_verifier()
+            # local 模式只有 CPU 運算；remote 模式的同步 HTTP 呼叫移到執行緒，避免卡住 event loop
+            if verifier.mode == MODE_REMOTE:
+                g.user_id = await asyncio.to_thread(verifier.verify, token)
+            else:
+                g.user_id = verifier.verify(token)
+
+        except Exception:
+            return jsonify({"message": "Token 無效 / 逾期"}), 401
+
+        return await f(*args, **kwargs)
+    return decorated
+
+
+# 用戶首頁 - 登入後可使用
+@auth_bp.route("/profile", methods=["GET"])
+@login_required
+async def get_profile():
+    try:
+        client = await get_async_supabase_client()
+        body, status = profile_response(await aget_user(client, g.user_id))
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
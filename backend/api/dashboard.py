@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify, g
+from api.auth import login_required
+from core.supabase_client import supabase
+from service.dashboard_service import load_dashboard
+
+dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
+
+# 儀表板：個人資料、履歷、應徵紀錄與職涯分析報告（ASGI 模式見 api/dashboard_async.py）
+@dashboard_bp.route("", methods=["GET"])
+@login_required
+def get_dashboard():
+    try:
+        return jsonify(load_dashboard(supabase, g.user_id)), 200
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
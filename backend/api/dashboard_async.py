@@ -0,0 +1,16 @@
+from quart import Blueprint, jsonify, g
+from api.auth_async import login_required
+from core.supabase_client import get_async_supabase_client
+from service.dashboard_service import aload_dashboard
+
+dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
+
+# 儀表板（ASGI 模式）：互不相依的查詢同時送出
+@dashboard_bp.route("", methods=["GET"])
+@login_required
+async def get_dashboard():
+    try:
+        client = await get_async_supabase_client()
+        return jsonify(await aload_dashboard(client, g.user_id)), 200
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
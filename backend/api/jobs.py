@@ -0,0 +1,19 @@
+from flask import Blueprint, request, jsonify
+from service.job_search_service import parse_search_params, search_jobs
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+
+# 職缺篩選搜尋：以職缺目錄快照回答，不查詢資料庫（ASGI 模式見 api/jobs_async.py）
+# GET /api/jobs/search?city=台北市&skill=12&skill=40&salary_min=50000&limit=20
+@jobs_bp.route("/search", methods=["GET"])
+def search():
+    try:
+        filters, limit, offset = parse_search_params(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"查詢參數錯誤: {e}"}), 400
+
+    try:
+        body, status = search_jobs(filters, limit, offset)
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
@@ -0,0 +1,18 @@
+from quart import Blueprint, request, jsonify
+from service.job_search_service import parse_search_params, search_jobs
+
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+
+# 職缺篩選搜尋（ASGI 模式）：查詢只在記憶體中進行（微秒級），直接在 event loop 上執行
+@jobs_bp.route("/search", methods=["GET"])
+async def search():
+    try:
+        filters, limit, offset = parse_search_params(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"查詢參數錯誤: {e}"}), 400
+
+    try:
+        body, status = search_jobs(filters, limit, offset)
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
@@ -3,11 +3,19 @@ from flask_cors import CORS
 from core.supabase_client import supabase
 from datetime import datetime
 from api.auth import auth_bp
+from api.dashboard import dashboard_bp
+from api.jobs import jobs_bp
+from core.request_metrics import init_app as init_request_metrics
 
 app = Flask(__name__)
 CORS(app)
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+
+# 路由計時、Server-Timing header 與 /metrics（Prometheus）
+init_request_metrics(app)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
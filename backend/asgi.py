@@ -0,0 +1,49 @@
+"""
+Backend 的 ASGI 模式（Quart）
+
+與 app.py（Flask）提供相同的路由，但 Supabase 呼叫全部改為非同步（AsyncClient）：
+- 等待 Supabase 回應時不佔用 worker，一個 worker 就能同時處理大量請求
+- 同一個 event loop 共用一個 httpx.AsyncClient 連線池（supabase_connection.get_async_supabase_client）
+- 需要多張表的端點（例如 /api/dashboard）以 asyncio.gather 同時查詢
+
+執行方式:
+    hypercorn asgi:app --bind 0.0.0.0:5000 --workers 4
+    python bench_async.py      # 與 Flask 開發伺服器比較同時請求的吞吐量
+
+與 app.py 相同提供路由計時與 /metrics（core/request_metrics.py）。
+"""
+
+from quart import Quart, request
+
+from api.auth_async import auth_bp
+from api.dashboard_async import dashboard_bp
+from api.jobs_async import jobs_bp
+from core.request_metrics import init_async_app as init_request_metrics
+from supabase_connection import close_async_clients
+
+app = Quart(__name__)
+
+app.register_blueprint(auth_bp, url_prefix='/api/auth')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+init_request_metrics(app)
+
+
+# 與 app.py 的 CORS(app) 相同：允許所有來源
+@app.after_request
+async def add_cors_headers(response):
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    if request.method == 'OPTIONS':
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get(
+            'Access-Control-Request-Headers', '*')
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
+    return response
+
+
+@app.after_serving
+async def close_supabase():
+    await close_async_clients()
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,193 @@
+"""
+Flask（WSGI）與 Quart（ASGI）吞吐量比較
+
+在本機啟動一個假的 PostgREST（每個查詢固定延遲 --latency 秒，模擬到 Supabase 的往返），
+再分別啟動：
+1. Flask 開發伺服器（app.py，threaded=True）
+2. Quart + hypercorn（asgi.py，1 個 worker）
+以 --concurrency 個同時連線送出 --requests 個 GET /api/dashboard（users 對應 user_id 後查 4 張表），比較每秒請求數與延遲。
+
+假 PostgREST、兩個伺服器與壓測用戶端都在同一台機器上；核心數少時，同時連線數一高就會變成
+CPU bound（兩者都受 CPU 限制，非同步的 httpx 每個請求的 CPU 成本較高），
+要觀察等待 Supabase 時的差異請提高 --latency 或降低 --concurrency。
+
+執行方式:
+    python bench_async.py --requests 500 --concurrency 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+JWT_SECRET = "bench-secret-bench-secret-bench-secret"
+BENCH_AUTH_ID = "00000000-0000-4000-8000-000000000001"   # 壓測使用者的 Supabase Auth UUID（JWT sub）
+
+# 假 PostgREST 回傳的資料列；users 讓 Auth UUID 對應到 user_id 1，dashboard 才會繼續查詢其他表
+FAKE_ROWS = {
+    "users": [{"id": BENCH_AUTH_ID, "user_id": 1, "email": "bench@example.com", "is_active": True}],
+    "user_profile": [{"profile_id": 1, "user_id": 1, "full_name": "王小明"}],
+    "resume": [{"resume_id": 1, "resume_type": "upload"}, {"resume_id": 2, "resume_type": "template"}],
+    "application_record": [{"application_id": 1, "job_id": 10, "application_status": "applied"}],
+    "career_analysis_report": [{"report_id": 1, "resume_id": 1, "career_readiness_score": 0.72}],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def serve_fake_postgrest(port, latency):
+    """以 asyncio 實作的最小 PostgREST（支援 keep-alive），延遲以 asyncio.sleep 模擬，本身幾乎不耗 CPU"""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                path = request_line.split()[1].decode("latin-1")
+                table = path.split("?")[0].rstrip("/").split("/")[-1]
+                body = json.dumps(FAKE_ROWS.get(table, [])).encode("utf-8")
+                await asyncio.sleep(latency)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def start_fake_postgrest(port, latency):
+    """在獨立行程啟動假 PostgREST，避免與壓測用戶端搶 GIL"""
+    command = [sys.executable, os.path.abspath(__file__), "--serve-fake", str(port), "--latency", str(latency)]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_server(kind, port, env):
+    if kind == "flask":
+        command = [sys.executable, "-c",
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    else:
+        command = [sys.executable, "-m", "hypercorn", "asgi:app", "--bind", f"127.0.0.1:{port}", "--workers", "1"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"伺服器未啟動: {url}")
+
+
+async def run_load(url, token, total, concurrency):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flask 與 Quart 吞吐量比較")
+    parser.add_argument("--requests", type=int, default=500, help="總請求數")
+    parser.add_argument("--concurrency", type=int, default=50, help="同時連線數")
+    parser.add_argument("--latency", type=float, default=0.05, help="假 PostgREST 每個查詢的延遲（秒）")
+    parser.add_argument("--serve-fake", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_fake:
+        asyncio.run(serve_fake_postgrest(args.serve_fake, args.latency))
+        return
+
+    print("=" * 60)
+    print("Flask（WSGI）與 Quart（ASGI）吞吐量比較")
+    print("=" * 60)
+
+    fake_port = free_port()
+    fake = start_fake_postgrest(fake_port, args.latency)
+    service_key = jwt.encode({"role": "service_role", "iss": "supabase"}, JWT_SECRET, algorithm="HS256")
+    token = jwt.encode({"sub": BENCH_AUTH_ID, "aud": "authenticated", "exp": int(time.time()) + 3600},
+                       JWT_SECRET, algorithm="HS256")
+    env = dict(os.environ,
+               SUPABASE_URL=f"http://127.0.0.1:{fake_port}",
+               SUPABASE_SERVICE_ROLE_KEY=service_key,
+               SUPABASE_JWT_SECRET=JWT_SECRET,
+               AUTH_VERIFY_MODE="local")
+    print(f"假 PostgREST 延遲 {args.latency * 1000:.0f} ms / 查詢，"
+          f"{args.requests} 個請求，同時 {args.concurrency} 個連線\n")
+
+    results = {}
+    try:
+        for kind, label in (("flask", "Flask 開發伺服器"), ("asgi", "Quart + hypercorn")):
+            port = free_port()
+            process = start_server(kind, port, env)
+            try:
+                base = f"http://127.0.0.1:{port}"
+                wait_ready(base + "/api/dashboard")
+                asyncio.run(run_load(base + "/api/dashboard", token, min(20, args.requests), 5))  # 暖機
+                result = asyncio.run(run_load(base + "/api/dashboard", token, args.requests, args.concurrency))
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+            results[kind] = result
+            print(f"【{label}】 {result['rps']:.1f} req/s，p50 {result['p50_ms']:.0f} ms，"
+                  f"p95 {result['p95_ms']:.0f} ms，錯誤 {result['errors']}")
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+    print(f"\nASGI 吞吐量為 Flask 的 {results['asgi']['rps'] / results['flask']['rps']:.2f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+以 Redis 為後端、多個 gunicorn worker 共用的 TTL 快取
+
+介面與 TTLCache 相同（get / set / pop），值以 JSON 序列化。
+Redis 無法連線或指令失敗時不拋出例外：get 視為未命中、set / pop 略過，
+呼叫端自然退回讀資料庫，快取故障不會讓 API 失敗。
+
+環境變數:
+    REDIS_URL    例如 redis://localhost:6379/0；未設定時 get_redis_client() 回傳 None
+"""
+
+import json
+import os
+import threading
+
+
+class RedisCache:
+    """
+    參數:
+        client: redis.Redis（或相容的 stand-in，例如 fakeredis.FakeRedis）
+        prefix (str): key 前綴，避免與其他用途的 key 衝突
+        ttl (float): 預設存活秒數
+    """
+
+    def __init__(self, client, prefix="cache:", ttl=300.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.errors = 0
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception:
+            self.errors += 1
+            return default
+        if raw is None:
+            return default
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(self._key(key), json.dumps(value, ensure_ascii=False, default=str),
+                            px=max(1, int(ttl * 1000)))
+        except Exception:
+            self.errors += 1
+
+    def pop(self, key, default=None):
+        try:
+            self.client.delete(self._key(key))
+        except Exception:
+            self.errors += 1
+        return default
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """依 REDIS_URL 建立行程內共用的 redis.Redis；未設定 REDIS_URL 時回傳 None"""
+    global _client
+    url = os.getenv("REDIS_URL", "")
+    if not url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
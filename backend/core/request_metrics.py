@@ -0,0 +1,156 @@
+"""
+路由計時 middleware、/metrics 端點與取樣式 profiler 的掛載點
+
+- 每個請求記錄 http_request_seconds（method、路由規則、status）與其中等待 Supabase 的時間
+  （http_request_supabase_seconds），回應加上 Server-Timing header
+- Supabase 各表各操作的次數、延遲與大小由 supabase_control/perf_metrics 的 transport 記錄，同樣從 /metrics 輸出
+- /metrics 為 Prometheus 文字格式，預設停用（回 404）；需要明確開啟:
+  設定 METRICS_TOKEN 時以 Authorization: Bearer <METRICS_TOKEN> 驗證，
+  或設定 METRICS_ALLOW_LOCAL=1 允許本機（127.0.0.1 / ::1）不帶 token 讀取。
+  同一台主機上有反向代理時，經由代理的請求來源也是本機，對外服務請使用 METRICS_TOKEN
+- 取樣式 profiler（只在 Flask 模式）：PROFILE_SAMPLE_RATE 大於 0 時，依比例抽出請求
+  （可用 PROFILE_ROUTES 限定路由），以背景執行緒取樣該請求的呼叫堆疊；
+  耗時超過 PROFILE_SLOW_MS 的請求寫出 folded stacks 到 PROFILE_DIR。
+  未啟用時每個請求只多一次比較，不會啟動取樣執行緒
+
+環境變數:
+    PERF_METRICS            設為 0 時不掛 middleware 與 /metrics
+    METRICS_TOKEN           /metrics 的 bearer token；設定後才能從其他主機讀取 /metrics
+    METRICS_ALLOW_LOCAL     設為 1 時本機請求不需要 token（開發用），預設 0
+    PROFILE_SAMPLE_RATE     取樣請求的比例（0~1），預設 0（停用）
+    PROFILE_ROUTES          只取樣這些路由（逗號分隔，依前綴比對，例如 /api/auth/login）
+    PROFILE_SLOW_MS         只保留耗時超過幾毫秒的請求，預設 200
+    PROFILE_INTERVAL_MS     取樣間隔毫秒，預設 5
+    PROFILE_DIR             profile 輸出目錄，預設 profiles
+
+使用方式:
+    from core.request_metrics import init_app, init_async_app
+
+    init_app(app)               # Flask（app.py）
+    init_async_app(app)         # Quart（asgi.py）
+"""
+
+import hmac
+import os
+import random
+import time
+
+from perf_metrics import (
+    ENABLED, REGISTRY, SamplingProfiler, begin_request, end_request, server_timing, write_folded,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+
+_profile_rate = float(os.getenv("PROFILE_SAMPLE_RATE") or 0)
+_profile_routes = tuple(route.strip() for route in os.getenv("PROFILE_ROUTES", "").split(",") if route.strip())
+_profile_slow = float(os.getenv("PROFILE_SLOW_MS") or 200) / 1000
+_profile_dir = os.getenv("PROFILE_DIR", "profiles")
+_profiler = SamplingProfiler(float(os.getenv("PROFILE_INTERVAL_MS") or 5) / 1000)
+
+
+def _route(request):
+    rule = request.url_rule
+    return rule.rule if rule is not None else UNMATCHED_ROUTE
+
+
+def _should_profile(route):
+    if random.random() >= _profile_rate:
+        return False
+    return not _profile_routes or route.startswith(_profile_routes)
+
+
+def _metrics_status(request):
+    """/metrics 的存取檢查：回傳 200（允許）、401（token 不符）或 404（未開啟）"""
+    if os.getenv("METRICS_ALLOW_LOCAL") == "1" and request.remote_addr in LOOPBACK_ADDRESSES:
+        return 200
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return 404
+    given = request.headers.get("Authorization", "")
+    return 200 if hmac.compare_digest(given.encode(), f"Bearer {token}".encode()) else 401
+
+
+def _finish(g, request, response):
+    timer = g.pop("perf_timer", None)
+    if timer is None:
+        return response
+    route = _route(request)
+    elapsed = end_request(timer, request.method, route, response.status_code)
+    response.headers["Server-Timing"] = server_timing(timer, elapsed)
+    response.headers.setdefault("Timing-Allow-Origin", "*")
+    if timer.profiling:
+        counts = _profiler.stop()
+        if counts and elapsed >= _profile_slow:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            slug = route.strip("/").replace("/", "_").replace("<", "").replace(">", "").replace(":", "-") or "root"
+            name = f"{stamp}_{request.method}_{slug}_{elapsed * 1000:.0f}ms.folded"
+            write_folded(counts, os.path.join(_profile_dir, name))
+            REGISTRY.inc("profiles_written_total", {"route": route})
+    return response
+
+
+def init_app(app):
+    """Flask：掛上計時 middleware、取樣式 profiler 與 /metrics"""
+    if not ENABLED:
+        return app
+
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        timer = g.perf_timer = begin_request()
+        if _profile_rate > 0 and _should_profile(_route(request)):
+            timer.profiling = True
+            _profiler.start()
+
+    @app.after_request
+    def record_timer(response):
+        return _finish(g, request, response)
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request 沒有執行到時（例如其他 before_request 拋出例外）也要停止取樣
+        timer = g.pop("perf_timer", None)
+        if timer is not None and timer.profiling:
+            _profiler.stop()
+
+    def metrics():
+        status = _metrics_status(request)
+        if status != 200:
+            return Response("unauthorized\n" if status == 401 else "not found\n", status=status)
+        return Response(REGISTRY.to_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
+    return app
+
+
+def init_async_app(app):
+    """
+    Quart：掛上計時 middleware 與 /metrics
+
+    hook 必須是 async 函數：Quart 會把同步函數丟到執行緒執行，請求的計時 context 就接不到 Supabase 呼叫。
+    同一個 event loop 交錯執行許多請求，逐請求取樣呼叫堆疊沒有意義，因此 ASGI 模式不提供 profiler。
+    """
+    if not ENABLED:
+        return app
+
+    from quart import Response, g, request
+
+    @app.before_request
+    async def start_timer():
+        g.perf_timer = begin_request()
+
+    @app.after_request
+    async def record_timer(response):
+        return _finish(g, request, response)
+
+    async def metrics():
+        status = _metrics_status(request)
+        if status != 200:
+            return Response("unauthorized\n" if status == 401 else "not found\n", status=status)
+        return Response(REGISTRY.to_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
+    return app
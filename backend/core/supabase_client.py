@@ -1,20 +1,52 @@
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import AsyncClient, Client
+
+# 與 supabase_control 共用同一個 Client 工廠（依 URL/key 快取、共用 HTTP 連線池）
+_supabase_control_path = str(Path(__file__).resolve().parent.parent.parent / 'supabase_control')
+if _supabase_control_path not in sys.path:
+    sys.path.insert(0, _supabase_control_path)
+
+from supabase_connection import get_supabase_client as _get_pooled_client
+from supabase_connection import get_async_supabase_client as _get_pooled_async_client
 
 load_dotenv()
 
-def get_supabase_client() -> Client:
-    """
-    初始化並回傳 Supabase Service Role Client。
-    """
+def _service_role_credentials():
     url: str = os.getenv("SUPABASE_URL", "")
     key: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
     if not url or not key:
         raise ValueError("缺少 Supabase 環境變數：SUPABASE_URL 或 SUPABASE_SERVICE_ROLE_KEY")
+    return url, key
+
+
+def get_supabase_client() -> Client:
+    """
+    取得 Supabase Service Role Client。
+
+    第一次呼叫時才建立，之後回傳同一個共用實例（連線池由 supabase_connection 管理）。
+    """
+    return _get_pooled_client(*_service_role_credentials())
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    取得非同步的 Supabase Service Role Client（ASGI 模式使用，見 backend/asgi.py）。
+
+    同一個 event loop 內共用同一個實例與 httpx.AsyncClient 連線池。
+    """
+    return await _get_pooled_async_client(*_service_role_credentials())
+
+
+class _LazySupabaseClient:
+    """第一次存取屬性時才建立 Client 的代理物件，讓 import 不需要連線資訊也不會建立連線"""
+
+    def __getattr__(self, name):
+        return getattr(get_supabase_client(), name)
 
-    return create_client(url, key)
 
-# 全域實例供使用
-supabase: Client = get_supabase_client()
+# 全域實例供使用（延遲建立）
+supabase: Client = _LazySupabaseClient()
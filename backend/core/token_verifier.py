@@ -0,0 +1,208 @@
+"""
+Access token 驗證模組
+
+login_required 原本每次都呼叫 supabase.auth.get_user(token)，等於每個受保護的
+請求都要多一次到 Supabase Auth 的 HTTP 往返。本模組提供兩種驗證模式：
+
+- local : 在本機以 JWT secret（HS256）或啟動時載入一次的 JWKS（RS256/ES256）
+          驗證簽章與到期時間，並把已驗證的 token 快取到過期為止
+- remote: 維持原本的 supabase.auth.get_user(token) 遠端驗證（不快取）
+
+環境變數:
+    AUTH_VERIFY_MODE        local / remote；未設定時，有 secret 或 JWKS 就用 local
+    SUPABASE_JWT_SECRET     專案 JWT secret（Settings -> API -> JWT Secret）
+    SUPABASE_JWKS_URL       JWKS 位址；未設定時使用 SUPABASE_URL/auth/v1/.well-known/jwks.json
+    AUTH_JWT_AUDIENCE       預設 authenticated
+    AUTH_TOKEN_CACHE_SIZE   已驗證 token 快取筆數上限，預設 10000
+
+使用方式:
+    from core.token_verifier import get_token_verifier
+
+    user_id = get_token_verifier().verify(token)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+
+import jwt
+
+from .ttl_cache import TTLCache
+
+MODE_LOCAL = "local"
+MODE_REMOTE = "remote"
+
+_HMAC_ALGORITHMS = ["HS256", "HS384", "HS512"]
+_ASYMMETRIC_ALGORITHMS = ["RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA"]
+
+
+class InvalidTokenError(Exception):
+    """token 無效、簽章錯誤或已過期"""
+
+
+def load_jwks(url, timeout=5.0):
+    """
+    下載 JWKS 並轉成 {kid: key} 對照表（只在啟動時呼叫一次）
+
+    返回:
+        dict: kid -> 可直接給 jwt.decode 使用的公鑰物件
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        data = json.load(resp)
+    return jwks_from_dict(data)
+
+
+def jwks_from_dict(data):
+    """將 JWKS dict（{"keys": [...]}）轉成 {kid: key}"""
+    keys = {}
+    for jwk in data.get("keys", []):
+        key = jwt.PyJWK.from_dict(jwk)
+        keys[jwk.get("kid")] = key.key
+    return keys
+
+
+class TokenVerifier:
+    """
+    驗證 Supabase access token 並回傳 user_id
+
+    參數:
+        mode (str): "local" 或 "remote"
+        jwt_secret (str, optional): HS256 簽章用的專案 JWT secret
+        jwks (dict, optional): {kid: 公鑰}，通常由 load_jwks() 取得
+        audience (str): 要求的 aud claim，Supabase 登入使用者為 "authenticated"
+        cache_size (int): 已驗證 token 快取的筆數上限
+        leeway (float): 驗證 exp 時容許的時鐘誤差（秒）
+        remote_client: remote 模式使用的 Supabase Client
+        clock (callable): 取得目前時間（epoch 秒）的函數，測試時可替換
+    """
+
+    def __init__(self, mode=MODE_LOCAL, jwt_secret=None, jwks=None, audience="authenticated",
+                 cache_size=10000, leeway=0, remote_client=None, clock=time.time):
+        if mode not in (MODE_LOCAL, MODE_REMOTE):
+            raise ValueError(f"不支援的驗證模式: {mode}")
+        if mode == MODE_LOCAL and not jwt_secret and not jwks:
+            raise ValueError("local 驗證模式需要 SUPABASE_JWT_SECRET 或 JWKS")
+
+        self.mode = mode
+        self.audience = audience
+        self.leeway = leeway
+        self._jwt_secret = jwt_secret
+        self._jwks = jwks or {}
+        self._remote_client = remote_client
+        self._clock = clock
+        self._cache = TTLCache(maxsize=cache_size, clock=clock)
+
+    def verify(self, token):
+        """
+        驗證 token
+
+        返回:
+            str: token 所屬的 user_id（JWT 的 sub）
+
+        異常:
+            InvalidTokenError: token 無效或已過期
+        """
+        if not token:
+            raise InvalidTokenError("缺少 token")
+        if self.mode == MODE_REMOTE:
+            return self._verify_remote(token)
+
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        user_id = self._cache.get(cache_key)
+        if user_id is not None:
+            return user_id
+
+        claims = self._decode(token)
+        user_id = claims["sub"]
+        # 快取到 token 過期為止，過期後自然被淘汰
+        self._cache.set(cache_key, user_id, expires_at=claims["exp"])
+        return user_id
+
+    def _decode(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+            alg = header.get("alg")
+            if alg in _HMAC_ALGORITHMS:
+                if not self._jwt_secret:
+                    raise InvalidTokenError("未設定 JWT secret，無法驗證 HS 簽章")
+                key = self._jwt_secret
+            elif alg in _ASYMMETRIC_ALGORITHMS:
+                key = self._jwks.get(header.get("kid"))
+                if key is None:
+                    raise InvalidTokenError(f"JWKS 中找不到 kid: {header.get('kid')}")
+            else:
+                raise InvalidTokenError(f"不支援的簽章演算法: {alg}")
+
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=self.audience,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+    def _verify_remote(self, token):
+        client = self._remote_client
+        if client is None:
+            from .supabase_client import supabase as client
+        try:
+            user_info = client.auth.get_user(token)
+        except Exception as e:
+            raise InvalidTokenError(str(e)) from e
+        if not user_info or not user_info.user:
+            raise InvalidTokenError("Supabase Auth 查無此用戶")
+        return user_info.user.id
+
+    def invalidate(self, token):
+        """主動讓某個 token 的快取失效（例如登出時）"""
+        self._cache.pop(hashlib.sha256(token.encode("utf-8")).digest())
+
+
+def build_token_verifier_from_env():
+    """依環境變數建立 TokenVerifier（JWKS 只在這裡下載一次）"""
+    secret = os.getenv("SUPABASE_JWT_SECRET", "")
+    jwks_url = os.getenv("SUPABASE_JWKS_URL", "")
+    mode = os.getenv("AUTH_VERIFY_MODE", "").strip().lower()
+    if not mode:
+        mode = MODE_LOCAL if (secret or jwks_url) else MODE_REMOTE
+
+    jwks = None
+    if mode == MODE_LOCAL and not secret:
+        if not jwks_url:
+            supabase_url = os.getenv("SUPABASE_URL", "").rstrip("/")
+            jwks_url = f"{supabase_url}/auth/v1/.well-known/jwks.json"
+        jwks = load_jwks(jwks_url)
+
+    return TokenVerifier(
+        mode=mode,
+        jwt_secret=secret or None,
+        jwks=jwks,
+        audience=os.getenv("AUTH_JWT_AUDIENCE", "authenticated"),
+        cache_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    )
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_token_verifier():
+    """取得行程內共用的 TokenVerifier（第一次呼叫時依環境變數建立）"""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = build_token_verifier_from_env()
+    return _verifier
+
+
+def set_token_verifier(verifier):
+    """替換共用的 TokenVerifier（測試時可注入以本機 secret 簽發 token 的驗證器）"""
+    global _verifier
+    _verifier = verifier
@@ -0,0 +1,100 @@
+"""
+執行緒安全的 TTL + LRU 記憶體快取
+
+供後端各處共用（例如：已驗證 token 快取），同時限制筆數與存活時間：
+- 超過 maxsize 時淘汰最久未使用的項目（LRU）
+- 每筆項目有自己的到期時間，到期後讀取即視為不存在
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    具容量上限的 TTL + LRU 快取
+
+    參數:
+        maxsize (int): 最多保留的項目數
+        ttl (float): 預設存活秒數；set() 可針對單筆覆寫
+        clock (callable): 取得目前時間的函數（秒），預設 time.time，方便測試時替換
+        purge_interval (float): 快取滿時，最短每隔幾秒掃描一次過期項目
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.time, purge_interval=1.0):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必須大於 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """取得項目；不存在或已過期時回傳 default（過期項目會順便移除）"""
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """
+        寫入項目
+
+        參數:
+            ttl (float, optional): 存活秒數，預設使用建構時的 ttl
+            expires_at (float, optional): 絕對到期時間（與 clock 同單位），優先於 ttl
+        """
+        now = self._clock()
+        if expires_at is None:
+            expires_at = now + (self.ttl if ttl is None else ttl)
+        if expires_at <= now:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+
+            if len(self._data) > self.maxsize:
+                self._purge_expired(now)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """移除項目並回傳其值（用於主動失效）"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def _purge_expired(self, now):
+        # 呼叫端需持有 lock；限制掃描頻率，避免快取滿載時每次寫入都 O(n)
+        if now - self._last_purge < self._purge_interval:
+            return
+        self._last_purge = now
+        expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+        for k in expired:
+            del self._data[k]
+
+
+_MISSING = object()
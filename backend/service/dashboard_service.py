@@ -0,0 +1,72 @@
+"""
+使用者儀表板資料（user_profile、resume、application_record、career_analysis_report）
+
+查詢定義只有一份，同步（Flask）與非同步（ASGI）兩種模式共用。傳入的 auth_id 是 JWT 的 sub（Auth UUID），
+各表的 user_id 是 users.user_id（整數），先以 profile_service.resolve_user_id 換算一次再查詢；
+users 與 user_profile 都經過 profile_service 的 read-through 快取。
+- load_dashboard(client, auth_id)：依序查詢，每個查詢都要等前一個完成
+- aload_dashboard(client, auth_id)：互不相依的查詢（個人資料、履歷、應徵紀錄）以 asyncio.gather 同時送出，
+  拿到履歷後再查各履歷的職涯分析報告；快取命中時總延遲約為兩次往返，而不是四次
+"""
+
+import asyncio
+
+from service.profile_service import aget_user_profile, aresolve_user_id, get_user_profile, resolve_user_id
+
+RESUME_COLUMNS = "resume_id, resume_type, template_id, is_primary, updated_at, created_at"
+APPLICATION_COLUMNS = "application_id, job_id, application_status, applied_at, status_updated_at"
+REPORT_COLUMNS = "report_id, resume_id, career_readiness_score, generated_at"
+RECENT_LIMIT = 20
+
+
+def _resume_query(client, user_id):
+    return (client.table("resume").select(RESUME_COLUMNS).eq("user_id", user_id)
+            .order("updated_at", desc=True).limit(RECENT_LIMIT))
+
+
+def _application_query(client, user_id):
+    return (client.table("application_record").select(APPLICATION_COLUMNS).eq("user_id", user_id)
+            .order("applied_at", desc=True).limit(RECENT_LIMIT))
+
+
+def _report_query(client, resume_ids):
+    return (client.table("career_analysis_report").select(REPORT_COLUMNS).in_("resume_id", resume_ids)
+            .order("generated_at", desc=True).limit(RECENT_LIMIT))
+
+
+def build_dashboard(profile, resumes, applications, reports):
+    return {
+        "profile": profile,
+        "resumes": resumes,
+        "applications": applications,
+        "reports": reports,
+    }
+
+
+def load_dashboard(client, auth_id):
+    """同步版本（Flask）"""
+    user_id = resolve_user_id(auth_id)
+    if user_id is None:
+        return build_dashboard(None, [], [], [])
+    profile = get_user_profile(user_id)
+    resumes = _resume_query(client, user_id).execute().data or []
+    applications = _application_query(client, user_id).execute().data or []
+    resume_ids = [r["resume_id"] for r in resumes]
+    reports = (_report_query(client, resume_ids).execute().data or []) if resume_ids else []
+    return build_dashboard(profile, resumes, applications, reports)
+
+
+async def aload_dashboard(client, auth_id):
+    """非同步版本（ASGI，client 為 AsyncClient）"""
+    user_id = await aresolve_user_id(client, auth_id)
+    if user_id is None:
+        return build_dashboard(None, [], [], [])
+    profile, resumes, applications = await asyncio.gather(
+        aget_user_profile(client, user_id),
+        _resume_query(client, user_id).execute(),
+        _application_query(client, user_id).execute(),
+    )
+    resumes = resumes.data or []
+    resume_ids = [r["resume_id"] for r in resumes]
+    reports = ((await _report_query(client, resume_ids).execute()).data or []) if resume_ids else []
+    return build_dashboard(profile, resumes, applications.data or [], reports)
@@ -0,0 +1,113 @@
+"""
+職缺篩選搜尋（以 supabase_control/job_catalog.py 的快照回答，不查詢資料庫）
+
+依縣市、區域、產業、遠端選項、技能與薪資篩選職缺，原本每個請求都要查 job_posting / company_info /
+job_skill_requirement；改為讀取 job_catalog 產生的 mmap 快照：
+
+- 同一台機器上的所有 worker 共用同一份 page cache
+- 快照由排程執行 `python job_catalog.py refresh` 更新（原子替換檔案），
+  每個 worker 最多每 JOB_CATALOG_CHECK_INTERVAL 秒檢查一次檔案是否換新，換新時重新 mmap
+- 同步（Flask）與非同步（ASGI）模式共用 parse_search_params / search_jobs
+
+環境變數:
+    JOB_CATALOG_PATH             快照路徑，預設 supabase_control/.job_catalog.bin
+    JOB_CATALOG_CHECK_INTERVAL   檢查快照是否更新的間隔秒數，預設 5
+"""
+
+import os
+import threading
+import time
+
+import core.supabase_client  # noqa: F401  將 supabase_control 加入 sys.path
+from job_catalog import DEFAULT_CATALOG_PATH, JobCatalog
+
+MAX_LIMIT = 100
+CATEGORICAL_PARAMS = {"city": "city", "district": "district", "industry": "industry", "remote": "remote_option"}
+
+
+class CatalogHolder:
+    """
+    持有目前的 JobCatalog；檔案被替換（inode 或修改時間改變）時重新開啟
+
+    舊的快照不主動關閉：正在查詢的請求仍持有它的陣列，最後一個參考釋放時 mmap 才會關閉。
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._catalog = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """目前的快照；檔案不存在時回傳 None"""
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.check_interval:
+            return self._catalog
+        with self._lock:
+            if self._catalog is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    return self._catalog
+                signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if signature != self._signature:
+                    self._catalog = JobCatalog.open(self.path)
+                    self._signature = signature
+        return self._catalog
+
+
+_holder = CatalogHolder(os.getenv("JOB_CATALOG_PATH", DEFAULT_CATALOG_PATH),
+                        float(os.getenv("JOB_CATALOG_CHECK_INTERVAL", "5")))
+
+
+def get_job_catalog():
+    return _holder.get()
+
+
+def parse_search_params(args):
+    """
+    查詢參數（Flask / Quart 的 request.args）-> (篩選條件, limit, offset)
+
+    city / district / industry / remote / skill 可重複或以逗號分隔；
+    match=any 時具備任一技能即可；salary_min / salary_max 為月薪。
+    格式錯誤時拋出 ValueError。
+    """
+    def values(name):
+        items = [v.strip() for raw in args.getlist(name) for v in raw.split(",") if v.strip()]
+        return items or None
+
+    filters = {field: values(param) for param, field in CATEGORICAL_PARAMS.items()}
+    skills = values("skill")
+    filters["skills"] = [int(s) for s in skills] if skills else None
+    filters["match_all_skills"] = args.get("match", "all") != "any"
+    for name in ("salary_min", "salary_max"):
+        value = args.get(name)
+        filters[name] = int(value) if value not in (None, "") else None
+
+    limit = min(int(args.get("limit", 20)), MAX_LIMIT)
+    offset = int(args.get("offset", 0))
+    if limit < 0 or offset < 0:
+        raise ValueError("limit / offset 不可為負數")
+    return filters, limit, offset
+
+
+def search_jobs(filters, limit=20, offset=0):
+    """
+    返回:
+        (dict, int): 回應內容與 HTTP 狀態碼
+    """
+    catalog = get_job_catalog()
+    if catalog is None:
+        return {"message": "職缺目錄尚未建立"}, 503
+
+    start = time.perf_counter()
+    rows = catalog.match(**filters)
+    return {
+        "total": int(len(rows)),
+        "jobs": catalog.records(rows[offset:offset + limit]),
+        "snapshot": catalog.watermark,
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 3),
+    }, 200
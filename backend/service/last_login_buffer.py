@@ -0,0 +1,259 @@
+"""
+last_login 的 write-behind 緩衝
+
+login() 原本在回傳 token 前同步執行 users.update(last_login)，每次登入都多一次遠端寫入；
+登入尖峰時 users 表每個請求都被寫一次。本模組改為：
+
+- 登入時只在記憶體記錄 {user_id: 最後登入時間}，同一個使用者重複登入只保留最新的時間
+- 背景執行緒每 flush_interval 秒、或累積 flush_size 位使用者時寫回：登入時間取整到秒後分組，
+  每組一個 UPDATE users SET last_login = ? WHERE id IN (...)（每次最多 chunk_size 個 id），
+  以 workers 個執行緒並行送出；同一段時間內登入的使用者通常只需要少數幾個請求
+  （不用 upsert：只帶 id 與 last_login 的資料列會被 email、password_hash 等 NOT NULL 欄位拒絕）
+- 只有暫時性錯誤（網路、429 / 5xx，見 bulk_writer.is_transient_error）的使用者放回緩衝等下次寫回；
+  4xx 重試結果必定相同：多個 id 的請求對半拆分找出有問題的 id，只捨棄並計數這些 id
+- 等待寫回的使用者數上限為 max_pending：寫回跟不上時，新使用者的登入時間會被捨棄並計數
+  （已在緩衝中的使用者仍會更新為最新時間），記憶體用量有上限
+- 行程結束（atexit）時寫回剩餘資料
+- 寫回後呼叫 on_flush(user_ids)；共用實例以此讓 profile 快取（service/profile_service.py）失效
+
+環境變數:
+    LAST_LOGIN_FLUSH_INTERVAL   寫回間隔秒數，預設 5
+    LAST_LOGIN_FLUSH_SIZE       累積多少位使用者就提前寫回，預設 500
+    LAST_LOGIN_MAX_PENDING      等待寫回的使用者數上限，預設 100000
+    LAST_LOGIN_FLUSH_WORKERS    寫回時並行的請求數，預設 8
+    LAST_LOGIN_CHUNK_SIZE       每個 UPDATE 帶入的 id 數上限，預設 200
+
+使用方式:
+    from service.last_login_buffer import get_last_login_buffer
+
+    get_last_login_buffer().record(user.id)
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from core.supabase_client import supabase as default_client
+from bulk_writer import is_transient_error
+from service.profile_service import invalidate_user
+
+
+class LastLoginBuffer:
+    """
+    參數:
+        client: Supabase Client，預設為 core.supabase_client.supabase
+        table (str): 使用者資料表
+        key (str): 主鍵欄位
+        column (str): 最後登入時間欄位
+        flush_interval (float): 寫回間隔秒數
+        flush_size (int): 累積多少位使用者就提前寫回
+        max_pending (int): 等待寫回的使用者數上限
+        workers (int): 寫回時並行的請求數
+        chunk_size (int): 每個 UPDATE 帶入的 id 數上限（id 放在網址的 in 篩選中）
+        on_flush (callable, optional): 寫回成功後以 user_id 清單呼叫
+    """
+
+    def __init__(self, client=None, table="users", key="id", column="last_login",
+                 flush_interval=5.0, flush_size=500, max_pending=100000, workers=8, chunk_size=200,
+                 on_flush=None):
+        self.client = client or default_client
+        self.table = table
+        self.key = key
+        self.column = column
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.on_flush = on_flush
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+        self.rejected = 0
+
+    def start(self):
+        """啟動背景寫回執行緒（重複呼叫無作用）"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="last-login-flusher", daemon=True)
+                self._thread.start()
+        return self
+
+    def record(self, user_id, when=None):
+        """
+        記錄一次登入（不會進行任何 I/O，也不會拋出例外）
+
+        返回:
+            bool: False 表示緩衝已滿、這次記錄被捨棄
+        """
+        when = (when or datetime.now(timezone.utc)).replace(microsecond=0)   # 取整到秒，寫回時同一秒的合併
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+            self.recorded += 1
+            size = len(self._pending)
+        if size >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        把目前緩衝的登入時間寫回資料庫
+
+        返回:
+            int: 寫回的使用者數
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            written, retry, rejected = self._write(batch)
+            if retry:
+                self.flush_errors += 1
+                self._requeue(retry)
+                print(f"⚠️ last_login 寫回失敗，{len(retry)} 筆留待下次寫回: {next(iter(retry.values()))[1]}")
+            if rejected:
+                self.rejected += len(rejected)
+                print(f"⚠️ last_login 寫回被拒絕，捨棄 {len(rejected)} 筆: {rejected[0][1]}")
+
+            self.flushed += len(written)
+            if self.on_flush is not None and written:
+                self.on_flush(written)
+            return len(written)
+
+    def _write(self, batch):
+        """
+        依登入時間分組，每組以 in_ 篩選一次 UPDATE 多位使用者，以 workers 個執行緒並行
+
+        返回:
+            tuple: (寫回的 user_id 清單, {user_id: (時間, 錯誤)} 暫時性失敗, [(user_id, 錯誤)] 被拒絕)
+        """
+        groups = {}
+        for user_id, when in batch.items():
+            groups.setdefault(when, []).append(user_id)
+        items = deque((when, user_ids[i:i + self.chunk_size])
+                      for when, user_ids in groups.items() for i in range(0, len(user_ids), self.chunk_size))
+        items_lock = threading.Lock()
+        written, retry, rejected = [], {}, []
+
+        def work():
+            while True:
+                with items_lock:
+                    if not items:
+                        return
+                    when, user_ids = items.popleft()
+                try:
+                    self.client.table(self.table).update({self.column: when.isoformat()}) \
+                        .in_(self.key, user_ids).execute()
+                except Exception as e:
+                    with items_lock:
+                        if is_transient_error(e):
+                            retry.update((user_id, (when, e)) for user_id in user_ids)
+                        elif len(user_ids) > 1:
+                            # 對半拆分，找出被拒絕的 id（例如格式錯誤的 uuid），其他 id 照常寫回
+                            half = len(user_ids) // 2
+                            items.extend([(when, user_ids[:half]), (when, user_ids[half:])])
+                        else:
+                            rejected.append((user_ids[0], e))
+                else:
+                    with items_lock:
+                        written.extend(user_ids)
+
+        # 行程結束（atexit）時無法建立新執行緒，剩下的由目前的執行緒寫回
+        threads = []
+        for _ in range(min(self.workers, len(items)) - 1):
+            thread = threading.Thread(target=work, daemon=True)
+            try:
+                thread.start()
+            except RuntimeError:
+                break
+            threads.append(thread)
+        work()
+        for thread in threads:
+            thread.join()
+        return written, retry, rejected
+
+    def _requeue(self, batch):
+        # 寫回失敗的資料放回緩衝（期間有更新的登入時間則保留較新的），仍受 max_pending 限制
+        with self._lock:
+            for user_id, (when, _) in batch.items():
+                current = self._pending.get(user_id)
+                if current is not None:
+                    if when > current:
+                        self._pending[user_id] = when
+                elif len(self._pending) < self.max_pending:
+                    self._pending[user_id] = when
+                else:
+                    self.dropped += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self, timeout=10.0):
+        """停止背景執行緒並寫回剩餘資料"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            "pending": self.pending(),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+            "rejected": self.rejected,
+        }
+
+
+def _invalidate_profiles(user_ids):
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_last_login_buffer():
+    """取得行程內共用的 LastLoginBuffer（第一次呼叫時依環境變數建立並啟動，行程結束時寫回）"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LastLoginBuffer(
+                    flush_interval=float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "5")),
+                    flush_size=int(os.getenv("LAST_LOGIN_FLUSH_SIZE", "500")),
+                    max_pending=int(os.getenv("LAST_LOGIN_MAX_PENDING", "100000")),
+                    workers=int(os.getenv("LAST_LOGIN_FLUSH_WORKERS", "8")),
+                    chunk_size=int(os.getenv("LAST_LOGIN_CHUNK_SIZE", "200")),
+                    on_flush=_invalidate_profiles,
+                ).start()
+                atexit.register(_buffer.close)
+    return _buffer
@@ -0,0 +1,229 @@
+"""
+使用者資料讀取（read-through 快取）
+
+前端每次載入頁面都會呼叫 /api/auth/profile，原本每次都對 users 做 select("*")。
+本模組把 users 與 user_profile 的單一使用者讀取包成 read-through 快取：
+
+- 本機一層 TTLCache（TTL + LRU 筆數上限）
+- 設定 REDIS_URL 時再加一層 Redis，多個 gunicorn worker 共用命中；
+  此時本機層的 TTL 縮短為 PROFILE_CACHE_LOCAL_TTL，其他 worker 失效後最多只會看到這麼久的舊資料
+- 只讀取明確列出的欄位，不再 select("*")（也不會把 password_hash 回傳給前端）
+- users.id 是 Supabase Auth 的 UUID（JWT 的 sub，即 g.user_id）；user_profile、resume、application_record
+  的 user_id 則是 users.user_id（整數）。resolve_user_id / aresolve_user_id 經由快取的 users 資料換算
+- 同一個 worker 內同一個 key 同時未命中時只查一次資料庫
+- aget_user / aget_user_profile 為 ASGI 模式（AsyncClient）使用的非同步版本，共用同一個快取
+- 任何更新 users / user_profile 的程式都要呼叫 invalidate_user() / invalidate_user_profile()
+
+環境變數:
+    PROFILE_CACHE_TTL           快取秒數，預設 60
+    PROFILE_CACHE_LOCAL_TTL     有 Redis 時本機層的快取秒數，預設 5
+    PROFILE_CACHE_SIZE          本機層筆數上限，預設 10000
+    PROFILE_USER_COLUMNS        users 讀取的欄位，預設 id, user_id, email, is_active, auth_provider, created_at, last_login
+    PROFILE_DETAIL_COLUMNS      user_profile 讀取的欄位，預設為 user_profile 的全部欄位
+
+使用方式:
+    from service.profile_service import get_user, invalidate_user
+
+    user = get_user(g.user_id)
+    profile = get_user_profile(resolve_user_id(g.user_id))
+    ...更新 users 後...
+    invalidate_user(g.user_id)
+"""
+
+import asyncio
+import os
+import threading
+
+from core.redis_cache import RedisCache, get_redis_client
+from core.supabase_client import supabase
+from core.ttl_cache import TTLCache
+
+USER_COLUMNS = os.getenv("PROFILE_USER_COLUMNS", "id, user_id, email, is_active, auth_provider, created_at, last_login")
+PROFILE_DETAIL_COLUMNS = os.getenv(
+    "PROFILE_DETAIL_COLUMNS",
+    "profile_id, user_id, full_name, location, years_of_experience, current_position, "
+    "education_background, github_repo, privacy_settings, updated_at",
+)
+
+_NOT_FOUND = {"__not_found__": True}
+
+
+class ReadThroughCache:
+    """
+    兩層 read-through 快取：本機 TTLCache，加上選用的共用快取（RedisCache）
+
+    參數:
+        ttl (float): 快取秒數
+        maxsize (int): 本機層筆數上限
+        shared (RedisCache, optional): 多個 worker 共用的快取
+        local_ttl (float, optional): 有共用快取時本機層的快取秒數
+    """
+
+    def __init__(self, ttl=60.0, maxsize=10000, shared=None, local_ttl=5.0):
+        self.ttl = ttl
+        self.shared = shared
+        self.local = TTLCache(maxsize=maxsize, ttl=min(ttl, local_ttl) if shared is not None else ttl)
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._inflight = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        """
+        讀取快取；未命中時呼叫 loader() 並寫入快取（loader 回傳 None 也會被快取，避免反覆查不存在的資料）
+        """
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return None if value is _NOT_FOUND else value
+
+        with self._key_locks[hash(key) % len(self._key_locks)]:
+            value = self._cached(key)
+            if value is not None:
+                return None if value is _NOT_FOUND else value
+
+            self.misses += 1
+            loaded = loader()
+            value = _NOT_FOUND if loaded is None else loaded
+            self.local.set(key, value)
+            if self.shared is not None:
+                self.shared.set(key, value, ttl=self.ttl)
+            return loaded
+
+    def _cached(self, key):
+        """只查快取（本機層，再來共用層）；未命中時回傳 None"""
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.shared_hits += 1
+                value = _NOT_FOUND if value == _NOT_FOUND else value
+                self.local.set(key, value)
+                return value
+        return None
+
+    async def aget_or_load(self, key, loader):
+        """
+        get_or_load 的非同步版本：loader 為回傳 coroutine 的函數；
+        同一個 event loop 內同一個 key 同時未命中時只會 await 一次 loader
+        """
+        value = self._cached(key)
+        if value is None:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                self.misses += 1
+                inflight = asyncio.ensure_future(self._aload(key, loader))
+                self._inflight[key] = inflight
+                inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+            value = await asyncio.shield(inflight)
+        return None if value is _NOT_FOUND else value
+
+    async def _aload(self, key, loader):
+        loaded = await loader()
+        value = _NOT_FOUND if loaded is None else loaded
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl=self.ttl)
+        return value
+
+    def invalidate(self, key):
+        self.local.pop(key)
+        if self.shared is not None:
+            self.shared.pop(key)
+
+    def stats(self):
+        return {
+            "local_entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared_errors": self.shared.errors if self.shared is not None else 0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache():
+    """取得行程內共用的 ReadThroughCache（第一次呼叫時依環境變數建立）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+                client = get_redis_client()
+                _cache = ReadThroughCache(
+                    ttl=ttl,
+                    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+                    shared=RedisCache(client, prefix="profile:", ttl=ttl) if client is not None else None,
+                    local_ttl=float(os.getenv("PROFILE_CACHE_LOCAL_TTL", "5")),
+                )
+    return _cache
+
+
+def set_profile_cache(cache):
+    """替換共用的快取（測試時可注入使用 fakeredis 的 RedisCache）"""
+    global _cache
+    _cache = cache
+
+
+def _first_row(response):
+    rows = response.data or []
+    return rows[0] if rows else None
+
+
+def get_user(auth_id):
+    """users 中的使用者（明確欄位，auth_id 為 Auth UUID）；不存在時回傳 None"""
+    return get_profile_cache().get_or_load(
+        f"users:{auth_id}",
+        lambda: _first_row(supabase.table("users").select(USER_COLUMNS).eq("id", auth_id).limit(1).execute()),
+    )
+
+
+def resolve_user_id(auth_id):
+    """Auth UUID -> users.user_id（整數）；使用者不存在時回傳 None"""
+    return (get_user(auth_id) or {}).get("user_id")
+
+
+def get_user_profile(user_id):
+    """user_profile 中的個人資料（明確欄位，user_id 為 users.user_id）；不存在時回傳 None"""
+    return get_profile_cache().get_or_load(
+        f"user_profile:{user_id}",
+        lambda: _first_row(supabase.table("user_profile").select(PROFILE_DETAIL_COLUMNS)
+                           .eq("user_id", user_id).limit(1).execute()),
+    )
+
+
+async def aget_user(client, auth_id):
+    """get_user 的非同步版本（client 為 AsyncClient）"""
+    async def load():
+        return _first_row(await client.table("users").select(USER_COLUMNS).eq("id", auth_id).limit(1).execute())
+    return await get_profile_cache().aget_or_load(f"users:{auth_id}", load)
+
+
+async def aresolve_user_id(client, auth_id):
+    """resolve_user_id 的非同步版本"""
+    return (await aget_user(client, auth_id) or {}).get("user_id")
+
+
+async def aget_user_profile(client, user_id):
+    """get_user_profile 的非同步版本（client 為 AsyncClient）"""
+    async def load():
+        return _first_row(await client.table("user_profile").select(PROFILE_DETAIL_COLUMNS)
+                          .eq("user_id", user_id).limit(1).execute())
+    return await get_profile_cache().aget_or_load(f"user_profile:{user_id}", load)
+
+
+def invalidate_user(auth_id):
+    """更新 users 之後呼叫"""
+    get_profile_cache().invalidate(f"users:{auth_id}")
+
+
+def invalidate_user_profile(user_id):
+    """更新 user_profile 之後呼叫"""
+    get_profile_cache().invalidate(f"user_profile:{user_id}")
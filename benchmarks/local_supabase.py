@@ -0,0 +1,899 @@
+"""
+本機 Supabase 替身（PostgREST / GoTrue 的子集合，純 Python、資料放在記憶體）
+
+讓 supabase-py 的 Client 不需要連到雲端專案就能執行：connect_to_supabase、update_location、
+cleaner_pipeline + incremental_ingest 的寫入、backend 的 login / get_profile 都走真正的 HTTP 請求，
+只是對象換成本機的替身，因此量到的是程式本身的請求數、批次大小與序列化成本。
+
+- 資料表與欄位型態、NOT NULL、預設值取自 supabase_control/Erd/Db_schema_init.md；
+  schema 文件沒有、但程式有使用的表與欄位列在 EXTRA_TABLES / EXTRA_COLUMNS
+- PostgREST: GET（select、別名、JSON 路徑、eq/neq/gt/gte/lt/lte/in/is 與 not.、order、limit/offset、
+  Prefer: count=exact）、POST（insert / upsert：on_conflict、columns、missing=default、resolution）、PATCH、DELETE；
+  與 Supabase 相同，單次讀取最多回傳 max_rows 筆（db-max-rows）；寫入不存在的欄位、違反 NOT NULL、
+  主鍵重複時回傳與 PostgREST 相同的錯誤
+- 主鍵維持排序（keyset 分頁以二分搜尋定位），eq / in 篩選的欄位第一次使用時建立 hash 索引並隨寫入更新
+- GoTrue: password 登入、refresh_token、signup、GET /user、admin 建立使用者；access token 以 HS256 簽章
+- 每個請求固定延遲 latency_ms（模擬到 Supabase 的往返），Auth 請求另外延遲 auth_latency_ms（模擬密碼雜湊）
+- /_bench/reset 以 synthetic_data 重新產生資料（固定 seed），/_bench/stats 回傳各表的請求數、讀寫筆數與
+  替身處理請求的累計秒數（server_seconds，不含固定延遲；用來確認耗時不是替身本身造成的）
+
+替身在獨立行程執行，避免與效能測試用戶端搶 GIL：
+
+    with LocalSupabase(latency_ms=5) as server:
+        server.reset(jobs=10000, companies=1000, users=1000)
+        client = create_client(server.url, server.service_key)
+
+執行方式（單獨啟動，例如給前端或手動測試使用）:
+    python local_supabase.py --port 54321 --jobs 10000 --latency-ms 5
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import jwt
+
+import synthetic_data
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BENCH_DIR, '..', 'supabase_control', 'Erd', 'Db_schema_init.md')
+
+DEFAULT_JWT_SECRET = 'local-supabase-jwt-secret-for-benchmarks-only'
+DEFAULT_SERVICE_KEY = 'local-service-role-key'
+DEFAULT_MAX_ROWS = 1000
+TOKEN_TTL = 3600
+
+# schema 文件的 USER 表在 Supabase 上為 public.users，另有 Auth UUID 的 id 欄位（backend 以此查詢）
+EXTRA_TABLES = {
+    'users': {
+        'key': 'id',
+        'columns': [('id', 'uuid', True, None), ('user_id', 'integer', True, None),
+                    ('email', 'character varying', True, None),
+                    ('password_hash', 'character varying', True, None),
+                    ('is_active', 'boolean', False, 'true'),
+                    ('auth_provider', 'character varying', False, "'Email'::character varying"),
+                    ('created_at', 'timestamp with time zone', True, 'now()'),
+                    ('last_login', 'timestamp with time zone', False, None)],
+    },
+}
+# schema 文件沒有、但程式有寫入的欄位（update_location / cleaner_pipeline 的地址欄位、incremental_ingest 的指紋）
+EXTRA_COLUMNS = {
+    'job_posting': [('city', 'character varying', False, None), ('district', 'character varying', False, None),
+                    ('full_address', 'character varying', False, None),
+                    ('content_hash', 'character varying', False, None)],
+}
+
+
+class ApiError(Exception):
+    """回傳給用戶端的錯誤（PostgREST / GoTrue 的錯誤格式）"""
+
+    def __init__(self, status, message, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+    def body(self):
+        return {'code': self.code, 'message': str(self), 'details': None, 'hint': None}
+
+
+# ============================================
+# schema
+# ============================================
+
+class Column:
+    def __init__(self, name, type_name, not_null=False, default=None):
+        self.name = name
+        self.type = type_name
+        self.not_null = not_null
+        self.serial = bool(default and default.startswith('nextval('))
+        self.default = None if self.serial else default
+
+    def default_value(self):
+        if self.default is None:
+            return None
+        if self.default == 'now()':
+            return datetime.now(timezone.utc).isoformat()
+        if self.default in ('true', 'false'):
+            return self.default == 'true'
+        match = re.match(r"'(.*)'::", self.default)
+        return match.group(1) if match else self.default
+
+    def parse(self, text):
+        """篩選條件中的字串 -> 欄位型態的值"""
+        if text == 'null':
+            return None
+        try:
+            if self.type in ('integer', 'bigint', 'smallint'):
+                return int(text)
+            if self.type in ('double precision', 'real', 'numeric'):
+                return float(text)
+        except ValueError:
+            raise ApiError(400, f'invalid input syntax for type {self.type}: "{text}"', '22P02')
+        if self.type == 'boolean':
+            return text.lower() in ('true', 't', '1')
+        return text
+
+
+def load_schema(path=SCHEMA_PATH):
+    """
+    解析 Db_schema_init.md 的 CREATE TABLE，加上 EXTRA_TABLES / EXTRA_COLUMNS
+
+    返回:
+        dict: 表名 -> (欄位清單 [Column], 主鍵欄位)；主鍵為 DEFAULT nextval(...) 的欄位
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    definitions = {}
+    for name, body in re.findall(r'CREATE TABLE (\w+) \((.*?)\n\);', text, flags=re.S):
+        columns = []
+        for line in body.strip().splitlines():
+            match = re.match(r'\s*(\w+) (.+?)( NOT NULL)?( DEFAULT (.+?))?,?\s*$', line)
+            if match:
+                columns.append(Column(match.group(1), match.group(2), bool(match.group(3)), match.group(5)))
+        definitions[name] = {'columns': columns, 'key': next((c.name for c in columns if c.serial), None)}
+    for name, extra in EXTRA_TABLES.items():
+        definitions[name] = {'columns': [Column(*spec) for spec in extra['columns']], 'key': extra['key']}
+    for name, specs in EXTRA_COLUMNS.items():
+        definitions[name]['columns'].extend(Column(*spec) for spec in specs)
+    return definitions
+
+
+# ============================================
+# 資料表
+# ============================================
+
+_OPERATORS = {
+    'eq': lambda value, target: value == target,
+    'neq': lambda value, target: value != target,
+    'gt': lambda value, target: value > target,
+    'gte': lambda value, target: value >= target,
+    'lt': lambda value, target: value < target,
+    'lte': lambda value, target: value <= target,
+}
+
+
+class Filter:
+    """一個 PostgREST 篩選條件（column=[not.]op.value）"""
+
+    def __init__(self, table, column, expression):
+        if column not in table.columns:
+            raise ApiError(400, f'column {table.name}.{column} does not exist', '42703')
+        self.column = column
+        self.negate = expression.startswith('not.')
+        if self.negate:
+            expression = expression[4:]
+        self.op, _, raw = expression.partition('.')
+        parse = table.columns[column].parse
+        if self.op == 'in':
+            if not (raw.startswith('(') and raw.endswith(')')):
+                raise ApiError(400, f'"failed to parse filter ({expression})"', 'PGRST100')
+            self.value = {parse(item) for item in _split_list(raw[1:-1])}
+        elif self.op == 'is':
+            if raw not in ('null', 'true', 'false'):
+                raise ApiError(400, f'"failed to parse filter ({expression})"', 'PGRST100')
+            self.value = {'null': None, 'true': True, 'false': False}[raw]
+        elif self.op in _OPERATORS:
+            self.value = parse(raw)
+        else:
+            raise ApiError(400, f'unsupported operator: {self.op}', 'PGRST100')
+
+    def __call__(self, row):
+        value = row.get(self.column)
+        if self.op == 'is':
+            result = value is self.value
+        elif value is None:
+            return False   # NULL 與任何值比較都不是 true（not. 也一樣）
+        elif self.op == 'in':
+            result = value in self.value
+        else:
+            try:
+                result = _OPERATORS[self.op](value, self.value)
+            except TypeError:
+                return False
+        return result != self.negate
+
+    @property
+    def lookup(self):
+        """可以用索引查詢的值集合（eq / in）；其他條件為 None"""
+        if self.negate or self.value is None:
+            return None
+        if self.op == 'eq':
+            return {self.value}
+        return self.value if self.op == 'in' else None
+
+
+def _split_list(text):
+    """in.(a,"b,c",d) 的內容 -> ['a', 'b,c', 'd']"""
+    return [item[1:-1] if item.startswith('"') and item.endswith('"') else item
+            for item in re.findall(r'"[^"]*"|[^,]+', text)]
+
+
+class Table:
+    """
+    一張記憶體中的資料表
+
+    rows 以主鍵為 key；keys 為排序好的主鍵（依序追加時直接 append，亂序時下次查詢前重新排序）；
+    indexes 為 eq / in 篩選用的 hash 索引（欄位值 -> 主鍵集合），第一次篩選該欄位時建立。
+    """
+
+    def __init__(self, name, columns, key):
+        self.name = name
+        self.columns = {column.name: column for column in columns}
+        self.key = key or columns[0].name
+        self.serial = self.columns[self.key].serial
+        self.rows = {}
+        self.keys = []
+        self.keys_sorted = True
+        self.indexes = {}
+        self.sequence = 0
+
+    def load(self, rows):
+        """放入初始資料（缺少的欄位以預設值補上），序號設為目前最大的主鍵（與 setval 相同）"""
+        self.rows, self.keys, self.keys_sorted, self.indexes = {}, [], True, {}
+        for row in rows:
+            full = {name: row[name] if name in row else column.default_value()
+                    for name, column in self.columns.items()}
+            self._add(full)
+        if self.serial and self.rows:
+            self.sequence = max(self.rows)
+
+    def _sorted_keys(self):
+        if not self.keys_sorted:
+            self.keys.sort()
+            self.keys_sorted = True
+        return self.keys
+
+    def _add(self, row):
+        key = row[self.key]
+        self.rows[key] = row
+        if self.keys_sorted and self.keys and key < self.keys[-1]:
+            self.keys_sorted = False
+        self.keys.append(key)
+        for column, index in self.indexes.items():
+            _index_add(index, row.get(column), key)
+
+    def _remove(self, keys):
+        keys = set(keys)
+        for key in keys:
+            row = self.rows.pop(key)
+            for column, index in self.indexes.items():
+                _index_discard(index, row.get(column), key)
+        self.keys = [key for key in self.keys if key not in keys]
+
+    def _index(self, column):
+        index = self.indexes.get(column)
+        if index is None:
+            index = {}
+            for key, row in self.rows.items():
+                _index_add(index, row.get(column), key)
+            self.indexes[column] = index
+        return index
+
+    def _check_columns(self, names):
+        for name in names:
+            if name not in self.columns:
+                raise ApiError(400, f"Could not find the '{name}' column of '{self.name}' in the schema cache",
+                               'PGRST204')
+
+    # ---------- 讀取 ----------
+
+    def scan(self, filters, order=None, limit=None, offset=0):
+        """
+        符合條件的資料列
+
+        參數:
+            filters (list[Filter])
+            order (list[(column, desc, nulls_first)], optional): 未指定時依主鍵由小到大
+            limit (int, optional), offset (int)
+        """
+        keys, filters = self._candidates(filters)
+        by_key = not order or (len(order) == 1 and order[0][0] == self.key)
+        if by_key and order and order[0][1]:
+            keys = reversed(keys)
+        rows = (row for row in map(self.rows.__getitem__, keys) if all(f(row) for f in filters))
+        if not by_key:
+            rows = list(rows)
+            for column, desc, nulls_first in reversed(order):
+                nulls_first = desc if nulls_first is None else nulls_first   # PostgreSQL：DESC 時 NULL 在前
+                present = sorted((r for r in rows if r.get(column) is not None),
+                                 key=lambda r: r[column], reverse=desc)
+                missing = [r for r in rows if r.get(column) is None]
+                rows = missing + present if nulls_first else present + missing
+        result = []
+        for position, row in enumerate(rows):
+            if position < offset:
+                continue
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(row)
+        return result
+
+    def count(self, filters):
+        keys, filters = self._candidates(filters)
+        return sum(1 for key in keys if all(f(self.rows[key]) for f in filters))
+
+    def _candidates(self, filters):
+        """
+        以主鍵、索引或主鍵範圍縮小要檢查的資料列（索引與主鍵範圍取候選較少者）
+
+        返回:
+            (list, list[Filter]): 依主鍵排序的候選主鍵、還需要逐列檢查的條件
+        """
+        filters = list(filters)
+        keys = self._sorted_keys()
+        low, high = 0, len(keys)
+        for f in filters:
+            if f.column != self.key or f.negate or f.value is None:
+                continue
+            if f.op == 'gt':
+                low = max(low, bisect.bisect_right(keys, f.value))
+            elif f.op == 'gte':
+                low = max(low, bisect.bisect_left(keys, f.value))
+            elif f.op == 'lt':
+                high = min(high, bisect.bisect_left(keys, f.value))
+            elif f.op == 'lte':
+                high = min(high, bisect.bisect_right(keys, f.value))
+
+        best, best_size = None, max(0, high - low)
+        for position, f in enumerate(filters):
+            if f.lookup is None:
+                continue
+            if f.column == self.key:
+                best, best_size = position, 0
+                break
+            index = self._index(f.column)
+            size = sum(len(index.get(value, ())) for value in f.lookup)
+            if size < best_size:
+                best, best_size = position, size
+        if best is None:
+            return (keys[low:high] if (low, high) != (0, len(keys)) else keys), filters
+
+        f = filters[best]
+        if f.column == self.key:
+            candidates = sorted(value for value in f.lookup if value in self.rows)
+        else:
+            index = self.indexes[f.column]
+            candidates = sorted(key for value in f.lookup for key in index.get(value, ()))
+        return candidates, filters[:best] + filters[best + 1:]
+
+    # ---------- 寫入 ----------
+
+    def _new_row(self, row, columns, missing_default):
+        """INSERT 的一列：columns 以外的欄位為預設值；columns 內但這列沒有的欄位為 NULL（或 missing=default 時的預設值）"""
+        full = {}
+        for name, column in self.columns.items():
+            if name in row:
+                full[name] = row[name]
+            elif name in columns and not missing_default:
+                full[name] = None
+            else:
+                full[name] = column.default_value()
+        if full[self.key] is None and self.serial:
+            self.sequence += 1
+            full[self.key] = self.sequence
+        for name, column in self.columns.items():
+            if column.not_null and full[name] is None:
+                raise ApiError(400, f'null value in column "{name}" of relation "{self.name}" '
+                                    'violates not-null constraint', '23502')
+        return full
+
+    def insert(self, rows, columns=None, missing_default=False, on_conflict=None, ignore_duplicates=False):
+        """
+        INSERT（on_conflict 指定時為 upsert）；整批成功或整批失敗
+
+        返回:
+            list[dict]: 寫入（新增或更新）後的資料列
+        """
+        columns = set(columns or {name for row in rows for name in row})
+        self._check_columns(columns)
+        if on_conflict is not None and on_conflict != self.key:
+            raise ApiError(400, 'there is no unique or exclusion constraint matching the ON CONFLICT specification',
+                           '42P10')
+
+        staged, updates, seen = [], [], set()
+        for row in rows:
+            existing = self.rows.get(row.get(self.key)) if on_conflict is not None else None
+            if existing is not None:
+                if not ignore_duplicates:
+                    merged = dict(existing)
+                    merged.update({name: row[name] if name in row else
+                                   (self.columns[name].default_value() if missing_default else None)
+                                   for name in columns})
+                    updates.append(merged)
+                continue
+            new = self._new_row(row, columns, missing_default)
+            key = new[self.key]
+            if key in self.rows or key in seen:
+                raise ApiError(409, f'duplicate key value violates unique constraint "{self.name}_pkey"', '23505')
+            seen.add(key)
+            staged.append(new)
+
+        for row in updates:
+            self._replace(row)
+        for row in staged:
+            self._add(row)
+        return updates + staged
+
+    def _replace(self, row):
+        key = row[self.key]
+        old = self.rows[key]
+        for column, index in self.indexes.items():
+            if old.get(column) != row.get(column):
+                _index_discard(index, old.get(column), key)
+                _index_add(index, row.get(column), key)
+        self.rows[key] = row
+
+    def update(self, filters, values):
+        self._check_columns(values)
+        keys, remaining = self._candidates(filters)
+        changed = []
+        for key in list(keys):
+            row = self.rows[key]
+            if all(f(row) for f in remaining):
+                new = dict(row, **values)
+                self._replace(new)
+                changed.append(new)
+        return changed
+
+    def delete(self, filters):
+        keys, remaining = self._candidates(filters)
+        removed = [self.rows[key] for key in keys if all(f(self.rows[key]) for f in remaining)]
+        self._remove(row[self.key] for row in removed)
+        return removed
+
+
+def _index_add(index, value, key):
+    if value is not None and not isinstance(value, (dict, list)):
+        index.setdefault(value, set()).add(key)
+
+
+def _index_discard(index, value, key):
+    if value is not None and not isinstance(value, (dict, list)):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+
+
+# ============================================
+# select 欄位
+# ============================================
+
+def compile_select(table, select):
+    """
+    select 參數 -> [(輸出名稱, 欄位, JSON 路徑)]
+
+    支援 *、欄位、別名（alias:column）、JSON 路徑（a->b->>c）與型態轉換（::text，忽略）；
+    不支援嵌入其他表（company_info(company_name)）。
+    """
+    if not select or select == '*':
+        return [(name, name, ()) for name in table.columns]
+    projection = []
+    for item in select.split(','):
+        item = item.strip().split('::')[0]
+        if '(' in item:
+            raise ApiError(400, f'embedded resources are not supported by the local stand-in: {item}', 'PGRST100')
+        if item == '*':
+            projection.extend((name, name, ()) for name in table.columns)
+            continue
+        alias, _, expression = item.rpartition(':')
+        parts = re.split(r'->>?', expression)
+        if parts[0] not in table.columns:
+            raise ApiError(400, f'column {table.name}.{parts[0]} does not exist', '42703')
+        projection.append((alias or parts[-1], parts[0], tuple(parts[1:])))
+    return projection
+
+
+def project(rows, projection):
+    result = []
+    for row in rows:
+        out = {}
+        for name, column, path in projection:
+            value = row.get(column)
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            out[name] = value
+        result.append(out)
+    return result
+
+
+# ============================================
+# 資料庫、Auth 與統計
+# ============================================
+
+class Database:
+    """所有資料表、Auth 使用者與請求統計；一把鎖保護所有狀態（與單一 PostgREST 的序列化成本相比可忽略）"""
+
+    def __init__(self, schema=None, jwt_secret=DEFAULT_JWT_SECRET, max_rows=DEFAULT_MAX_ROWS):
+        self.schema = schema or load_schema()
+        self.jwt_secret = jwt_secret
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.accounts = {}          # email -> 帳號
+        self.refresh_tokens = {}    # refresh token -> email
+        self.stats = Counter()
+        self.reset()
+
+    def reset(self, jobs=0, companies=0, users=0, seed=synthetic_data.DEFAULT_SEED, empty=()):
+        data = synthetic_data.seed_tables(jobs, companies, users, seed, empty)
+        with self.lock:
+            self.tables = {}
+            for name, definition in self.schema.items():
+                table = Table(name, definition['columns'], definition['key'])
+                table.load(data.get(name, []))
+                self.tables[name] = table
+            self.accounts, self.refresh_tokens = {}, {}
+            for index, account in enumerate(synthetic_data.auth_users(users, seed)):
+                self.accounts[account['email']] = dict(account, password=_hash_password(
+                    synthetic_data.user_credentials(index)[1]), user_metadata={'username': account['username']})
+            self.stats = Counter()
+        return {name: len(table.rows) for name, table in self.tables.items() if table.rows}
+
+    def table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            raise ApiError(404, f'relation "public.{name}" does not exist', '42P01')
+        return table
+
+    def count(self, *keys, amount=1):
+        self.stats['/'.join(keys)] += amount
+
+    # ---------- Auth ----------
+
+    def session(self, account):
+        now = int(time.time())
+        claims = {'sub': account['id'], 'aud': 'authenticated', 'role': 'authenticated', 'email': account['email'],
+                  'iat': now, 'exp': now + TOKEN_TTL, 'session_id': str(uuid.uuid4())}
+        refresh = secrets.token_urlsafe(16)
+        self.refresh_tokens[refresh] = account['email']
+        account['last_sign_in_at'] = datetime.now(timezone.utc).isoformat()
+        return {'access_token': jwt.encode(claims, self.jwt_secret, algorithm='HS256'), 'token_type': 'bearer',
+                'expires_in': TOKEN_TTL, 'expires_at': now + TOKEN_TTL, 'refresh_token': refresh,
+                'user': _user_json(account)}
+
+    def sign_in(self, email, password):
+        account = self.accounts.get(email)
+        if account is None or account['password'] != _hash_password(password):
+            raise ApiError(400, 'Invalid login credentials', 'invalid_credentials')
+        return self.session(account)
+
+    def sign_up(self, email, password, metadata=None):
+        if not email or not password:
+            raise ApiError(400, 'Signup requires a valid password', 'validation_failed')
+        if email in self.accounts:
+            raise ApiError(422, 'User already registered', 'user_already_exists')
+        account = {'id': str(uuid.uuid4()), 'email': email, 'password': _hash_password(password),
+                   'user_metadata': metadata or {}, 'created_at': datetime.now(timezone.utc).isoformat()}
+        self.accounts[email] = account
+        return account
+
+    def user_from_token(self, token):
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=['HS256'], audience='authenticated')
+        except jwt.PyJWTError:
+            raise ApiError(401, 'invalid JWT: unable to parse or verify signature', 'bad_jwt')
+        account = self.accounts.get(claims.get('email'))
+        if account is None or account['id'] != claims.get('sub'):
+            raise ApiError(403, 'User from sub claim in JWT does not exist', 'user_not_found')
+        return account
+
+
+def _hash_password(password):
+    return hashlib.sha256(f'local-supabase:{password}'.encode('utf-8')).hexdigest()
+
+
+def _user_json(account):
+    return {'id': account['id'], 'aud': 'authenticated', 'role': 'authenticated', 'email': account['email'],
+            'app_metadata': {'provider': 'email', 'providers': ['email']},
+            'user_metadata': account.get('user_metadata') or {}, 'created_at': account['created_at'],
+            'updated_at': account['created_at'], 'email_confirmed_at': account['created_at'],
+            'last_sign_in_at': account.get('last_sign_in_at')}
+
+
+# ============================================
+# HTTP
+# ============================================
+
+def _prefer(headers):
+    prefer = {}
+    for item in (headers.get('Prefer') or '').split(','):
+        name, _, value = item.strip().partition('=')
+        if name:
+            prefer[name] = value
+    return prefer
+
+
+def _order(text):
+    order = []
+    for item in text.split(','):
+        parts = item.split('.')
+        order.append((parts[0], 'desc' in parts[1:],
+                      True if 'nullsfirst' in parts[1:] else False if 'nullslast' in parts[1:] else None))
+    return order
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LocalSupabase/1.0'
+    disable_nagle_algorithm = True   # 標頭與內容分兩次送出，不關掉 Nagle 時小回應會多等 40 ms 的 delayed ACK
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+        database = self.server.database
+        headers = {}
+        try:
+            if url.path.startswith('/_bench/'):
+                status, payload = self._bench(url.path, params, body)
+            else:
+                is_auth = url.path.startswith('/auth/v1/')
+                delay = self.server.latency + (self.server.auth_latency if is_auth else 0)
+                if delay:
+                    time.sleep(delay)
+                start = time.perf_counter()
+                if is_auth:
+                    status, payload = self._auth(method, url.path[len('/auth/v1/'):], params, body)
+                elif url.path.startswith('/rest/v1/'):
+                    status, payload, headers = self._rest(method, url.path[len('/rest/v1/'):], params, body)
+                else:
+                    raise ApiError(404, f'not found: {url.path}', 'not_found')
+                with database.lock:
+                    database.count('server_seconds', amount=time.perf_counter() - start)
+        except ApiError as e:
+            status, payload = e.status, e.body()
+            if url.path.startswith('/auth/v1/'):
+                payload = {'code': e.code, 'error_code': e.code, 'msg': str(e)}
+            database.count('errors')
+        except Exception as e:   # 替身本身的錯誤：回傳 500，不要讓連線直接中斷
+            status, payload = 500, {'code': 'XX000', 'message': f'{type(e).__name__}: {e}'}
+            database.count('errors')
+        self._send(status, payload, headers, method == 'HEAD')
+
+    def _send(self, status, payload, headers, head=False):
+        data = b'' if payload is None else json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(0 if head else len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head and data:
+            self.wfile.write(data)
+
+    def _rest(self, method, name, params, body):
+        database = self.server.database
+        prefer = _prefer(self.headers)
+        options = {key: value for key, value in params if key in ('select', 'order', 'limit', 'offset',
+                                                                   'columns', 'on_conflict')}
+        with database.lock:
+            table = database.table(name)
+            filters = [Filter(table, key, value) for key, value in params if key not in options]
+            database.count(method, name)
+            headers, status = {}, 200
+
+            if method in ('GET', 'HEAD'):
+                limit = int(options['limit']) if 'limit' in options else None
+                if database.max_rows:
+                    limit = database.max_rows if limit is None else min(limit, database.max_rows)
+                offset = int(options.get('offset') or 0)
+                rows = table.scan(filters, _order(options['order']) if options.get('order') else None, limit, offset)
+                projection = compile_select(table, options.get('select'))
+                payload = project(rows, projection)
+                if prefer.get('count'):
+                    total = table.count(filters)
+                    end = f'{offset}-{offset + len(rows) - 1}' if rows else '*'
+                    headers['Content-Range'] = f'{end}/{total}'
+                database.count('rows_read', name, amount=len(rows))
+                return status, payload, headers
+
+            if method == 'POST':
+                rows = body if isinstance(body, list) else [body]
+                columns = ([c.strip().strip('"') for c in options['columns'].split(',')]
+                           if options.get('columns') else None)
+                upsert = prefer.get('resolution') in ('merge-duplicates', 'ignore-duplicates')
+                written = table.insert(rows, columns, prefer.get('missing') == 'default',
+                                       on_conflict=(options.get('on_conflict') or table.key) if upsert else None,
+                                       ignore_duplicates=prefer.get('resolution') == 'ignore-duplicates')
+                status = 201
+            elif method == 'PATCH':
+                written = table.update(filters, body or {})
+            elif method == 'DELETE':
+                written = table.delete(filters)
+            else:
+                raise ApiError(405, f'method not allowed: {method}', 'PGRST117')
+
+            database.count('rows_written', name, amount=len(written))
+            if prefer.get('return') == 'representation':
+                projection = compile_select(table, options.get('select'))
+                return status, project(written, projection), headers
+            return (201 if status == 201 else 204), None, headers
+
+    def _auth(self, method, path, params, body):
+        database = self.server.database
+        body = body or {}
+        query = dict(params)
+        with database.lock:
+            database.count('auth', path)
+            if method == 'POST' and path == 'token':
+                if query.get('grant_type') == 'password':
+                    return 200, database.sign_in(body.get('email'), body.get('password'))
+                if query.get('grant_type') == 'refresh_token':
+                    email = database.refresh_tokens.pop(body.get('refresh_token'), None)
+                    if email is None:
+                        raise ApiError(400, 'Invalid Refresh Token: Refresh Token Not Found', 'refresh_token_not_found')
+                    return 200, database.session(database.accounts[email])
+                raise ApiError(400, 'unsupported_grant_type', 'validation_failed')
+            if method == 'POST' and path == 'signup':
+                account = database.sign_up(body.get('email'), body.get('password'), body.get('data'))
+                return 200, database.session(account)
+            if method == 'POST' and path == 'admin/users':
+                account = database.sign_up(body.get('email'), body.get('password'), body.get('user_metadata'))
+                return 200, _user_json(account)
+            if method == 'GET' and path == 'user':
+                token = (self.headers.get('Authorization') or '').removeprefix('Bearer ')
+                return 200, _user_json(database.user_from_token(token))
+            if method == 'POST' and path == 'logout':
+                return 204, None
+            if method == 'GET' and path == '.well-known/jwks.json':
+                return 200, {'keys': []}   # HS256 專案沒有公開金鑰
+        raise ApiError(404, f'not found: /auth/v1/{path}', 'not_found')
+
+    def _bench(self, path, params, body):
+        database = self.server.database
+        if path == '/_bench/reset':
+            body = body or {}
+            return 200, database.reset(body.get('jobs', 0), body.get('companies', 0), body.get('users', 0),
+                                       body.get('seed', synthetic_data.DEFAULT_SEED), body.get('empty', ()))
+        if path == '/_bench/stats':
+            with database.lock:
+                return 200, dict(database.stats)
+        if path == '/_bench/health':
+            return 200, {'ok': True}
+        raise ApiError(404, f'not found: {path}', 'not_found')
+
+
+class LocalSupabaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, database, latency_ms=0.0, auth_latency_ms=0.0):
+        super().__init__(address, Handler)
+        self.database = database
+        self.latency = latency_ms / 1000
+        self.auth_latency = auth_latency_ms / 1000
+
+
+# ============================================
+# 在獨立行程啟動
+# ============================================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class LocalSupabase:
+    """
+    在子行程啟動替身，供效能測試使用（with 區塊結束時關閉）
+
+    參數:
+        latency_ms (float): 每個請求的固定延遲
+        auth_latency_ms (float): Auth 請求額外的延遲
+        max_rows (int): 單次讀取最多回傳筆數（0 為不限制）
+        jwt_secret (str): access token 的 HS256 secret（backend 以 SUPABASE_JWT_SECRET 在本機驗證）
+    """
+
+    def __init__(self, latency_ms=0.0, auth_latency_ms=0.0, max_rows=DEFAULT_MAX_ROWS,
+                 jwt_secret=DEFAULT_JWT_SECRET, port=None):
+        self.port = port or free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.service_key = DEFAULT_SERVICE_KEY
+        self.jwt_secret = jwt_secret
+        self.options = ['--latency-ms', str(latency_ms), '--auth-latency-ms', str(auth_latency_ms),
+                        '--max-rows', str(max_rows), '--jwt-secret', jwt_secret]
+        self.process = None
+
+    def __enter__(self):
+        command = [sys.executable, os.path.abspath(__file__), '--port', str(self.port)] + self.options
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while True:
+            try:
+                self._call('GET', '/_bench/health')
+                return self
+            except OSError:
+                if self.process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError('本機 Supabase 替身沒有啟動')
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+    def _call(self, method, path, body=None, timeout=600):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+
+    def reset(self, jobs=0, companies=0, users=0, seed=synthetic_data.DEFAULT_SEED, empty=()):
+        """重新產生資料並清除統計；返回各表筆數"""
+        return self._call('POST', '/_bench/reset', {'jobs': jobs, 'companies': companies, 'users': users,
+                                                     'seed': seed, 'empty': list(empty)})
+
+    def stats(self):
+        """累計的請求數與讀寫筆數（key 例如 'GET/job_posting'、'rows_written/job_posting'、'auth/token'）"""
+        return self._call('GET', '/_bench/stats')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='本機 Supabase 替身（PostgREST / GoTrue 子集合）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--jobs', type=int, default=0, help='啟動時產生的職缺數')
+    parser.add_argument('--companies', type=int, default=None, help='公司數，預設為職缺數的 1/10')
+    parser.add_argument('--users', type=int, default=None, help='使用者數，預設為職缺數的 1/10')
+    parser.add_argument('--seed', type=int, default=synthetic_data.DEFAULT_SEED)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='每個請求的固定延遲')
+    parser.add_argument('--auth-latency-ms', type=float, default=0.0, help='Auth 請求額外的延遲')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS, help='單次讀取最多回傳筆數，0 為不限制')
+    parser.add_argument('--jwt-secret', default=DEFAULT_JWT_SECRET)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database = Database(jwt_secret=args.jwt_secret, max_rows=args.max_rows)
+    if args.jobs:
+        scale = max(1, args.jobs // 10)
+        database.reset(args.jobs, args.companies or scale, args.users if args.users is not None else scale, args.seed)
+    server = LocalSupabaseServer((args.host, args.port), database, args.latency_ms, args.auth_latency_ms)
+    print(f"本機 Supabase 替身：http://{args.host}:{args.port}（service key: {DEFAULT_SERVICE_KEY}）", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
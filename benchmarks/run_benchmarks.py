@@ -0,0 +1,507 @@
+"""
+離線效能測試：不需要 Supabase 專案，以本機替身（local_supabase.py）量測各資料路徑
+
+每個測試都呼叫 repo 內實際的程式（supabase-py Client 走真正的 HTTP 請求），資料以固定 seed 產生，
+結果存成 JSON，不同 commit 的結果可以用 compare 比較（耗時與請求數）。
+
+測試項目（--suites，預設全部）:
+    connect   connect_to_supabase：第一次（建立 Client + 連線測試）與之後的快取呼叫
+    ingest    cleaner_pipeline 清理原始資料 -> incremental_ingest 第一次匯入（全部 insert），
+              再以下架 / 修改 / 新增部分職缺後的資料增量匯入，檢查比對結果與資料變動一致
+    update    update_location.main（串流讀取 job_posting + 批次 upsert 地址欄位），單段與 4 段並行讀取
+    read      table_stream.read_table 串流讀取整張 job_posting（單段 / 4 段並行）與以主鍵逐筆查詢
+    auth      backend（Flask）的 POST /api/auth/login、GET /api/auth/profile（未命中 / 命中快取），
+              以及 last_login write-behind 緩衝的批次寫回
+
+規模:
+    --scale N 為職缺數（10000 ~ 1000000）；公司數與使用者數預設為 N / 10（--companies / --users 可另外指定）。
+    替身把資料放在記憶體，1000000 筆職缺約需 3 GB。
+
+每個結果記錄:
+    seconds（--repeat 次的中位數）、seconds_runs、rows、rows_per_second、
+    requests（到替身的 HTTP 請求數，依「方法/表」分類）、request_total、
+    server_seconds（替身本身處理請求的時間，不含固定延遲）、latency_ms（p50 / p95 / p99 / mean，逐筆操作的測試）、
+    checks（正確性檢查，全部為 true 才算通過）
+
+執行方式:
+    python run_benchmarks.py run --scale 10000
+    python run_benchmarks.py run --scale 100000 --suites ingest,read --repeat 5 --latency-ms 20
+    python run_benchmarks.py compare results/old.json results/new.json --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+for _path in (os.path.join(REPO_DIR, 'supabase_control'), os.path.join(REPO_DIR, 'backend')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import synthetic_data
+from local_supabase import LocalSupabase
+
+
+SUITES = ['connect', 'ingest', 'update', 'read', 'auth']
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+REQUEST_PREFIXES = ('GET/', 'HEAD/', 'POST/', 'PATCH/', 'DELETE/', 'auth/')
+
+
+# ============================================
+# 量測工具
+# ============================================
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return None
+    values = np.asarray(samples_ms)
+    return {'p50': round(float(np.percentile(values, 50)), 3), 'p95': round(float(np.percentile(values, 95)), 3),
+            'p99': round(float(np.percentile(values, 99)), 3), 'mean': round(float(values.mean()), 3)}
+
+
+def request_delta(before, after):
+    """兩次 /_bench/stats 之間的請求數（只保留 HTTP 請求，不含讀寫筆數）"""
+    return {key: after[key] - before.get(key, 0) for key in sorted(after)
+            if key.startswith(REQUEST_PREFIXES) and after[key] != before.get(key, 0)}
+
+
+class Run:
+    """一次量測：計時並記錄期間到替身的請求數"""
+
+    def __init__(self, server):
+        self.server = server
+        self.seconds = None
+        self.requests = {}
+        self.server_seconds = 0.0
+
+    def __enter__(self):
+        self._before = self.server.stats()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        after = self.server.stats()
+        self.requests = request_delta(self._before, after)
+        self.server_seconds = after.get('server_seconds', 0.0) - self._before.get('server_seconds', 0.0)
+
+
+class Results:
+    """彙總 --repeat 次的量測，並在完成時印出一行摘要"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, name, run_or_seconds, rows=None, requests=None, latency_ms=None, checks=None, details=None):
+        seconds = run_or_seconds.seconds if isinstance(run_or_seconds, Run) else run_or_seconds
+        requests = run_or_seconds.requests if isinstance(run_or_seconds, Run) else (requests or {})
+        entry = self.entries.setdefault(name, {'seconds_runs': [], 'server_runs': [], 'latency_samples': [],
+                                               'checks': {}})
+        entry['seconds_runs'].append(round(seconds, 6))
+        entry['server_runs'].append(run_or_seconds.server_seconds if isinstance(run_or_seconds, Run) else 0.0)
+        entry['rows'] = rows
+        entry['requests'] = requests
+        entry['request_total'] = sum(requests.values())
+        entry['latency_samples'].extend(latency_ms or [])
+        for check, passed in (checks or {}).items():
+            entry['checks'][check] = entry['checks'].get(check, True) and bool(passed)
+        if details:
+            entry['details'] = details
+
+    def finish(self):
+        output = {}
+        for name, entry in self.entries.items():
+            seconds = statistics.median(entry['seconds_runs'])
+            result = {'seconds': round(seconds, 6), 'seconds_runs': entry['seconds_runs'], 'rows': entry['rows'],
+                      'rows_per_second': round(entry['rows'] / seconds, 1) if entry['rows'] and seconds else None,
+                      'requests': entry['requests'], 'request_total': entry['request_total'],
+                      'server_seconds': round(statistics.median(entry['server_runs']), 6),
+                      'latency_ms': percentiles(entry['latency_samples']), 'checks': entry['checks']}
+            if 'details' in entry:
+                result['details'] = entry['details']
+            output[name] = result
+        return output
+
+    def print_line(self, name):
+        entry = self.entries[name]
+        seconds = statistics.median(entry['seconds_runs'])
+        rate = f"{entry['rows'] / seconds:>12,.0f} 筆/s" if entry['rows'] and seconds else ' ' * 16
+        latency = percentiles(entry['latency_samples'])
+        latency = f"  p50 {latency['p50']:.2f} / p95 {latency['p95']:.2f} ms" if latency else ''
+        failed = [check for check, passed in entry['checks'].items() if not passed]
+        status = '✗ ' + ', '.join(failed) if failed else '✓'
+        print(f"  {name:<34} {seconds:>9.3f}s {rate}  請求 {entry['request_total']:>6,}{latency}  {status}")
+
+
+@contextlib.contextmanager
+def quiet():
+    """被測程式的進度輸出不印出來"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def configure_environment(server, env_dir):
+    """
+    讓 supabase_control 與 backend 都連到替身（環境變數優先於任何既有的 .env，load_dotenv 不會覆寫）
+
+    返回:
+        str: 寫好連線資訊的 .env 路徑
+    """
+    settings = {
+        'project_url': server.url, 'service_role_key': server.service_key,
+        'SUPABASE_URL': server.url, 'SUPABASE_KEY': server.service_key,
+        'SUPABASE_SERVICE_ROLE_KEY': server.service_key, 'SUPABASE_JWT_SECRET': server.jwt_secret,
+        'AUTH_VERIFY_MODE': 'local', 'REDIS_URL': '',
+        'LAST_LOGIN_FLUSH_INTERVAL': '3600', 'LAST_LOGIN_FLUSH_SIZE': '1000000000',   # 寫回由 auth 測試明確觸發
+    }
+    os.environ.update(settings)
+    env_path = os.path.join(env_dir, '.env')
+    with open(env_path, 'w', encoding='utf-8') as f:
+        f.writelines(f"{name}={value}\n" for name, value in settings.items())
+    return env_path
+
+
+def count_rows(client, table, **filters):
+    query = client.table(table).select('*', count='exact').limit(1)
+    for column, expression in filters.items():
+        operator, _, value = expression.partition('.')
+        query = query.filter(column, operator, value)
+    return query.execute().count
+
+
+# ============================================
+# 測試項目
+# ============================================
+
+def bench_connect(ctx):
+    from supabase_connection import connect_to_supabase
+
+    server, results = ctx['server'], ctx['results']
+    with Run(server) as run, quiet():
+        client = connect_to_supabase(env_path=ctx['env_path'])
+    results.add('connect.first_call', run, checks={'connected': client is not None})
+
+    calls = 10000
+    with Run(server) as run:
+        for _ in range(calls):
+            connect_to_supabase(env_path=ctx['env_path'])
+    results.add('connect.cached_call', run, rows=calls, checks={'no_requests': not run.requests},
+                details={'microseconds_per_call': round(run.seconds / calls * 1e6, 3)})
+    return ['connect.first_call', 'connect.cached_call']
+
+
+def clean_raw_jobs(raw, chunksize=20000):
+    from cleaner_pipeline import CompanyAggregator, iter_clean_batches
+
+    companies = CompanyAggregator()
+    frame = pd.DataFrame(raw)
+    chunks = (frame.iloc[start:start + chunksize] for start in range(0, len(frame), chunksize))
+    jobs = pd.concat(list(iter_clean_batches(chunks, companies)), ignore_index=True)
+    return jobs, companies.to_frame()
+
+
+def bench_ingest(ctx):
+    from incremental_ingest import ingest_jobs, prepare_scraped_jobs
+
+    server, results, args, client = ctx['server'], ctx['results'], ctx['args'], ctx['client']
+    raw = synthetic_data.raw_jobs(args.scale, args.companies, args.seed)
+    mutated, changes = synthetic_data.mutate_raw_jobs(raw, args.companies, args.seed)
+    existing_companies = int(args.companies * 0.95)   # 其餘 5% 的公司由匯入時建立
+
+    for _ in range(args.repeat):
+        server.reset(jobs=0, companies=existing_companies, seed=args.seed)
+        with Run(server) as run:
+            jobs, companies = clean_raw_jobs(raw)
+        results.add('ingest.clean', run, rows=len(raw), checks={'all_rows_kept': len(jobs) == len(raw)})
+
+        with Run(server) as run, quiet():
+            plan, writes = ingest_jobs(client, prepare_scraped_jobs(jobs), companies,
+                                       batch_size=args.batch_size, workers=args.workers)
+        stored = count_rows(client, 'job_posting')
+        results.add('ingest.initial', run, rows=len(jobs),
+                    checks={'all_inserted': len(plan.inserts) == stored == len(jobs),
+                            'no_failed_rows': not any(result.failed for result in writes.values())})
+
+        jobs, companies = clean_raw_jobs(mutated)
+        with Run(server) as run, quiet():
+            plan, writes = ingest_jobs(client, prepare_scraped_jobs(jobs), companies,
+                                       batch_size=args.batch_size, workers=args.workers)
+        results.add('ingest.incremental', run, rows=len(jobs),
+                    checks={'plan_matches_changes': (len(plan.inserts), len(plan.updates), len(plan.deactivate))
+                            == (changes['added'], changes['changed'], changes['removed']),
+                            'no_failed_rows': not any(result.failed for result in writes.values())},
+                    details=dict(changes, unchanged=plan.unchanged))
+    return ['ingest.clean', 'ingest.initial', 'ingest.incremental']
+
+
+def bench_update(ctx):
+    import update_location
+
+    server, results, args, client = ctx['server'], ctx['results'], ctx['args'], ctx['client']
+    work_dir = ctx['env_dir']   # 與 .env 同一個目錄（connect_to_supabase() 會找目前目錄的 .env）
+    pd.DataFrame(synthetic_data.raw_jobs(args.scale, args.companies, args.seed)).to_csv(
+        os.path.join(work_dir, 'clear_data_rows.csv'), index=False)
+
+    names = []
+    for parallel in (1, 4):
+        name = 'update.location' if parallel == 1 else f'update.location_parallel{parallel}'
+        names.append(name)
+        for _ in range(args.repeat):
+            server.reset(jobs=args.scale, companies=args.companies, seed=args.seed)
+            cwd = os.getcwd()
+            os.chdir(work_dir)   # update_location 從目前目錄讀 clear_data_rows.csv
+            try:
+                with Run(server) as run, quiet():
+                    update_location.main(['--batch-size', str(args.batch_size), '--workers', str(args.workers),
+                                          '--parallel', str(parallel)])
+            finally:
+                os.chdir(cwd)
+            results.add(name, run, rows=args.scale,
+                        checks={'all_cities_set': count_rows(client, 'job_posting', city='not.is.null') == args.scale,
+                                'location_cleared': count_rows(client, 'job_posting', location='not.is.null') == 0})
+    return names
+
+
+def bench_read(ctx):
+    from table_stream import read_table
+
+    server, results, args, client = ctx['server'], ctx['results'], ctx['args'], ctx['client']
+    columns = 'job_id, job_title, company_id, salary_min, salary_max, location, is_active'
+    server.reset(jobs=args.scale, companies=args.companies, seed=args.seed)
+
+    names = []
+    for parallel in (1, 4):
+        name = 'read.stream_job_posting' if parallel == 1 else f'read.stream_job_posting_parallel{parallel}'
+        names.append(name)
+        for _ in range(args.repeat):
+            with Run(server) as run:
+                frame = read_table(client, 'job_posting', columns, 'job_id', parallel=parallel)
+            results.add(name, run, rows=len(frame),
+                        checks={'all_rows': len(frame) == args.scale and frame['job_id'].is_unique})
+
+    lookups = min(args.lookups, args.scale)
+    job_ids = np.random.default_rng(args.seed).integers(1, args.scale + 1, lookups).tolist()
+    for _ in range(args.repeat):
+        samples, found = [], 0
+        with Run(server) as run:
+            for job_id in job_ids:
+                start = time.perf_counter()
+                rows = client.table('job_posting').select('*').eq('job_id', job_id).limit(1).execute().data
+                samples.append((time.perf_counter() - start) * 1000)
+                found += len(rows)
+        results.add('read.point_lookup', run, rows=lookups, latency_ms=samples, checks={'all_found': found == lookups})
+    return names + ['read.point_lookup']
+
+
+def bench_auth(ctx):
+    from app import app
+    from service.last_login_buffer import get_last_login_buffer
+    from service.profile_service import ReadThroughCache, set_profile_cache
+
+    server, results, args = ctx['server'], ctx['results'], ctx['args']
+    n_users = min(args.auth_users, args.users)
+    credentials = [synthetic_data.user_credentials(index) for index in range(n_users)]
+    http = app.test_client()
+
+    def login(credential):
+        start = time.perf_counter()
+        response = http.post('/api/auth/login', json={'email': credential[0], 'password': credential[1]})
+        return response, (time.perf_counter() - start) * 1000
+
+    def profile(token):
+        start = time.perf_counter()
+        response = http.get('/api/auth/profile', headers={'Authorization': f'Bearer {token}'})
+        return response, (time.perf_counter() - start) * 1000
+
+    for _ in range(args.repeat):
+        server.reset(users=args.users, seed=args.seed)
+        set_profile_cache(ReadThroughCache())   # 每一輪都從空的快取開始
+
+        with Run(server) as run:
+            responses = [login(credential) for credential in credentials]
+        tokens = [response.get_json()['auth']['accessToken'] for response, _ in responses
+                  if response.status_code == 200]
+        results.add('auth.login', run, rows=n_users, latency_ms=[ms for _, ms in responses],
+                    checks={'all_ok': len(tokens) == n_users})
+
+        with Run(server) as run:
+            with ThreadPoolExecutor(args.workers * 4) as pool:
+                responses = list(pool.map(login, credentials))
+        results.add('auth.login_concurrent', run, rows=n_users,
+                    checks={'all_ok': all(response.status_code == 200 for response, _ in responses)})
+
+        with Run(server) as run:
+            flushed = get_last_login_buffer().flush()
+        results.add('auth.last_login_flush', run, rows=flushed, checks={'all_users_flushed': flushed == n_users})
+
+        for name in ('auth.profile_cold', 'auth.profile_warm'):
+            with Run(server) as run:
+                responses = [profile(token) for token in tokens]
+            results.add(name, run, rows=len(tokens), latency_ms=[ms for _, ms in responses],
+                        checks={'all_ok': all(response.status_code == 200 for response, _ in responses)})
+    return ['auth.login', 'auth.login_concurrent', 'auth.last_login_flush', 'auth.profile_cold', 'auth.profile_warm']
+
+
+BENCHMARKS = {'connect': bench_connect, 'ingest': bench_ingest, 'update': bench_update, 'read': bench_read,
+              'auth': bench_auth}
+
+
+# ============================================
+# 執行與比較
+# ============================================
+
+def git_info():
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], cwd=REPO_DIR, capture_output=True, text=True,
+                                  timeout=60).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+    return {'commit': git('rev-parse', 'HEAD') or None,
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def run_benchmarks(args):
+    suites = [suite.strip() for suite in args.suites.split(',') if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"未知的測試項目: {', '.join(sorted(unknown))}（可用: {', '.join(SUITES)}）")
+    args.companies = args.companies or max(1, args.scale // 10)
+    args.users = args.users or max(1, args.scale // 10)
+
+    print("=" * 60)
+    print("離線效能測試（本機 Supabase 替身）")
+    print("=" * 60)
+    print(f"職缺 {args.scale:,}、公司 {args.companies:,}、使用者 {args.users:,}，seed {args.seed}，"
+          f"延遲 {args.latency_ms} ms（Auth 另加 {args.auth_latency_ms} ms），重複 {args.repeat} 次")
+
+    results = Results()
+    started = datetime.now()
+    with tempfile.TemporaryDirectory() as env_dir, \
+            LocalSupabase(args.latency_ms, args.auth_latency_ms, args.max_rows) as server:
+        env_path = configure_environment(server, env_dir)
+        from supabase_connection import get_supabase_client
+        ctx = {'server': server, 'results': results, 'args': args, 'env_dir': env_dir, 'env_path': env_path,
+               'client': get_supabase_client(server.url, server.service_key)}
+        # 依 SUITES 的順序執行：auth 的登入會改變共用 Client 的 session，放在最後
+        for suite in [suite for suite in SUITES if suite in suites]:
+            print(f"\n【{suite}】")
+            start = time.perf_counter()
+            for name in BENCHMARKS[suite](ctx):
+                results.print_line(name)
+            print(f"  （{time.perf_counter() - start:.1f}s）")
+
+    output = {
+        'meta': dict(git_info(), timestamp=started.isoformat(timespec='seconds'),
+                     python=platform.python_version(), platform=platform.platform(), cpu_count=os.cpu_count(),
+                     parameters={name: getattr(args, name) for name in
+                                 ('scale', 'companies', 'users', 'seed', 'latency_ms', 'auth_latency_ms',
+                                  'max_rows', 'repeat', 'batch_size', 'workers', 'lookups', 'auth_users')},
+                     suites=suites),
+        'results': results.finish(),
+    }
+    path = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}_{(output['meta']['commit'] or 'nogit')[:8]}_{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+    failed = [name for name, result in output['results'].items() if not all(result['checks'].values())]
+    print(f"\n結果: {path}")
+    print(f"{'✓ 全部檢查通過' if not failed else '✗ 檢查未通過: ' + ', '.join(failed)}")
+    return 0 if not failed else 1
+
+
+def compare_results(old_path, new_path, threshold=0.1):
+    """
+    比較兩次結果：耗時（中位數）慢了超過 threshold、HTTP 請求數增加或檢查未通過時視為退步
+
+    返回:
+        list[str]: 退步的測試項目
+    """
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print("=" * 60)
+    print(f"比較 {old['meta'].get('commit', '')[:8]} -> {new['meta'].get('commit', '')[:8]}")
+    print("=" * 60)
+    if old['meta']['parameters'] != new['meta']['parameters']:
+        print(f"⚠️  參數不同，耗時不可直接比較：\n  舊 {old['meta']['parameters']}\n  新 {new['meta']['parameters']}")
+
+    regressions = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        before, after = old['results'][name], new['results'][name]
+        ratio = after['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        reasons = []
+        if ratio > 1 + threshold:
+            reasons.append(f"慢 {ratio - 1:.0%}")
+        if after['request_total'] > before['request_total']:
+            reasons.append(f"請求 {before['request_total']:,} -> {after['request_total']:,}")
+        if not all(after['checks'].values()):
+            reasons.append('檢查未通過')
+        if reasons:
+            regressions.append(name)
+        latency = ''
+        if before.get('latency_ms') and after.get('latency_ms'):
+            latency = f"  p95 {before['latency_ms']['p95']:.2f} -> {after['latency_ms']['p95']:.2f} ms"
+        print(f"  {name:<34} {before['seconds']:>9.3f}s -> {after['seconds']:>9.3f}s ({ratio - 1:+.0%}){latency}"
+              f"  {'✗ ' + '、'.join(reasons) if reasons else '✓'}")
+    for name in sorted(set(old['results']) ^ set(new['results'])):
+        print(f"  {name:<34} 只出現在{'舊' if name in old['results'] else '新'}的結果")
+
+    print(f"\n{'✓ 沒有退步' if not regressions else '✗ 退步: ' + ', '.join(regressions)}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='離線效能測試（本機 Supabase 替身）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='執行效能測試並存成 JSON')
+    run.add_argument('--scale', type=int, default=10000, help='職缺數（10000 ~ 1000000）')
+    run.add_argument('--companies', type=int, default=None, help='公司數，預設為職缺數的 1/10')
+    run.add_argument('--users', type=int, default=None, help='使用者數，預設為職缺數的 1/10')
+    run.add_argument('--seed', type=int, default=synthetic_data.DEFAULT_SEED)
+    run.add_argument('--suites', default=','.join(SUITES), help=f"以逗號分隔，可用: {', '.join(SUITES)}")
+    run.add_argument('--repeat', type=int, default=3, help='每個測試重複次數（取耗時中位數）')
+    run.add_argument('--latency-ms', type=float, default=5.0, help='替身每個請求的固定延遲（模擬網路往返）')
+    run.add_argument('--auth-latency-ms', type=float, default=0.0, help='Auth 請求額外的延遲（模擬密碼雜湊）')
+    run.add_argument('--max-rows', type=int, default=1000, help='替身單次讀取最多回傳筆數（Supabase 預設 1000）')
+    run.add_argument('--batch-size', type=int, default=500, help='寫入批次筆數（ingest / update）')
+    run.add_argument('--workers', type=int, default=4, help='並行寫入請求數（ingest / update）')
+    run.add_argument('--lookups', type=int, default=1000, help='read.point_lookup 的查詢次數')
+    run.add_argument('--auth-users', type=int, default=500, help='auth 測試登入的使用者數')
+    run.add_argument('--output', default=None, help=f'結果 JSON 路徑，預設存在 {DEFAULT_RESULTS_DIR}')
+
+    compare = sub.add_parser('compare', help='比較兩次結果')
+    compare.add_argument('old', help='基準結果 JSON')
+    compare.add_argument('new', help='新的結果 JSON')
+    compare.add_argument('--threshold', type=float, default=0.1, help='耗時增加超過此比例視為退步')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'compare':
+        return 1 if compare_results(args.old, args.new, args.threshold) else 0
+    return run_benchmarks(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
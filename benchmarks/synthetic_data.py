@@ -0,0 +1,199 @@
+"""
+效能測試用的合成資料（固定 seed，同樣的參數每次產生完全相同的資料）
+
+- raw_jobs(): 爬蟲原始資料（欄位與 clear_data_rows.csv 相同），給 cleaner_pipeline / update_location 使用
+- seed_tables(): 本機 Supabase 替身（local_supabase.py）的初始資料：company_info、job_posting（update_location
+  執行前的狀態：location 為「縣市、行政區」，city / district / full_address 為 NULL）、users、user_profile
+- auth_users() / user_credentials(): Auth 帳號與登入用的密碼
+
+替身與效能測試用戶端各自以相同參數呼叫這些函數，不需要互相傳送資料。
+只用標準函式庫（替身行程不需要 pandas）。
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+DEFAULT_SEED = 42
+SOURCE_PLATFORM = '104人力銀行'
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+ROLES = ['後端工程師', '前端工程師', '全端工程師', '資料工程師', '資料科學家', 'AI 工程師', '軟體工程師',
+         '系統工程師', '網路工程師', '資安工程師', '雲端架構師', '測試工程師', 'DevOps 工程師', '韌體工程師']
+SENIORITY = ['', '資深', '初階', '主任', '']
+CATEGORIES = ['軟體工程師', '系統工程師', '網路管理工程師', '資料庫管理人員', '資訊安全工程師', 'AI 工程師']
+COMPANY_PREFIXES = ['宏', '聯', '鴻', '台', '中', '全', '華', '新', '大', '永', '群', '光', '智', '雲', '數']
+COMPANY_WORDS = ['科技', '資訊', '數位', '電子', '網路', '軟體', '系統', '資通', '雲端', '智能']
+COMPANY_SUFFIXES = ['股份有限公司', '有限公司', '股份有限公司', '國際股份有限公司']
+LOCATIONS = [('台北市', '信義區'), ('台北市', '大安區'), ('台北市', '內湖區'), ('台北市', '中山區'),
+             ('新北市', '板橋區'), ('新北市', '新店區'), ('桃園市', '中壢區'), ('新竹市', '東區'),
+             ('新竹縣', '竹北市'), ('台中市', '西屯區'), ('台南市', '永康區'), ('高雄市', '前鎮區')]
+ROADS = ['忠孝東路', '信義路', '復興北路', '中正路', '民生東路', '文心路', '中華路', '光復路']
+SKILLS = ['Python', 'Java', 'Go', 'JavaScript', 'TypeScript', 'React', 'Vue', 'SQL', 'PostgreSQL', 'Docker',
+          'Kubernetes', 'AWS', 'GCP', 'Linux', 'Git', 'C++', 'PyTorch', 'Spark', 'Redis', 'Kafka']
+EDUCATION = ['大學以上', '專科以上', '碩士以上', '不拘']
+FAMILY_NAMES = ['王', '李', '張', '劉', '陳', '楊', '黃', '吳', '林', '周']
+GIVEN_NAMES = ['小明', '怡君', '志豪', '雅婷', '家豪', '淑芬', '俊傑', '美玲', '建宏', '佩珊']
+
+
+def company_name(index):
+    """第 index 家公司的名稱（index 從 0 開始；不同 index 的名稱一定不同）"""
+    return (COMPANY_PREFIXES[index % len(COMPANY_PREFIXES)]
+            + COMPANY_WORDS[index // len(COMPANY_PREFIXES) % len(COMPANY_WORDS)]
+            + (str(index) if index >= len(COMPANY_PREFIXES) * len(COMPANY_WORDS) else '')
+            + COMPANY_SUFFIXES[index % len(COMPANY_SUFFIXES)])
+
+
+def raw_jobs(n_jobs, n_companies, seed=DEFAULT_SEED, start=0):
+    """
+    爬蟲原始資料（dict 清單，欄位與 clear_data_rows.csv 相同）
+
+    參數:
+        n_jobs (int): 職缺數
+        n_companies (int): 公司數（職缺的公司依 Zipf 分布抽樣，少數大公司有很多職缺）
+        start (int): 第一筆的編號；新增的職缺以不同的 start 產生，職稱與網址不會與既有的重複
+    """
+    if n_jobs <= 0:
+        return []
+    rng = random.Random(f'{seed}:jobs:{start}')
+    weights = [1 / (rank + 1) for rank in range(n_companies)]
+    companies = rng.choices(range(n_companies), weights=weights, k=n_jobs)
+    rows = []
+    for offset, company in enumerate(companies):
+        number = start + offset
+        city, district = rng.choice(LOCATIONS)
+        remote = rng.random() < 0.05
+        address = f"{city}{district}{rng.choice(ROADS)}{rng.randint(1, 300)}號" + ('（可遠端工作）' if remote else '')
+        salary_min = rng.randrange(30, 90) * 1000
+        skills = rng.sample(SKILLS, rng.randint(2, 6))
+        created = BASE_TIME + timedelta(minutes=number)
+        rows.append({
+            'company_name': company_name(company),
+            'job_name': f"{rng.choice(SENIORITY)}{rng.choice(ROLES)}（{number:07d}）",
+            'job_category': rng.choice(CATEGORIES),
+            'job_description': f"負責{'、'.join(skills[:3])}相關系統的設計、開發與維運，與產品團隊合作交付功能。",
+            'location': address,
+            'salary_min': salary_min,
+            'salary_max': salary_min + rng.randrange(0, 40) * 1000,
+            'job_type': '全職',
+            'work_exp': f"{rng.randint(0, 5)}年以上" if rng.random() < 0.7 else '不拘',
+            'education': rng.choice(EDUCATION),
+            'skills': '、'.join(skills),
+            'tools': '、'.join(rng.sample(SKILLS, 2)),
+            'work_time': '日班，09:00~18:00',
+            'vacation': '週休二日',
+            'source_url': f"https://www.104.com.tw/job/bench{number:07d}",
+            'update_date': (created + timedelta(days=rng.randint(0, 30))).date().isoformat(),
+            'created_at': created.isoformat(),
+        })
+    return rows
+
+
+def mutate_raw_jobs(rows, n_companies, seed=DEFAULT_SEED, changed=0.05, removed=0.02, added=0.03):
+    """
+    下一次爬蟲的結果：下架 removed 比例、修改 changed 比例的薪資與描述，並新增 added 比例的職缺
+
+    返回:
+        (list[dict], dict): 新的原始資料與各類筆數
+    """
+    rng = random.Random(f'{seed}:mutate')
+    kept, counts = [], {'changed': 0, 'removed': 0, 'added': 0}
+    for row in rows:
+        draw = rng.random()
+        if draw < removed:
+            counts['removed'] += 1
+            continue
+        if draw < removed + changed:
+            row = dict(row, salary_max=row['salary_max'] + 5000,
+                       job_description=row['job_description'] + '另有年終獎金與員工分紅。')
+            counts['changed'] += 1
+        kept.append(row)
+    new = raw_jobs(int(len(rows) * added), n_companies, seed, start=len(rows))
+    counts['added'] = len(new)
+    return kept + new, counts
+
+
+def _legacy_location(address):
+    """update_location 執行前 job_posting.location 的格式：「縣市、行政區」"""
+    for city, district in LOCATIONS:
+        if address.startswith(city + district):
+            return f"{city}、{district}"
+    return None
+
+
+def auth_users(n_users, seed=DEFAULT_SEED):
+    """Auth 帳號（dict 清單：id、email、username、created_at）"""
+    rng = random.Random(f'{seed}:users')
+    return [{
+        'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        'email': f"user{index}@bench.local",
+        'username': f"user{index}",
+        'created_at': (BASE_TIME + timedelta(seconds=index)).isoformat(),
+    } for index in range(n_users)]
+
+
+def user_credentials(index):
+    """第 index 位使用者的 (email, password)"""
+    return f"user{index}@bench.local", f"bench-password-{index}"
+
+
+def seed_tables(n_jobs, n_companies, n_users, seed=DEFAULT_SEED, empty=()):
+    """
+    本機 Supabase 替身的初始資料
+
+    參數:
+        empty (iterable[str]): 不放資料的表（例如匯入測試從空的 job_posting 開始）
+
+    返回:
+        dict: 表名 -> 資料列清單
+    """
+    tables = {'company_info': [{
+        'company_id': index + 1,
+        'company_name': company_name(index),
+        'industry': '資訊科技',
+        'created_at': BASE_TIME.isoformat(),
+    } for index in range(n_companies)]}
+
+    company_ids = {row['company_name']: row['company_id'] for row in tables['company_info']}
+    tables['job_posting'] = [{
+        'job_id': index + 1,
+        'company_id': company_ids[raw['company_name']],
+        'job_title': raw['job_name'],
+        'job_description': raw['job_description'],
+        'requirements': f"技能要求: {raw['skills']}",
+        'salary_min': raw['salary_min'],
+        'salary_max': raw['salary_max'],
+        'location': _legacy_location(raw['location']),
+        'remote_option': 'remote' if '遠端' in raw['location'] else 'onsite',
+        'source_platform': SOURCE_PLATFORM,
+        'source_url': raw['source_url'],
+        'posted_date': raw['update_date'],
+        'scraped_at': raw['created_at'],
+        'is_active': True,
+        'is_embedded': False,
+    } for index, raw in enumerate(raw_jobs(n_jobs, n_companies, seed))]
+
+    accounts = auth_users(n_users, seed)
+    tables['users'] = [{
+        'id': account['id'],
+        'user_id': index + 1,
+        'email': account['email'],
+        'password_hash': 'supabase-auth',
+        'created_at': account['created_at'],
+        'last_login': None,
+    } for index, account in enumerate(accounts)]
+
+    rng = random.Random(f'{seed}:profiles')
+    tables['user_profile'] = [{
+        'profile_id': index + 1,
+        'user_id': index + 1,
+        'full_name': rng.choice(FAMILY_NAMES) + rng.choice(GIVEN_NAMES),
+        'location': rng.choice(LOCATIONS)[0],
+        'years_of_experience': rng.randint(0, 15),
+        'current_position': rng.choice(ROLES),
+    } for index in range(n_users)]
+
+    for name in empty:
+        tables[name] = []
+    return tables
@@ -0,0 +1,290 @@
+"""
+職缺語意搜尋服務效能測試（合成資料，不需連線、不需下載模型）
+
+以 supabase_control/job_catalog.synthetic_frame 產生 --jobs 筆職缺（另有 5% 已下架、只在向量庫中的職缺），
+職缺文字由主題詞彙組成，以 hashed bag-of-words 的假模型 encode（每次 forward pass 固定延遲
+--base-ms + 每筆 --per-item-ms，模擬 sentence-transformers 在 CPU 上的成本），建立 HNSW 向量庫與目錄快照後：
+1. 以 --clients 個並行用戶端透過 ASGI 呼叫 /search（查詢依 Zipf 分布重複，部分帶篩選條件），
+   比較「快取 + micro-batching」「只有 micro-batching」「逐筆 encode」的 p50 / p95 / p99 延遲與每秒查詢數
+2. 篩選條件嚴格時，比較 bitmap 預篩選（服務預設）、bitmap + HNSW、先取 top-k 再過濾 三種召回方式
+   與精確結果的 recall@limit 與耗時
+3. GET /search（重複參數）與參數錯誤（400）的回應
+
+執行方式:
+    python bench_search.py --jobs 50000 --clients 32 --requests 40
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import zlib
+
+import httpx
+import numpy as np
+
+from job_search import RERANK_FACTOR, JobSearchService, QueryEmbedder, SearchIndexHolder
+from job_catalog import synthetic_frame, write_catalog   # job_search 已把 supabase_control 加入 sys.path
+from search_service import create_app
+from vector_store import VectorStore
+
+
+TOPICS = {
+    'backend': ['Python', 'Django', 'FastAPI', '後端', 'PostgreSQL', 'Redis', 'API', '微服務', 'Docker', 'Linux'],
+    'frontend': ['React', 'Vue', 'TypeScript', '前端', 'CSS', 'UI', '網頁', 'Next.js', '元件', '瀏覽器'],
+    'data': ['資料分析', 'SQL', 'Pandas', '機器學習', '統計', 'Tableau', '資料科學', 'Spark', '模型', '報表'],
+    'firmware': ['韌體', 'C語言', '嵌入式', 'MCU', 'RTOS', '驅動程式', '硬體', '電路', '除錯', 'ARM'],
+    'accounting': ['會計', '帳務', '稅務', '財報', 'ERP', '成本', '審計', '出納', 'Excel', '憑證'],
+    'sales': ['業務', '客戶', '開發', '業績', '簡報', '談判', '通路', '行銷', '拜訪', '提案'],
+    'design': ['設計', 'Figma', '視覺', '品牌', 'Photoshop', 'Illustrator', '排版', '插畫', '動畫', '使用者體驗'],
+    'support': ['客服', '電話', '服務', '溝通', '售後', '訂單', '客訴', '系統操作', '排班', '回覆'],
+}
+COMMON = ['團隊', '合作', '經驗', '責任感', '學習', '溝通能力', '年終', '彈性', '成長', '福利']
+
+# 並行查詢的篩選條件（None 為不篩選）
+LOAD_FILTERS = [None, None, None, {'city': ['台北市']}, {'city': ['台北市', '新北市']},
+                {'city': ['台中市'], 'salary_min': 60000}, {'remote_option': ['完全遠端']}]
+
+# 召回比較的篩選條件
+RECALL_FILTERS = [
+    ('台北市', {'city': ['台北市']}),
+    ('台北市 + 月薪上限 >= 90000', {'city': ['台北市'], 'salary_min': 90000}),
+    ('新竹縣 + 完全遠端', {'city': ['新竹縣'], 'remote_option': ['完全遠端']}),
+]
+
+
+class FakeEncoder:
+    """hashed bag-of-words：每個詞對應一個固定的隨機向量；encode 時依批次大小 sleep 模擬模型延遲"""
+
+    model_name = 'bench-hashed-bow'
+
+    def __init__(self, dim=256, base_ms=15.0, per_item_ms=1.0):
+        self.dim = dim
+        self.base = base_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self._words = {}
+        self.calls = 0
+
+    def _word_vector(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode('utf-8')))
+            vector = self._words[word] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def vectors(self, texts):
+        """不含模擬延遲（建立向量庫用）"""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i] += self._word_vector(word)
+        return out
+
+    def encode(self, texts, batch_size=32):
+        self.calls += 1
+        time.sleep(self.base + self.per_item * len(texts))
+        return self.vectors(texts)
+
+
+def job_texts(n, seed):
+    rng = np.random.default_rng(seed)
+    names = list(TOPICS)
+    texts = []
+    for topic in rng.choice(names, n):
+        words = list(rng.choice(TOPICS[topic], 6, replace=False)) + list(rng.choice(COMMON, 2, replace=False))
+        texts.append(' '.join(words))
+    return texts
+
+
+def query_pool(n, seed):
+    """n 個不同的查詢文字（主題詞 2~3 個）"""
+    rng = np.random.default_rng(seed)
+    pool = set()
+    while len(pool) < n:
+        topic = rng.choice(list(TOPICS))
+        pool.add(' '.join(rng.choice(TOPICS[topic], rng.integers(2, 4), replace=False)))
+    return sorted(pool)
+
+
+def build_fixture(directory, n_jobs, encoder):
+    """建立目錄快照與 HNSW 向量庫；返回 (index_dir, catalog_path)"""
+    frame = synthetic_frame(n_jobs)
+    catalog_path = os.path.join(directory, 'job_catalog.bin')
+    write_catalog(frame, catalog_path)
+
+    # 已下架的職缺仍在向量庫中（indexer 尚未刪除），只有 active_only=False 時會被搜尋到
+    n_vectors = n_jobs + n_jobs // 20
+    index_dir = os.path.join(directory, 'job_posting')
+    store = VectorStore(index_dir, encoder.dim, 'hnsw', meta={'model': encoder.model_name})
+    texts = job_texts(n_vectors, seed=7)
+    for start in range(0, n_vectors, 10000):
+        chunk = texts[start:start + 10000]
+        store.upsert(np.arange(start + 1, start + 1 + len(chunk)), encoder.vectors(chunk))
+    store.save()
+    return index_dir, catalog_path
+
+
+# ============================================
+# 並行查詢
+# ============================================
+
+async def run_load(service, queries, clients, requests, seed=0):
+    app = create_app(service)
+    transport = httpx.ASGITransport(app=app)
+    latencies, statuses = [], []
+    # 查詢熱門程度呈 Zipf 分布：少數查詢很常出現
+    weights = 1 / np.arange(1, len(queries) + 1) ** 1.1
+    weights /= weights.sum()
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def worker(i):
+            rng = np.random.default_rng(seed * 1000 + i)
+            for _ in range(requests):
+                body = {'query': queries[rng.choice(len(queries), p=weights)], 'limit': 20}
+                body.update(LOAD_FILTERS[rng.integers(len(LOAD_FILTERS))] or {})
+                start = time.perf_counter()
+                response = await client.post('/search', json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses.append(response.status_code)
+
+        start, cpu = time.perf_counter(), time.process_time()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    return np.array(latencies) * 1000, elapsed, cpu, statuses
+
+
+def report_load(label, latencies, elapsed, cpu, statuses, embedder):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    stats = embedder.stats()
+    print(f"【{label}】 {len(latencies) / elapsed:,.0f} 查詢/秒，p50 {p50:.1f} ms、p95 {p95:.1f} ms、p99 {p99:.1f} ms")
+    print(f"    forward pass {stats['batches']:,} 次（平均每批 {stats['mean_batch_size']:.1f} 筆），"
+          f"快取命中率 {stats['hit_rate']:.1%}，每個查詢 CPU {cpu / len(latencies) * 1000:.1f} ms，"
+          f"非 200 回應 {sum(s != 200 for s in statuses)} 個")
+    return len(latencies) / elapsed, p50
+
+
+# ============================================
+# 召回比較
+# ============================================
+
+def compare_recall(service, encoder, queries, limit):
+    index = service.holder.get()
+    store, filters = index.store, index.filters
+    label_ids = store.label_ids()
+    vectors = encoder.vectors(queries)
+    faiss_normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    ann_only = JobSearchService(service.holder, service.embedder, exact_threshold=0)
+    ok = True
+
+    for label, spec in RECALL_FILTERS:
+        bits, matched = filters.bitmap(**spec)
+        allowed = np.zeros(len(label_ids), dtype=bool)
+        allowed[filters.labels(bits)] = True
+        allowed_ids = set(label_ids[allowed].tolist())
+        totals = {'bitmap 預篩選（服務預設）': [0.0, 0.0, 0], 'bitmap + HNSW': [0.0, 0.0, 0],
+                  f'top-{limit * RERANK_FACTOR} 後篩選': [0.0, 0.0, 0]}
+
+        for vector in faiss_normalized:
+            vector = vector[None, :]
+            _, truth = store.search_labels(vector, filters.labels(bits), limit)
+            truth = set(truth[0][truth[0] >= 0].tolist())
+            runs = {
+                'bitmap 預篩選（服務預設）': lambda: service._recall(index, vector, bits, matched, limit)[0],
+                'bitmap + HNSW': lambda: ann_only._recall(index, vector, bits, matched, limit)[0],
+                f'top-{limit * RERANK_FACTOR} 後篩選': lambda: [
+                    i for i in store.search(vector, limit * RERANK_FACTOR)[1][0] if i in allowed_ids][:limit],
+            }
+            for name, run in runs.items():
+                start = time.perf_counter()
+                found = run()
+                totals[name][0] += (time.perf_counter() - start) * 1000
+                totals[name][1] += len(truth & set(int(i) for i in found)) / max(1, len(truth))
+                totals[name][2] += len(found)
+
+        print(f"【{label}】 符合 {matched:,} 筆（{matched / len(filters):.1%}）")
+        recalls = {}
+        for name, (ms, recall, count) in totals.items():
+            recalls[name] = recall / len(queries)
+            print(f"    {name:<22} recall@{limit} {recalls[name]:.3f}，平均取得 {count / len(queries):.1f} 筆，"
+                  f"{ms / len(queries):.2f} ms")
+        ok &= recalls['bitmap 預篩選（服務預設）'] >= max(recalls.values()) - 0.02
+    return ok
+
+
+async def check_api(service):
+    app = create_app(service)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        response = await client.get('/search', params=[('query', 'Python 後端'), ('city', '台北市'),
+                                                       ('city', '新北市'), ('limit', '5')])
+        body = response.json()
+        cities_ok = response.status_code == 200 and all(r['city'] in ('台北市', '新北市') for r in body['results'])
+        bad = await client.post('/search', json={'city': '台北市'})
+        health = await client.get('/health')
+    print(f"GET /search（重複參數）: {response.status_code}、{body.get('count')} 筆 {'✓' if cities_ok else '✗'}；"
+          f"缺少 query: {bad.status_code} {'✓' if bad.status_code == 400 else '✗'}；"
+          f"/health: {health.json()['index'].get('searchable_jobs'):,} 筆可搜尋")
+    return cities_ok and bad.status_code == 400
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='職缺語意搜尋服務效能測試')
+    parser.add_argument('--jobs', type=int, default=50_000, help='職缺數')
+    parser.add_argument('--dim', type=int, default=256, help='向量維度')
+    parser.add_argument('--queries', type=int, default=400, help='不同查詢的數量')
+    parser.add_argument('--clients', type=int, default=32, help='並行用戶端數')
+    parser.add_argument('--requests', type=int, default=40, help='每個用戶端的查詢數')
+    parser.add_argument('--base-ms', type=float, default=15.0, help='每次 forward pass 的固定延遲（毫秒）')
+    parser.add_argument('--per-item-ms', type=float, default=1.0, help='forward pass 每筆查詢的延遲（毫秒）')
+    parser.add_argument('--limit', type=int, default=20, help='召回比較的 limit')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("職缺語意搜尋服務效能測試")
+    print("=" * 60)
+
+    encoder = FakeEncoder(args.dim, args.base_ms, args.per_item_ms)
+    queries = query_pool(args.queries, seed=11)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        index_dir, catalog_path = build_fixture(tmp, args.jobs, encoder)
+        holder = SearchIndexHolder(index_dir, catalog_path)
+        index = holder.get()
+        print(f"{len(index.store):,} 個向量（{len(index.filters):,} 筆上架中），{len(queries)} 種查詢，"
+              f"{args.clients} 個用戶端 x {args.requests} 次，模型延遲 {args.base_ms:g} ms + "
+              f"{args.per_item_ms:g} ms/筆（建立 {time.perf_counter() - start:.1f}s）\n")
+
+        scenarios = [('快取 + micro-batching', dict()),
+                     ('只有 micro-batching（不快取）', dict(cache_size=0)),
+                     ('逐筆 encode（不快取、不批次）', dict(cache_size=0, batching=False))]
+        # 暖機：讓 memory-map 的索引頁面載入、FastAPI 路由初始化，不計入結果
+        service = JobSearchService(holder, QueryEmbedder(encoder, cache_size=0))
+        asyncio.run(run_load(service, queries, 4, 10, seed=99))
+        service.close()
+
+        measured = {}
+        for label, options in scenarios:
+            service = JobSearchService(holder, QueryEmbedder(encoder, **options))
+            latencies, elapsed, cpu, statuses = asyncio.run(run_load(service, queries, args.clients, args.requests))
+            measured[label] = report_load(label, latencies, elapsed, cpu, statuses, service.embedder)
+            results.append(all(s == 200 for s in statuses))
+            service.close()
+        # 每秒查詢數較高、p50 較低；用戶端與服務共用一個 event loop，快取命中率高時 CPU 滿載，
+        # p99 主要反映 event loop 排隊，只列出不比較
+        baseline = measured['逐筆 encode（不快取、不批次）']
+        for label in ('快取 + micro-batching', '只有 micro-batching（不快取）'):
+            results.append(measured[label][0] > baseline[0] and measured[label][1] < baseline[1])
+
+        print()
+        service = JobSearchService(holder, QueryEmbedder(encoder))
+        results.append(compare_recall(service, encoder, queries[:100], args.limit))
+        print()
+        results.append(asyncio.run(check_api(service)))
+        service.close()
+
+    print(f"\n{'✓ 全部檢查通過' if all(results) else '✗ 有檢查未通過'}")
+
+
+if __name__ == "__main__":
+    main()
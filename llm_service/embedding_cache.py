@@ -0,0 +1,282 @@
+"""
+Embedding 快取（以內容 hash 為鍵）
+
+重新爬取的職缺大多是一模一樣的 job_description / requirements，履歷也常只是小幅修改後重新儲存；
+在 CPU 上用 sentence-transformers encode 是 llm_service 最昂貴的一步。
+本模組以 (模型名稱, 正規化文字的 hash) 為鍵快取向量，相同內容永遠不會被 encode 第二次。
+
+儲存格式（每個模型一個目錄，預設 llm_service/embedding_cache/<model>）:
+    vectors.f16   float16 的 memory-map 矩陣（capacity x dim），每一列是一個 slot
+    slot_keys.u8  每個 slot 目前存放的 key（sha256 前 16 bytes，memory-map；全 0 表示空 slot）
+    index.npz     每個 slot 的 key 與最後使用時間（LRU 用，flush() 時才更新）
+    meta.json     模型、維度、容量、格式版本
+
+slot 的 key 與向量一起直接寫進 memory-map（重用 slot 時先清掉 key、寫入向量、最後才寫入新 key），
+載入時以 slot_keys 為準：index.npz 與 slot_keys 不一致的 slot（flush 之前被淘汰重用）會被丟棄，
+flush 之後才寫入的 slot 也能找回。行程在兩次 flush 之間結束，也不會把別的文字的向量回傳給某個 key。
+
+- 容量由 max_bytes 決定；滿了之後一次淘汰最久未使用的 10% slot（LRU）
+- 只支援單一寫入行程（例如 embedding_indexer）；維度或容量改變時快取會重建
+- 命中與未命中的向量一律以 float16 精度回傳，相同文字在任何時候都得到相同的向量
+
+使用方式:
+    from embedding_cache import CachedEncoder, EmbeddingCache
+
+    cache = EmbeddingCache('embedding_cache', encoder.model_name, encoder.dim)
+    encoder = CachedEncoder(encoder, cache)
+    vectors = encoder.encode(texts)
+    print(encoder.stats())
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import unicodedata
+
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embedding_cache')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+KEY_BYTES = 16
+CACHE_FORMAT = 2
+EVICT_FRACTION = 0.1
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """快取鍵使用的正規化：NFKC、空白壓縮（不改大小寫，避免影響模型輸出）"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _model_slug(model_name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', model_name)
+
+
+class EmbeddingCache:
+    """
+    參數:
+        root (str): 快取根目錄
+        model_name (str): 模型名稱（不同模型的向量分開存放）
+        dim (int): 向量維度
+        max_bytes (int): 向量矩陣大小上限（決定 slot 數）
+    """
+
+    def __init__(self, root, model_name, dim, max_bytes=DEFAULT_MAX_BYTES):
+        self.model_name = model_name
+        self.dim = int(dim)
+        self.capacity = max(1, int(max_bytes) // (self.dim * 2))
+        self.path = os.path.join(root, _model_slug(model_name))
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        meta = {'model': model_name, 'dim': self.dim, 'capacity': self.capacity, 'format': CACHE_FORMAT}
+        meta_path = os.path.join(self.path, 'meta.json')
+        existing = None
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                existing = json.load(f)
+        if existing != meta:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        vectors_path = os.path.join(self.path, 'vectors.f16')
+        mode = 'r+' if os.path.exists(vectors_path) else 'w+'
+        self._vectors = np.memmap(vectors_path, dtype=np.float16, mode=mode, shape=(self.capacity, self.dim))
+        slot_keys_path = os.path.join(self.path, 'slot_keys.u8')
+        mode = 'r+' if os.path.exists(slot_keys_path) else 'w+'
+        self._slot_keys = np.memmap(slot_keys_path, dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_BYTES))
+
+        index_path = os.path.join(self.path, 'index.npz')
+        if os.path.exists(index_path):
+            with np.load(index_path) as data:
+                self._keys = data['keys'].copy()
+                self._last_used = data['last_used'].copy()
+                self._clock = int(data['clock'])
+        else:
+            self._keys = np.zeros((self.capacity, KEY_BYTES), dtype=np.uint8)
+            self._last_used = np.zeros(self.capacity, dtype=np.int64)   # 0 表示空 slot
+            self._clock = 0
+
+        # slot_keys 是每個 slot 實際存放內容的依據；index.npz 只提供 LRU 時間
+        occupied = self._slot_keys.any(axis=1)
+        stale = ~(self._keys == self._slot_keys).all(axis=1)
+        self._last_used[~occupied] = 0
+        self._last_used[occupied & (stale | (self._last_used == 0))] = 1   # flush 之後才寫入的 slot 視為最舊
+        self._keys[:] = self._slot_keys
+        self._slots = {}
+        for i in np.flatnonzero(occupied).tolist():
+            key = self._keys[i].tobytes()
+            if key in self._slots:   # 不應發生；保險起見只保留一份
+                self._clear_slot(i)
+            else:
+                self._slots[key] = i
+        self._free = np.flatnonzero(self._last_used == 0)[::-1].tolist()
+        self._dirty = bool(stale.any())
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text):
+        digest = hashlib.sha256(f'{self.model_name}\0{normalize_text(text)}'.encode('utf-8')).digest()
+        return digest[:KEY_BYTES]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get_many(self, keys):
+        """
+        返回:
+            (np.ndarray[bool], np.ndarray): 每個 key 是否命中、命中者的向量（float32，未命中的列為 0）
+        """
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+        with self._lock:
+            self._clock += 1
+            slots = np.asarray([self._slots.get(k, -1) for k in keys], dtype=np.int64)
+            found = slots >= 0
+            if found.any():
+                # 確認 slot 目前存放的仍是這個 key
+                expected = np.frombuffer(b''.join(keys[i] for i in np.flatnonzero(found)),
+                                         dtype=np.uint8).reshape(-1, KEY_BYTES)
+                valid = (self._slot_keys[slots[found]] == expected).all(axis=1)
+                if not valid.all():
+                    for i in np.flatnonzero(found)[~valid].tolist():
+                        self._slots.pop(keys[i], None)
+                    found[np.flatnonzero(found)[~valid]] = False
+            if found.any():
+                vectors[found] = self._vectors[slots[found]]
+                self._last_used[slots[found]] = self._clock
+                self._dirty = True
+        return found, vectors
+
+    def record(self, hits, misses):
+        """累計命中 / 未命中次數（未命中 = 實際送進模型 encode 的文字數）"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def put_many(self, keys, vectors):
+        """寫入向量（已存在的 key 覆寫）"""
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with self._lock:
+            self._clock += 1
+            for key, vector in zip(keys, vectors):
+                slot = self._slots.get(key)
+                if slot is None:
+                    slot = self._allocate()
+                    self._slots[key] = slot
+                    self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._slot_keys[slot] = 0   # 寫入向量期間 slot 不屬於任何 key
+                self._vectors[slot] = vector
+                self._slot_keys[slot] = self._keys[slot]
+                self._last_used[slot] = self._clock
+            self._dirty = True
+
+    def _allocate(self):
+        if not self._free:
+            self._evict(max(1, int(self.capacity * EVICT_FRACTION)))
+        return self._free.pop()
+
+    def _evict(self, count):
+        # 呼叫端需持有 lock；一次淘汰一批最久未使用的 slot，避免每次寫入都要排序
+        count = min(count, self.capacity)
+        victims = np.argpartition(self._last_used, count - 1)[:count]
+        for slot in victims.tolist():
+            self._slots.pop(self._keys[slot].tobytes(), None)
+            self._clear_slot(slot)
+        self._free.extend(victims.tolist())
+        self.evictions += len(victims)
+
+    def _clear_slot(self, slot):
+        self._slot_keys[slot] = 0
+        self._keys[slot] = 0
+        self._last_used[slot] = 0
+
+    def flush(self):
+        """將向量與索引寫回磁碟（索引以暫存檔 + os.replace 原子更新）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._vectors.flush()
+            self._slot_keys.flush()
+            tmp_path = os.path.join(self.path, 'index.tmp.npz')
+            np.savez(tmp_path, keys=self._keys, last_used=self._last_used, clock=self._clock)
+            os.replace(tmp_path, os.path.join(self.path, 'index.npz'))
+            self._dirty = False
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._slots),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class CachedEncoder:
+    """
+    在 encoder 前面加上 EmbeddingCache：先查快取，只把未命中的文字（同一批內去重後）送進模型
+
+    參數:
+        encoder: 具有 model_name、dim 與 encode(texts, batch_size) 的物件
+        cache (EmbeddingCache)
+        flush_every (int): 累積多少筆新向量後寫回磁碟一次（行程結束時也會寫回）
+    """
+
+    def __init__(self, encoder, cache, flush_every=1000):
+        self.encoder = encoder
+        self.cache = cache
+        self.flush_every = flush_every
+        self._pending = 0
+        atexit.register(cache.flush)
+
+    @property
+    def model_name(self):
+        return self.encoder.model_name
+
+    @property
+    def dim(self):
+        return self.encoder.dim
+
+    def encode(self, texts, batch_size=64):
+        texts = list(texts)
+        keys = [self.cache.key(t) for t in texts]
+        found, vectors = self.cache.get_many(keys)
+
+        missing = {}
+        for i in np.flatnonzero(~found).tolist():
+            missing.setdefault(keys[i], []).append(i)
+        if missing:
+            first = [positions[0] for positions in missing.values()]
+            encoded = self.encoder.encode([texts[i] for i in first], batch_size=batch_size)
+            # 以 float16 精度回傳，與之後的快取命中結果完全一致
+            encoded = np.asarray(encoded, dtype=np.float16).astype(np.float32)
+            self.cache.put_many(list(missing), encoded)
+            for vector, positions in zip(encoded, missing.values()):
+                vectors[positions] = vector
+
+            self._pending += len(missing)
+            if self._pending >= self.flush_every:
+                self.flush()
+        # 同一批內重複的文字只 encode 一次，重複者也算命中
+        self.cache.record(hits=len(texts) - len(missing), misses=len(missing))
+        return vectors
+
+    def flush(self):
+        self.cache.flush()
+        self._pending = 0
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,341 @@
+"""
+job_posting 向量索引 worker
+
+以 job_posting.is_embedded / vector_id 驅動的增量索引：
+1. 刪除：is_active = false 且 is_embedded = true 的職缺從索引移除，並把 is_embedded 改回 false
+2. 新增：is_active = true 且 is_embedded = false 的職缺以 keyset 分頁讀取，
+   在 CPU 上分批 encode 後寫入 FAISS 索引（vector_store.VectorStore），
+   每 --save-every 頁或 --save-interval 秒（以及每輪結束時）存檔一次索引，
+   存檔成功後才批次寫回這段期間的 is_embedded = true 與 vector_id
+   （每次存檔都會寫出完整的索引版本，逐頁存檔會讓 I/O 隨職缺數平方成長）。
+   旗標以 UPDATE ... WHERE job_id = ? AND content_hash = ? 寫回，只標記 content_hash 仍是 encode 時讀到的
+   那一版的職缺：encode 期間被 incremental_ingest 改過內容（is_embedded 已被設回 false）的職缺維持未 embed，
+   期間被刪除的職缺也不會被 upsert 成新的資料列
+3. （選用）--reconcile：比對資料庫與索引，移除資料庫中已不存在的職缺、
+   並把索引裡找不到向量的職缺標回 is_embedded = false
+
+日常更新永遠只處理有變動的資料列，不需要重建整個索引；
+職缺內容更新時把 is_embedded 設回 false，下一輪就會重新 encode 並覆寫舊向量。
+
+環境變數:
+    EMBEDDING_MODEL        sentence-transformers 模型，預設 paraphrase-multilingual-MiniLM-L12-v2
+    EMBEDDING_INDEX_DIR    索引目錄，預設 llm_service/index
+    EMBEDDING_INDEX_TYPE   hnsw / ivf / flat，預設 hnsw
+    EMBEDDING_BATCH_SIZE   encode 批次大小，預設 64
+    EMBEDDING_CACHE_DIR    embedding 快取目錄（embedding_cache.py），預設 llm_service/embedding_cache
+    EMBEDDING_CACHE_MB     embedding 快取大小上限（MB），預設 512
+
+執行方式:
+    python embedding_indexer.py                 # 執行一輪
+    python embedding_indexer.py --interval 300  # 每 5 分鐘執行一輪
+    python embedding_indexer.py --reconcile     # 額外比對資料庫與索引
+    python embedding_indexer.py --no-cache      # 不使用 embedding 快取
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from embedding_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, CachedEncoder, EmbeddingCache
+from vector_store import INDEX_TYPES, VectorStore
+
+# 與 backend 相同，共用 supabase_control 的連線工廠與批次寫入
+_supabase_control_path = str(Path(__file__).resolve().parent.parent / 'supabase_control')
+if _supabase_control_path not in sys.path:
+    sys.path.insert(0, _supabase_control_path)
+
+from bulk_writer import BulkWriteResult  # noqa: E402
+from perf_metrics import stage, start_run  # noqa: E402
+from table_stream import iter_pages  # noqa: E402
+
+
+DEFAULT_MODEL = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index')
+
+# vector_id = uuid5(命名空間, "<model>:<table>:<id>")，同一筆資料、同一個模型永遠得到相同的 vector_id
+VECTOR_ID_NAMESPACE = uuid.UUID('6f1c2a4e-8d43-4a53-9d7e-3f0b7a1c5e21')
+
+JOB_TEXT_COLUMNS = ['job_title', 'job_description', 'requirements']
+FLAG_CHUNK_SIZE = 200   # 清除旗標時每個 UPDATE 的職缺數（job_id 放在 URL 的 IN 條件裡）
+MAX_TEXT_LENGTH = 4000   # 模型本身會截斷 token，這裡先截掉過長的文字減少 tokenize 成本
+
+
+class SentenceTransformerEncoder:
+    """
+    以 sentence-transformers 在 CPU 上 encode，輸出已正規化的 float32 向量
+
+    模型在第一次 encode 時才載入。
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, device='cpu'):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    @property
+    def dim(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=64):
+        vectors = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def job_text(row):
+    """職缺要 encode 的文字：職稱、描述與要求"""
+    parts = [str(row[c]).strip() for c in JOB_TEXT_COLUMNS if row.get(c)]
+    return '\n'.join(p for p in parts if p)[:MAX_TEXT_LENGTH]
+
+
+def vector_uuid(model_name, table, row_id):
+    return str(uuid.uuid5(VECTOR_ID_NAMESPACE, f'{model_name}:{table}:{row_id}'))
+
+
+class JobEmbeddingIndexer:
+    """
+    參數:
+        supabase: Supabase Client
+        encoder: 具有 model_name、dim 與 encode(texts, batch_size) 的物件
+        store (VectorStore): 可寫入的向量庫
+        page_size (int): 每次從資料庫讀取的筆數
+        batch_size (int): encode 批次大小
+        workers (int): 寫回資料庫的並行請求數
+        save_every (int): 累積幾頁就存檔索引並寫回旗標
+        save_interval (float): 距離上次存檔超過幾秒就存檔索引並寫回旗標
+    """
+
+    table = 'job_posting'
+    id_column = 'job_id'
+
+    def __init__(self, supabase, encoder, store, page_size=500, batch_size=64, workers=4,
+                 save_every=20, save_interval=60.0):
+        self.supabase = supabase
+        self.encoder = encoder
+        self.store = store
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._pending_flags = []   # 索引已更新、尚未存檔的職缺旗標
+        self._pending_pages = 0
+        self._last_save = time.monotonic()
+
+    def _iter_pages(self, columns, **filters):
+        """依條件以 id keyset 分頁讀取"""
+        return iter_pages(self.supabase, self.table, columns, self.id_column, page_size=self.page_size,
+                          filters=[('eq', (column, value)) for column, value in filters.items()])
+
+    def _clear_flags(self, ids):
+        query = self.supabase.table(self.table).update({'is_embedded': False, 'vector_id': None})
+        return len(query.in_(self.id_column, ids).execute().data or [])
+
+    def _set_embedded(self, row):
+        """只在 content_hash 仍是 encode 時那一版才標記（尚未有指紋的舊資料比對 NULL）"""
+        query = (self.supabase.table(self.table).update({'is_embedded': True, 'vector_id': row['vector_id']})
+                 .eq(self.id_column, row[self.id_column]))
+        if row['content_hash'] is None:
+            query = query.is_('content_hash', 'null')
+        else:
+            query = query.eq('content_hash', row['content_hash'])
+        return len(query.execute().data or [])
+
+    def _write_flags(self, rows):
+        """
+        以 UPDATE 寫回旗標（不 upsert：期間被刪除的職缺不會被重新建立）
+
+        rows 為 {job_id, is_embedded, vector_id[, content_hash]}：
+        - is_embedded = false：每 FLAG_CHUNK_SIZE 個 job_id 一個 UPDATE ... WHERE job_id IN (...)
+        - is_embedded = true：每個職缺的 vector_id 不同，逐筆 UPDATE ... WHERE job_id = ? AND content_hash = ?，
+          以 workers 個執行緒並行；內容已變更的職缺不會被標記，下一輪重新 encode
+
+        返回:
+            BulkWriteResult: written 為實際更新的筆數
+        """
+        if not rows:
+            return None
+        result = BulkWriteResult(self.table)
+        start = time.perf_counter()
+        cleared = [row[self.id_column] for row in rows if not row['is_embedded']]
+        tasks = [(self._clear_flags, cleared[offset:offset + FLAG_CHUNK_SIZE])
+                 for offset in range(0, len(cleared), FLAG_CHUNK_SIZE)]
+        tasks += [(self._set_embedded, row) for row in rows if row['is_embedded']]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(executor.submit(function, argument), argument) for function, argument in tasks]
+            for future, argument in futures:
+                try:
+                    result.written += future.result()
+                except Exception as e:
+                    failed = argument if isinstance(argument, list) else [argument]
+                    result.failed_rows.extend((row, str(e)) for row in failed)
+                result.batches += 1
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def checkpoint(self):
+        """
+        存檔索引後才寫回累積的 is_embedded / vector_id（確保資料庫標記為已 embed 的資料一定在索引中）
+
+        返回:
+            BulkWriteResult: 旗標寫回結果；沒有待存檔的變更時為 None
+        """
+        if not self._pending_pages:
+            return None
+        with stage('save'):
+            self.store.save()
+        flags, self._pending_flags = self._pending_flags, []
+        self._pending_pages = 0
+        self._last_save = time.monotonic()
+        with stage('upsert', rows=len(flags)):
+            return self._write_flags(flags)
+
+    def _page_done(self, flags):
+        """記錄一頁的索引變更；達到 save_every 頁或 save_interval 秒時存檔"""
+        self._pending_flags.extend(flags)
+        self._pending_pages += 1
+        if (self._pending_pages >= self.save_every
+                or time.monotonic() - self._last_save >= self.save_interval):
+            return self.checkpoint()
+        return None
+
+    def sync_removed(self):
+        """從索引移除已下架的職缺；回傳移除筆數"""
+        removed = 0
+        for rows in self._iter_pages(self.id_column, is_active=False, is_embedded=True):
+            ids = [row[self.id_column] for row in rows]
+            removed += self.store.remove(ids)
+            self._page_done([{self.id_column: i, 'is_embedded': False, 'vector_id': None} for i in ids])
+        self.checkpoint()
+        return removed
+
+    def sync_pending(self):
+        """encode 尚未建立向量的職缺並寫入索引；回傳新增筆數"""
+        columns = ', '.join([self.id_column, 'content_hash'] + JOB_TEXT_COLUMNS)
+        added = 0
+        for rows in self._iter_pages(columns, is_active=True, is_embedded=False):
+            ids = np.array([row[self.id_column] for row in rows], dtype=np.int64)
+            with stage('embed', rows=len(rows)):
+                vectors = self.encoder.encode([job_text(row) for row in rows], batch_size=self.batch_size)
+            with stage('index', rows=len(ids)):
+                self.store.upsert(ids, vectors)
+            added += len(ids)
+            result = self._page_done([
+                {self.id_column: int(row[self.id_column]), 'is_embedded': True, 'content_hash': row['content_hash'],
+                 'vector_id': vector_uuid(self.encoder.model_name, self.table, int(row[self.id_column]))}
+                for row in rows
+            ])
+            if result is not None:
+                print(f"  已加入 {added} 筆，索引已存檔（{result.summary()}）")
+        result = self.checkpoint()
+        if result is not None:
+            print(f"  已加入 {added} 筆，索引已存檔（{result.summary()}）")
+        return added
+
+    def reconcile(self):
+        """
+        比對資料庫與索引
+
+        返回:
+            (int, int): 從索引移除的筆數、標回未 embed 的筆數
+        """
+        embedded = set()
+        for rows in self._iter_pages(self.id_column, is_active=True, is_embedded=True):
+            embedded.update(row[self.id_column] for row in rows)
+
+        indexed = set(self.store.ids().tolist())
+        stale = indexed - embedded
+        missing = embedded - indexed
+        if stale:
+            self.store.remove(list(stale))
+            self.store.save()
+        self._write_flags([{self.id_column: i, 'is_embedded': False, 'vector_id': None}
+                           for i in sorted(missing)])
+        return len(stale), len(missing)
+
+    def run_once(self, reconcile=False):
+        stats = {'removed': self.sync_removed(), 'added': self.sync_pending()}
+        if reconcile:
+            stats['stale'], stats['missing'] = self.reconcile()
+        stats['indexed'] = len(self.store)
+        return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='job_posting 向量索引 worker')
+    parser.add_argument('--model', default=os.getenv('EMBEDDING_MODEL', DEFAULT_MODEL), help='sentence-transformers 模型')
+    parser.add_argument('--index-dir', default=os.getenv('EMBEDDING_INDEX_DIR', DEFAULT_INDEX_DIR), help='索引目錄')
+    parser.add_argument('--index-type', default=os.getenv('EMBEDDING_INDEX_TYPE', 'hnsw'), choices=INDEX_TYPES,
+                        help='FAISS 索引型態')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('EMBEDDING_BATCH_SIZE', '64')),
+                        help='encode 批次大小')
+    parser.add_argument('--page-size', type=int, default=500, help='每次從資料庫讀取的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='寫回資料庫的並行請求數')
+    parser.add_argument('--save-every', type=int, default=20, help='每處理幾頁存檔一次索引並寫回旗標')
+    parser.add_argument('--save-interval', type=float, default=60.0, help='距離上次存檔超過幾秒就存檔一次')
+    parser.add_argument('--reconcile', action='store_true', help='比對資料庫與索引（處理硬刪除的職缺）')
+    parser.add_argument('--cache-dir', default=os.getenv('EMBEDDING_CACHE_DIR', DEFAULT_CACHE_DIR),
+                        help='embedding 快取目錄')
+    parser.add_argument('--cache-mb', type=int,
+                        default=int(os.getenv('EMBEDDING_CACHE_MB', str(DEFAULT_MAX_BYTES // (1024 * 1024)))),
+                        help='embedding 快取大小上限（MB）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用 embedding 快取')
+    parser.add_argument('--interval', type=float, default=0, help='大於 0 時每隔幾秒執行一輪，否則只執行一次')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+    start_run('embedding_indexer')
+
+    print("=" * 60)
+    print("job_posting 向量索引 worker")
+    print("=" * 60)
+
+    supabase = connect_to_supabase()
+    encoder = SentenceTransformerEncoder(args.model)
+    if not args.no_cache:
+        cache = EmbeddingCache(args.cache_dir, encoder.model_name, encoder.dim,
+                               max_bytes=args.cache_mb * 1024 * 1024)
+        encoder = CachedEncoder(encoder, cache)
+    store = VectorStore.open_or_create(os.path.join(args.index_dir, 'job_posting'), encoder.dim,
+                                       args.index_type, meta={'model': args.model})
+    indexer = JobEmbeddingIndexer(supabase, encoder, store, page_size=args.page_size,
+                                  batch_size=args.batch_size, workers=args.workers,
+                                  save_every=args.save_every, save_interval=args.save_interval)
+
+    while True:
+        start = time.perf_counter()
+        stats = indexer.run_once(reconcile=args.reconcile)
+        print(f"✓ 移除 {stats['removed']} 筆、新增 {stats['added']} 筆，索引共 {stats['indexed']} 筆"
+              f"（{time.perf_counter() - start:.2f}s）")
+        if 'stale' in stats:
+            print(f"✓ 比對：移除 {stats['stale']} 筆已不存在的職缺，{stats['missing']} 筆標回未 embed")
+        if isinstance(encoder, CachedEncoder):
+            encoder.flush()
+            cache_stats = encoder.stats()
+            print(f"✓ embedding 快取：命中 {cache_stats['hits']}、未命中 {cache_stats['misses']}"
+                  f"（命中率 {cache_stats['hit_rate']:.1%}），{cache_stats['entries']}/{cache_stats['capacity']} 筆，"
+                  f"淘汰 {cache_stats['evictions']} 筆")
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+"""
+混合式職缺語意搜尋（向量召回 + 結構化篩選 + 重新排序）
+
+查詢流程:
+1. 查詢文字（或履歷文字）encode 一次：QueryEmbedder 先查記憶體 LRU 快取，未命中的請求進入 micro-batch 佇列，
+   同時到達的查詢（max_wait_ms 內、最多 max_batch 筆，相同文字只算一筆）共用一次模型 forward pass
+2. 結構化篩選（縣市、區域、遠端選項、薪資範圍、只看上架中職缺）以 bitmap 表示：
+   JobFilterIndex 把 supabase_control 的職缺目錄快照（job_catalog）對齊到 FAISS 的內部 label，
+   每個縣市 / 區域 / 遠端選項預先算好一張 packed bitmap，查詢時只做 bitmap 的 AND / OR
+3. 向量召回：bitmap 直接交給 FAISS（IDSelectorBitmap），在搜尋過程中排除不符合的職缺，
+   而不是先取 top-k 再逐筆過濾（條件嚴格時後者常常一筆都不剩）；
+   符合的職缺少於 exact_threshold 筆時改為只對這些向量做精確內積
+4. 重新排序：召回 limit x RERANK_FACTOR 筆候選，以語意相似度加上技能重疊、期望薪資、刊登時間計算最終分數
+
+職缺目錄快照與向量索引都以 memory-map 開啟；SearchIndexHolder 定期檢查兩者是否更新（indexer 切換了
+CURRENT 版本或目錄快照被重建），有變動時重新開啟並重建 bitmap。
+
+使用方式:
+    service = JobSearchService(SearchIndexHolder(index_dir, catalog_path), QueryEmbedder(encoder))
+    result = await service.search({'query': 'Python 後端', 'city': ['台北市'], 'salary_min': 50000})
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from embedding_cache import normalize_text
+from vector_store import CURRENT_FILE, VectorStore
+
+# 與 embedding_indexer 相同，共用 supabase_control 的職缺目錄快照與技能比對器
+_supabase_control_path = str(Path(__file__).resolve().parent.parent / 'supabase_control')
+if _supabase_control_path not in sys.path:
+    sys.path.insert(0, _supabase_control_path)
+
+from job_catalog import DEFAULT_CATALOG_PATH, JobCatalog  # noqa: E402
+
+
+FILTER_FIELDS = ['city', 'district', 'remote_option']
+PRECOMPUTED_FIELDS = ['city', 'remote_option']   # 值少，載入時預先建立所有 bitmap；district 用到時才建立
+
+MAX_LIMIT = 100
+MAX_OFFSET = 400
+RERANK_FACTOR = 4          # 召回 (offset + limit) x RERANK_FACTOR 筆候選再重新排序
+MIN_CANDIDATES = 50
+EXACT_THRESHOLD = 5000     # 符合篩選條件的職缺少於此數時做精確搜尋
+RECENCY_HALF_LIFE_DAYS = 30
+
+# 重新排序的權重：最終分數 = 相似度 x similarity + 各訊號（0~1）x 權重
+RERANK_WEIGHTS = {'similarity': 1.0, 'skills': 0.15, 'salary': 0.1, 'recency': 0.05}
+
+
+class SearchError(ValueError):
+    """查詢參數錯誤"""
+
+
+class IndexUnavailableError(RuntimeError):
+    """向量索引或職缺目錄快照尚未建立"""
+
+
+def _packbits(mask):
+    return np.packbits(mask, bitorder='little')
+
+
+# ============================================
+# 查詢 embedding：快取 + micro-batching
+# ============================================
+
+class QueryEmbedder:
+    """
+    查詢文字 -> 正規化的 float32 向量
+
+    參數:
+        encoder: 具有 model_name、dim 與 encode(texts, batch_size) 的物件（例如 SentenceTransformerEncoder）
+        cache_size (int): LRU 快取筆數（0 表示不快取）
+        max_batch (int): 一次 forward pass 最多幾個查詢
+        max_wait_ms (float): 第一個查詢到達後最多等待多久湊成一批（0 表示不等待，只合併已在佇列中的查詢）
+        batching (bool): False 時每個查詢各自 encode（效能測試的對照組）
+    """
+
+    def __init__(self, encoder, cache_size=4096, max_batch=32, max_wait_ms=5.0, batching=True):
+        self.encoder = encoder
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batching = batching
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._queue = None
+        self._worker = None
+        # 模型一次只跑一個 forward pass；排隊中的查詢在這段時間內累積成下一批
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='query-encoder')
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.encoded = 0
+
+    @property
+    def model_name(self):
+        return self.encoder.model_name
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _remember(self, key, vector):
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def embed(self, text):
+        """
+        返回:
+            (np.ndarray, bool): 向量（唯讀）與是否命中快取
+        """
+        key = normalize_text(text)
+        if not key:
+            raise SearchError('查詢文字是空的')
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return vector, True
+        self.misses += 1
+
+        # 相同文字正在 encode 時直接等待同一個結果
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[key] = future
+            if self.batching:
+                self._ensure_worker()
+                self._queue.put_nowait((key, future))
+            else:
+                asyncio.ensure_future(self._encode_batch([(key, future)]))
+        return await asyncio.shield(future), False
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._encode_batch(batch)
+
+    async def _encode_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        keys = [key for key, _ in batch]
+        try:
+            vectors = await loop.run_in_executor(
+                self._executor, lambda: self.encoder.encode(keys, batch_size=len(keys)))
+            vectors = np.asarray(vectors, dtype=np.float32)
+            faiss.normalize_L2(vectors)
+        except Exception as e:   # encode 失敗時讓這一批的查詢都收到例外，worker 繼續處理下一批
+            for key, future in batch:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.encoded += len(keys)
+        for (key, future), vector in zip(batch, vectors):
+            vector.setflags(write=False)
+            self._remember(key, vector)
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'cache_entries': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'batches': self.batches,
+            'encoded': self.encoded,
+            'mean_batch_size': self.encoded / self.batches if self.batches else 0.0,
+        }
+
+
+# ============================================
+# 篩選 bitmap
+# ============================================
+
+class JobFilterIndex:
+    """
+    把職缺目錄快照對齊到向量庫的內部 label，篩選條件以 packed bitmap（IDSelectorBitmap 的格式）表示
+
+    參數:
+        store (VectorStore): memory-map 開啟的向量庫
+        catalog (JobCatalog): 職缺目錄快照（只含上架中的職缺）
+    """
+
+    def __init__(self, store, catalog):
+        self.store = store
+        self.catalog = catalog
+        label_ids = store.label_ids()
+        self.size = len(label_ids)
+        # label -> 目錄快照的列（已刪除的向量、已下架或還沒進快照的職缺為 -1）
+        self.rows = pd.Index(np.asarray(catalog.job_id)).get_indexer(np.asarray(label_ids))
+        self.active = self.rows >= 0
+        self.active_bits = _packbits(self.active)
+        self.alive_bits = store.alive_bitmap()
+        self.row_of_job = pd.Index(np.asarray(catalog.job_id))
+        self.value_codes = {field: {value: code for code, value in enumerate(catalog.dictionaries[field])}
+                            for field in FILTER_FIELDS}
+
+        safe_rows = np.maximum(self.rows, 0)
+        self.codes = {field: np.where(self.active, getattr(catalog, field)[safe_rows], -1).astype(np.int16)
+                      for field in FILTER_FIELDS}
+        self.salary_top = np.where(self.active, catalog.salary_top[safe_rows], -1)
+        self.salary_bottom = np.where(self.active, catalog.salary_bottom[safe_rows], -1)
+        self._bitmaps = {}
+        self._lock = threading.Lock()
+        for field in PRECOMPUTED_FIELDS:
+            for code in range(len(catalog.dictionaries[field])):
+                self._value_bitmap(field, code)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    def _value_bitmap(self, field, code):
+        key = (field, code)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = _packbits(self.codes[field] == code)
+            with self._lock:
+                self._bitmaps[key] = bitmap
+        return bitmap
+
+    def bitmap(self, active_only=True, salary_min=None, salary_max=None, **values):
+        """
+        符合所有條件的 label bitmap
+
+        參數:
+            active_only (bool): 只包含目錄快照中（上架中）的職缺；False 時包含向量庫中所有未刪除的向量，
+                此時其他條件只對快照中的職缺成立
+            salary_min (int, optional): 職缺薪資上限 >= salary_min
+            salary_max (int, optional): 職缺薪資下限 <= salary_max
+            city / district / remote_option (list[str], optional): 任一值相符
+
+        返回:
+            (np.ndarray, int): packed bitmap（uint8）與符合的 label 數
+        """
+        bits = (self.active_bits if active_only else self.alive_bits).copy()
+        for field in FILTER_FIELDS:
+            wanted = values.get(field)
+            if not wanted:
+                continue
+            codes = [self.value_codes[field].get(value) for value in wanted]
+            union = np.zeros_like(bits)
+            for code in codes:
+                if code is not None:
+                    union |= self._value_bitmap(field, code)
+            bits &= union
+        if salary_min is not None or salary_max is not None:
+            mask = self.salary_bottom >= 0
+            if salary_min is not None:
+                mask &= self.salary_top >= salary_min
+            if salary_max is not None:
+                mask &= self.salary_bottom <= salary_max
+            bits &= _packbits(mask)
+        return bits, int(np.bitwise_count(bits).sum())
+
+    def labels(self, bits):
+        return np.flatnonzero(np.unpackbits(bits, count=self.size, bitorder='little'))
+
+
+class SearchIndex:
+    """一個版本的向量庫 + 目錄快照 + 篩選 bitmap"""
+
+    def __init__(self, store, catalog, version=None):
+        self.store = store
+        self.catalog = catalog
+        self.filters = JobFilterIndex(store, catalog)
+        self.version = version
+        self.loaded_at = time.time()
+
+    @classmethod
+    def open(cls, index_dir, catalog_path, version=None):
+        return cls(VectorStore.open(index_dir, mmap=True), JobCatalog.open(catalog_path), version)
+
+
+class SearchIndexHolder:
+    """
+    目前使用中的 SearchIndex；每 check_interval 秒檢查一次向量庫的 CURRENT 與目錄快照檔案是否變更
+
+    舊版本不主動關閉（可能仍有查詢在使用），由 GC 回收。
+    """
+
+    def __init__(self, index_dir, catalog_path=DEFAULT_CATALOG_PATH, check_interval=30.0):
+        self.index_dir = index_dir
+        self.catalog_path = catalog_path
+        self.check_interval = check_interval
+        self._index = None
+        self._signature = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _current_signature(self):
+        try:
+            with open(os.path.join(self.index_dir, CURRENT_FILE), encoding='utf-8') as f:
+                version = f.read().strip()
+            stat = os.stat(self.catalog_path)
+        except FileNotFoundError:
+            return None
+        return version, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        """
+        異常:
+            IndexUnavailableError: 向量庫或目錄快照不存在
+        """
+        now = time.monotonic()
+        if self._index is not None and now - self._checked < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is None or now - self._checked >= self.check_interval:
+                signature = self._current_signature()
+                if signature is not None and signature != self._signature:
+                    self._index = SearchIndex.open(self.index_dir, self.catalog_path, version=signature[0])
+                    self._signature = signature
+                self._checked = now
+        if self._index is None:
+            raise IndexUnavailableError('向量索引或職缺目錄快照尚未建立（embedding_indexer / job_catalog.py build）')
+        return self._index
+
+
+# ============================================
+# 重新排序
+# ============================================
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [v for v in value.split(',')]
+    value = [str(v).strip() for v in value if str(v).strip()]
+    return value or None
+
+
+def _optional_int(value, name):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise SearchError(f'{name} 必須是整數')
+
+
+def rerank(catalog, rows, similarity, skills=None, expected_salary=None, now=None, weights=RERANK_WEIGHTS):
+    """
+    以結構化訊號重新排序召回的候選
+
+    參數:
+        rows / similarity (np.ndarray): 召回的候選（目錄快照的列，-1 表示不在快照中）與語意相似度
+        skills (list[int], optional): 查詢要求（或履歷具備）的 skill_id
+        expected_salary (int, optional): 期望月薪
+
+    返回:
+        (np.ndarray, np.ndarray, dict): 依最終分數排序的目錄快照列、最終分數、各訊號（與列同順序）
+    """
+    keep = rows >= 0
+    rows, similarity = rows[keep], similarity[keep]
+    signals = {'similarity': similarity.astype(np.float32)}
+
+    if skills:
+        skill_ids = np.asarray(catalog.skill_ids)
+        positions = np.searchsorted(skill_ids, skills)
+        positions = [int(p) for p, s in zip(positions, skills) if p < len(skill_ids) and skill_ids[p] == s]
+        bits = catalog.skill_bits[rows]
+        matched = np.zeros(len(rows), dtype=np.float32)
+        for p in positions:
+            matched += ((bits[:, p // 64] >> np.uint64(p % 64)) & np.uint64(1)).astype(np.float32)
+        signals['skills'] = matched / len(skills)
+
+    if expected_salary:
+        top = catalog.salary_top[rows].astype(np.float32)
+        # 薪資上限達到期望為 1，不足時依比例遞減；沒有薪資資料為 0.5（不加分也不扣分太多）
+        signals['salary'] = np.where(top < 0, 0.5, np.clip(top / expected_salary, 0, 1)).astype(np.float32)
+
+    scraped = catalog.scraped_at[rows]
+    age_days = np.maximum(0, ((now or time.time()) - scraped) / 86400)
+    signals['recency'] = np.where(scraped >= 0, np.exp2(-age_days / RECENCY_HALF_LIFE_DAYS), 0).astype(np.float32)
+
+    score = sum(weights.get(name, 0) * values for name, values in signals.items())
+    order = np.argsort(-score, kind='stable')
+    return rows[order], score[order], {name: values[order] for name, values in signals.items()}
+
+
+# ============================================
+# 服務
+# ============================================
+
+class JobSearchService:
+    """
+    參數:
+        holder (SearchIndexHolder)
+        embedder (QueryEmbedder)
+        skill_index (SkillIndex, optional): 從查詢文字找出技能（supabase_control/skill_extractor）
+        exact_threshold (int): 符合篩選的職缺少於此數時做精確搜尋
+    """
+
+    def __init__(self, holder, embedder, skill_index=None, exact_threshold=EXACT_THRESHOLD):
+        self.holder = holder
+        self.embedder = embedder
+        self.skill_index = skill_index
+        self.exact_threshold = exact_threshold
+        self.searches = 0
+
+    def close(self):
+        self.embedder.close()
+
+    @staticmethod
+    def parse_params(params):
+        """查詢參數 dict -> 正規化後的 dict（異常: SearchError）"""
+        text = (params.get('query') or params.get('resume_text') or '').strip()
+        if not text:
+            raise SearchError('需要 query 或 resume_text')
+        limit = _optional_int(params.get('limit'), 'limit') or 20
+        offset = _optional_int(params.get('offset'), 'offset') or 0
+        if not 1 <= limit <= MAX_LIMIT or not 0 <= offset <= MAX_OFFSET:
+            raise SearchError(f'limit 需介於 1~{MAX_LIMIT}，offset 需介於 0~{MAX_OFFSET}')
+        skills = params.get('skills')
+        if isinstance(skills, str):
+            skills = skills.split(',')
+        try:
+            skills = [int(s) for s in skills or [] if str(s).strip()]
+        except ValueError:
+            raise SearchError('skills 必須是 skill_id（整數）')
+        active_only = params.get('active_only', True)
+        if isinstance(active_only, str):
+            active_only = active_only.lower() not in ('0', 'false', 'no')
+        return {
+            'text': text,
+            'filters': {field: _as_list(params.get(field)) for field in FILTER_FIELDS},
+            'salary_min': _optional_int(params.get('salary_min'), 'salary_min'),
+            'salary_max': _optional_int(params.get('salary_max'), 'salary_max'),
+            'expected_salary': _optional_int(params.get('expected_salary'), 'expected_salary'),
+            'skills': skills,
+            'active_only': bool(active_only),
+            'limit': limit,
+            'offset': offset,
+        }
+
+    def _recall(self, index, vector, bits, matched, k):
+        """以 bitmap 篩選的向量召回；返回 (job_ids, similarity, 使用的方法)"""
+        if matched <= self.exact_threshold:
+            scores, ids = index.store.search_labels(vector, index.filters.labels(bits), k)
+            method = 'exact'
+        else:
+            scores, ids = index.store.search(vector, k, selector=faiss.IDSelectorBitmap(bits))
+            method = 'ann'
+        found = ids[0] >= 0
+        return ids[0][found], scores[0][found], method
+
+    async def search(self, params):
+        """
+        返回:
+            dict: total_matched（符合篩選的職缺數）、results、timings（毫秒）等
+
+        異常:
+            SearchError: 參數錯誤
+            IndexUnavailableError: 索引尚未建立
+        """
+        started = time.perf_counter()
+        query = self.parse_params(params)
+        index = self.holder.get()
+        vector, cached = await self.embedder.embed(query['text'])
+        embedded = time.perf_counter()
+
+        bits, matched = index.filters.bitmap(active_only=query['active_only'], salary_min=query['salary_min'],
+                                             salary_max=query['salary_max'], **query['filters'])
+        page_end = query['offset'] + query['limit']
+        results, method = [], 'none'
+        if matched:
+            k = min(matched, max(page_end * RERANK_FACTOR, MIN_CANDIDATES))
+            job_ids, similarity, method = await asyncio.to_thread(self._recall, index, vector[None, :], bits,
+                                                                  matched, k)
+            skills = query['skills']
+            if not skills and self.skill_index is not None:
+                skills = self.skill_index.extract(query['text'])
+            rows = index.filters.row_of_job.get_indexer(job_ids)
+            rows, scores, signals = rerank(index.catalog, rows, similarity, skills=skills,
+                                           expected_salary=query['expected_salary'])
+            page = slice(query['offset'], page_end)
+            records = index.catalog.records(rows[page])
+            for i, record in enumerate(records, start=query['offset']):
+                record['score'] = round(float(scores[i]), 4)
+                record['signals'] = {name: round(float(values[i]), 4) for name, values in signals.items()}
+                results.append(record)
+        self.searches += 1
+        finished = time.perf_counter()
+        return {
+            'total_matched': matched,
+            'count': len(results),
+            'offset': query['offset'],
+            'results': results,
+            'recall': method,
+            'embedding_cached': cached,
+            'timings': {'embed_ms': round((embedded - started) * 1000, 2),
+                        'search_ms': round((finished - embedded) * 1000, 2),
+                        'total_ms': round((finished - started) * 1000, 2)},
+        }
+
+    def stats(self):
+        try:
+            index = self.holder.get()
+            index_stats = {'version': index.version, 'vectors': len(index.store), 'searchable_jobs': len(index.filters),
+                           'catalog_watermark': index.catalog.watermark}
+        except IndexUnavailableError as e:
+            index_stats = {'error': str(e)}
+        return {'searches': self.searches, 'index': index_stats, 'embedder': self.embedder.stats()}
@@ -0,0 +1,135 @@
+"""
+職缺語意搜尋服務（FastAPI）
+
+以 job_search.JobSearchService 提供查詢：查詢文字 encode 一次（快取 + micro-batching），
+FAISS 召回時以預先建立的篩選 bitmap 排除不符合條件的職缺，再以技能、薪資、刊登時間重新排序。
+
+API:
+    GET  /health     索引版本、可搜尋職缺數、embedding 快取與批次統計
+    POST /search     JSON：query 或 resume_text（必填其一）、city / district / remote_option（字串或清單）、
+                     salary_min、salary_max、expected_salary、skills（skill_id 清單）、active_only、limit、offset
+    GET  /search     同上，以 query string 傳入（清單以逗號分隔或重複參數）
+
+環境變數:
+    EMBEDDING_MODEL          sentence-transformers 模型；預設使用向量庫 meta 記錄的模型（與 embedding_indexer 相同）
+    EMBEDDING_INDEX_DIR      索引目錄，預設 llm_service/index
+    JOB_CATALOG_PATH         職缺目錄快照（supabase_control/job_catalog.py build），預設 supabase_control/.job_catalog.bin
+    SEARCH_CHECK_INTERVAL    檢查索引 / 快照是否更新的間隔秒數，預設 30
+    SEARCH_CACHE_SIZE        查詢 embedding 快取筆數，預設 4096
+    SEARCH_MAX_BATCH         micro-batch 最多筆數，預設 32
+    SEARCH_MAX_WAIT_MS       micro-batch 最多等待毫秒數，預設 5
+
+執行方式:
+    uvicorn search_service:app --host 0.0.0.0 --port 5000
+"""
+
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel
+
+from embedding_indexer import DEFAULT_INDEX_DIR, DEFAULT_MODEL, SentenceTransformerEncoder
+from job_search import (DEFAULT_CATALOG_PATH, FILTER_FIELDS, IndexUnavailableError, JobSearchService,
+                        QueryEmbedder, SearchError, SearchIndexHolder)
+from vector_store import CURRENT_FILE
+
+
+INDEX_DIR = os.path.join(os.getenv('EMBEDDING_INDEX_DIR', DEFAULT_INDEX_DIR), 'job_posting')
+CATALOG_PATH = os.getenv('JOB_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+CHECK_INTERVAL = float(os.getenv('SEARCH_CHECK_INTERVAL', '30'))
+CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '4096'))
+MAX_BATCH = int(os.getenv('SEARCH_MAX_BATCH', '32'))
+MAX_WAIT_MS = float(os.getenv('SEARCH_MAX_WAIT_MS', '5'))
+
+
+class SearchRequest(BaseModel):
+    query: Optional[str] = None
+    resume_text: Optional[str] = None
+    city: Optional[Union[str, List[str]]] = None
+    district: Optional[Union[str, List[str]]] = None
+    remote_option: Optional[Union[str, List[str]]] = None
+    salary_min: Optional[int] = None
+    salary_max: Optional[int] = None
+    expected_salary: Optional[int] = None
+    skills: Optional[List[int]] = None
+    active_only: bool = True
+    limit: int = 20
+    offset: int = 0
+
+
+def _index_model(index_dir):
+    """向量庫 meta 記錄的模型（查詢與職缺必須使用同一個模型）"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding='utf-8') as f:
+            version = f.read().strip()
+        with open(os.path.join(index_dir, version, 'meta.json'), encoding='utf-8') as f:
+            return (json.load(f).get('extra') or {}).get('model')
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def create_service():
+    from skill_extractor import DEFAULT_INDEX_PATH, SkillIndex
+
+    model = os.getenv('EMBEDDING_MODEL') or _index_model(INDEX_DIR) or DEFAULT_MODEL
+    embedder = QueryEmbedder(SentenceTransformerEncoder(model), cache_size=CACHE_SIZE, max_batch=MAX_BATCH,
+                             max_wait_ms=MAX_WAIT_MS)
+    return JobSearchService(SearchIndexHolder(INDEX_DIR, CATALOG_PATH, CHECK_INTERVAL), embedder,
+                            skill_index=SkillIndex.load(DEFAULT_INDEX_PATH))
+
+
+def create_app(service=None):
+    """
+    參數:
+        service (JobSearchService, optional): 傳入時直接使用（效能測試）；否則在啟動時依環境變數建立
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if getattr(app.state, 'search', None) is None:
+            app.state.search = create_service()
+        try:
+            yield
+        finally:
+            app.state.search.close()
+
+    app = FastAPI(title='Job Search Service', lifespan=lifespan)
+    app.state.search = service
+
+    async def run_search(params):
+        try:
+            return await app.state.search.search(params)
+        except SearchError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except IndexUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    @app.get('/health')
+    async def health():
+        return app.state.search.stats()
+
+    @app.post('/search')
+    async def search(request: SearchRequest):
+        return await run_search(request.model_dump())
+
+    @app.get('/search')
+    async def search_get(request: Request):
+        params = dict(request.query_params)
+        for field in FILTER_FIELDS + ['skills']:
+            values = request.query_params.getlist(field)
+            if len(values) > 1:
+                params[field] = values
+        return await run_search(params)
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('search_service:app', host='0.0.0.0', port=5000)
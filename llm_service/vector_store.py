@@ -0,0 +1,445 @@
+"""
+可增量更新、可 memory-map 的 FAISS 向量庫
+
+一個 VectorStore 對應一個目錄：
+
+    <root>/CURRENT            目前版本的子目錄名稱（以 os.replace 原子切換）
+    <root>/v000012/index.faiss
+    <root>/v000012/labels.npy  內部 label -> 外部 id（例如 job_id）；已刪除為 -1
+    <root>/v000012/meta.json   索引型態、維度、模型名稱等
+
+- FAISS 內部以連續的 label 編號向量，外部 id 與 label 的對照存在 labels.npy；
+  同一個 id 重新寫入時會先刪除舊 label，再新增一個新的 label
+- 索引型態（EMBEDDING_INDEX_TYPE）:
+    hnsw  IndexHNSWFlat；不支援實體刪除，刪除以 tombstone（label = -1）標記，
+          查詢時以 IDSelectorBitmap 排除；tombstone 比例超過 compact_ratio 時
+          從索引內既有的向量重建（不需重新 encode）
+    ivf   IndexIVFFlat；第一次寫入時以該批向量訓練（資料不足時先用較小的 nlist），之後直接
+          remove_ids 實體刪除；資料量成長到可用 nlist 的兩倍以上時，save() 前從全部向量中
+          均勻抽樣重新訓練（設定的 ivf_nlist 不變，只是上限）
+    flat  IndexFlatIP；資料量小時使用，支援實體刪除
+- 向量一律正規化後以內積（= cosine similarity）比對
+- 每次 save() 寫入新的版本目錄後才切換 CURRENT，查詢端永遠讀到完整的一版；
+  查詢端以 VectorStore.open(root, mmap=True) 開啟，索引與 labels 皆為 memory-map 唯讀
+
+使用方式:
+    store = VectorStore.open_or_create('index/job_posting', dim=384, index_type='hnsw')
+    store.upsert(job_ids, vectors)
+    store.remove([123, 456])
+    store.save()
+
+    reader = VectorStore.open('index/job_posting', mmap=True)
+    scores, ids = reader.search(query_vectors, k=10)
+"""
+
+import json
+import os
+import shutil
+import threading
+
+import faiss
+import numpy as np
+
+
+INDEX_HNSW = 'hnsw'
+INDEX_IVF = 'ivf'
+INDEX_FLAT = 'flat'
+INDEX_TYPES = (INDEX_HNSW, INDEX_IVF, INDEX_FLAT)
+
+DEFAULT_HNSW_M = 32
+DEFAULT_HNSW_EF_CONSTRUCTION = 80
+DEFAULT_HNSW_EF_SEARCH = 64
+DEFAULT_IVF_NLIST = 1024
+DEFAULT_IVF_NPROBE = 16
+IVF_MIN_POINTS_PER_LIST = 39   # FAISS 建議每個 list 至少 39 個訓練點
+IVF_MAX_POINTS_PER_LIST = 256  # 超過的訓練點 FAISS 也會抽樣捨棄，重新訓練時只抽這麼多
+
+CURRENT_FILE = 'CURRENT'
+KEEP_VERSIONS = 2
+
+
+class VectorStoreError(Exception):
+    """向量庫狀態錯誤（例如對唯讀的 memory-map 版本寫入）"""
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _ivf_vectors(index):
+    """取出 IndexIVFFlat 內所有向量（inverted list 的 code 即原始 float32 向量），依 label 排序"""
+    invlists = index.invlists
+    labels, vectors = [], []
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        labels.append(faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy())
+        codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), size * index.code_size)
+        vectors.append(codes.view(np.float32).reshape(size, index.d).copy())
+    if not labels:
+        return np.empty(0, dtype=np.int64), np.empty((0, index.d), dtype=np.float32)
+    labels, vectors = np.concatenate(labels), np.concatenate(vectors)
+    order = np.argsort(labels)
+    return labels[order], vectors[order]
+
+
+class VectorStore:
+    """
+    外部 id（int64）-> 向量 的持久化 FAISS 索引
+
+    參數:
+        root (str): 向量庫目錄
+        dim (int): 向量維度
+        index_type (str): 'hnsw' / 'ivf' / 'flat'
+        meta (dict, optional): 額外的描述資訊（例如 model 名稱），會存到 meta.json
+        compact_ratio (float): hnsw 的 tombstone 比例超過此值時，save() 前自動壓縮
+    """
+
+    def __init__(self, root, dim, index_type=INDEX_HNSW, meta=None, compact_ratio=0.3,
+                 hnsw_m=DEFAULT_HNSW_M, ivf_nlist=DEFAULT_IVF_NLIST, _index=None, _labels=None,
+                 _version=0, _read_only=False):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"不支援的索引型態: {index_type}")
+        self.root = root
+        self.dim = int(dim)
+        self.index_type = index_type
+        self.meta = dict(meta or {})
+        self.compact_ratio = compact_ratio
+        self.hnsw_m = hnsw_m
+        self.ivf_nlist = ivf_nlist
+        self.version = _version
+        self.read_only = _read_only
+        self._index = _index
+        self._labels = _labels if _labels is not None else np.empty(0, dtype=np.int64)
+        self._id_to_label = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------
+    # 建立 / 開啟 / 儲存
+    # ------------------------------------------
+
+    @classmethod
+    def open(cls, root, mmap=False):
+        """
+        開啟目前版本；mmap=True 時索引與 labels 以 memory-map 唯讀開啟（查詢端使用）
+
+        異常:
+            FileNotFoundError: 目錄中沒有任何版本
+        """
+        current_path = os.path.join(root, CURRENT_FILE)
+        with open(current_path, encoding='utf-8') as f:
+            version_dir = f.read().strip()
+        path = os.path.join(root, version_dir)
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        index = None
+        index_file = os.path.join(path, 'index.faiss')
+        if os.path.exists(index_file):
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            index = faiss.read_index(index_file, flags)
+        labels = np.load(os.path.join(path, 'labels.npy'), mmap_mode='r' if mmap else None)
+
+        store = cls(root, meta['dim'], meta['index_type'], meta=meta.get('extra'),
+                    compact_ratio=meta.get('compact_ratio', 0.3), hnsw_m=meta.get('hnsw_m', DEFAULT_HNSW_M),
+                    ivf_nlist=meta.get('ivf_nlist', DEFAULT_IVF_NLIST), _index=index,
+                    _labels=labels if mmap else np.array(labels, dtype=np.int64),
+                    _version=meta['version'], _read_only=mmap)
+        store._set_search_params()
+        return store
+
+    @classmethod
+    def open_or_create(cls, root, dim, index_type=INDEX_HNSW, meta=None, **kwargs):
+        """開啟既有的向量庫；不存在時建立新的（維度或型態不符時丟出 VectorStoreError）"""
+        if os.path.exists(os.path.join(root, CURRENT_FILE)):
+            store = cls.open(root)
+            if store.dim != dim or store.index_type != index_type:
+                raise VectorStoreError(
+                    f"既有向量庫為 {store.index_type}/{store.dim} 維，與設定 {index_type}/{dim} 維不符；"
+                    "請改用新的目錄或刪除後重建")
+            return store
+        os.makedirs(root, exist_ok=True)
+        return cls(root, dim, index_type, meta=meta, **kwargs)
+
+    def save(self):
+        """寫入新版本目錄後原子切換 CURRENT，並清除舊版本"""
+        self._check_writable()
+        with self._lock:
+            if self.index_type == INDEX_HNSW and self.dead_ratio > self.compact_ratio:
+                self.compact()
+            elif self.index_type == INDEX_IVF and self._needs_retrain():
+                self.compact()
+
+            self.version += 1
+            version_dir = f'v{self.version:06d}'
+            path = os.path.join(self.root, version_dir)
+            os.makedirs(path, exist_ok=True)
+            if self._index is not None:
+                faiss.write_index(self._index, os.path.join(path, 'index.faiss'))
+            np.save(os.path.join(path, 'labels.npy'), self._labels)
+            meta = {
+                'version': self.version,
+                'dim': self.dim,
+                'index_type': self.index_type,
+                'compact_ratio': self.compact_ratio,
+                'hnsw_m': self.hnsw_m,
+                'ivf_nlist': self.ivf_nlist,
+                'count': len(self),
+                'extra': self.meta,
+            }
+            with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+
+            tmp_current = os.path.join(self.root, CURRENT_FILE + '.tmp')
+            with open(tmp_current, 'w', encoding='utf-8') as f:
+                f.write(version_dir)
+            os.replace(tmp_current, os.path.join(self.root, CURRENT_FILE))
+            self._remove_old_versions()
+
+    def _remove_old_versions(self):
+        versions = sorted(name for name in os.listdir(self.root)
+                          if name.startswith('v') and os.path.isdir(os.path.join(self.root, name)))
+        # 保留最近幾版，讓仍在讀取舊版的查詢端不會立刻失去檔案
+        for name in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    # ------------------------------------------
+    # 寫入
+    # ------------------------------------------
+
+    def _check_writable(self):
+        if self.read_only:
+            raise VectorStoreError("memory-map 開啟的向量庫為唯讀")
+
+    def _ivf_nlist_for(self, count):
+        # 資料量不足時縮小 nlist，避免訓練點不足；self.ivf_nlist 是設定的上限，不會被改寫
+        return max(1, min(self.ivf_nlist, count // IVF_MIN_POINTS_PER_LIST))
+
+    def _needs_retrain(self):
+        # 第一批資料訓練出的 nlist 偏小時，等資料量能支撐兩倍以上的 nlist 再重新訓練，避免每次 save() 都重建
+        if self._index is None:
+            return False
+        return self._ivf_nlist_for(len(self)) >= 2 * self._index.nlist
+
+    def _create_index(self, training_vectors, count=None):
+        if self.index_type == INDEX_HNSW:
+            index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = DEFAULT_HNSW_EF_CONSTRUCTION
+        elif self.index_type == INDEX_IVF:
+            nlist = self._ivf_nlist_for(len(training_vectors) if count is None else count)
+            quantizer = faiss.IndexFlatIP(self.dim)
+            index = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(training_vectors)
+        else:
+            index = faiss.IndexFlatIP(self.dim)
+        self._index = index
+        self._set_search_params()
+
+    def _set_search_params(self):
+        if self._index is None:
+            return
+        if self.index_type == INDEX_HNSW:
+            self._index.hnsw.efSearch = DEFAULT_HNSW_EF_SEARCH
+        elif self.index_type == INDEX_IVF:
+            self._index.nprobe = min(DEFAULT_IVF_NPROBE, self._index.nlist)
+
+    def _label_map(self):
+        if self._id_to_label is None:
+            alive = np.flatnonzero(self._labels >= 0)
+            self._id_to_label = dict(zip(self._labels[alive].tolist(), alive.tolist()))
+        return self._id_to_label
+
+    def upsert(self, ids, vectors):
+        """新增或覆寫向量（ids 已存在時先刪除舊向量）"""
+        self._check_writable()
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        vectors = _normalize(vectors)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"向量形狀 {vectors.shape} 與 ids 數量 / 維度 {self.dim} 不符")
+        # 同一批內重複的 id 只保留最後一個
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        ids, vectors = ids[keep], vectors[keep]
+
+        with self._lock:
+            self.remove(ids)
+            if self._index is None:
+                self._create_index(vectors)
+            start = len(self._labels)
+            labels = np.arange(start, start + len(ids), dtype=np.int64)
+            if self.index_type == INDEX_HNSW or self.index_type == INDEX_FLAT:
+                self._index.add(vectors)   # label 即新增順序
+            else:
+                self._index.add_with_ids(vectors, labels)
+            self._labels = np.concatenate([self._labels, ids])
+            label_map = self._label_map()
+            label_map.update(zip(ids.tolist(), labels.tolist()))
+
+    def remove(self, ids):
+        """刪除向量；回傳實際刪除的筆數（不存在的 id 略過）"""
+        self._check_writable()
+        with self._lock:
+            label_map = self._label_map()
+            labels = [label_map.pop(int(i)) for i in ids if int(i) in label_map]
+            if not labels:
+                return 0
+            labels = np.asarray(labels, dtype=np.int64)
+            self._labels[labels] = -1
+            if self.index_type == INDEX_IVF:
+                self._index.remove_ids(faiss.IDSelectorArray(labels))
+            elif self.index_type == INDEX_FLAT:
+                # IndexFlat 刪除後後面的向量會往前移，label 需要一起壓縮
+                self._compact_flat()
+            return len(labels)
+
+    def _compact_flat(self):
+        alive = np.flatnonzero(self._labels >= 0)
+        if len(alive) == len(self._labels):
+            return
+        self._index.remove_ids(faiss.IDSelectorBatch(np.flatnonzero(self._labels < 0).astype(np.int64)))
+        self._labels = self._labels[alive].copy()
+        self._id_to_label = None
+
+    def compact(self):
+        """
+        以索引內既有的向量（不需重新 encode）重建
+            hnsw  移除 tombstone
+            ivf   從全部向量中均勻抽樣重新訓練，nlist 隨資料量成長到設定的 ivf_nlist
+        """
+        self._check_writable()
+        with self._lock:
+            if self.index_type == INDEX_IVF:
+                self._retrain_ivf()
+                return
+            if self.index_type != INDEX_HNSW or self._index is None:
+                return
+            alive = np.flatnonzero(self._labels >= 0)
+            if len(alive) == len(self._labels):
+                return
+            vectors = self._index.reconstruct_n(0, self._index.ntotal)[alive] if len(alive) else None
+            old_index, self._index = self._index, None
+            self._labels = self._labels[alive].copy()
+            self._id_to_label = None
+            if vectors is not None:
+                self._create_index(vectors)
+                self._index.add(vectors)
+            del old_index
+
+    def _retrain_ivf(self):
+        if self._index is None or len(self) == 0:
+            return
+        labels, vectors = _ivf_vectors(self._index)
+        ids = np.asarray(self._labels)[labels]
+        nlist = self._ivf_nlist_for(len(vectors))
+        limit = nlist * IVF_MAX_POINTS_PER_LIST
+        sample = vectors
+        if len(vectors) > limit:
+            sample = vectors[np.sort(np.random.default_rng(0).choice(len(vectors), limit, replace=False))]
+        old_index, self._index = self._index, None
+        self._create_index(sample, count=len(vectors))
+        # 重建時 label 重新從 0 連續編號，一併移除已刪除的 label
+        self._index.add_with_ids(vectors, np.arange(len(ids), dtype=np.int64))
+        self._labels = ids.copy()
+        self._id_to_label = None
+        del old_index
+
+    # ------------------------------------------
+    # 查詢
+    # ------------------------------------------
+
+    def __len__(self):
+        return int(np.count_nonzero(np.asarray(self._labels) >= 0))
+
+    def __contains__(self, id_):
+        return int(id_) in self._label_map()
+
+    @property
+    def dead_ratio(self):
+        total = len(self._labels)
+        return 0.0 if total == 0 else 1.0 - len(self) / total
+
+    def ids(self):
+        """目前所有外部 id"""
+        labels = np.asarray(self._labels)
+        return labels[labels >= 0].copy()
+
+    def label_ids(self):
+        """內部 label -> 外部 id 的陣列（已刪除為 -1）；memory-map 開啟時為唯讀"""
+        return np.asarray(self._labels)
+
+    def alive_bitmap(self):
+        """未刪除 label 的 bitmap（給 faiss.IDSelectorBitmap 使用）"""
+        return np.packbits(np.asarray(self._labels) >= 0, bitorder='little')
+
+    def search(self, queries, k=10, selector=None):
+        """
+        查詢最相近的 k 筆
+
+        參數:
+            queries (np.ndarray): q x dim
+            selector (faiss.IDSelector, optional): 以內部 label 篩選的條件；預設只排除已刪除的向量
+
+        返回:
+            (np.ndarray, np.ndarray): q x k 的相似度與外部 id（不足 k 筆時 id 為 -1）
+        """
+        queries = _normalize(queries)
+        if self._index is None or self._index.ntotal == 0:
+            return (np.zeros((len(queries), k), dtype=np.float32),
+                    np.full((len(queries), k), -1, dtype=np.int64))
+
+        if selector is None and self.index_type == INDEX_HNSW and self.dead_ratio > 0:
+            bitmap = self.alive_bitmap()   # 搜尋結束前必須保持參照
+            selector = faiss.IDSelectorBitmap(bitmap)
+        params = None
+        if selector is not None:
+            if self.index_type == INDEX_HNSW:
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(DEFAULT_HNSW_EF_SEARCH, k))
+            elif self.index_type == INDEX_IVF:
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=self._index.nprobe)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+
+        scores, labels = self._index.search(queries, k, params=params)
+        ids = np.where(labels >= 0, np.asarray(self._labels)[np.maximum(labels, 0)], -1)
+        return scores, ids
+
+    def search_labels(self, queries, labels, k=10):
+        """
+        只在指定的內部 label 中做精確搜尋（篩選條件很嚴格、候選很少時使用）
+
+        HNSW 的 IDSelector 只是在走訪圖時跳過不符合的節點，符合的節點很少時容易找不到足夠的結果；
+        候選少時直接取出這些向量計算內積，結果是精確的。
+
+        返回:
+            (np.ndarray, np.ndarray): 同 search()
+        """
+        queries = _normalize(queries)
+        labels = np.asarray(labels, dtype=np.int64)
+        scores = np.zeros((len(queries), k), dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if self._index is None or not len(labels):
+            return scores, ids
+        if self.index_type == INDEX_IVF:
+            # IVF 沒有 direct map 時無法 reconstruct，改為掃描所有 list 的篩選搜尋
+            params = faiss.SearchParametersIVF(sel=faiss.IDSelectorBatch(labels), nprobe=self._index.nlist)
+            found_scores, found = self._index.search(queries, k, params=params)
+            found_ids = np.where(found >= 0, np.asarray(self._labels)[np.maximum(found, 0)], -1)
+            return found_scores, found_ids
+
+        vectors = self._index.reconstruct_batch(labels)
+        similarity = queries @ vectors.T
+        top = min(k, len(labels))
+        for i, row in enumerate(similarity):
+            best = np.argpartition(-row, top - 1)[:top]
+            best = best[np.argsort(-row[best], kind='stable')]
+            scores[i, :top] = row[best]
+            ids[i, :top] = np.asarray(self._labels)[labels[best]]
+        return scores, ids
+
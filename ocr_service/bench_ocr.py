@@ -0,0 +1,115 @@
+"""
+OCR 服務效能測試
+
+以產生的範例頁面（或 --images 指定的圖片）測量每秒可辨識的頁數：
+1. 單一 worker（等同逐頁呼叫 pytesseract）
+2. worker pool（預設為可用核心數），多頁檔案與批次上傳同時平行
+3. 重新上傳相同檔案（快取命中）
+
+執行方式:
+    python bench_ocr.py --files 8 --pages 3
+    python bench_ocr.py --images sample1.png sample2.pdf --workers 4
+    python bench_ocr.py --font /usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc   # 產生中文範例頁面
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_service import OCRResultCache, OCRService, available_cpus
+
+
+SAMPLE_LINES = [
+    '王小明  Software Engineer',
+    'Email: xiaoming@example.com  Phone: 0912-345-678',
+    'Skills: Python, Django, PostgreSQL, Docker, AWS',
+    'Experience: 5 years backend development',
+    'Education: National Taiwan University, Computer Science',
+    '熟悉 Linux 系統管理與 CI/CD 流程',
+    'Projects: job matching platform, resume parser',
+]
+
+
+def make_page(seed, font, width=1240, height=1754):
+    """產生一頁 A4（150 dpi）大小的範例履歷"""
+    rng = random.Random(seed)
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    y = 80
+    while y < height - 120:
+        draw.text((100, y), rng.choice(SAMPLE_LINES), fill=0, font=font)
+        y += 48
+    return page
+
+
+def make_file(seed, pages, font):
+    """多頁時輸出成多頁 TIFF，單頁時輸出 PNG"""
+    images = [make_page(seed * 100 + i, font) for i in range(pages)]
+    buffer = io.BytesIO()
+    if pages > 1:
+        images[0].save(buffer, format='TIFF', save_all=True, append_images=images[1:])
+    else:
+        images[0].save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+async def run_batch(service, contents):
+    start = time.perf_counter()
+    results = await service.recognize_batch(contents)
+    return time.perf_counter() - start, results
+
+
+def measure(contents, workers, label):
+    service = OCRService(workers=workers, cache=OCRResultCache(max_entries=len(contents) * 2, directory=None))
+    try:
+        elapsed, results = asyncio.run(run_batch(service, contents))
+        pages = sum(r['extracted_data'].get('page_count', 0) for r in results)
+        failed = sum(r['ocr_status'] != 'completed' for r in results)
+        print(f"【{label}】 {pages} 頁 {elapsed:.2f}s，{pages / elapsed:.2f} 頁/秒"
+              + (f"（{failed} 個檔案失敗）" if failed else ''))
+
+        cached_elapsed, cached = asyncio.run(run_batch(service, contents))
+        hits = sum(r['cached'] for r in cached)
+        print(f"【{label}，重新上傳】 {cached_elapsed * 1000:.1f} ms，快取命中 {hits}/{len(cached)}")
+        return pages / elapsed, results
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='OCR 服務效能測試')
+    parser.add_argument('--files', type=int, default=8, help='產生的範例檔案數')
+    parser.add_argument('--pages', type=int, default=3, help='每個範例檔案的頁數')
+    parser.add_argument('--images', nargs='*', help='改用指定的圖片 / PDF')
+    parser.add_argument('--font', help='產生範例頁面用的字型（需支援中文才會產生中文字）')
+    parser.add_argument('--workers', type=int, default=available_cpus(), help='worker pool 大小')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("OCR 服務效能測試")
+    print("=" * 60)
+
+    if args.images:
+        contents = []
+        for path in args.images:
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+    else:
+        font = ImageFont.truetype(args.font, 28) if args.font else ImageFont.load_default(28)
+        contents = [make_file(seed, args.pages, font) for seed in range(args.files)]
+    print(f"檔案 {len(contents)} 個，worker pool 大小 {args.workers}\n")
+
+    serial_rate, serial_results = measure(contents, 1, '單一 worker')
+    pool_rate, pool_results = measure(contents, args.workers, f'{args.workers} 個 worker')
+
+    same = [a['raw_text'] for a in serial_results] == [b['raw_text'] for b in pool_results]
+    print(f"\n加速 {pool_rate / serial_rate:.2f}x")
+    print(f"{'✓' if same else '✗'} 平行與逐頁辨識的文字一致")
+
+
+if __name__ == "__main__":
+    main()
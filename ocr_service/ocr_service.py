@@ -1,10 +1,322 @@
+"""
+OCR 服務（FastAPI + Tesseract）
+
+- 以 ProcessPoolExecutor 執行 pytesseract，worker 數預設為可用核心數
+- 多頁文件（PDF / 多頁 TIFF）拆成單頁後平行辨識；批次上傳的所有頁面共用同一個 worker pool
+- 回傳格式對應 ocr_result 資料表（raw_text、confidence_score、is_manual_review_needed、extracted_data）
+- 以檔案內容的 sha256 快取結果：重新上傳同一份履歷不會再跑一次 OCR；
+  同一份檔案同時上傳多次時也只會辨識一次
+
+API:
+    GET  /health        Tesseract 版本、worker 數與快取統計
+    POST /ocr           單一檔案（multipart 欄位 file，選填 event_id、resume_id）
+    POST /ocr/batch     多個檔案（multipart 欄位 files）
+
+環境變數:
+    OCR_WORKERS               worker 行程數，預設為可用核心數
+    OCR_LANG                  Tesseract 語言，預設 chi_tra+eng
+    OCR_REVIEW_THRESHOLD      信心低於此值時 is_manual_review_needed = true，預設 0.6
+    OCR_MAX_PAGES             單一檔案最多辨識的頁數，預設 20
+    OCR_MAX_BATCH             單次批次最多檔案數，預設 20
+    OCR_PDF_DPI               PDF 轉圖的解析度，預設 300
+    OCR_CACHE_SIZE            記憶體快取筆數，預設 1000
+    OCR_CACHE_DIR             設定時結果也寫入磁碟（服務重啟後仍可命中）
+
+執行方式:
+    uvicorn ocr_service:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import copy
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import partial
+from typing import List, Optional
+
 import pytesseract
-from PIL import Image
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from PIL import Image, ImageSequence, UnidentifiedImageError
+
+from ocr_worker import DEFAULT_LANG, init_worker, page_to_payload, recognize_page
+
+try:
+    from pdf2image import convert_from_bytes
+except ImportError:  # 未安裝 pdf2image / poppler 時只接受圖片
+    convert_from_bytes = None
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '0')) or available_cpus()
+OCR_LANG = os.getenv('OCR_LANG', DEFAULT_LANG)
+REVIEW_THRESHOLD = float(os.getenv('OCR_REVIEW_THRESHOLD', '0.6'))
+MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '20'))
+MAX_BATCH = int(os.getenv('OCR_MAX_BATCH', '20'))
+PDF_DPI = int(os.getenv('OCR_PDF_DPI', '300'))
+CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', '1000'))
+CACHE_DIR = os.getenv('OCR_CACHE_DIR') or None
+
+
+class UnsupportedFileError(ValueError):
+    """無法解析的檔案格式"""
+
+
+def load_pages(content, max_pages=MAX_PAGES, dpi=PDF_DPI):
+    """
+    將上傳的檔案拆成單頁的 PIL 圖片
+
+    返回:
+        list[PIL.Image.Image]
+    """
+    if content[:5] == b'%PDF-':
+        if convert_from_bytes is None:
+            raise UnsupportedFileError('未安裝 pdf2image，無法處理 PDF')
+        return convert_from_bytes(content, dpi=dpi, grayscale=True, first_page=1, last_page=max_pages)
+
+    try:
+        image = Image.open(io.BytesIO(content))
+    except UnidentifiedImageError as e:
+        raise UnsupportedFileError('無法辨識的圖片格式') from e
+    pages = []
+    for frame in ImageSequence.Iterator(image):
+        pages.append(frame.copy())
+        if len(pages) >= max_pages:
+            break
+    return pages
+
+
+def build_result(page_results, content_hash, lang, threshold=REVIEW_THRESHOLD):
+    """把每頁的辨識結果合併成 ocr_result 的欄位"""
+    total_chars = sum(p['chars'] for p in page_results)
+    confidence = (sum(p['confidence'] * p['chars'] for p in page_results) / total_chars) if total_chars else 0.0
+    return {
+        'ocr_status': 'completed',
+        'raw_text': '\n\n'.join(p['text'] for p in page_results if p['text']),
+        'confidence_score': round(confidence, 4),
+        'is_manual_review_needed': total_chars == 0 or confidence < threshold,
+        'extracted_data': {
+            'content_hash': content_hash,
+            'lang': lang,
+            'page_count': len(page_results),
+            'pages': [{'page': i + 1, 'confidence': p['confidence'], 'chars': p['chars']}
+                      for i, p in enumerate(page_results)],
+        },
+        'processed_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class OCRResultCache:
+    """
+    以內容 hash 為鍵的 LRU 快取；設定 directory 時同時寫入磁碟
+
+    參數:
+        max_entries (int): 記憶體中保留的筆數
+        directory (str | None): 磁碟快取目錄
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, directory=CACHE_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key):
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+        if result is None and self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), encoding='utf-8') as f:
+                result = json.load(f)
+            self._remember(key, result)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class OCRService:
+    """
+    參數:
+        workers (int): worker 行程數
+        lang (str): Tesseract 語言
+        cache (OCRResultCache | None)
+        executor: 自訂的 executor（測試或效能測試用），預設建立 ProcessPoolExecutor
+    """
+
+    def __init__(self, workers=OCR_WORKERS, lang=OCR_LANG, cache=None, executor=None):
+        self.workers = workers
+        self.lang = lang
+        self.cache = cache if cache is not None else OCRResultCache()
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        self._inflight = {}
+        self.pages_processed = 0
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def cache_key(self, content):
+        return hashlib.sha256(content).hexdigest() + f':{self.lang}'
+
+    async def recognize(self, content):
+        """
+        辨識一個檔案
+
+        返回:
+            dict: ocr_result 的欄位，另含 cached（是否命中快取）
+        """
+        key = self.cache_key(content)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(copy.deepcopy(cached), cached=True)
+
+        # 相同內容正在辨識中時直接等待同一個結果
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._recognize_uncached(content, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        result = await asyncio.shield(task)
+        return dict(copy.deepcopy(result), cached=False)
+
+    async def _recognize_uncached(self, content, key):
+        payloads = await asyncio.to_thread(self._decode, content)
+        loop = asyncio.get_running_loop()
+        worker = partial(recognize_page, lang=self.lang)
+        page_results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, worker, payload) for payload in payloads
+        ])
+        self.pages_processed += len(page_results)
+        result = build_result(page_results, key.split(':')[0], self.lang)
+        self.cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _decode(content):
+        pages = load_pages(content)
+        if not pages:
+            raise UnsupportedFileError('檔案中沒有可辨識的頁面')
+        return [page_to_payload(page) for page in pages]
+
+    async def recognize_batch(self, contents):
+        """
+        批次辨識；所有檔案的頁面同時送進 worker pool，單一檔案失敗不影響其他檔案
+
+        返回:
+            list[dict]: 與 contents 同順序的結果
+        """
+        results = await asyncio.gather(*[self.recognize(c) for c in contents], return_exceptions=True)
+        return [r if not isinstance(r, Exception) else failed_result(r) for r in results]
+
+
+def failed_result(error):
+    return {
+        'ocr_status': 'failed',
+        'raw_text': None,
+        'confidence_score': None,
+        'is_manual_review_needed': True,
+        'extracted_data': {'error': str(error)},
+        'processed_at': datetime.now(timezone.utc).isoformat(),
+        'cached': False,
+    }
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.ocr = OCRService()
+    try:
+        yield
+    finally:
+        app.state.ocr.close()
+
+
+app = FastAPI(title='OCR Service', lifespan=lifespan)
+
+
+@app.get('/health')
+async def health():
+    service = app.state.ocr
+    return {
+        'tesseract_version': str(pytesseract.get_tesseract_version()),
+        'lang': service.lang,
+        'workers': service.workers,
+        'pages_processed': service.pages_processed,
+        'cache': service.cache.stats(),
+    }
+
+
+@app.post('/ocr')
+async def ocr(file: UploadFile = File(...), event_id: Optional[int] = Form(None),
+              resume_id: Optional[int] = Form(None)):
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail='檔案是空的')
+    try:
+        result = await app.state.ocr.recognize(content)
+    except UnsupportedFileError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return dict(result, file_name=file.filename, event_id=event_id, resume_id=resume_id)
+
+
+@app.post('/ocr/batch')
+async def ocr_batch(files: List[UploadFile] = File(...)):
+    if len(files) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f'單次最多 {MAX_BATCH} 個檔案')
+    contents = [await f.read() for f in files]
+    results = await app.state.ocr.recognize_batch(contents)
+    return {
+        'count': len(results),
+        'results': [dict(r, file_name=f.filename) for f, r in zip(files, results)],
+    }
 
-# 簡單測試
-print("Tesseract Version:", pytesseract.get_tesseract_version())
 
-# 如果要讀圖片 (假設你有放一張 test.png)
-# image = Image.open('test.png')
-# text = pytesseract.image_to_string(image, lang='chi_tra') # 指定繁體中文
-# print(text)
\ No newline at end of file
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('ocr_service:app', host='0.0.0.0', port=5000)
@@ -0,0 +1,87 @@
+"""
+OCR worker（在 ProcessPoolExecutor 的子行程中執行）
+
+Tesseract 本身是 CPU bound，且每次呼叫都會啟動一個 tesseract 行程；
+以「一個 worker 行程一次辨識一頁」的方式才能把所有核心用滿。
+每個 worker 都關掉 Tesseract 內部的 OpenMP 多執行緒，避免 N 個 worker x N 條執行緒互相搶 CPU。
+"""
+
+import os
+import re
+
+import pytesseract
+from PIL import Image
+
+
+DEFAULT_LANG = 'chi_tra+eng'
+DEFAULT_CONFIG = '--oem 1 --psm 3'
+
+# chi_tra 會把每個中文字當成一個 word；中文字之間不補空白
+_CJK = re.compile(r'[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def init_worker():
+    """ProcessPoolExecutor 的 initializer"""
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def page_to_payload(image):
+    """把 PIL 頁面轉成灰階的 (mode, size, bytes)：pickle 成本低，也不需要重新壓縮成 PNG"""
+    if image.mode != 'L':
+        image = image.convert('L')
+    return image.mode, image.size, image.tobytes()
+
+
+def join_words(words):
+    """把同一行的 word 接回文字：英數之間補空白，中文字之間不補"""
+    text = ''
+    for word in words:
+        if text and not (_CJK.match(text[-1]) and _CJK.match(word[0])):
+            text += ' '
+        text += word
+    return text
+
+
+def recognize_page(payload, lang=DEFAULT_LANG, config=DEFAULT_CONFIG):
+    """
+    辨識單一頁面
+
+    參數:
+        payload (tuple): page_to_payload 的回傳值
+        lang (str): Tesseract 語言
+        config (str): Tesseract 參數
+
+    返回:
+        dict: text（辨識文字）、confidence（0~1，依字元數加權的平均信心）、chars（字元數）
+    """
+    mode, size, data = payload
+    image = Image.frombytes(mode, size, data)
+
+    result = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+
+    lines = []
+    current_key = None
+    current_words = []
+    weighted_conf = 0.0
+    total_chars = 0
+    for i, word in enumerate(result['text']):
+        word = (word or '').strip()
+        conf = float(result['conf'][i])
+        if not word or conf < 0:
+            continue
+        key = (result['block_num'][i], result['par_num'][i], result['line_num'][i])
+        if key != current_key and current_words:
+            lines.append(join_words(current_words))
+            current_words = []
+        current_key = key
+        current_words.append(word)
+        weighted_conf += conf * len(word)
+        total_chars += len(word)
+    if current_words:
+        lines.append(join_words(current_words))
+
+    return {
+        'text': '\n'.join(lines),
+        'confidence': round(weighted_conf / total_chars / 100, 4) if total_chars else 0.0,
+        'chars': total_chars,
+    }
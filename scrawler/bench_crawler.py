@@ -0,0 +1,291 @@
+"""
+爬蟲測試與效能量測（本機 fixture server，不連線到 104）
+
+在本機啟動一個模擬 104 列表 / 職缺內容 API 的 HTTP server（每個請求固定延遲 --latency 秒），
+依序執行並檢查：
+1. 第一次爬取（空快取）：所有職缺都被解析、清理；server 端同時請求數不超過 --concurrency、
+   請求速率不超過 --rate、連線被重用（TCP 連線數遠小於請求數）
+2. 第二次爬取（沿用快取）：有 ETag / Last-Modified 的頁面回 304，其餘內容 hash 相同，全部不重新解析
+3. 修改 --mutate 比例的職缺後再爬：只有被修改的職缺被解析
+4. 對照組：逐一請求、每次新建連線、不做條件式請求
+並印出每秒頁數與傳輸位元組。部分職缺第一次請求會回 429（Retry-After），用來檢查重試。
+
+執行方式:
+    python bench_crawler.py --pages 10 --per-page 20 --latency 0.02 --concurrency 8 --rate 0
+"""
+
+import argparse
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from crawl import CrawlRun
+from crawler import FetchCache, HostPolicy
+from source_104 import Job104Source
+from cleaner_pipeline import CompanyAggregator, iter_clean_batches
+
+
+# ============================================
+# Fixture server
+# ============================================
+
+class FixtureSite:
+    """模擬站台的資料與統計（跨 server 執行緒共用）"""
+
+    def __init__(self, pages, per_page, latency):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.versions = {self.code(i): 0 for i in range(pages * per_page)}
+        self.throttled = set()
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+    @staticmethod
+    def code(i):
+        return f'{i + 1000:x}'
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.connections = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.request_times = []
+
+    def mutate(self, fraction):
+        codes = sorted(self.versions)[::max(1, round(1 / fraction))] if fraction > 0 else []
+        for code in codes:
+            self.versions[code] += 1
+        return len(codes)
+
+    def list_body(self, page):
+        start = (page - 1) * self.per_page
+        codes = [self.code(i) for i in range(start, min(start + self.per_page, len(self.versions)))]
+        return {'data': {'totalPage': self.pages,
+                         'list': [{'link': {'job': f'//fixture/job/{code}?jobsource=list'}} for code in codes]}}
+
+    def detail_body(self, code):
+        i = int(code, 16) - 1000
+        version = self.versions[code]
+        return {'data': {
+            'header': {'jobName': f'Python 後端工程師 {i}', 'custName': f'測試科技股份有限公司{i % 37}',
+                       'appearDate': '2026/10/01'},
+            'jobDetail': {'jobDescription': f'使用 Python、Django 與 PostgreSQL 開發後端服務（v{version}）',
+                          'jobCategory': [{'description': '軟體工程師'}],
+                          'addressRegion': ['臺北市大安區', '新北市板橋區', '新竹縣竹北市'][i % 3],
+                          'addressDetail': f'測試路{i}號', 'salaryMin': 40000 + i, 'salaryMax': 60000 + i,
+                          'workPeriod': '日班', 'vacationPolicy': '週休二日'},
+            'condition': {'workExp': '1年以上', 'edu': '大學', 'specialty': [{'description': 'Python'}],
+                          'skill': [{'description': '後端開發'}], 'other': ''},
+            'welfare': {'welfare': '年終獎金', 'legalTag': ['勞保', '健保'], 'tag': ['員工旅遊']},
+        }}
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive
+
+        def setup(self):
+            super().setup()
+            with site.lock:
+                site.connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == '/robots.txt':
+                self.send_body(200, b'User-agent: *\nDisallow: /private/\n')
+                return
+
+            with site.lock:
+                site.requests += 1
+                site.in_flight += 1
+                site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                site.request_times.append(time.perf_counter())
+            try:
+                time.sleep(site.latency)
+                self.route(parts)
+            finally:
+                with site.lock:
+                    site.in_flight -= 1
+
+        def route(self, parts):
+            if parts.path == '/jobs/search/list':
+                page = int(parse_qs(parts.query).get('page', ['1'])[0])
+                body = json.dumps(site.list_body(page)).encode('utf-8')
+                self.send_body(200, body, [('Content-Type', 'application/json')])
+                return
+
+            code = parts.path.rsplit('/', 1)[-1]
+            if not parts.path.startswith('/job/ajax/content/') or code not in site.versions:
+                self.send_body(404, b'not found')
+                return
+            i = int(code, 16) - 1000
+            with site.lock:
+                throttle = i % 25 == 0 and code not in site.throttled
+                site.throttled.add(code)
+            if throttle:
+                self.send_body(429, b'slow down', [('Retry-After', '0.05')])
+                return
+
+            body = json.dumps(site.detail_body(code), ensure_ascii=False).encode('utf-8')
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            headers = [('Content-Type', 'application/json; charset=utf-8')]
+            if i % 3 == 0:      # 三分之一的頁面不支援條件式請求，只能比對內容 hash
+                self.send_body(200, body, headers)
+                return
+            if i % 3 == 1:
+                headers.append(('ETag', etag))
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_body(304, b'', headers)
+                    return
+            else:
+                modified = formatdate(1790000000 + site.versions[code] * 60, usegmt=True)
+                headers.append(('Last-Modified', modified))
+                if self.headers.get('If-Modified-Since') == modified:
+                    self.send_body(304, b'', headers)
+                    return
+            self.send_body(200, body, headers)
+
+    return Handler
+
+
+def start_server(site):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+# ============================================
+# 量測
+# ============================================
+
+def crawl_once(base_url, cache, args):
+    run = CrawlRun(Job104Source(base_url), 'python', args.pages,
+                   crawler_options=dict(cache=cache, default_policy=HostPolicy(args.concurrency, args.rate),
+                                        max_connections=args.concurrency * 2, backoff=0.05),
+                   batch_size=args.batch_size)
+    companies = CompanyAggregator()
+    cleaned = sum(len(jobs) for jobs in iter_clean_batches(run.raw_batches(), companies))
+    cache.commit()
+    return run, cleaned
+
+
+def sequential_baseline(base_url, site):
+    """對照組：逐一請求、每次新建連線、不做條件式請求"""
+    source = Job104Source(base_url)
+    start = time.perf_counter()
+    transferred = 0
+    for code in site.versions:
+        url, headers, _ = source.detail_request(code)
+        for _ in range(3):
+            response = httpx.get(url, headers=headers)
+            if response.status_code != 429:
+                break
+            time.sleep(float(response.headers.get('Retry-After', '0.05')))
+        transferred += response.num_bytes_downloaded
+    return len(site.versions) / (time.perf_counter() - start), transferred
+
+
+def max_rate(times, window=1.0):
+    """任一 window 秒內的最多請求數"""
+    times = sorted(times)
+    best, left = 0, 0
+    for right, t in enumerate(times):
+        while t - times[left] > window:
+            left += 1
+        best = max(best, right - left + 1)
+    return best / window
+
+
+def report(label, site, run, cleaned, expected_parsed):
+    stats = run.crawler.stats
+    parsed = run.parsed
+    ok = parsed == expected_parsed and not run.failed
+    print(f"【{label}】 {stats.summary()}")
+    print(f"    server: {site.requests} 個請求、{site.connections} 條 TCP 連線、最多同時 {site.max_in_flight} 個；"
+          f"解析 {parsed} 筆（預期 {expected_parsed}），清理後 {cleaned} 筆 {'✓' if ok else '✗'}")
+    for url, reason in run.failed[:3]:
+        print(f"    ✗ {url}: {reason}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='爬蟲測試與效能量測（本機 fixture server）')
+    parser.add_argument('--pages', type=int, default=10, help='列表頁數')
+    parser.add_argument('--per-page', type=int, default=20, help='每頁職缺數')
+    parser.add_argument('--latency', type=float, default=0.02, help='server 每個請求的延遲（秒）')
+    parser.add_argument('--concurrency', type=int, default=8, help='同一主機同時請求數')
+    parser.add_argument('--rate', type=float, default=0, help='同一主機每秒最多請求數（0 為不限制）')
+    parser.add_argument('--batch-size', type=int, default=50, help='每批交給清理步驟的職缺數')
+    parser.add_argument('--mutate', type=float, default=0.1, help='第三次爬取前修改的職缺比例')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("爬蟲測試與效能量測（本機 fixture server）")
+    print("=" * 60)
+
+    site = FixtureSite(args.pages, args.per_page, args.latency)
+    server, base_url = start_server(site)
+    total = len(site.versions)
+    print(f"{args.pages} 頁 x {args.per_page} 筆 = {total} 筆職缺，延遲 {args.latency * 1000:.0f} ms，"
+          f"同時 {args.concurrency} 個、速率上限 {args.rate or '不限'} req/s\n")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FetchCache(f'{tmp}/crawl_cache.json')
+
+            run, cleaned = crawl_once(base_url, cache, args)
+            results.append(report('第一次爬取（空快取）', site, run, cleaned, total))
+            results.append(cleaned == total)
+            results.append(site.max_in_flight <= args.concurrency)
+            results.append(site.connections <= args.concurrency * 2 + 1)
+            if args.rate:
+                observed = max_rate(site.request_times)
+                print(f"    任一秒內最多 {observed:.0f} 個請求（上限 {args.rate:g}）")
+                results.append(observed <= args.rate + 1)
+            first_bytes = run.crawler.stats.bytes_downloaded
+
+            site.reset_counters()
+            run, cleaned = crawl_once(base_url, FetchCache(cache.path), args)
+            results.append(report('第二次爬取（沿用快取）', site, run, cleaned, 0))
+            results.append(len(run.unchanged_urls) == total)
+            print(f"    傳輸量為第一次的 {run.crawler.stats.bytes_downloaded / first_bytes:.1%}")
+
+            changed = site.mutate(args.mutate)
+            site.reset_counters()
+            run, cleaned = crawl_once(base_url, FetchCache(cache.path), args)
+            results.append(report(f'修改 {changed} 筆後再爬', site, run, cleaned, changed))
+
+        site.reset_counters()
+        rate, transferred = sequential_baseline(base_url, site)
+        print(f"【對照組：逐一請求、每次新建連線】 {rate:.1f} 頁/秒，下載 {transferred / 1024:.1f} KB，"
+              f"{site.connections} 條 TCP 連線")
+    finally:
+        server.shutdown()
+
+    print(f"\n{'✓ 全部檢查通過' if all(results) else '✗ 有檢查未通過'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+爬取 104 人力銀行職缺，邊爬邊清理，不產生中間的原始 CSV（取代手動整理的 clear_data_rows.csv）
+
+流程:
+    1. 列表頁每次都完整抓取（即使沒變也要從中取得職缺代碼），依頁碼排列
+    2. 職缺內容以條件式請求抓取；304 或內容 hash 相同的頁面不重新解析，只記下網址
+       （匯入時視為「有爬到、未變更」，不會被下架）
+    3. 每 --batch-size 筆解析結果組成一個 DataFrame，經由有上限的佇列交給
+       cleaner_pipeline.iter_clean_batches（同步 generator）；清理跟不上時爬蟲會暫停
+    4. 清理後的職缺逐批寫入 --jobs-out / --companies-out，未變更的網址寫入 --unchanged-out；
+       或加上 --ingest 直接以 incremental_ingest 增量匯入 Supabase
+    5. 全部處理完才寫入抓取指紋（--cache），中途失敗時下次會重新抓取；
+       --ingest 時寫入失敗或找不到公司而沒有匯入的職缺不記錄指紋，下次重新抓取與匯入
+
+執行方式:
+    python crawl.py --keyword python --pages 10
+    python crawl.py --keyword python --pages 10 --ingest
+    python crawl.py --keyword python --pages 10 --full          # 忽略快取，全部重新抓取
+    python crawl.py --concurrency 2 --rate 1                    # 每秒最多 1 個請求、同時 2 個
+
+之後也可以用 CSV 匯入（未變更的網址一併帶入，避免被下架）:
+    python incremental_ingest.py jobs_cleaned.csv --companies companies_cleaned.csv --unchanged jobs_unchanged.txt
+"""
+
+import argparse
+import asyncio
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from crawler import AsyncCrawler, FetchCache, HostPolicy
+from source_104 import SOURCE_PLATFORM, Job104Source
+
+# 與 supabase_control 共用清理與匯入（docker-compose 將其掛載在 /supabase_control）
+_supabase_control_path = str(Path(__file__).resolve().parent.parent / 'supabase_control')
+if _supabase_control_path not in sys.path:
+    sys.path.insert(0, _supabase_control_path)
+
+from cleaner_pipeline import JOB_COLUMNS, CompanyAggregator, iter_clean_batches  # noqa: E402
+
+
+DEFAULT_CACHE_PATH = str(Path(__file__).resolve().parent / '.crawl_cache.json')
+_DONE = object()
+
+
+class CrawlRun:
+    """
+    一次爬取：在背景執行緒執行 event loop，以同步 generator（raw_batches）逐批交出原始資料
+
+    參數:
+        source (Job104Source): 網址產生與解析
+        crawler_options (dict): AsyncCrawler 的參數
+        conditional (bool): 職缺內容是否使用條件式請求（False 時全部重新抓取、重新解析）
+    """
+
+    def __init__(self, source, keyword, pages, crawler_options=None, conditional=True, batch_size=100,
+                 queue_size=4):
+        self.source = source
+        self.keyword = keyword
+        self.pages = pages
+        self.crawler_options = crawler_options or {}
+        self.conditional = conditional
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.crawler = None
+        self.job_count = 0
+        self.parsed = 0            # 重新解析的職缺數
+        self.unchanged_urls = []   # 未變更而沒有重新解析的職缺頁網址
+        self.fetch_urls = {}       # 重新解析的職缺頁網址 -> 抓取網址（FetchCache 的鍵）
+        self.failed = []           # (網址, 原因)
+        self._stop = threading.Event()
+
+    def raw_batches(self):
+        """同步 generator：逐批產生原始資料 DataFrame（欄位同 clear_data_rows.csv）"""
+        batches = queue.Queue(maxsize=self.queue_size)
+        thread = threading.Thread(target=lambda: asyncio.run(self._produce(batches)), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self._stop.set()   # 呼叫端提前停止：讓爬蟲不再等待佇列
+            thread.join()
+
+    def _put(self, batches, item):
+        while not self._stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def _produce(self, batches):
+        loop = asyncio.get_running_loop()
+
+        async def put(item):
+            return await loop.run_in_executor(None, self._put, batches, item)
+
+        try:
+            async with AsyncCrawler(**self.crawler_options) as crawler:
+                self.crawler = crawler
+                codes = await self._list_codes(crawler)
+                self.job_count = len(codes)
+                crawled_at = datetime.now(timezone.utc)
+                rows = []
+                requests = (self.source.detail_request(code) for code in codes)
+                async for result in crawler.fetch_all(requests, conditional=self.conditional):
+                    if self._stop.is_set():
+                        return
+                    if result.changed:
+                        try:
+                            rows.append(self.source.parse_detail(result.content, result.meta, crawled_at))
+                            self.fetch_urls[result.meta] = result.url
+                            self.parsed += 1
+                        except (ValueError, AttributeError, TypeError) as e:
+                            crawler.cache.discard(result.url)
+                            self.failed.append((result.meta, f'解析失敗: {e}'))
+                    elif result.reason in ('not_modified', 'unchanged'):
+                        self.unchanged_urls.append(result.meta)
+                    else:
+                        self.failed.append((result.meta, result.error or result.reason))
+                    if len(rows) >= self.batch_size:
+                        if not await put(pd.DataFrame(rows)):
+                            return
+                        rows = []
+                if rows:
+                    await put(pd.DataFrame(rows))
+        except BaseException as e:   # 交給呼叫端的執行緒重新拋出
+            await put(e)
+        finally:
+            await put(_DONE)
+
+    async def _list_codes(self, crawler):
+        """抓取所有列表頁，依頁碼排列職缺代碼（重複者只保留第一次出現）"""
+        by_page = {}
+        requests = self.source.list_requests(self.keyword, self.pages)
+        async for result in crawler.fetch_all(requests, conditional=False):
+            if result.changed:
+                by_page[result.meta] = self.source.parse_list(result.content)
+            else:
+                self.failed.append((result.url, result.error or result.reason))
+        return list(dict.fromkeys(code for page in sorted(by_page) for code in by_page[page]))
+
+
+def write_outputs(cleaned_batches, companies, jobs_out, companies_out):
+    """逐批寫出清理後的職缺；全部寫完後寫出公司資料。返回寫出的職缺數"""
+    written = 0
+    with open(jobs_out, 'w', encoding='utf-8-sig', newline='') as f:
+        header = True
+        for jobs in cleaned_batches:
+            jobs.to_csv(f, index=False, header=header)
+            header = False
+            written += len(jobs)
+        if header:
+            pd.DataFrame(columns=JOB_COLUMNS).to_csv(f, index=False)
+    companies.to_frame().to_csv(companies_out, index=False, encoding='utf-8-sig')
+    return written
+
+
+def ingest(cleaned_batches, companies, unchanged_urls, args):
+    """
+    清理後的職缺逐批增量匯入 Supabase（每批寫入後即釋放）
+
+    返回:
+        (dict, dict): ingest_job_batches 的各類筆數與合計的 BulkWriteResult；沒有執行匯入時為 None
+    """
+    from incremental_ingest import ingest_job_batches, source_key
+    from supabase_connection import connect_to_supabase
+
+    # 未變更的網址要等全部爬完才齊全；map 在所有批次處理完後才被讀取
+    seen_keys = map(lambda url: source_key(url, None, None, None), unchanged_urls)
+    outcome = ingest_job_batches(connect_to_supabase(), cleaned_batches, companies.to_frame, SOURCE_PLATFORM,
+                                 deactivate_missing=args.deactivate_missing, seen_keys=seen_keys,
+                                 dry_run=args.dry_run, batch_size=args.write_batch_size, workers=args.workers)
+    return outcome
+
+
+def unwritten_urls(totals):
+    """沒有寫入的職缺（寫入失敗、找不到公司）的職缺頁網址"""
+    return {row.get('source_url') for result in totals.values() for row, _ in result.failed_rows
+            if row.get('source_url')}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='爬取 104 人力銀行職缺並串流清理')
+    parser.add_argument('--keyword', default='python', help='搜尋關鍵字')
+    parser.add_argument('--pages', type=int, default=5, help='列表頁數')
+    parser.add_argument('--base-url', default=None, help='站台網址（預設為 104 人力銀行）')
+    parser.add_argument('--concurrency', type=int, default=4, help='同一主機同時進行的請求數')
+    parser.add_argument('--rate', type=float, default=2.0, help='同一主機每秒最多請求數（0 為不限制）')
+    parser.add_argument('--max-connections', type=int, default=20, help='連線池大小')
+    parser.add_argument('--batch-size', type=int, default=100, help='每批交給清理步驟的職缺數')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='抓取指紋（ETag / 內容 hash）檔案')
+    parser.add_argument('--full', action='store_true', help='忽略快取，全部重新抓取並解析')
+    parser.add_argument('--ignore-robots', action='store_true', help='不檢查 robots.txt（僅限測試用的本機站台）')
+    parser.add_argument('--jobs-out', default='jobs_cleaned.csv', help='職缺資料輸出路徑')
+    parser.add_argument('--companies-out', default='companies_cleaned.csv', help='公司資料輸出路徑')
+    parser.add_argument('--unchanged-out', default='jobs_unchanged.txt', help='未變更職缺的網址清單')
+    parser.add_argument('--ingest', action='store_true', help='不寫 CSV，直接增量匯入 Supabase')
+    parser.add_argument('--deactivate-missing', action='store_true',
+                        help='匯入時下架這次沒爬到的職缺（只在爬完所有職缺時使用）')
+    parser.add_argument('--dry-run', action='store_true', help='匯入時只比對與統計，不寫入')
+    parser.add_argument('--write-batch-size', type=int, default=500, help='匯入時每個寫入批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='匯入時同時進行的寫入請求數')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print(f"爬取職缺：{args.keyword}（{args.pages} 頁）")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    cache = FetchCache(args.cache)
+    run = CrawlRun(
+        Job104Source(args.base_url) if args.base_url else Job104Source(),
+        args.keyword, args.pages,
+        crawler_options=dict(cache=cache, default_policy=HostPolicy(args.concurrency, args.rate),
+                             max_connections=args.max_connections, respect_robots=not args.ignore_robots),
+        conditional=not args.full, batch_size=args.batch_size,
+    )
+    companies = CompanyAggregator()
+    cleaned = iter_clean_batches(run.raw_batches(), companies, source_platform=SOURCE_PLATFORM)
+
+    if args.ingest:
+        outcome = ingest(cleaned, companies, run.unchanged_urls, args)
+        done = outcome is not None
+        if done:
+            # 沒有寫入的職缺不記錄指紋，否則下次會是 304 / 內容相同而不再重新解析，永遠不會被匯入
+            unwritten = unwritten_urls(outcome[1])
+            for url in unwritten:
+                cache.discard(run.fetch_urls.get(url, url))
+            if unwritten:
+                print(f"⚠️ {len(unwritten)} 筆職缺沒有匯入，下次重新抓取")
+    else:
+        written = write_outputs(cleaned, companies, args.jobs_out, args.companies_out)
+        with open(args.unchanged_out, 'w', encoding='utf-8') as f:
+            f.writelines(f'{url}\n' for url in run.unchanged_urls)
+        print(f"✓ 職缺 {written} 筆 -> {args.jobs_out}，未變更 {len(run.unchanged_urls)} 筆 -> {args.unchanged_out}")
+        done = True
+
+    stats = run.crawler.stats if run.crawler else None
+    if stats:
+        print(f"✓ 職缺代碼 {run.job_count} 個，重新解析 {run.parsed} 個；抓取 {stats.summary()}")
+    for url, reason in run.failed[:5]:
+        print(f"  ✗ {url}: {reason}")
+    if done and not args.dry_run:
+        cache.commit()
+    print(f"✓ 完成，耗時 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+非同步、有禮貌的 HTTP 抓取器
+
+- 所有請求共用一個 httpx.AsyncClient（keep-alive 連線池，同一主機的請求重用 TCP/TLS 連線）
+- 每個主機各自的同時請求數上限（HostPolicy.concurrency）與速率上限（HostPolicy.rate，每秒請求數）
+- 遵守 robots.txt（每個主機只讀一次）；429 / 5xx 依 Retry-After 或指數退避重試，並暫停該主機的後續請求
+- 條件式請求：送出上次的 ETag（If-None-Match）/ Last-Modified（If-Modified-Since），
+  304 或內容 sha256 與上次相同時 changed=False，呼叫端不需要重新解析
+- 指紋存在 FetchCache（JSON 檔）；只在呼叫端 commit() 後才寫入，
+  處理到一半失敗時下次會重新抓取，不會漏掉沒處理完的頁面
+- CrawlStats 統計請求數、304 / 未變更頁數、下載位元組與每秒頁數
+
+使用方式:
+    async with AsyncCrawler(cache=FetchCache('.crawl_cache.json')) as crawler:
+        async for result in crawler.fetch_all(urls):
+            if result.changed:
+                parse(result.content)
+    crawler.cache.commit()
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (compatible; final-job-crawler/1.0)'
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class HostPolicy:
+    """單一主機的禮貌設定"""
+    concurrency: int = 4     # 同時進行的請求數
+    rate: float = 2.0        # 每秒最多請求數（0 表示不限制）
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = None                 # HTTP 狀態碼；連線錯誤或被 robots.txt 禁止時為 None
+    content: bytes = None              # changed=False 時為 None
+    changed: bool = False              # 內容與上次不同（或第一次抓取）
+    reason: str = None                 # not_modified / unchanged / robots / error
+    error: str = None
+    meta: object = None                # 呼叫端附帶的資料（fetch_all 的 (url, headers, meta)）
+
+
+@dataclass
+class CrawlStats:
+    requests: int = 0          # 實際送出的 HTTP 請求（含重試，不含 robots.txt）
+    fetched: int = 0           # 內容有變（或第一次抓取）的頁面
+    not_modified: int = 0      # 304
+    unchanged: int = 0         # 200 但內容 hash 與上次相同
+    skipped: int = 0           # robots.txt 禁止
+    errors: int = 0
+    retries: int = 0
+    bytes_downloaded: int = 0  # 實際傳輸的位元組（壓縮後）
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = None
+
+    @property
+    def pages(self):
+        return self.fetched + self.not_modified + self.unchanged
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def pages_per_second(self):
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.pages} 頁（變更 {self.fetched}、304 {self.not_modified}、內容相同 {self.unchanged}），"
+                f"錯誤 {self.errors}、robots 略過 {self.skipped}、重試 {self.retries}，"
+                f"{self.requests} 個請求、下載 {self.bytes_downloaded / 1024:.1f} KB，"
+                f"{self.pages_per_second():.1f} 頁/秒")
+
+
+class FetchCache:
+    """
+    每個 URL 上次抓取的 ETag、Last-Modified 與內容 sha256
+
+    參數:
+        path (str, optional): JSON 檔路徑；None 時只存在記憶體
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self._staged = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, url):
+        return self._staged.get(url) or self.entries.get(url)
+
+    def stage(self, url, etag, last_modified, content_hash):
+        self._staged[url] = {'etag': etag, 'last_modified': last_modified, 'content_hash': content_hash}
+
+    def discard(self, url):
+        """這次抓到的內容無法處理（例如解析失敗）：不記錄指紋，下次重新抓取"""
+        self._staged.pop(url, None)
+
+    def commit(self):
+        """把這次抓取的指紋寫入（呼叫端處理完所有頁面後才呼叫）"""
+        self.entries.update(self._staged)
+        self._staged = {}
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class _Host:
+    """單一主機的執行期狀態：同時請求數、下一個可送出請求的時間、robots.txt"""
+
+    def __init__(self, policy):
+        self.semaphore = asyncio.Semaphore(max(1, policy.concurrency))
+        self.interval = 1.0 / policy.rate if policy.rate else 0.0
+        self.next_slot = 0.0
+        self.robots = None
+        self.robots_lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        """依速率上限排隊；在同一個 event loop 中讀寫 next_slot 之間沒有 await，不需要鎖"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def back_off(self, seconds):
+        """被要求放慢（429 / 503）：該主機所有後續請求延後"""
+        loop = asyncio.get_running_loop()
+        self.next_slot = max(self.next_slot, loop.time() + seconds)
+
+
+def _retry_after(response, attempt, backoff):
+    value = response.headers.get('Retry-After') if response is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return backoff * (2 ** attempt)
+
+
+class AsyncCrawler:
+    """
+    參數:
+        cache (FetchCache, optional): 條件式請求與內容 hash 使用的快取
+        default_policy (HostPolicy): 未個別設定的主機使用的禮貌設定
+        policies (dict, optional): 主機名稱 -> HostPolicy
+        max_connections (int): 連線池大小（所有主機合計）
+        retries (int): 429 / 5xx / 連線錯誤的重試次數
+        respect_robots (bool): 是否遵守 robots.txt
+    """
+
+    def __init__(self, cache=None, default_policy=None, policies=None, user_agent=DEFAULT_USER_AGENT,
+                 max_connections=20, timeout=20.0, retries=3, backoff=0.5, respect_robots=True):
+        self.cache = cache if cache is not None else FetchCache()
+        self.default_policy = default_policy or HostPolicy()
+        self.policies = policies or {}
+        self.user_agent = user_agent
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.respect_robots = respect_robots
+        self.stats = CrawlStats()
+        self.client = None
+        self._hosts = {}
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_connections)
+        self.client = httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True,
+                                        headers={'User-Agent': self.user_agent})
+        self.stats = CrawlStats()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.stats.finished = time.perf_counter()
+        await self.client.aclose()
+        self.client = None
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        key = f'{parts.scheme}://{parts.netloc}'
+        if key not in self._hosts:
+            self._hosts[key] = _Host(self.policies.get(parts.hostname, self.default_policy))
+        return key, self._hosts[key]
+
+    async def _allowed(self, url, origin, host):
+        if not self.respect_robots:
+            return True
+        async with host.robots_lock:
+            if host.robots is None:
+                host.robots = RobotFileParser()
+                try:
+                    response = await self.client.get(f'{origin}/robots.txt')
+                    if response.status_code in (401, 403):
+                        host.robots.disallow_all = True
+                    elif response.status_code < 400:
+                        host.robots.parse(response.text.splitlines())
+                    else:
+                        host.robots.allow_all = True
+                except httpx.HTTPError:
+                    host.robots.allow_all = True
+        return host.robots.can_fetch(self.user_agent, url)
+
+    async def fetch(self, url, headers=None, conditional=True, meta=None):
+        """
+        抓取單一 URL
+
+        參數:
+            headers (dict, optional): 額外的請求標頭（例如 Referer）
+            conditional (bool): 是否使用條件式請求與內容 hash 比對；
+                False 時每次都回傳完整內容（例如列表頁：即使沒變也要從中取得職缺連結）
+        """
+        origin, host = self._host(url)
+        if not await self._allowed(url, origin, host):
+            self.stats.skipped += 1
+            return FetchResult(url, reason='robots', meta=meta)
+
+        request_headers = dict(headers or {})
+        cached = self.cache.get(url) if conditional else None
+        if cached:
+            if cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            async with host.semaphore:
+                await host.wait_turn()
+                self.stats.requests += 1
+                try:
+                    response = await self.client.get(url, headers=request_headers)
+                    self.stats.bytes_downloaded += response.num_bytes_downloaded
+                    error = None
+                except httpx.HTTPError as e:
+                    response, error = None, f'{type(e).__name__}: {e}'
+            if response is not None and response.status_code not in RETRY_STATUS:
+                break
+            if attempt < self.retries:
+                self.stats.retries += 1
+                delay = _retry_after(response, attempt, self.backoff)
+                if response is not None and response.status_code in (429, 503):
+                    host.back_off(delay)
+                await asyncio.sleep(delay)
+
+        if response is None or response.status_code >= 400:
+            self.stats.errors += 1
+            return FetchResult(url, status=response.status_code if response is not None else None,
+                               reason='error', error=error or f'HTTP {response.status_code}', meta=meta)
+        if response.status_code == 304:
+            self.stats.not_modified += 1
+            return FetchResult(url, status=304, reason='not_modified', meta=meta)
+
+        content = response.content
+        if not conditional:
+            self.stats.fetched += 1
+            return FetchResult(url, status=response.status_code, content=content, changed=True, meta=meta)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.cache.stage(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), digest)
+        if cached and cached.get('content_hash') == digest:
+            self.stats.unchanged += 1
+            return FetchResult(url, status=response.status_code, reason='unchanged', meta=meta)
+        self.stats.fetched += 1
+        return FetchResult(url, status=response.status_code, content=content, changed=True, meta=meta)
+
+    async def fetch_all(self, requests, conditional=True, max_in_flight=None):
+        """
+        同時抓取多個 URL，依完成順序產生 FetchResult
+
+        參數:
+            requests (iterable): URL 字串或 (url, headers, meta) tuple；逐一取用，不會一次建立全部的 task
+            max_in_flight (int, optional): 同時存在的 task 數，預設為連線池大小的兩倍
+        """
+        max_in_flight = max_in_flight or self.max_connections * 2
+        pending = set()
+        requests = iter(requests)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    item = next(requests, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    url, headers, meta = (item, None, None) if isinstance(item, str) else item
+                    pending.add(asyncio.ensure_future(self.fetch(url, headers, conditional, meta)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:   # 呼叫端提前停止時取消尚未完成的請求
+                task.cancel()
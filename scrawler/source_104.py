@@ -0,0 +1,115 @@
+"""
+104 人力銀行的列表 / 職缺內容 API 與解析
+
+列表: GET {base}/jobs/search/list?keyword=...&page=N&order=15 （JSON，依更新日期由新到舊）
+    data.list[].link.job = '//www.104.com.tw/job/<代碼>?jobsource=...'
+內容: GET {base}/job/ajax/content/<代碼>（JSON，需帶 Referer: {base}/job/<代碼>）
+    data.header / data.jobDetail / data.condition / data.welfare
+
+解析結果的欄位與 clear_data_rows.csv 相同，可直接交給 cleaner_pipeline.iter_clean_batches。
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+
+BASE_URL = 'https://www.104.com.tw'
+SOURCE_PLATFORM = '104人力銀行'
+NEGOTIABLE_SALARY = {0, 9999999}   # 面議 / 「以上」時 104 回傳的 salaryMin / salaryMax
+
+_JOB_CODE = re.compile(r'/job/(?:ajax/content/)?([0-9a-z]+)')
+
+
+class Job104Source:
+    """
+    參數:
+        base_url (str): 站台網址（測試時指向本機的 fixture server）
+    """
+
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def list_referer(self):
+        return f'{self.base_url}/jobs/search/'
+
+    def list_requests(self, keyword, pages):
+        """列表頁請求 (url, headers, 頁碼)"""
+        for page in range(1, pages + 1):
+            query = urlencode({'ro': 0, 'keyword': keyword, 'order': 15, 'asc': 0, 'page': page, 'mode': 's'})
+            yield f'{self.base_url}/jobs/search/list?{query}', {'Referer': self.list_referer}, page
+
+    def parse_list(self, content):
+        """列表頁 -> 職缺代碼清單（保持頁面上的順序）"""
+        data = json.loads(content).get('data') or {}
+        codes = []
+        for item in data.get('list') or []:
+            match = _JOB_CODE.search((item.get('link') or {}).get('job') or '')
+            if match:
+                codes.append(match.group(1))
+        return codes
+
+    def job_url(self, code):
+        """職缺頁網址（存入 source_url，作為 incremental_ingest 的身分鍵）"""
+        return f'{self.base_url}/job/{code}'
+
+    def detail_request(self, code):
+        """職缺內容請求 (url, headers, 職缺頁網址)"""
+        return (f'{self.base_url}/job/ajax/content/{code}', {'Referer': self.job_url(code)}, self.job_url(code))
+
+    def parse_detail(self, content, job_url, crawled_at=None):
+        """職缺內容 -> 一列原始資料（欄位同 clear_data_rows.csv）"""
+        data = json.loads(content).get('data') or {}
+        header = data.get('header') or {}
+        detail = data.get('jobDetail') or {}
+        condition = data.get('condition') or {}
+        welfare = data.get('welfare') or {}
+
+        def descriptions(items):
+            return _join(item.get('description') for item in items or [])
+
+        return {
+            'company_name': header.get('custName'),
+            'job_name': header.get('jobName'),
+            'job_category': descriptions(detail.get('jobCategory')),
+            'job_description': detail.get('jobDescription'),
+            'location': _join([detail.get('addressRegion'), detail.get('addressDetail')], sep=''),
+            'salary_min': _salary(detail.get('salaryMin')),
+            'salary_max': _salary(detail.get('salaryMax')),
+            'job_type': (detail.get('remoteWork') or {}).get('description'),
+            'headcount': data.get('employees'),
+            'work_exp': condition.get('workExp'),
+            'education': condition.get('edu'),
+            'major': _join(condition.get('major') or []),
+            'language': _join(f"{item.get('language')} {item.get('ability')}".strip()
+                              for item in condition.get('language') or []),
+            'skills': descriptions(condition.get('skill')),
+            'tools': descriptions(condition.get('specialty')),
+            'certificates': descriptions(condition.get('certificate')),
+            'other_requirements': condition.get('other'),
+            'work_time': detail.get('workPeriod'),
+            'vacation': detail.get('vacationPolicy'),
+            'start_work': detail.get('startWorkingDay'),
+            'business_trip': detail.get('businessTrip'),
+            'legal_benefits': _join(welfare.get('legalTag') or []),
+            'other_benefits': _join(welfare.get('tag') or []),
+            'raw_benefits': welfare.get('welfare'),
+            'update_date': (header.get('appearDate') or '').replace('/', '-') or None,
+            'created_at': (crawled_at or datetime.now(timezone.utc)).isoformat(),
+            'source_url': job_url,
+        }
+
+
+def _join(values, sep='、'):
+    values = [str(v).strip() for v in values if v is not None and str(v).strip()]
+    return sep.join(values) or None
+
+
+def _salary(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value in NEGOTIABLE_SALARY else value
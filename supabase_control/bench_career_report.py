@@ -0,0 +1,170 @@
+"""
+market_stats / career_report 效能與正確性測試（合成資料，不需連線）
+
+1. 以 job_catalog.synthetic_frame 產生 --jobs 筆職缺，建立目錄快照並整份彙總市場統計
+2. 下架 --removed 比例、修改 --changed 比例並新增 --added 比例的職缺（含新產業）後重建目錄快照，
+   比較增量更新（refresh）與整份重新彙總的耗時，並檢查兩者的統計完全相同
+3. 產生 --users 份履歷（技能依熱門程度抽樣、程度 1~10、地點與期望薪資），批次產生報告
+4. 對照組：每份報告各自掃描全部職缺計算需求率與職涯準備度（在 --sample 份上實測並推估全部的耗時），
+   並檢查職涯準備度與批次結果一致
+
+執行方式:
+    python bench_career_report.py --jobs 200000 --users 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from career_report import MIN_SEGMENT_JOBS, TARGET_LEVEL_RANGE, TOP_SKILLS, generate_reports
+from job_catalog import synthetic_frame, write_catalog
+from market_stats import MarketCounts, MarketStats, build_stats, refresh_stats
+
+
+# 各統計 key 中分群代碼以下的位元數（與 market_stats 的 key 配置相同）
+SEGMENT_SHIFTS = {'demand': 24, 'salary': 36, 'cooccur': 48}
+
+
+def recode_segments(counts, names, target_names):
+    """把 counts 的分群代碼換成 target_names 中的代碼（整份彙總與增量更新的分群順序不同）"""
+    mapping = np.array([target_names.index(name) for name in names], dtype=np.int64)
+    tables = {}
+    for name, (keys, values) in counts.tables.items():
+        shift = SEGMENT_SHIFTS[name]
+        recoded = (mapping[keys >> shift] << shift) | (keys & ((1 << shift) - 1))
+        order = np.argsort(recoded, kind='stable')
+        tables[name] = (recoded[order], values[order])
+    return MarketCounts(tables)
+
+
+def mutate_jobs(frame, removed, changed, added, seed=1):
+    rng = np.random.default_rng(seed)
+    frame = frame.drop(frame.sample(frac=removed, random_state=seed).index).copy()
+    edit = frame.sample(frac=changed, random_state=seed + 1).index
+    frame.loc[edit, 'city'] = rng.choice(['台北市', '台中市', '高雄市'], len(edit))
+    frame.loc[edit, 'salary_min'] = frame.loc[edit, 'salary_min'] + 5000
+    new = synthetic_frame(max(1, int(len(frame) * added)), seed=seed + 2)
+    new['job_id'] += int(frame['job_id'].max())
+    new.loc[new.index[:len(new) // 10], 'industry'] = '綠能'
+    return pd.concat([frame, new], ignore_index=True)
+
+
+def generate_users(n_users, frame, seed=7):
+    """返回 (resumes, user_skills)；技能依職缺中的出現次數抽樣"""
+    rng = np.random.default_rng(seed)
+    skill_counts = frame['skills'].explode().dropna().astype(int).value_counts()
+    weights = skill_counts.to_numpy() / skill_counts.sum()
+    cities = ['台北市', '新北市', '台中市', '高雄市', '新竹縣', '花蓮縣', None]
+    resumes = pd.DataFrame({
+        'resume_id': np.arange(1, n_users + 1),
+        'user_id': np.arange(1001, 1001 + n_users),
+        'survey_id': np.arange(1, n_users + 1),
+        'salary_min': np.where(rng.random(n_users) < 0.2, np.nan, rng.integers(30, 90, n_users) * 1000),
+        'location': rng.choice(np.array(cities, dtype=object), n_users),
+    })
+    per_user = rng.integers(0, 15, n_users)
+    user_ids = np.repeat(resumes['user_id'].to_numpy(), per_user)
+    user_skills = pd.DataFrame({
+        'user_skill_id': np.arange(1, len(user_ids) + 1),
+        'user_id': user_ids,
+        'skill_id': rng.choice(skill_counts.index.to_numpy(), len(user_ids), p=weights),
+        'proficiency_level': np.where(rng.random(len(user_ids)) < 0.3, np.nan, rng.integers(1, 11, len(user_ids))),
+        'years_of_experience': rng.integers(0, 8, len(user_ids)).astype(float),
+    })
+    return resumes, user_skills
+
+
+def naive_readiness(frame, resume, user_skills):
+    """對照組：掃描全部職缺計算單一履歷的職涯準備度（與 career_report 相同的公式）"""
+    city_jobs = frame[frame['city'] == resume['location']]
+    jobs = city_jobs if len(city_jobs) >= MIN_SEGMENT_JOBS else frame
+    counts = jobs['skills'].explode().dropna().astype(int).value_counts()
+    counts = counts.rename_axis('skill_id').reset_index(name='count').sort_values(['count', 'skill_id'],
+                                                                                   ascending=[False, True])
+    demand = counts['count'].to_numpy() / len(jobs)
+    low, high = TARGET_LEVEL_RANGE
+    target = low + (high - low) * demand / demand.max()
+    mine = user_skills[user_skills['user_id'] == resume['user_id']]
+    level = (mine['proficiency_level'].fillna((2 + 1.5 * mine['years_of_experience']).round()).fillna(3)
+             .clip(1, 10).groupby(mine['skill_id']).max())
+    top = counts['skill_id'].to_numpy()[:TOP_SKILLS]
+    current = level.reindex(top).fillna(0).to_numpy()
+    weights = demand[:TOP_SKILLS]
+    return float(np.minimum(1, current / target[:TOP_SKILLS]) @ weights / weights.sum() * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='market_stats / career_report 效能與正確性測試')
+    parser.add_argument('--jobs', type=int, default=200_000, help='職缺數')
+    parser.add_argument('--users', type=int, default=20_000, help='履歷數')
+    parser.add_argument('--removed', type=float, default=0.02, help='下架的職缺比例')
+    parser.add_argument('--changed', type=float, default=0.01, help='修改的職缺比例')
+    parser.add_argument('--added', type=float, default=0.03, help='新增的職缺比例')
+    parser.add_argument('--sample', type=int, default=50, help='對照組實測的履歷數')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("market_stats / career_report 效能與正確性測試")
+    print("=" * 60)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path, stats_path = os.path.join(tmp, 'catalog.bin'), os.path.join(tmp, 'market_stats.bin')
+        frame = synthetic_frame(args.jobs)
+        write_catalog(frame, catalog_path)
+        start = time.perf_counter()
+        header = build_stats(catalog_path, stats_path)
+        print(f"整份彙總 {args.jobs:,} 筆職缺：{time.perf_counter() - start:.2f}s，{len(header['segments'])} 個分群，"
+              f"快照 {os.path.getsize(stats_path) / 1024:,.0f} KB")
+
+        frame = mutate_jobs(frame, args.removed, args.changed, args.added)
+        write_catalog(frame, catalog_path)
+        start = time.perf_counter()
+        header = refresh_stats(catalog_path, stats_path)
+        refresh_seconds = time.perf_counter() - start
+        full_path = os.path.join(tmp, 'full.bin')
+        start = time.perf_counter()
+        build_stats(catalog_path, full_path)
+        full_seconds = time.perf_counter() - start
+
+        incremental, full = MarketStats.open(stats_path), MarketStats.open(full_path)
+        same = recode_segments(full.counts(), full.segments, incremental.segments).equals(incremental.counts())
+        results.append(same)
+        print(f"增量更新：加上 {header['added']:,} 筆、減掉 {header['removed']:,} 筆，{refresh_seconds:.2f}s"
+              f"（整份重新彙總 {full_seconds:.2f}s），統計與整份彙總相同 {'✓' if same else '✗'}")
+        full.close()
+        unchanged = refresh_stats(catalog_path, stats_path)
+        results.append(unchanged['added'] == unchanged['removed'] == 0)
+
+        resumes, user_skills = generate_users(args.users, frame)
+        start = time.perf_counter()
+        reports, gaps = generate_reports(incremental, resumes, user_skills)
+        batch_seconds = time.perf_counter() - start
+        print(f"\n【批次產生】 {len(reports):,} 份報告、{sum(map(len, gaps)):,} 筆技能落差：{batch_seconds:.2f}s"
+              f"（每份 {batch_seconds / len(reports) * 1000:.2f} ms）")
+
+        sample = resumes.sample(min(args.sample, len(resumes)), random_state=3)
+        start = time.perf_counter()
+        expected = [naive_readiness(frame, row, user_skills) for _, row in sample.iterrows()]
+        naive_seconds = (time.perf_counter() - start) / len(sample)
+        got = [reports[i]['career_readiness_score'] for i in sample.index]
+        match = np.allclose(expected, got, atol=0.01)
+        results.append(match)
+        print(f"【逐份掃描全部職缺】 每份 {naive_seconds * 1000:.0f} ms，推估 {len(reports):,} 份約 "
+              f"{naive_seconds * len(reports) / 60:.1f} 分鐘（{naive_seconds * len(reports) / batch_seconds:,.0f}x）")
+        print(f"    抽樣 {len(sample)} 份的職涯準備度與批次結果一致 {'✓' if match else '✗'}")
+        incremental.close()
+
+    example = next(r for r in reports if r['skill_gap_analysis']['missing_skills'])
+    print(f"\n範例報告（resume_id {example['resume_id']}）：準備度 {example['career_readiness_score']}，"
+          f"分群 {example['market_insights']['segment']}，"
+          f"優先補強 skill {example['skill_gap_analysis']['missing_skills'][0]['skill_id']}")
+    print(f"\n{'✓ 全部檢查通過' if all(results) else '✗ 有檢查未通過'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+company_resolver 效能與正確性測試（合成資料，不需連線）
+
+產生 --entities 家公司、每家 1~4 種寫法（括號集團標籤、品牌前綴、外商前綴與台灣分公司、
+股份有限公司 / 有限公司、臺/台、全形括號與空白、長名稱少一個字），比較：
+1. 原本以完整名稱對應：同一家公司被拆成幾筆
+2. company_resolver（正規化 + MinHash LSH）：耗時、候選對數、以公司為單位的 precision / recall
+3. O(n²) 兩兩 bigram Jaccard（在 --sample 筆上實測並推估全部資料的耗時），
+   同時檢查 LSH 在樣本上找到的配對是否與兩兩比對相同
+
+執行方式:
+    python bench_company_resolver.py --entities 100000
+"""
+
+import argparse
+import random
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from company_resolver import DEFAULT_THRESHOLD, fuzzy_eligible, normalize_names, resolve_companies
+
+
+CHARACTERS = ('華鴻達泰昇宏凱聯揚欣嘉誠信億晶光碩群傑瑞祥豐盛源邦騰威德隆永新合興捷智創順安益順'
+              '台元正大中天立亞世東南北美星豪博富康雲峰海陽明成吉利通宇宙晟豐翔盈瀚鼎睿馳')
+INDUSTRIES = ['科技', '資訊', '電子', '數位', '國際', '工業', '精密', '光電', '生醫', '網路', '軟體', '系統整合']
+LEGAL_FORMS = ['股份有限公司', '有限公司']
+GROUP_TAGS = ['(集團)', '(總公司)', '（台灣）', '【上市】']
+FOREIGN = ['美商', '日商', '香港商', '新加坡商', '英屬維京群島商', '薩摩亞商']
+BRANCHES = ['台灣分公司', '台中分公司', '高雄分公司', '新竹分公司']
+
+
+def generate_companies(entities, seed=42):
+    """返回 (公司名稱清單, 每個名稱所屬的公司編號)"""
+    rng = random.Random(seed)
+    names, truth, seen = [], [], set()
+    for entity in range(entities):
+        while True:
+            core = ''.join(rng.choices(CHARACTERS, k=rng.randint(2, 6))) + rng.choice(INDUSTRIES)
+            if core not in seen:
+                seen.add(core)
+                break
+        legal = rng.choice(LEGAL_FORMS)
+        variants = {f'{core}{legal}'}
+        for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+            form = rng.randrange(7)
+            if form == 0:
+                variants.add(f'{rng.choice(GROUP_TAGS)}{core}{legal}')
+            elif form == 1:
+                variants.add(f'{core.encode().hex()[:6].upper()}_{core}{legal}')
+            elif form == 2:
+                variants.add(f'{rng.choice(FOREIGN)}{core}{legal}{rng.choice(BRANCHES)}')
+            elif form == 3:
+                variants.add(f'{core}{"有限公司" if legal == "股份有限公司" else "股份有限公司"}')
+            elif form == 4:
+                variants.add(f'{core.replace("台", "臺")}{legal}' if '台' in core else f'{core} {legal}')
+            elif form == 5:
+                variants.add(f'（{rng.choice(["上櫃", "集團"])}）{core}{legal}{rng.choice(BRANCHES)}')
+            elif len(core) >= 7:   # 長名稱少一個字（例如被截斷），只能靠模糊比對
+                variants.add(f'{core[:-1]}{legal}')
+        for name in sorted(variants):
+            names.append(name)
+            truth.append(entity)
+    order = rng.sample(range(len(names)), len(names))
+    return [names[i] for i in order], np.array([truth[i] for i in order])
+
+
+def pair_scores(predicted, truth):
+    """以「同群的名稱對」計算 precision / recall（不需列舉所有配對）"""
+    def pairs(labels):
+        counts = pd.Series(labels).value_counts()
+        return int((counts * (counts - 1) // 2).sum())
+
+    both = pairs(pd.Series(list(zip(predicted, truth))).astype(str))
+    predicted_pairs, true_pairs = pairs(predicted), pairs(truth)
+    precision = both / predicted_pairs if predicted_pairs else 1.0
+    recall = both / true_pairs if true_pairs else 1.0
+    return precision, recall, predicted_pairs, true_pairs
+
+
+def naive_pairs(cores, threshold=DEFAULT_THRESHOLD):
+    """O(n²) 兩兩比對：正規化後相同，或 bigram Jaccard >= threshold"""
+    grams = [{core[i:i + 2] for i in range(len(core) - 1)} for core in cores]
+    eligible = [fuzzy_eligible(core) for core in cores]
+    found = set()
+    for a, b in combinations(range(len(cores)), 2):
+        if cores[a] == cores[b]:
+            found.add((a, b))
+        elif (eligible[a] and eligible[b]
+              and len(grams[a] & grams[b]) / len(grams[a] | grams[b]) >= threshold):
+            found.add((a, b))
+    return found
+
+
+def resolver_pairs(frame):
+    """resolve_companies 結果中同群的位置對"""
+    found = set()
+    for members in frame.groupby('canonical_id').indices.values():
+        found.update(combinations(sorted(members), 2))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='company_resolver 效能與正確性測試')
+    parser.add_argument('--entities', type=int, default=100_000, help='公司數')
+    parser.add_argument('--sample', type=int, default=3000, help='O(n²) 兩兩比對的樣本筆數')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("company_resolver 效能與正確性測試")
+    print("=" * 60)
+
+    names, truth = generate_companies(args.entities)
+    print(f"測試資料: {args.entities:,} 家公司、{len(names):,} 個不同名稱")
+    print(f"原本以完整名稱對應: {len(names):,} 筆 company_info（多出 {len(names) - args.entities:,} 筆重複）\n")
+
+    for label, fuzzy in (('只做正規化', False), ('正規化 + MinHash LSH', True)):
+        stats = {}
+        start = time.perf_counter()
+        frame = resolve_companies(names, fuzzy=fuzzy, stats=stats)
+        elapsed = time.perf_counter() - start
+        precision, recall, _, _ = pair_scores(frame['canonical_id'].to_numpy(), truth)
+        print(f"【{label}】 {elapsed:.2f}s（正規化 {stats['normalize_seconds']:.2f}s、"
+              f"比對 {stats['match_seconds']:.2f}s），候選 {stats['candidates']:,} 對、"
+              f"模糊比對成立 {stats['fuzzy_pairs']:,} 對")
+        print(f"    分成 {stats['clusters']:,} 家（實際 {args.entities:,}），"
+              f"precision {precision:.4f}、recall {recall:.4f}")
+
+    sample = names[:args.sample]
+    start = time.perf_counter()
+    expected = naive_pairs(list(normalize_names(sample)))
+    naive_seconds = time.perf_counter() - start
+    estimate = naive_seconds * (len(names) / len(sample)) ** 2
+    got = resolver_pairs(resolve_companies(sample))
+    print(f"\n【O(n²) 兩兩比對】 {len(sample):,} 筆 {naive_seconds:.2f}s，"
+          f"推估 {len(names):,} 筆約 {estimate / 3600:.1f} 小時")
+    print(f"    樣本上兩兩比對找到 {len(expected)} 對，LSH 找到 {len(got)} 對，"
+          f"共同 {len(expected & got)} 對 {'✓' if expected <= got else '✗'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+job_matcher 效能測試
+
+以隨機產生的職缺與履歷測量：
+1. 單一履歷 x 全部職缺的評分 + top-K（目標：10 萬筆職缺遠低於 1 秒）
+2. 多份履歷 x 全部職缺的分批矩陣評分
+並以逐筆 Python 迴圈的版本抽樣驗證分數一致。
+
+執行方式:
+    python bench_job_matcher.py --jobs 100000 --resumes 200 --skills 800
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from job_matcher import (
+    SkillVocabulary, build_job_arrays, build_resume_arrays, score_pairs, top_k_for_resume,
+    top_k_for_resumes,
+)
+from tw_address import CITIES
+
+
+def generate_data(n_jobs, n_resumes, n_skills, seed=42):
+    rng = np.random.default_rng(seed)
+    job_ids = np.arange(1, n_jobs + 1)
+
+    skills_per_job = rng.integers(0, 12, size=n_jobs)
+    requirements = pd.DataFrame({
+        'job_id': np.repeat(job_ids, skills_per_job),
+        'skill_id': rng.integers(1, n_skills + 1, size=skills_per_job.sum()),
+        'importance': rng.choice(['required', 'preferred'], size=skills_per_job.sum()),
+    })
+
+    salary_min = rng.integers(28000, 80000, size=n_jobs).astype(float)
+    salary_min[rng.random(n_jobs) < 0.3] = np.nan
+    experience = rng.choice(['工作經驗: 不拘', '工作經驗: 1年以上', '工作經驗: 3年以上', '工作經驗: 5年以上', None],
+                            size=n_jobs)
+    jobs = pd.DataFrame({
+        'job_id': job_ids,
+        'salary_min': salary_min,
+        'salary_max': salary_min + rng.integers(0, 30000, size=n_jobs),
+        'city': rng.choice(CITIES + [None], size=n_jobs),
+        'remote_option': rng.choice(['onsite', 'hybrid', 'remote'], p=[0.8, 0.15, 0.05], size=n_jobs),
+        'requirements': experience,
+    })
+
+    resumes = pd.DataFrame({
+        'resume_id': np.arange(1, n_resumes + 1),
+        'user_id': np.arange(1, n_resumes + 1),
+        'salary_min': rng.integers(30000, 70000, size=n_resumes),
+        'location': rng.choice(CITIES, size=n_resumes),
+        'years_of_experience': rng.integers(0, 10, size=n_resumes),
+    })
+    skills_per_user = rng.integers(3, 25, size=n_resumes)
+    user_skills = pd.DataFrame({
+        'user_id': np.repeat(resumes['user_id'].to_numpy(), skills_per_user),
+        'skill_id': rng.integers(1, n_skills + 1, size=skills_per_user.sum()),
+    })
+    return jobs, requirements, resumes, user_skills
+
+
+def reference_skill_score(requirements, user_skill_ids, job_id):
+    """逐筆 Python 版本的技能分數（驗證用）"""
+    req = requirements[requirements['job_id'] == job_id]
+    weights = {}
+    for skill_id, importance in zip(req['skill_id'], req['importance']):
+        weights[skill_id] = max(weights.get(skill_id, 0), 2.0 if importance == 'required' else 1.0)
+    total = sum(weights.values())
+    if total == 0:
+        return 0.0
+    return sum(w for s, w in weights.items() if s in user_skill_ids) / total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='job_matcher 效能測試')
+    parser.add_argument('--jobs', type=int, default=100000, help='職缺數')
+    parser.add_argument('--resumes', type=int, default=200, help='履歷數（批次評分用）')
+    parser.add_argument('--skills', type=int, default=800, help='技能種類數')
+    parser.add_argument('--top-k', type=int, default=50, help='每份履歷保留的職缺數')
+    parser.add_argument('--repeat', type=int, default=20, help='單一履歷評分的重複次數')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("job_matcher 效能測試")
+    print("=" * 60)
+
+    jobs_df, requirements_df, resumes_df, user_skills_df = generate_data(args.jobs, args.resumes, args.skills)
+    start = time.perf_counter()
+    vocab = SkillVocabulary(pd.concat([requirements_df['skill_id'], user_skills_df['skill_id']]))
+    jobs = build_job_arrays(jobs_df, requirements_df, vocab)
+    resumes = build_resume_arrays(resumes_df, user_skills_df, vocab)
+    print(f"職缺 {len(jobs)} 筆（技能需求 {len(jobs.skill_index)} 筆），履歷 {len(resumes)} 份，"
+          f"技能 {len(vocab)} 種；建立陣列 {time.perf_counter() - start:.2f}s")
+
+    # 1. 單一履歷
+    timings = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        idx, scores = top_k_for_resume(jobs, resumes, i % len(resumes), args.top_k)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    print(f"\n【單一履歷 x {len(jobs)} 筆職缺 + top-{args.top_k}】"
+          f" 中位數 {np.median(timings):.1f} ms，最慢 {timings.max():.1f} ms")
+
+    # 2. 多份履歷（分批矩陣評分）
+    start = time.perf_counter()
+    best_idx, best_score = top_k_for_resumes(jobs, resumes, args.top_k)
+    elapsed = time.perf_counter() - start
+    print(f"【{len(resumes)} 份履歷 x {len(jobs)} 筆職缺】 {elapsed:.2f}s"
+          f"（每份履歷 {elapsed / len(resumes) * 1000:.1f} ms）")
+
+    # 3. 驗證：兩種評分路徑一致，且技能分數與逐筆版本相同
+    single_idx, single_scores = top_k_for_resume(jobs, resumes, 0, args.top_k)
+    same_top = np.allclose(single_scores['overall'], best_score[0], atol=1e-5)
+    pair_scores = score_pairs(jobs, resumes, best_idx[0], np.zeros(len(best_idx[0]), dtype=np.int64))
+    user_skill_ids = set(user_skills_df.loc[user_skills_df['user_id'] == resumes_df['user_id'][0], 'skill_id'])
+    rng = random.Random(0)
+    sample = rng.sample(range(len(best_idx[0])), min(10, len(best_idx[0])))
+    same_skill = all(
+        abs(pair_scores['skill'][p] - reference_skill_score(requirements_df, user_skill_ids,
+                                                            jobs.job_ids[best_idx[0][p]])) < 1e-5
+        for p in sample
+    )
+    print(f"\n{'✓' if same_top else '✗'} 單一履歷與批次評分的 top-K 分數一致")
+    print(f"{'✓' if same_skill else '✗'} 技能分數與逐筆計算一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+KeywordMatcher 效能比較
+
+比較 cleaner.ipynb 原本「逐關鍵字 keyword in text」的三個分類器，
+與 keyword_matcher 共用一次掃描的版本（pyahocorasick / regex 兩種 backend），
+並確認三者的分類結果完全相同。
+
+執行方式:
+    python bench_keyword_matcher.py --rows 50000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from keyword_matcher import (
+    BACKEND_AHOCORASICK, BACKEND_REGEX, KeywordMatcher, ahocorasick, load_keyword_tables,
+)
+
+
+# ============================================
+# 原本的寫法（與 cleaner.ipynb 相同）
+# ============================================
+
+def notebook_classifiers(df, tables):
+    tech_keywords = [k for k, _ in tables['tech_keywords']]
+
+    def first(text, table, default):
+        for keyword, value in tables[table]:
+            if keyword in text:
+                return value
+        return default
+
+    def is_tech_related(row):
+        text = (str(row['job_category']) + ' ' + str(row['job_name']) + ' '
+                + str(row['job_description'])).lower()
+        return any(keyword in text for keyword in tech_keywords)
+
+    is_tech = df.apply(is_tech_related, axis=1)
+    industry = df['job_category'].map(
+        lambda x: None if pd.isna(x) else first(str(x).lower(), 'job_category_industry', '其他'))
+    from_name = df['company_name'].map(
+        lambda x: None if pd.isna(x) else first(str(x).lower(), 'company_name_industry', None))
+    return is_tech, industry, from_name
+
+
+def matcher_classifiers(df, matcher):
+    is_tech = matcher.any_match_frame(df, ['job_category', 'job_name', 'job_description'],
+                                      'tech_keywords')
+    industry = matcher.classify_series(df['job_category'], 'job_category_industry', default='其他')
+    from_name = matcher.classify_series(df['company_name'], 'company_name_industry')
+    return is_tech, industry, from_name
+
+
+# ============================================
+# 測試資料
+# ============================================
+
+FILLER = list('的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說產種面而方後多定行學法所民得經')
+CATEGORIES = ['軟體工程師', '客服人員', '業務專員', '行銷企劃', '美術設計', '品管人員', '會計',
+              '護理師', '國小教師', '門市人員', '資料分析師', 'AI 研究員', '生產技術員', None]
+COMPANY_SUFFIXES = ['科技股份有限公司', '醫院', '人壽保險', '商業銀行', '電子股份有限公司',
+                    '建設公司', '百貨', '大學', '餐飲有限公司', '貿易有限公司']
+
+
+def generate_rows(n, seed=42, description_length=600):
+    rng = random.Random(seed)
+    words = [k for k, _ in load_keyword_tables()['tech_keywords']] + ['銷售', '服務', '顧客', '門市']
+    companies = [f'{rng.choice(FILLER)}{rng.choice(FILLER)}{rng.choice(COMPANY_SUFFIXES)}'
+                 for _ in range(max(1, n // 20))]
+
+    def description():
+        chars = [rng.choice(FILLER) for _ in range(description_length)]
+        # 約一半的職缺描述帶有資訊科技關鍵字，放在隨機位置
+        if rng.random() < 0.5:
+            pos = rng.randrange(description_length)
+            chars[pos] = ' ' + rng.choice(words).upper() + ' '
+        return ''.join(chars)
+
+    return pd.DataFrame({
+        'company_name': [rng.choice(companies) for _ in range(n)],
+        'job_category': [rng.choice(CATEGORIES) for _ in range(n)],
+        'job_name': [rng.choice(['專員', '助理', '儲備幹部', 'Engineer', '主任']) for _ in range(n)],
+        'job_description': [description() for _ in range(n)],
+    })
+
+
+def same_values(a, b):
+    """逐列比較（忽略 dtype 差異，缺值一律視為 None）"""
+    def values(series):
+        return series.astype(object).where(series.notna(), None).tolist()
+    return values(a) == values(b)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='KeywordMatcher 效能比較')
+    parser.add_argument('--rows', type=int, default=50000, help='測試資料筆數')
+    parser.add_argument('--description-length', type=int, default=600, help='職缺描述字數')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("KeywordMatcher 效能比較")
+    print("=" * 60)
+
+    tables = load_keyword_tables()
+    df = generate_rows(args.rows, description_length=args.description_length)
+    print(f"測試資料: {len(df)} 筆，職缺描述 {args.description_length} 字")
+
+    expected, baseline = timed(notebook_classifiers, df, tables)
+    print(f"\n{'notebook (keyword in text)':<30} {baseline:8.2f}s  {len(df) / baseline:10,.0f} rows/s")
+
+    backends = [BACKEND_REGEX] + ([BACKEND_AHOCORASICK] if ahocorasick is not None else [])
+    for backend in backends:
+        matcher = KeywordMatcher(tables, backend=backend)  # 每個 backend 從空快取開始
+        got, elapsed = timed(matcher_classifiers, df, matcher)
+        same = all(same_values(a, b) for a, b in zip(expected, got))
+        print(f"{'KeywordMatcher (' + backend + ')':<30} {elapsed:8.2f}s  "
+              f"{len(df) / elapsed:10,.0f} rows/s  x{baseline / elapsed:.1f}  "
+              f"{'✓ 結果相同' if same else '✗ 結果不同'}")
+
+    if ahocorasick is None:
+        print("\n（未安裝 pyahocorasick，僅測試 regex backend：pip install pyahocorasick）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+批次寫入 Supabase 的共用模組
+
+把大量資料切成固定大小的批次，以有上限的並行度送出 upsert / insert，
+取代逐筆呼叫 supabase.table(...).update(...) 的寫法。
+
+特色：
+- batch_size 控制每次 HTTP 請求的筆數，max_workers 控制同時進行的請求數
+- 暫時性錯誤（網路錯誤、逾時、5xx、死結等，見 is_transient_error）以指數退避重試；
+  重試仍失敗、或是資料本身有問題的 4xx 錯誤（違反限制、欄位不存在等，重試結果必定相同）
+  則直接對半拆分，一路拆到單筆，因此最後只有真正有問題的資料列會被記錄在 failed_rows
+- 回傳 BulkWriteResult，包含寫入筆數、失敗資料列與 rows/sec
+
+使用方式:
+    from bulk_writer import bulk_write
+
+    result = bulk_write(supabase, 'job_posting', rows, on_conflict='job_id')
+    print(result.summary())
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from threading import Lock
+
+import httpx
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+
+
+# 重試可能成功的 SQLSTATE 類別：連線例外、交易回滾（死結 / 序列化失敗）、資源不足、
+# 操作中斷（statement timeout 等）、系統錯誤；PGRST000~003 為 PostgREST 連不到資料庫
+TRANSIENT_SQLSTATE_CLASSES = ('08', '40', '53', '57', '58')
+TRANSIENT_PGRST_CODES = ('PGRST000', 'PGRST001', 'PGRST002', 'PGRST003')
+
+
+def is_transient_error(error):
+    """
+    判斷寫入錯誤是否值得重試
+
+    網路錯誤與逾時、HTTP 429 / 5xx、上面列出的 SQLSTATE 與 PGRST 代碼為暫時性錯誤；
+    其他 PostgREST 錯誤（違反 NOT NULL / unique、欄位不存在、型態錯誤等 4xx）重試結果必定相同。
+    """
+    if isinstance(error, (httpx.TransportError, OSError)):
+        return True
+    if not isinstance(error, APIError):
+        return False
+    code = error.code
+    # 回應不是 JSON 時（例如 gateway 的 502 頁面），postgrest 以 HTTP 狀態碼作為 code
+    if isinstance(code, int) or (isinstance(code, str) and code.isdigit() and len(code) == 3):
+        return int(code) == 429 or int(code) >= 500
+    if not code:
+        return False
+    return code in TRANSIENT_PGRST_CODES or code[:2] in TRANSIENT_SQLSTATE_CLASSES
+
+
+@dataclass
+class BulkWriteResult:
+    """批次寫入結果統計"""
+    table: str
+    written: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    failed_rows: list = field(default_factory=list)  # [(row, 錯誤訊息), ...]
+    returned: list = field(default_factory=list)     # returning=True 時資料庫回傳的資料列
+
+    @property
+    def failed(self):
+        return len(self.failed_rows)
+
+    @property
+    def rows_per_second(self):
+        return self.written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"{self.table}: 寫入 {self.written} 筆, 失敗 {self.failed} 筆, "
+                f"{self.batches} 個批次, 重試 {self.retries} 次, "
+                f"耗時 {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+def iter_batches(rows, batch_size):
+    """將任意 iterable（含 generator）切成 list 批次，不會一次載入全部資料"""
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_write(supabase, table, rows, mode="upsert", on_conflict=None, batch_size=500,
+               max_workers=4, max_retries=3, backoff=0.5, returning=False,
+               default_to_null=True, progress=True):
+    """
+    將資料列批次寫入指定資料表
+
+    參數:
+        supabase: Supabase Client
+        table (str): 資料表名稱
+        rows (iterable[dict]): 要寫入的資料列，可以是 generator
+        mode (str): "upsert" 或 "insert"
+        on_conflict (str, optional): upsert 的衝突鍵，例如 'job_id'
+        batch_size (int): 每個批次的筆數
+        max_workers (int): 同時進行的請求數上限
+        max_retries (int): 每個批次遇到暫時性錯誤後的重試次數（不含第一次）
+        backoff (float): 第一次重試前等待秒數，之後每次加倍
+        returning (bool): 是否要求資料庫回傳寫入後的資料列（例如取得自動編號 id）
+        default_to_null (bool): 批次中缺少的欄位是否填 NULL（False 時使用欄位預設值）
+        progress (bool): 是否每完成一個批次印出進度
+
+    返回:
+        BulkWriteResult: 寫入統計；失敗資料列列於 failed_rows
+    """
+    if mode not in ("upsert", "insert"):
+        raise ValueError(f"不支援的寫入模式: {mode}")
+
+    result = BulkWriteResult(table=table)
+    lock = Lock()
+    return_method = ReturnMethod.representation if returning else ReturnMethod.minimal
+
+    def send(batch):
+        query = supabase.table(table)
+        if mode == "upsert":
+            query = query.upsert(batch, on_conflict=on_conflict or "", returning=return_method,
+                                 default_to_null=default_to_null)
+        else:
+            query = query.insert(batch, returning=return_method, default_to_null=default_to_null)
+        return query.execute()
+
+    def write_with_retry(batch):
+        delay = backoff
+        for attempt in range(max_retries + 1):
+            try:
+                return send(batch), None
+            except Exception as e:
+                error = e
+                if not is_transient_error(e):
+                    break
+                if attempt < max_retries:
+                    with lock:
+                        result.retries += 1
+                    time.sleep(delay)
+                    delay *= 2
+        return None, error
+
+    def write_batch(batch):
+        response, error = write_with_retry(batch)
+        if error is None:
+            with lock:
+                result.written += len(batch)
+                if returning and response.data:
+                    result.returned.extend(response.data)
+            return
+        if len(batch) == 1:
+            with lock:
+                result.failed_rows.append((batch[0], str(error)))
+            return
+        # 對半拆分，找出真正有問題的資料列
+        mid = len(batch) // 2
+        write_batch(batch[:mid])
+        write_batch(batch[mid:])
+
+    def finish(future):
+        future.result()
+        with lock:
+            result.batches += 1
+            if progress:
+                print(f"  批次 {result.batches}: 累計寫入 {result.written} 筆"
+                      f"（失敗 {len(result.failed_rows)} 筆）")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # 最多只讓 2 * max_workers 個批次排隊，避免 generator 輸入被一次吃進記憶體
+        pending = deque()
+        for batch in iter_batches(rows, batch_size):
+            pending.append(pool.submit(write_batch, batch))
+            if len(pending) >= max_workers * 2:
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    result.elapsed = time.perf_counter() - start
+    return result
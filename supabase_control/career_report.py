@@ -0,0 +1,365 @@
+"""
+職涯分析報告批次產生（CAREER_ANALYSIS_REPORT / SKILL_GAP）
+
+以 market_stats 的市場統計快照作為市場資料，一次替多份履歷產生報告，不再替每份報告掃描全部職缺：
+同一個目標市場（分群）的履歷組成 m x n 的技能程度矩陣（n 為該分群需求最高的 MARKET_SKILLS 個技能），
+與分群的需求率、薪資分位數、共現矩陣以向量化運算計算。
+
+資料來源:
+    履歷: resume -> user_skill（技能、proficiency_level、years_of_experience）、
+          career_survey（survey_id、期望薪資、地點偏好）、user_profile（所在地）
+    市場: market_stats 快照（python market_stats.py refresh）
+
+目標市場: 地點偏好（沒有時用個人檔案所在地）所在縣市的分群；該縣市職缺少於 MIN_SEGMENT_JOBS 筆時用全部職缺
+技能程度: proficiency_level（1~10）；沒有時依該技能年資推估，都沒有時為 DEFAULT_LEVEL；沒有該技能為 0
+
+計算（欄位為分群內需求最高的技能）:
+    需求率 demand        要求該技能的職缺比例
+    目標等級 target      依需求率在 TARGET_LEVEL_RANGE 內線性插值（越熱門的技能期望程度越高）
+    缺口 gap             max(0, target - 目前程度)
+    相鄰度 adjacency     Σ 已具備技能 i 的 P(要求 i | 要求該技能)（上限 1）；常一起出現的技能比較容易銜接
+    time_investment_hours  ceil(gap) x HOURS_PER_LEVEL x (1 - ADJACENCY_DISCOUNT x adjacency)
+    薪資溢價 premium     要求該技能的職缺薪資中位數 / 分群薪資中位數（沒有資料為 1）
+    skill_roi_score      需求率（%）x 薪資溢價 / 投入時間（每 100 小時）
+    priority_rank        同一份報告內依 skill_roi_score 由高到低
+    career_readiness_score  前 TOP_SKILLS 個熱門技能以需求率加權的 min(1, 目前程度 / 目標等級)，0~100
+
+執行方式:
+    python career_report.py                           # 所有履歷
+    python career_report.py --resume-ids 1 2 --dry-run
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import bulk_write
+from job_matcher import load_resumes, top_k_indices
+from market_stats import ALL_JOBS, DEFAULT_STATS_PATH, SALARY_BIN, MarketStats, histogram_percentiles
+from table_stream import read_table
+from tw_address import CITIES, parse_codes
+
+
+REPORT_ALGORITHM = 'market_stats_v1'
+
+MARKET_SKILLS = 500         # 每個分群只考慮需求最高的前 N 個技能
+TOP_SKILLS = 30             # career_readiness_score 以前 N 個熱門技能計算
+MAX_GAPS = 10               # 每份報告的 skill_gap 筆數上限
+MAX_STRENGTHS = 5
+MARKET_TOP = 10             # market_insights 列出的熱門技能數
+MIN_SEGMENT_JOBS = 200
+
+TARGET_LEVEL_RANGE = (5.0, 9.0)
+HOURS_PER_LEVEL = 40
+ADJACENCY_DISCOUNT = 0.5
+DEFAULT_LEVEL = 3
+MAX_LEVEL = 10
+
+
+# ============================================
+# 市場陣列
+# ============================================
+
+@dataclass
+class SegmentMarket:
+    """一個分群的稠密市場陣列（欄位為需求最高的技能，由多到少）"""
+    segment: int
+    name: str
+    jobs: int
+    skill_ids: np.ndarray          # int64, n
+    demand: np.ndarray             # float32, 需求率
+    target: np.ndarray             # float32, 目標等級
+    salary: np.ndarray             # float64, n x 3（P25 / P50 / P75，沒有資料為 NaN）
+    premium: np.ndarray            # float32, 薪資溢價
+    market_salary: np.ndarray      # float64, 3（整個分群的 P25 / P50 / P75）
+    market_cumulative: np.ndarray  # int64, 整個分群薪資直方圖的累計數（計算期望薪資的落點）
+    conditional: np.ndarray        # float32, n x n：[i, j] = P(要求技能 i | 要求技能 j)，對角線為 0
+
+    def __len__(self):
+        return len(self.skill_ids)
+
+    @classmethod
+    def load(cls, stats, segment, n_skills=MARKET_SKILLS):
+        skill_ids, counts = stats.demand(segment)
+        skill_ids, counts = skill_ids[:n_skills], counts[:n_skills]
+        jobs = stats.job_count(segment)
+        demand = (counts / max(jobs, 1)).astype(np.float32)
+        low, high = TARGET_LEVEL_RANGE
+        target = (low + (high - low) * demand / demand.max() if len(demand) else demand).astype(np.float32)
+
+        histograms = stats.salary_histograms(segment, np.concatenate([[ALL_JOBS], skill_ids]))
+        percentiles = histogram_percentiles(histograms)
+        market_salary, salary = percentiles[0], percentiles[1:]
+        premium = np.where(np.isnan(salary[:, 1]) | np.isnan(market_salary[1]), 1.0,
+                           salary[:, 1] / market_salary[1]).astype(np.float32)
+
+        conditional = stats.cooccurrence(segment, skill_ids).astype(np.float32) / np.maximum(counts, 1)
+        np.fill_diagonal(conditional, 0)
+        return cls(segment=segment, name=stats.segments[segment], jobs=jobs, skill_ids=skill_ids, demand=demand,
+                   target=target, salary=salary, premium=premium, market_salary=market_salary,
+                   market_cumulative=np.cumsum(histograms[0]), conditional=conditional)
+
+    def salary_share_above(self, expected_salary):
+        """薪資（級距中點）不低於期望薪資的職缺比例；期望薪資為 NaN 時為 NaN"""
+        total = self.market_cumulative[-1] if len(self.market_cumulative) else 0
+        if not total:
+            return np.full(len(expected_salary), np.nan)
+        bins = np.clip(np.nan_to_num(expected_salary) // SALARY_BIN, 0, len(self.market_cumulative) - 1)
+        before = np.concatenate([[0], self.market_cumulative])[bins.astype(np.int64)]
+        return np.where(np.isnan(expected_salary), np.nan, (total - before) / total)
+
+
+# ============================================
+# 計算
+# ============================================
+
+def _numeric(frame, name):
+    values = frame[name] if name in frame.columns else pd.Series(np.nan, index=frame.index)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def skill_levels(user_skills):
+    """
+    user_skill -> DataFrame(user_id, skill_id, level)，同一使用者的同一技能取最高程度
+
+    程度: proficiency_level（1~10）；沒有時 2 + 1.5 x 該技能年資；都沒有時 DEFAULT_LEVEL
+    """
+    skills = user_skills.dropna(subset=['user_id', 'skill_id'])
+    estimated = (2 + 1.5 * _numeric(skills, 'years_of_experience')).round()
+    level = _numeric(skills, 'proficiency_level').fillna(estimated).fillna(DEFAULT_LEVEL).clip(1, MAX_LEVEL)
+    levels = pd.DataFrame({'user_id': skills['user_id'].astype(np.int64),
+                           'skill_id': skills['skill_id'].astype(np.int64),
+                           'level': level.astype(np.float32)})
+    return levels.groupby(['user_id', 'skill_id'], as_index=False)['level'].max()
+
+
+def assign_segments(stats, locations, min_jobs=MIN_SEGMENT_JOBS):
+    """地點（縣市或地址）-> 分群代碼；無法辨識或職缺太少時為全部職缺"""
+    everything = stats.segment()
+    codes, _ = parse_codes(pd.Series(locations, dtype=object))
+    by_city = {}
+    for code in np.unique(codes[codes >= 0]):
+        segment = stats.segment('city', CITIES[code])
+        by_city[int(code)] = segment if segment is not None and stats.job_count(segment) >= min_jobs else everything
+    return np.array([by_city.get(int(code), everything) for code in codes], dtype=np.int64)
+
+
+def level_matrix(market, user_ids, levels):
+    """len(user_ids) x len(market) 的技能程度矩陣（沒有該技能為 0）"""
+    matrix = np.zeros((len(user_ids), len(market)), dtype=np.float32)
+    pairs = pd.DataFrame({'user_id': user_ids}).reset_index().merge(levels, on='user_id')
+    columns = pd.Index(market.skill_ids).get_indexer(pairs['skill_id'].to_numpy())
+    keep = columns >= 0
+    matrix[pairs['index'].to_numpy()[keep], columns[keep]] = pairs['level'].to_numpy()[keep]
+    return matrix
+
+
+def analyze(market, levels):
+    """
+    一批履歷對同一個分群的技能落差
+
+    參數:
+        market (SegmentMarket)
+        levels (np.ndarray): m x n 技能程度（level_matrix）
+
+    返回:
+        dict: gap / hours / roi（m x n）與 readiness（m）
+    """
+    has = (levels > 0).astype(np.float32)
+    gap = np.maximum(0, market.target - levels)
+    adjacency = np.minimum(1, has @ market.conditional)
+    hours = np.ceil(gap) * HOURS_PER_LEVEL * (1 - ADJACENCY_DISCOUNT * adjacency)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = np.where(hours > 0, market.demand * 100 * market.premium / (hours / 100), 0).astype(np.float32)
+
+    top = slice(0, min(TOP_SKILLS, len(market)))
+    weights = market.demand[top]
+    coverage = np.minimum(1, levels[:, top] / market.target[top])
+    readiness = (coverage @ weights / weights.sum() * 100 if weights.sum() > 0
+                 else np.zeros(len(levels), dtype=np.float32))
+    return {'gap': gap, 'hours': hours, 'roi': roi, 'readiness': readiness}
+
+
+def _salary(value):
+    return None if value is None or np.isnan(value) else int(value)
+
+
+def _market_insights(market, skill_names):
+    """同一分群共用的 market_insights 內容"""
+    top = range(min(MARKET_TOP, len(market)))
+    return {
+        'segment': market.name,
+        'job_count': market.jobs,
+        'salary_p25': _salary(market.market_salary[0]),
+        'salary_median': _salary(market.market_salary[1]),
+        'salary_p75': _salary(market.market_salary[2]),
+        'top_skills': [{'skill_id': int(market.skill_ids[j]), 'skill_name': skill_names.get(int(market.skill_ids[j])),
+                        'demand_rate': round(float(market.demand[j]), 4),
+                        'salary_median': _salary(market.salary[j, 1])} for j in top],
+    }
+
+
+def build_segment_reports(market, resumes, levels, skill_names, stats_built_at=None):
+    """
+    同一個分群的一批履歷 -> (報告, 每份報告的 skill_gap 資料列)
+
+    參數:
+        resumes (DataFrame): resume_id, user_id, survey_id, salary_min
+        levels (DataFrame): skill_levels() 的結果
+    """
+    matrix = level_matrix(market, resumes['user_id'].to_numpy(), levels)
+    result = analyze(market, matrix)
+    gap_idx = top_k_indices(result['roi'], MAX_GAPS)
+    strength_idx = top_k_indices(np.where(matrix > 0, market.demand, -1), MAX_STRENGTHS)
+    expected = _numeric(resumes, 'salary_min').to_numpy(dtype=np.float64)
+    share_above = market.salary_share_above(expected)
+    shared = _market_insights(market, skill_names)
+    survey_ids = _numeric(resumes, 'survey_id')
+
+    reports, gaps = [], []
+    for i, resume_id in enumerate(resumes['resume_id'].to_numpy()):
+        missing, report_gaps = [], []
+        for rank, j in enumerate(j for j in gap_idx[i] if result['roi'][i, j] > 0):
+            skill_id = int(market.skill_ids[j])
+            current, target = int(matrix[i, j]), int(np.ceil(market.target[j]))
+            missing.append({'skill_id': skill_id, 'skill_name': skill_names.get(skill_id), 'current_level': current,
+                            'target_level': target, 'demand_rate': round(float(market.demand[j]), 4)})
+            report_gaps.append({
+                'skill_id': skill_id,
+                'current_level': current,
+                'target_level': target,
+                'priority_rank': rank + 1,
+                'time_investment_hours': round(float(result['hours'][i, j]), 1),
+                'skill_roi_score': round(float(result['roi'][i, j]), 4),
+            })
+        strengths = [{'skill_id': int(market.skill_ids[j]), 'skill_name': skill_names.get(int(market.skill_ids[j])),
+                      'level': int(matrix[i, j]), 'demand_rate': round(float(market.demand[j]), 4)}
+                     for j in strength_idx[i] if matrix[i, j] > 0]
+        insights = dict(shared, stats_built_at=stats_built_at, expected_salary=_salary(expected[i]),
+                        jobs_meeting_expected_salary=None if np.isnan(share_above[i])
+                        else round(float(share_above[i]), 4))
+        reports.append({
+            'resume_id': int(resume_id),
+            'survey_id': None if pd.isna(survey_ids.iloc[i]) else int(survey_ids.iloc[i]),
+            'career_readiness_score': round(float(result['readiness'][i]), 2),
+            'skill_gap_analysis': {'algorithm': REPORT_ALGORITHM, 'segment': market.name,
+                                   'readiness_top_skills': min(TOP_SKILLS, len(market)),
+                                   'strengths': strengths, 'missing_skills': missing},
+            'market_insights': insights,
+        })
+        gaps.append(report_gaps)
+    return reports, gaps
+
+
+def generate_reports(stats, resumes, user_skills, skill_names=None, batch_size=2048):
+    """
+    所有履歷的報告：依目標分群分組，每組載入一次市場陣列、每 batch_size 份履歷做一次矩陣運算
+
+    參數:
+        stats (MarketStats)
+        resumes (DataFrame): load_resumes() 的結果（resume_id, user_id, survey_id, salary_min, location）
+        user_skills (DataFrame): user_skill（user_id, skill_id, proficiency_level, years_of_experience）
+
+    返回:
+        (list[dict], list[list[dict]]): 報告（與 resumes 同順序）與各報告的 skill_gap 資料列
+    """
+    resumes = resumes.drop_duplicates('resume_id').reset_index(drop=True)
+    location = resumes['location'] if 'location' in resumes.columns else pd.Series(None, index=resumes.index)
+    segments = assign_segments(stats, location)
+    levels = skill_levels(user_skills)
+    skill_names = skill_names or {}
+    reports, gaps = [None] * len(resumes), [None] * len(resumes)
+
+    for segment in np.unique(segments):
+        market = SegmentMarket.load(stats, int(segment))
+        members = np.flatnonzero(segments == segment)
+        for start in range(0, len(members), batch_size):
+            batch = members[start:start + batch_size]
+            batch_reports, batch_gaps = build_segment_reports(market, resumes.iloc[batch], levels, skill_names,
+                                                              stats.header.get('built_at'))
+            for i, report, report_gaps in zip(batch, batch_reports, batch_gaps):
+                reports[i], gaps[i] = report, report_gaps
+    return reports, gaps
+
+
+# ============================================
+# 資料庫讀寫
+# ============================================
+
+def load_skill_names(supabase):
+    skills = read_table(supabase, 'skill_master', 'skill_id, skill_name', 'skill_id')
+    return dict(zip(skills['skill_id'].astype(int), skills['skill_name'])) if not skills.empty else {}
+
+
+def write_reports(supabase, reports, gaps, batch_size=500, max_workers=4):
+    """寫入 career_analysis_report，再以回傳的 report_id 寫入 skill_gap"""
+    report = bulk_write(supabase, 'career_analysis_report', reports, mode='insert', returning=True,
+                        batch_size=batch_size, max_workers=max_workers, progress=False)
+    report_ids = {row['resume_id']: row['report_id'] for row in report.returned}
+
+    def gap_rows():
+        for row, report_gaps in zip(reports, gaps):
+            report_id = report_ids.get(row['resume_id'])
+            if report_id is None:
+                continue
+            for gap in report_gaps:
+                yield dict(gap, report_id=report_id)
+
+    gap = bulk_write(supabase, 'skill_gap', gap_rows(), mode='insert', batch_size=batch_size,
+                     max_workers=max_workers, progress=False)
+    return report, gap
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='批次產生職涯分析報告（career_analysis_report / skill_gap）')
+    parser.add_argument('--resume-ids', type=int, nargs='*', help='只產生指定 resume_id 的報告')
+    parser.add_argument('--stats', default=DEFAULT_STATS_PATH, help='市場統計快照路徑')
+    parser.add_argument('--report-batch-size', type=int, default=2048, help='每次矩陣運算的履歷數')
+    parser.add_argument('--batch-size', type=int, default=500, help='每個 insert 批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    parser.add_argument('--dry-run', action='store_true', help='只計算，不寫入資料庫')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("職涯分析報告（career_analysis_report / skill_gap）")
+    print("=" * 60)
+
+    stats = MarketStats.open(args.stats)
+    print(f"✓ 市場統計快照：{stats.job_count(stats.segment()):,} 筆職缺，{len(stats.segments)} 個分群"
+          f"（{stats.header['built_at']}）")
+
+    supabase = connect_to_supabase()
+    start = time.perf_counter()
+    resumes, user_skills = load_resumes(
+        supabase, args.resume_ids,
+        skill_columns='user_skill_id, user_id, skill_id, proficiency_level, years_of_experience')
+    skill_names = load_skill_names(supabase)
+    print(f"✓ 讀取 {len(resumes)} 份履歷、{len(user_skills)} 筆使用者技能（{time.perf_counter() - start:.2f}s）")
+    if resumes.empty:
+        print("❌ 沒有履歷")
+        return
+
+    start = time.perf_counter()
+    reports, gaps = generate_reports(stats, resumes, user_skills, skill_names, args.report_batch_size)
+    scores = np.array([r['career_readiness_score'] for r in reports])
+    print(f"✓ 產生 {len(reports)} 份報告、{sum(map(len, gaps))} 筆技能落差（{time.perf_counter() - start:.2f}s），"
+          f"平均職涯準備度 {scores.mean():.1f}")
+
+    if args.dry_run:
+        return
+    report, gap = write_reports(supabase, reports, gaps, args.batch_size, args.workers)
+    print(f"✓ {report.summary()}")
+    print(f"✓ {gap.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+職缺資料清理 pipeline（cleaner.ipynb 的可匯入、串流版本）
+
+把 cleaner.ipynb 中逐列 df.apply(..., axis=1) 的清理步驟，改寫成以 pandas 向量化字串運算
+與對照表處理整個 Series，並以 chunk 串流讀取原始 CSV，每個清理完的 chunk 立即寫出，
+記憶體用量不隨輸入大小成長。
+
+流程（對應 cleaner.ipynb）:
+    1. 過濾：只保留資訊科技相關職缺（is_tech_related）
+    2. 公司：依 company_name 統計最常見的 job_category，推斷產業（extract_industry_improved）
+    3. 職缺：clean_text、merge_requirements、地點拆分（tw_address）、remote_option、job_details、日期
+    4. 去重：(company_name, job_title, location) 重複時保留最後一筆，移除關鍵欄位為空的資料
+    5. 修正 ERD 欄位長度與型態
+
+跨 chunk 的去重需要知道「最後一筆」在哪裡，因此原始 CSV 會讀兩次：
+第一次只計算過濾結果、去重鍵的 hash 與公司統計，第二次才做完整清理並寫出。
+
+與 notebook 的差異：缺值維持 NULL，不會像 astype(str) 一樣變成 'nan' / 'None' 字串。
+
+執行方式:
+    python cleaner_pipeline.py clear_data_rows.csv \\
+        --companies-out companies_cleaned.csv --jobs-out jobs_cleaned.csv --chunksize 20000
+
+爬蟲（scrawler/crawl.py）邊爬邊以 iter_clean_batches 逐批清理，不需要中間 CSV。
+
+清理後以 incremental_ingest.py 增量匯入 Supabase（取代 cleaner.ipynb 階段七的全量 insert）:
+    python incremental_ingest.py jobs_cleaned.csv --companies companies_cleaned.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from keyword_matcher import get_cleaner_matcher, load_keyword_tables
+from perf_metrics import stage, start_run
+from tw_address import parse_location_frame
+
+
+# ============================================
+# 對照表（與 cleaner.ipynb 相同，順序代表優先順序）
+# ============================================
+
+# 產業與資訊科技關鍵字對照表定義在 keyword_tables.json（清單順序即優先順序），
+# 由 keyword_matcher 編譯成單一自動機，每段文字只掃描一次
+_KEYWORD_TABLES = load_keyword_tables()
+JOB_CATEGORY_INDUSTRY_MAP = _KEYWORD_TABLES['job_category_industry']    # 從 job_category 推斷產業
+COMPANY_NAME_INDUSTRY_MAP = _KEYWORD_TABLES['company_name_industry']    # 從公司名稱推斷產業（優先）
+TECH_KEYWORDS = [keyword for keyword, _ in _KEYWORD_TABLES['tech_keywords']]  # 資訊科技職缺關鍵字
+
+# headcount -> 公司規模（依序比對，第一個符合者為準）
+COMPANY_SIZE_RULES = [
+    (('1~2', '1-2'), '1-50'), (('2~4', '2-4'), '1-50'), (('3~5', '3-5'), '1-50'),
+    (('5~10', '5-10'), '1-50'), (('10~20', '10-20'), '1-50'), (('20~50', '20-50'), '1-50'),
+    (('50~100', '50-100'), '51-200'), (('100~200', '100-200'), '51-200'),
+    (('200~500', '200-500'), '201-500'), (('500', '501'), '501+'),
+]
+
+REQUIREMENT_FIELDS = [
+    ('work_exp', '工作經驗'), ('education', '學歷要求'), ('major', '科系要求'),
+    ('language', '語言能力'), ('skills', '技能要求'), ('tools', '工具要求'),
+    ('certificates', '證照要求'), ('other_requirements', '其他要求'),
+]
+
+DETAIL_FIELDS = ['work_time', 'vacation', 'start_work', 'business_trip',
+                 'legal_benefits', 'other_benefits', 'raw_benefits']
+
+# ERD 欄位長度限制
+COMPANY_LENGTH_LIMITS = {'company_name': 200, 'industry': 100}
+JOB_LENGTH_LIMITS = {'job_title': 200, 'location': 100, 'remote_option': 50, 'source_platform': 50}
+
+COMPANY_COLUMNS = ['company_name', 'industry', 'company_size', 'location', 'website', 'description']
+JOB_COLUMNS = [
+    'company_name', 'job_title', 'job_description', 'requirements', 'salary_min', 'salary_max',
+    'location', 'city', 'district', 'full_address', 'remote_option', 'job_details',
+    'source_platform', 'source_url', 'posted_date', 'scraped_at', 'is_active', 'is_embedded',
+    'vector_id',
+]
+DEDUP_KEYS = ['company_name', 'job_title', 'location']
+
+# json.dumps(..., ensure_ascii=False) 對控制字元的跳脫方式
+_JSON_CONTROL_ESCAPES = {chr(i): f'\\u{i:04x}' for i in range(32)}
+_JSON_CONTROL_ESCAPES.update({'\b': '\\b', '\f': '\\f', '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+
+# ============================================
+# 向量化清理函數
+# ============================================
+
+def _as_text(series, na=None):
+    """轉成 Python str 的 object Series（str(x) 的語意）；缺值以 na 取代"""
+    result = series.astype(object).where(series.notna(), na)
+    mask = result.notna()
+    result[mask] = result[mask].map(str)
+    return result
+
+
+def _none_series(index):
+    return pd.Series(None, index=index, dtype=object)
+
+
+def clean_text_series(series):
+    """清理文字：移除多餘空白、換行符、HTML 標籤；空值與空字串回傳 None"""
+    result = _none_series(series.index)
+    mask = series.notna()
+    text = _as_text(series[mask])
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+    text = text.str.replace(r'<[^>]+>', '', regex=True)
+    result[mask] = text.where(text != '', None)
+    return result
+
+
+def extract_industry_series(job_category):
+    """從 job_category 推斷產業類別；空值回傳 None，沒有符合的關鍵字回傳 '其他'"""
+    return get_cleaner_matcher().classify_series(job_category, 'job_category_industry', default='其他')
+
+
+def extract_industry_from_company_name_series(company_name):
+    """根據公司名稱推斷產業；沒有明顯特徵回傳 None"""
+    return get_cleaner_matcher().classify_series(company_name, 'company_name_industry')
+
+
+def extract_industry_improved_series(company_name, job_category):
+    """產業推斷：優先根據公司名稱，其次根據 job_category"""
+    from_name = extract_industry_from_company_name_series(company_name)
+    from_category = extract_industry_series(job_category)
+    return from_name.where(from_name.notna(), from_category)
+
+
+def parse_company_size_series(headcount):
+    """從 headcount 欄位解析公司規模；空值回傳 None，無法判斷時預設 '51-200'"""
+    text = _as_text(headcount, na='').str.strip()
+    conditions = []
+    for patterns, _ in COMPANY_SIZE_RULES:
+        cond = np.zeros(len(text), dtype=bool)
+        for pattern in patterns:
+            cond |= text.str.contains(pattern, regex=False).to_numpy(dtype=bool)
+        conditions.append(cond)
+    sizes = np.select(conditions, [size for _, size in COMPANY_SIZE_RULES], default='51-200')
+    result = pd.Series(sizes, index=headcount.index, dtype=object)
+    return result.where(headcount.notna(), None)
+
+
+def standardize_location_series(city, district, location):
+    """合併 city 與 district（以 '、' 連接）；兩者皆無時使用清理後的 location"""
+    city_text = _as_text(city, na='').str.strip()
+    district_text = _as_text(district, na='').str.strip()
+    has_city = city_text != ''
+    has_district = district_text != ''
+
+    joined = city_text.where(has_city, '')
+    joined = joined + np.where(has_city & has_district, '、', '') + district_text.where(has_district, '')
+    result = joined.where(has_city | has_district, None)
+    fallback = clean_text_series(location)
+    return result.where(has_city | has_district, fallback)
+
+
+def determine_remote_option_series(location, job_type=None):
+    """判斷遠端工作選項：remote / hybrid / onsite"""
+    text = _as_text(location, na='').str.lower()
+    remote = text.str.contains('遠端|remote|在家', regex=True).to_numpy(dtype=bool)
+    hybrid = text.str.contains('混合|hybrid|彈性', regex=True).to_numpy(dtype=bool)
+    options = np.select([remote, hybrid], ['remote', 'hybrid'], default='onsite')
+    return pd.Series(options, index=location.index, dtype=object)
+
+
+def _join_parts(parts, sep):
+    """將多個 Series（缺值代表略過）依序以 sep 串接；全部缺值時回傳 None"""
+    result = None
+    for part in parts:
+        if result is None:
+            result = part.copy()
+            continue
+        both = result.notna() & part.notna()
+        joined = result.where(~both, result + sep + part)
+        result = joined.where(joined.notna(), part)
+    return result.where(result.notna(), None)
+
+
+def merge_requirements_frame(df):
+    """合併所有要求欄位為單一 requirements 文字（'標籤: 內容'，以換行分隔）"""
+    parts = []
+    for field, label in REQUIREMENT_FIELDS:
+        if field not in df.columns:
+            continue
+        value = _as_text(df[field]).str.strip()
+        value = value.where(value.notna() & (value != ''), None)
+        parts.append((label + ': ' + value).where(value.notna(), None))
+    if not parts:
+        return _none_series(df.index)
+    return _join_parts(parts, '\n')
+
+
+def _json_string(series):
+    """與 json.dumps(str, ensure_ascii=False) 相同的字串跳脫"""
+    escaped = series.str.replace('\\', '\\\\', regex=False).str.replace('"', '\\"', regex=False)
+    escaped = escaped.str.replace(r'[\x00-\x1f]', lambda m: _JSON_CONTROL_ESCAPES[m.group(0)], regex=True)
+    return '"' + escaped + '"'
+
+
+def create_job_details_frame(df):
+    """建立 job_details JSON 字串（欄位順序與 notebook 相同）；沒有任何內容時回傳 None"""
+    parts = []
+    for field in DETAIL_FIELDS:
+        if field not in df.columns:
+            continue
+        raw = _as_text(df[field])
+        value = clean_text_series(df[field]).where(raw.notna() & (raw.str.strip() != ''), None)
+        parts.append((f'"{field}": ' + _json_string(value)).where(value.notna(), None))
+    if not parts:
+        return _none_series(df.index)
+    body = _join_parts(parts, ', ')
+    return ('{' + body + '}').where(body.notna(), None)
+
+
+def is_tech_related_frame(df):
+    """判斷是否為資訊科技相關職缺（job_category、job_name、job_description 含任一關鍵字）"""
+    return get_cleaner_matcher().any_match_frame(
+        df, ['job_category', 'job_name', 'job_description'], 'tech_keywords')
+
+
+# ============================================
+# 職缺清理（單一 chunk）
+# ============================================
+
+def clean_jobs_frame(df, source_platform='104人力銀行'):
+    """
+    清理一個 chunk 的職缺資料（已過濾為資訊科技職缺），輸出對應 JOB_POSTING 欄位的 DataFrame
+
+    不做跨 chunk 去重與空值移除；由 run_pipeline 或呼叫端處理。
+    """
+    location = df['location'] if 'location' in df.columns else _none_series(df.index)
+    location_text = _as_text(location)
+    parsed = parse_location_frame(location)
+
+    def column(name):
+        return df[name] if name in df.columns else _none_series(df.index)
+
+    jobs = pd.DataFrame({
+        'company_name': clean_text_series(column('company_name')),
+        'job_title': clean_text_series(column('job_name')),
+        'job_description': clean_text_series(column('job_description')),
+        'requirements': merge_requirements_frame(df),
+        'salary_min': pd.to_numeric(column('salary_min'), errors='coerce'),
+        'salary_max': pd.to_numeric(column('salary_max'), errors='coerce'),
+        'location': location_text,
+        'city': parsed['city'],
+        'district': parsed['district'],
+        'full_address': location_text,
+        'remote_option': determine_remote_option_series(location, column('job_type')),
+        'job_details': create_job_details_frame(df),
+        'source_platform': source_platform,
+        'source_url': clean_text_series(column('source_url')),
+        'posted_date': pd.to_datetime(column('update_date'), errors='coerce').dt.date,
+        'scraped_at': pd.to_datetime(column('created_at'), errors='coerce'),
+        'is_active': True,
+        'is_embedded': False,
+        'vector_id': None,
+    }, index=df.index)
+    return jobs
+
+
+def finalize_jobs_frame(jobs):
+    """移除關鍵欄位為空的資料，並修正 ERD 欄位長度與型態"""
+    jobs = jobs[
+        jobs['company_name'].notna() &
+        jobs['job_title'].notna() &
+        jobs['job_description'].notna()
+    ].copy()
+    # 公司名稱超過 200 字會在公司表被截斷，對應不到公司的職缺移除（與 notebook 相同）
+    jobs = jobs[jobs['company_name'].str.len() <= COMPANY_LENGTH_LIMITS['company_name']]
+
+    for field, max_length in JOB_LENGTH_LIMITS.items():
+        jobs[field] = jobs[field].where(jobs[field].isna(), jobs[field].str[:max_length])
+    jobs['salary_min'] = pd.to_numeric(jobs['salary_min'], errors='coerce').astype('Int64')
+    jobs['salary_max'] = pd.to_numeric(jobs['salary_max'], errors='coerce').astype('Int64')
+    jobs['is_active'] = jobs['is_active'].astype(bool)
+    jobs['is_embedded'] = jobs['is_embedded'].astype(bool)
+    return jobs[JOB_COLUMNS]
+
+
+def dedup_key_hash(jobs):
+    """(company_name, job_title, location) 去重鍵的 64-bit hash"""
+    return pd.util.hash_pandas_object(jobs[DEDUP_KEYS].astype(object), index=False).to_numpy()
+
+
+# ============================================
+# 公司彙總（跨 chunk 累計）
+# ============================================
+
+class CompanyAggregator:
+    """跨 chunk 累計每家公司各 job_category 出現次數，最後取眾數推斷產業"""
+
+    def __init__(self):
+        self.category_counts = {}   # (company_name, job_category) -> 次數
+        self.company_names = set()
+
+    def update(self, df):
+        names = df['company_name'].dropna()
+        self.company_names.update(names.unique().tolist())
+        if 'job_category' not in df.columns:
+            return
+        counts = df.groupby(['company_name', 'job_category']).size()
+        for key, count in counts.items():
+            self.category_counts[key] = self.category_counts.get(key, 0) + int(count)
+
+    def to_frame(self):
+        """輸出對應 COMPANY_INFO 欄位的公司資料（順序、去重方式與 notebook 相同）"""
+        names = sorted(self.company_names)
+        if self.category_counts:
+            counts = pd.Series(self.category_counts)
+            counts.index.names = ['company_name', 'job_category']
+            counts = counts.reset_index(name='count')
+            # 眾數：次數最多者；同票時取排序最前面的 job_category（與 Series.mode()[0] 相同）
+            counts = counts.sort_values(['company_name', 'count', 'job_category'],
+                                        ascending=[True, False, True], kind='mergesort')
+            modes = counts.drop_duplicates('company_name').set_index('company_name')['job_category']
+        else:
+            modes = pd.Series(dtype=object)
+
+        company_df = pd.DataFrame({'company_name': names})
+        company_df['job_category'] = company_df['company_name'].map(modes)
+
+        companies = pd.DataFrame({
+            'company_name': clean_text_series(company_df['company_name']),
+            'industry': extract_industry_improved_series(company_df['company_name'],
+                                                         company_df['job_category']),
+            'company_size': None,  # 不從 headcount 解析，設為 Null
+            'location': None,      # 不從爬下來的資料填入，設為 Null
+            'website': None,
+            'description': None,
+        })
+        companies = companies.drop_duplicates(subset=['company_name'])
+        companies = companies[companies['company_name'].notna()].copy()
+        for field, max_length in COMPANY_LENGTH_LIMITS.items():
+            companies[field] = companies[field].where(companies[field].isna(),
+                                                      companies[field].str[:max_length])
+        return companies[COMPANY_COLUMNS].reset_index(drop=True)
+
+
+# ============================================
+# 串流 pipeline
+# ============================================
+
+def read_raw_chunks(input_path, chunksize):
+    """以 chunk 讀取原始 CSV；文字欄位一律以字串讀入，避免各 chunk 推斷出不同型態"""
+    return pd.read_csv(input_path, chunksize=chunksize, dtype=str, encoding='utf-8-sig')
+
+
+def _scan_dedup_keys(input_path, chunksize, companies):
+    """
+    第一次讀取：計算過濾結果、去重鍵 hash 與公司統計
+
+    返回:
+        np.ndarray[bool]: 每一列原始資料是否為 (過濾後) 去重鍵的最後一筆
+        int: 原始資料總筆數
+    """
+    hashes, positions = [], []
+    offset = 0
+    for chunk in read_raw_chunks(input_path, chunksize):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+
+        tech = chunk[is_tech_related_frame(chunk)]
+        companies.update(tech)
+        keys = pd.DataFrame({
+            'company_name': clean_text_series(tech['company_name']),
+            'job_title': clean_text_series(tech['job_name']),
+            'location': _as_text(tech['location']),
+        })
+        hashes.append(dedup_key_hash(keys))
+        positions.append(tech.index.to_numpy())
+
+    keep = np.zeros(offset, dtype=bool)
+    if hashes:
+        all_hashes = np.concatenate(hashes)
+        all_positions = np.concatenate(positions)
+        # 依 hash 穩定排序後，每組的最後一筆就是原始順序中最後出現者
+        order = np.argsort(all_hashes, kind='stable')
+        sorted_hashes = all_hashes[order]
+        is_last = np.ones(len(order), dtype=bool)
+        is_last[:-1] = sorted_hashes[:-1] != sorted_hashes[1:]
+        keep[all_positions[order[is_last]]] = True
+    return keep, offset
+
+
+def iter_clean_batches(raw_batches, companies=None, source_platform='104人力銀行'):
+    """
+    逐批清理原始資料（例如 scrawler 爬蟲邊爬邊產生的 DataFrame），不需要中間 CSV
+
+    只讀一次，無法預先知道「最後一筆」，因此去重改為保留第一次出現者
+    （爬蟲大致依列表順序、由新到舊產生資料）。
+
+    參數:
+        raw_batches (iterable[DataFrame]): 欄位與 clear_data_rows.csv 相同的原始資料
+        companies (CompanyAggregator, optional): 一併累計公司統計
+
+    產生:
+        DataFrame: 清理後的職缺（JOB_COLUMNS），可能為空
+    """
+    seen = set()
+    for raw in raw_batches:
+        with stage('clean', rows=len(raw)):
+            tech = raw[is_tech_related_frame(raw)]
+            if companies is not None:
+                companies.update(tech)
+            jobs = finalize_jobs_frame(clean_jobs_frame(tech, source_platform))
+            hashes = dedup_key_hash(jobs)
+            first = (np.array([h not in seen for h in hashes], dtype=bool)
+                     & ~pd.Series(hashes).duplicated().to_numpy())
+            seen.update(hashes[first].tolist())
+        yield jobs[first]
+
+
+def run_pipeline(input_path, companies_out, jobs_out, chunksize=20000, verbose=True):
+    """
+    串流清理原始 CSV，輸出公司與職缺兩個 CSV（utf-8-sig）
+
+    參數:
+        input_path (str): 原始 CSV（例如 clear_data_rows.csv）
+        companies_out (str): 公司資料輸出路徑
+        jobs_out (str): 職缺資料輸出路徑
+        chunksize (int): 每個 chunk 的筆數
+        verbose (bool): 是否印出進度
+
+    返回:
+        dict: 統計資訊（raw_rows, jobs_written, companies_written, elapsed）
+    """
+    start = time.perf_counter()
+    companies = CompanyAggregator()
+
+    if verbose:
+        print("【第一次讀取】過濾資訊科技職缺、計算去重鍵...")
+    with stage('scan') as s:
+        keep, total_rows = _scan_dedup_keys(input_path, chunksize, companies)
+        s.rows = total_rows
+
+    if verbose:
+        print(f"  原始資料 {total_rows} 筆，過濾去重後候選 {int(keep.sum())} 筆")
+        print("【第二次讀取】清理職缺並逐 chunk 寫出...")
+
+    jobs_written = 0
+    offset = 0
+    with open(jobs_out, 'w', encoding='utf-8-sig', newline='') as f:
+        header = True
+        for chunk in read_raw_chunks(input_path, chunksize):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+
+            with stage('clean', rows=len(chunk)):
+                chunk = chunk[keep[chunk.index.to_numpy()]]
+                jobs = finalize_jobs_frame(clean_jobs_frame(chunk))
+            with stage('write_csv', rows=len(jobs)):
+                jobs.to_csv(f, index=False, header=header)
+            header = False
+            jobs_written += len(jobs)
+            if verbose:
+                print(f"  已處理 {offset} 筆，累計寫出 {jobs_written} 筆職缺")
+
+        if header:
+            pd.DataFrame(columns=JOB_COLUMNS).to_csv(f, index=False)
+
+    with stage('write_csv') as s:
+        company_frame = companies.to_frame()
+        company_frame.to_csv(companies_out, index=False, encoding='utf-8-sig')
+        s.rows = len(company_frame)
+
+    stats = {
+        'raw_rows': total_rows,
+        'jobs_written': jobs_written,
+        'companies_written': len(company_frame),
+        'elapsed': time.perf_counter() - start,
+    }
+    if verbose:
+        print(f"✓ 公司資料 {stats['companies_written']} 筆 -> {companies_out}")
+        print(f"✓ 職缺資料 {stats['jobs_written']} 筆 -> {jobs_out}")
+        print(f"✓ 耗時 {stats['elapsed']:.2f}s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='串流清理職缺 CSV（cleaner.ipynb 的向量化版本）')
+    parser.add_argument('input', help='原始 CSV 路徑，例如 clear_data_rows.csv')
+    parser.add_argument('--companies-out', default='companies_cleaned.csv', help='公司資料輸出路徑')
+    parser.add_argument('--jobs-out', default='jobs_cleaned.csv', help='職缺資料輸出路徑')
+    parser.add_argument('--chunksize', type=int, default=20000, help='每個 chunk 的筆數')
+    args = parser.parse_args(argv)
+    start_run('cleaner_pipeline')
+
+    print("=" * 60)
+    print("職缺資料清理 pipeline")
+    print("=" * 60)
+    run_pipeline(args.input, args.companies_out, args.jobs_out, chunksize=args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,633 @@
+"""
+公司名稱實體解析（company_info 去重）
+
+cleaner 以完整公司名稱建立 company_name -> company_id 對應，同一家公司常以不同寫法出現：
+`(捷普集團)綠點高新科技股份有限公司捷普設計服務分公司`、`(美商)…`、`104人力銀行_一零四資訊科技股份有限公司`、
+`英屬維京群島商…有限公司台灣分公司`，於是在 company_info 中變成多筆，職缺與配對結果被拆散。本模組：
+
+1. 名稱正規化（normalize_company_name）：NFKC、臺→台、去掉括號標籤、品牌前綴（`品牌_公司名`）、
+   外商前綴（美商、英屬維京群島商…）、公司類型（股份有限公司 / 有限公司…）及其後的分公司名稱、標點空白；
+   正規化後相同的名稱直接視為同一家公司
+2. 模糊比對只比對候選對：正規化名稱的字元 bigram 以 MinHash（numpy 向量化）產生簽章，
+   LSH 分成 bands 個區段，同一區段雜湊值相同的名稱才成為候選，再以實際 bigram Jaccard 驗證；
+   不做 O(n²) 兩兩比對，數十萬筆名稱在數秒內完成
+3. 以連通分量分群，每群取 company_id 最小的一筆為標準公司（canonical_id）
+4. 套用合併：只讀取被合併公司的職缺（job_id, company_id），以 bulk_writer 批次 upsert 改為 canonical_id；
+   標準公司缺少的產業、規模等欄位以被合併公司的資料補上；加上 --delete-merged 時刪除被合併的 company_info
+
+incremental_ingest.resolve_company_ids 也以 CompanyMatcher 把新名稱對應到既有公司，避免再建立重複的公司；
+既有公司的正規化名稱、簽章與 LSH 區段桶只建立一次，之後每批只處理新名稱。
+
+執行方式:
+    python company_resolver.py --dry-run                          # 只計算對應表，寫出 company_merges.csv
+    python company_resolver.py                                    # 套用合併（更新 job_posting.company_id）
+    python company_resolver.py --delete-merged                    # 並刪除被合併的 company_info
+    python company_resolver.py --csv companies_cleaned.csv        # 離線分群 CSV 中的公司名稱（不連線）
+
+合併後 job_catalog 快照中的 company_id 不會自動更新，請執行 python job_catalog.py build 重建。
+"""
+
+import argparse
+import re
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import bulk_write
+from table_stream import iter_frames, read_table
+
+
+COMPANY_FIELDS = ['industry', 'company_size', 'location', 'website', 'description']
+
+DEFAULT_THRESHOLD = 0.8    # bigram Jaccard 門檻
+DEFAULT_NUM_PERM = 32      # MinHash 簽章長度
+DEFAULT_BANDS = 8          # LSH 區段數（每段 num_perm / bands 列）
+DEFAULT_WINDOW = 50        # 同一區段雜湊值相同的名稱，只與排序後前後 window 筆比對
+MIN_FUZZY_LENGTH = 4       # 去掉產業字尾後短於此長度的名稱只做完全比對（富昇系統整合 / 南富昇系統整合 這類
+                           # 字號短、產業字尾長的名稱，bigram 幾乎相同卻是不同公司）
+IN_CHUNK_SIZE = 200        # in_ 篩選每次帶入的 id 數
+
+# 外商前綴（… 商），依長度由長到短比對
+_FOREIGN_ORIGINS = [
+    '英屬維京群島', '英屬開曼群島', '英屬蓋曼群島', '英屬安圭拉', '英屬百慕達', '英屬澤西島',
+    '開曼群島', '蓋曼群島', '維京群島', '馬紹爾群島', '庫克群島', '百慕達', '安圭拉', '模里西斯',
+    '塞席爾', '薩摩亞', '貝里斯', '巴拿馬', '汶萊', '紐西蘭', '新加坡', '馬來西亞', '印尼', '泰國',
+    '越南', '菲律賓', '印度', '以色列', '愛爾蘭', '盧森堡', '比利時', '荷蘭', '瑞士', '瑞典', '丹麥',
+    '芬蘭', '挪威', '奧地利', '義大利', '西班牙', '葡萄牙', '加拿大', '澳洲', '澳大利亞', '香港',
+    '澳門', '大陸', '中國', '美國', '日本', '韓國', '英國', '德國', '法國',
+    '美', '日', '韓', '英', '德', '法', '荷', '瑞',
+]
+_FOREIGN_PREFIX = re.compile(
+    '^(?:' + '|'.join(sorted(map(re.escape, _FOREIGN_ORIGINS), key=len, reverse=True)) + ')商')
+_BRACKETS = re.compile(r'[(\[【〔《<][^()\[\]【】〔〕《》<>]*[)\]】〕》>]')
+_ENTITY_MARKER = re.compile(r'公司|法人|株式会社|事務所|企業社|商行|工作室')
+_ORGANIZATION_PREFIX = re.compile(r'^(?:財團法人|社團法人)')
+_LEGAL_FORM = re.compile(r'股份有限公司|有限公司|無限公司|兩合公司|有限合夥')
+_BRANCH_SUFFIX = re.compile(r'(?:台灣|台北|台中|台南|高雄|新竹|桃園)?(?:分公司|分行|辦事處|營業所)$|公司$')
+_LATIN_LEGAL_SUFFIX = re.compile(
+    r'[\s,.]*(?:co\.?,?\s*ltd|company\s+limited|corporation|corp|limited|ltd|inc|llc|gmbh|pte|plc)\.?$')
+_NON_WORD = re.compile(r'[\W_]+')
+_GENERIC_SUFFIX = re.compile(
+    r'(?:科技|資訊|電子|數位|國際|工業|實業|企業|精密|光電|生醫|生技|網路|軟體|系統|整合|電機|電腦|通訊|顧問|'
+    r'設計|行銷|管理|開發|材料|機械|能源|工程|醫療|傳播|媒體|服務|貿易|物流|建設|餐飲)+$')
+
+
+# ============================================
+# 名稱正規化
+# ============================================
+
+def _pick_entity(name):
+    """`品牌_公司名`：取最後一段有公司 / 法人字樣的部分；都沒有時保留全部"""
+    parts = [part for part in name.split('_') if part.strip()]
+    if len(parts) > 1:
+        for part in reversed(parts):
+            if _ENTITY_MARKER.search(part):
+                return part
+    return ''.join(parts)
+
+
+def normalize_company_name(name):
+    """
+    公司名稱 -> 比對用的核心名稱
+
+    範例:
+        >>> normalize_company_name('(捷普集團)綠點高新科技股份有限公司捷普設計服務分公司')
+        '綠點高新科技'
+        >>> normalize_company_name('91APP_英屬開曼群島商九一應用軟體股份有限公司台灣分公司')
+        '九一應用軟體'
+    """
+    if name is None or (not isinstance(name, str) and pd.isna(name)):
+        return ''
+    text = unicodedata.normalize('NFKC', str(name)).replace('臺', '台').strip()
+    fallback = _NON_WORD.sub('', text.lower())
+
+    text = _BRACKETS.sub('', text)
+    text = _pick_entity(text).lower().replace('株式会社', '')
+    text = _ORGANIZATION_PREFIX.sub('', text.strip())
+    text = _FOREIGN_PREFIX.sub('', text)
+    legal = _LEGAL_FORM.search(text)
+    if legal and legal.start() > 0:
+        text = text[:legal.start()]   # 公司類型之後通常是分公司名稱
+    else:
+        text = _LATIN_LEGAL_SUFFIX.sub('', _BRANCH_SUFFIX.sub('', text))
+    return _NON_WORD.sub('', text) or fallback
+
+
+def normalize_names(names):
+    """批次正規化：相同的原始名稱只處理一次。返回與 names 等長的核心名稱陣列（object）"""
+    codes, uniques = pd.factorize(pd.Series(list(names), dtype=object), use_na_sentinel=False)
+    cores = np.array([normalize_company_name(name) for name in uniques], dtype=object)
+    return cores[codes]
+
+
+# ============================================
+# MinHash / LSH
+# ============================================
+
+def _mix(x):
+    """splitmix64 finalizer（uint64 陣列，溢位即取模）"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bigrams(cores):
+    """
+    每個名稱的字元 bigram（以兩個 code point 組成的 uint64）
+
+    返回:
+        (ndarray, ndarray): 所有 bigram 依名稱串接，以及每個名稱的第一個 bigram 的位置；
+        每個名稱至少要有兩個字元
+    """
+    lengths = np.fromiter(map(len, cores), dtype=np.int64, count=len(cores))
+    points = np.frombuffer(''.join(cores).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    owner = np.repeat(np.arange(len(cores)), lengths)
+    same = owner[:-1] == owner[1:]
+    grams = ((points[:-1] << np.uint64(21)) | points[1:])[same]
+    offsets = np.concatenate([[0], np.cumsum(lengths - 1)[:-1]])
+    return grams, offsets
+
+
+def minhash_signatures(cores, num_perm=DEFAULT_NUM_PERM, seed=1):
+    """字元 bigram 的 MinHash 簽章，shape (len(cores), num_perm)，uint64"""
+    grams, offsets = _bigrams(cores)
+    base = _mix(grams)
+    seeds = _mix(np.arange(1, num_perm + 1, dtype=np.uint64) * np.uint64(0x9e3779b97f4a7c15) + np.uint64(seed))
+    signatures = np.empty((len(cores), num_perm), dtype=np.uint64)
+    for k in range(num_perm):
+        signatures[:, k] = np.minimum.reduceat(_mix(base ^ seeds[k]), offsets)
+    return signatures
+
+
+def band_keys(signatures, bands=DEFAULT_BANDS):
+    """LSH 區段雜湊值：每個區段的 num_perm / bands 個簽章值合併成一個，shape (len(signatures), bands)"""
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    keys = np.zeros((n, bands), dtype=np.uint64)
+    for band in range(bands):
+        for column in range(band * rows, (band + 1) * rows):
+            keys[:, band] = _mix(keys[:, band] ^ signatures[:, column])
+    return keys
+
+
+def lsh_candidate_pairs(signatures, bands=DEFAULT_BANDS, window=DEFAULT_WINDOW):
+    """
+    LSH 候選對：任一區段的雜湊值相同者
+
+    同一區段雜湊值相同的名稱依雜湊值排序後，每筆只與其後 window 筆配對（sorted neighbourhood），
+    避免大量名稱落在同一個桶時產生平方數量的候選對。
+
+    返回:
+        ndarray: shape (k, 2) 的不重複候選對（左 < 右）
+    """
+    n = len(signatures)
+    keys = band_keys(signatures, bands)
+    codes = []
+    for band in range(bands):
+        key = keys[:, band]
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        for distance in range(1, min(window, n - 1) + 1):
+            same = key[:-distance] == key[distance:]
+            if not same.any():
+                break
+            left, right = order[:-distance][same], order[distance:][same]
+            codes.append(np.minimum(left, right) * n + np.maximum(left, right))
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.column_stack([codes // n, codes % n])
+
+
+def fuzzy_eligible(core, min_length=MIN_FUZZY_LENGTH):
+    """核心名稱去掉產業字尾（科技、資訊、系統整合…）後至少 min_length 個字才做模糊比對"""
+    return len(core) >= 2 and len(_GENERIC_SUFFIX.sub('', core)) >= min_length
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def _bigram_set(core):
+    return {core[j:j + 2] for j in range(len(core) - 1)}
+
+
+def fuzzy_pairs(cores, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                window=DEFAULT_WINDOW, min_length=MIN_FUZZY_LENGTH):
+    """
+    bigram Jaccard >= threshold 的名稱對（cores 不應有重複）
+
+    返回:
+        (ndarray, int): shape (k, 2) 的名稱對（cores 的索引）與 LSH 候選對數
+    """
+    cores = list(cores)
+    eligible = np.flatnonzero(np.fromiter((fuzzy_eligible(core, min_length) for core in cores), dtype=bool,
+                                          count=len(cores)))
+    if len(eligible) < 2:
+        return np.empty((0, 2), dtype=np.int64), 0
+    subset = [cores[i] for i in eligible]
+    candidates = lsh_candidate_pairs(minhash_signatures(subset, num_perm), bands, window)
+
+    # bigram 數的比例已低於門檻的候選對不可能通過，先排除
+    sizes = np.fromiter(map(len, subset), dtype=np.int64, count=len(subset)) - 1
+    small, large = np.sort(sizes[candidates], axis=1).T if len(candidates) else (sizes[:0], sizes[:0])
+    kept = candidates[small >= threshold * large]
+
+    shingles = {}
+
+    def bigram_set(i):
+        if i not in shingles:
+            shingles[i] = _bigram_set(subset[i])
+        return shingles[i]
+
+    matched = [(eligible[a], eligible[b]) for a, b in kept.tolist()
+               if _jaccard(bigram_set(a), bigram_set(b)) >= threshold]
+    return np.array(matched, dtype=np.int64).reshape(-1, 2), len(candidates)
+
+
+def connected_components(n, pairs):
+    """以最小標籤傳遞 + 指標跳躍求連通分量；返回每個節點所屬分量中最小的節點編號"""
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, low)
+        np.minimum.at(updated, right, low)
+        while True:   # 指標跳躍：labels[i] 指向更小的節點時一路往下
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+# ============================================
+# 分群
+# ============================================
+
+def resolve_companies(names, ids=None, fuzzy=True, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                      bands=DEFAULT_BANDS, window=DEFAULT_WINDOW, min_length=MIN_FUZZY_LENGTH, stats=None):
+    """
+    公司名稱分群
+
+    參數:
+        names (iterable[str]): 公司名稱
+        ids (iterable[int], optional): 對應的 company_id；None 時以位置編號代替
+        fuzzy (bool): 是否做 MinHash LSH 模糊比對（False 時只合併正規化後相同的名稱）
+        stats (dict, optional): 傳入時填入各步驟的筆數與耗時
+
+    返回:
+        DataFrame: company_id、company_name、normalized、canonical_id、canonical_name、
+        match（exact：正規化後相同、fuzzy：模糊比對、None：本身就是標準公司）
+    """
+    stats = stats if stats is not None else {}
+    start = time.perf_counter()
+    frame = pd.DataFrame({'company_name': pd.Series(list(names), dtype=object)})
+    frame.insert(0, 'company_id', np.arange(len(frame)) if ids is None else list(ids))
+    frame['normalized'] = normalize_names(frame['company_name'])
+    core_codes, cores = pd.factorize(frame['normalized'])
+    stats.update(names=len(frame), normalized=len(cores), normalize_seconds=time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pairs, candidates = (fuzzy_pairs(cores, threshold, num_perm, bands, window, min_length) if fuzzy
+                         else (np.empty((0, 2), dtype=np.int64), 0))
+    clusters = connected_components(len(cores), pairs)[core_codes]
+    stats.update(candidates=candidates, fuzzy_pairs=len(pairs), match_seconds=time.perf_counter() - start)
+
+    canonical = frame.groupby(clusters)['company_id'].transform('min')
+    frame['canonical_id'] = canonical.to_numpy()
+    canonical_rows = frame.drop_duplicates('company_id').set_index('company_id')
+    frame['canonical_name'] = frame['canonical_id'].map(canonical_rows['company_name'])
+    canonical_core = frame['canonical_id'].map(canonical_rows['normalized'])
+    frame['match'] = np.where(frame['company_id'] == frame['canonical_id'], None,
+                              np.where(frame['normalized'] == canonical_core, 'exact', 'fuzzy'))
+    stats.update(clusters=int(frame['canonical_id'].nunique()),
+                 merged=int((frame['company_id'] != frame['canonical_id']).sum()))
+    return frame
+
+
+class CompanyMatcher:
+    """
+    新公司名稱對應到既有公司的比對索引（incremental_ingest 建立公司前使用）
+
+    既有公司的核心名稱、分群（正規化後相同或模糊比對成立者為同一群，以 union-find 記錄）與
+    LSH 區段桶只在建立時計算一次，之後以 add() 加入新建立的公司；match() 只對傳入的新名稱
+    正規化、計算簽章並查詢區段桶，不會重新處理既有公司。
+    與 resolve_companies 的差別：每個名稱只與同一區段桶中最後加入的 window 個名稱比對（不排序整個桶）
+
+    參數:
+        id_to_name (dict, optional): 既有的 company_id -> company_name
+        其餘參數同 resolve_companies
+    """
+
+    def __init__(self, id_to_name=None, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                 bands=DEFAULT_BANDS, window=DEFAULT_WINDOW, min_length=MIN_FUZZY_LENGTH):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.window = window
+        self.min_length = min_length
+        self._index = {}       # 核心名稱 -> 編號
+        self._parent = []      # union-find
+        self._min_id = []      # 根節點：群中最小的 company_id
+        self._shingles = []    # 可做模糊比對的核心名稱的 bigram 集合，其餘為 None
+        self._buckets = [{} for _ in range(bands)]   # 區段雜湊值 -> 核心名稱編號
+        if id_to_name:
+            self.add(id_to_name)
+
+    def __len__(self):
+        return len(self._parent)
+
+    def _find(self, i):
+        root = i
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[i] != root:   # 路徑壓縮
+            self._parent[i], i = root, self._parent[i]
+        return root
+
+    def _union(self, a, b):
+        a, b = sorted((self._find(a), self._find(b)))
+        if a != b:
+            self._parent[b] = a
+            self._min_id[a] = min(self._min_id[a], self._min_id[b])
+
+    def _band_keys(self, cores):
+        """可做模糊比對的核心名稱 -> 各區段的雜湊值；其餘為 None"""
+        eligible = [i for i, core in enumerate(cores) if fuzzy_eligible(core, self.min_length)]
+        keys = [None] * len(cores)
+        if eligible:
+            signatures = minhash_signatures([cores[i] for i in eligible], self.num_perm)
+            for i, row in zip(eligible, band_keys(signatures, self.bands).tolist()):
+                keys[i] = row
+        return keys
+
+    def _similar(self, shingles, keys):
+        """區段桶中與 shingles 的 bigram Jaccard >= threshold 的核心名稱編號"""
+        found = set()
+        for band, key in enumerate(keys):
+            for i in self._buckets[band].get(key, ())[-self.window:]:
+                if i in found:
+                    continue
+                other = self._shingles[i]
+                small, large = sorted((len(shingles), len(other)))
+                if small >= self.threshold * large and _jaccard(shingles, other) >= self.threshold:
+                    found.add(i)
+        return found
+
+    def add(self, id_to_name):
+        """
+        加入公司（dict 或 (company_id, company_name) 的 iterable）；
+        與已加入的公司正規化後相同或模糊比對成立者併入同一群
+        """
+        pairs = list(id_to_name.items() if isinstance(id_to_name, dict) else id_to_name)
+        if not pairs:
+            return
+        cores = normalize_names(name for _, name in pairs)
+        new_cores = list(dict.fromkeys(core for core in cores if core not in self._index))
+        start = len(self._parent)
+        for i, core in enumerate(new_cores, start):
+            self._index[core] = i
+            self._parent.append(i)
+            self._min_id.append(None)
+            self._shingles.append(None)
+        for (company_id, _), core in zip(pairs, cores):
+            root = self._find(self._index[core])
+            company_id = int(company_id)
+            if self._min_id[root] is None or company_id < self._min_id[root]:
+                self._min_id[root] = company_id
+
+        for i, (core, keys) in enumerate(zip(new_cores, self._band_keys(new_cores)), start):
+            if keys is None:
+                continue
+            shingles = self._shingles[i] = _bigram_set(core)
+            for other in self._similar(shingles, keys):
+                self._union(i, other)
+            for band, key in enumerate(keys):
+                self._buckets[band].setdefault(key, []).append(i)
+
+    def match(self, names):
+        """
+        參數:
+            names (iterable[str]): 資料庫中沒有完全相同名稱的公司
+
+        返回:
+            (dict, dict): 對應到既有公司的 名稱 -> company_id；
+            只與其他新名稱同群的 名稱 -> 同群中要建立的代表名稱
+        """
+        # 最短的寫法通常沒有括號標籤或分公司，排在前面成為代表名稱
+        names = sorted({name for name in names if name is not None}, key=lambda name: (len(name), name))
+        if not names:
+            return {}, {}
+        cores = normalize_names(names)
+        unique = list(dict.fromkeys(cores))
+        codes = {core: k for k, core in enumerate(unique)}
+
+        # 每個新核心名稱對應到的既有公司（多群時取最小的 company_id）
+        existing = [None] * len(unique)
+        unknown = []
+        for k, core in enumerate(unique):
+            if core in self._index:
+                existing[k] = self._min_id[self._find(self._index[core])]
+            else:
+                unknown.append(k)
+        for k, keys in zip(unknown, self._band_keys([unique[k] for k in unknown])):
+            if keys is not None:
+                found = [self._min_id[self._find(i)] for i in self._similar(_bigram_set(unique[k]), keys)]
+                existing[k] = min(found, default=None)
+
+        # 新名稱之間的模糊比對；同群中任一名稱對應到既有公司時，整群都對應到最小的 company_id
+        pairs, _ = fuzzy_pairs(unique, self.threshold, self.num_perm, self.bands, self.window, self.min_length)
+        labels = connected_components(len(unique), pairs)
+        cluster_ids = {}
+        for label, company_id in zip(labels.tolist(), existing):
+            if company_id is not None:
+                cluster_ids[label] = min(cluster_ids.get(label, company_id), company_id)
+
+        matched, aliases, representatives = {}, {}, {}
+        for name, core in zip(names, cores):
+            label = int(labels[codes[core]])
+            if label in cluster_ids:
+                matched[name] = int(cluster_ids[label])
+                continue
+            canonical_name = representatives.setdefault(label, name)
+            if name != canonical_name:
+                aliases[name] = canonical_name
+        return matched, aliases
+
+
+def match_company_names(names, id_to_name, **options):
+    """
+    新公司名稱對應到既有公司（只比對一次時使用；逐批比對請建立 CompanyMatcher 重複使用）
+
+    參數:
+        names (iterable[str]): 資料庫中沒有完全相同名稱的公司
+        id_to_name (dict): 既有的 company_id -> company_name
+
+    返回:
+        (dict, dict): 同 CompanyMatcher.match
+    """
+    return CompanyMatcher(id_to_name, **options).match(names)
+
+
+# ============================================
+# 套用合併
+# ============================================
+
+def load_companies(supabase, page_size=1000):
+    return read_table(supabase, 'company_info', ['company_id', 'company_name'] + COMPANY_FIELDS, 'company_id',
+                      page_size=page_size)
+
+
+def _chunks(values, size=IN_CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _reassigned_jobs(supabase, id_map, page_size):
+    """只讀取 company_id 屬於被合併公司的職缺，產生 {job_id, company_id: canonical_id}"""
+    for chunk in _chunks(sorted(id_map)):
+        for jobs in iter_frames(supabase, 'job_posting', 'job_id, company_id', 'job_id', page_size=page_size,
+                                filters=[('in_', ('company_id', chunk))]):
+            for job_id, company_id in zip(jobs['job_id'], jobs['company_id']):
+                yield {'job_id': int(job_id), 'company_id': id_map[int(company_id)]}
+
+
+def fill_canonical_fields(companies, resolved):
+    """標準公司缺少的欄位以同群被合併公司（company_id 由小到大）的資料補上；返回要 upsert 的資料列"""
+    frame = companies.merge(resolved[['company_id', 'canonical_id']], on='company_id')
+    frame = frame.sort_values('company_id')
+    fields = [field for field in COMPANY_FIELDS if field in frame.columns]
+    merged = frame.groupby('canonical_id')[fields].first()   # 每欄第一個非空值
+    current = frame[frame['company_id'] == frame['canonical_id']].set_index('company_id')
+    records = []
+    for canonical_id in resolved.loc[resolved['match'].notna(), 'canonical_id'].unique():
+        row = current.loc[canonical_id]
+        filled = {field: merged.at[canonical_id, field] for field in fields
+                  if pd.isna(row[field]) and pd.notna(merged.at[canonical_id, field])}
+        if filled:
+            records.append({'company_id': int(canonical_id), 'company_name': row['company_name'], **filled})
+    return records
+
+
+def apply_merges(supabase, resolved, companies=None, delete_merged=False, batch_size=500, workers=4,
+                 page_size=1000):
+    """
+    套用分群結果
+
+    參數:
+        resolved (DataFrame): resolve_companies() 的結果
+        companies (DataFrame, optional): load_companies() 的結果（補上標準公司缺少的欄位）
+        delete_merged (bool): job_posting 全部更新成功後，刪除被合併的 company_info
+
+    返回:
+        dict: 各步驟的 BulkWriteResult 與刪除筆數
+    """
+    merged = resolved[resolved['company_id'] != resolved['canonical_id']]
+    id_map = {int(a): int(b) for a, b in zip(merged['company_id'], merged['canonical_id'])}
+    results = {}
+    if not id_map:
+        return results
+
+    results['job_posting'] = bulk_write(supabase, 'job_posting', _reassigned_jobs(supabase, id_map, page_size),
+                                        on_conflict='job_id', default_to_null=False, batch_size=batch_size,
+                                        max_workers=workers, progress=False)
+    if companies is not None:
+        records = fill_canonical_fields(companies, resolved)
+        if records:
+            results['company_info'] = bulk_write(supabase, 'company_info', records, on_conflict='company_id',
+                                                 default_to_null=False, batch_size=batch_size,
+                                                 max_workers=workers, progress=False)
+    if delete_merged and not results['job_posting'].failed:
+        deleted = 0
+        for chunk in _chunks(sorted(id_map)):
+            supabase.table('company_info').delete().in_('company_id', chunk).execute()
+            deleted += len(chunk)
+        results['deleted'] = deleted
+    return results
+
+
+def print_clusters(resolved, limit=10):
+    """印出成員最多的幾個群"""
+    merged = resolved[resolved['match'].notna()]
+    for canonical_id, size in merged['canonical_id'].value_counts().head(limit).items():
+        members = resolved[resolved['canonical_id'] == canonical_id]
+        print(f"  [{canonical_id}] {members['canonical_name'].iloc[0]}（{size + 1} 筆）")
+        for name, match in zip(members['company_name'], members['match']):
+            if match is not None:
+                print(f"      {'≈' if match == 'fuzzy' else '='} {name}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='公司名稱實體解析（company_info 去重）')
+    parser.add_argument('--csv', default=None, help='離線分群 CSV（company_name 欄）中的公司名稱，不連線資料庫')
+    parser.add_argument('--output', default='company_merges.csv', help='分群結果輸出路徑')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='bigram Jaccard 門檻')
+    parser.add_argument('--exact-only', action='store_true', help='只合併正規化後完全相同的名稱')
+    parser.add_argument('--dry-run', action='store_true', help='只計算並輸出對應表，不寫入資料庫')
+    parser.add_argument('--delete-merged', action='store_true', help='刪除被合併的 company_info')
+    parser.add_argument('--batch-size', type=int, default=500, help='每個寫入批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("公司名稱實體解析")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    if args.csv:
+        supabase = None
+        companies = pd.read_csv(args.csv, encoding='utf-8-sig')
+        ids = companies['company_id'] if 'company_id' in companies.columns else None
+    else:
+        from supabase_connection import connect_to_supabase
+
+        supabase = connect_to_supabase()
+        companies = load_companies(supabase)
+        ids = companies['company_id']
+    print(f"✓ 讀取 {len(companies)} 家公司")
+
+    stats = {}
+    resolved = resolve_companies(companies['company_name'], ids, fuzzy=not args.exact_only,
+                                 threshold=args.threshold, stats=stats)
+    print(f"✓ 正規化後 {stats['normalized']} 個名稱（{stats['normalize_seconds']:.2f}s）；"
+          f"LSH 候選 {stats['candidates']} 對、模糊比對成立 {stats['fuzzy_pairs']} 對（{stats['match_seconds']:.2f}s）")
+    print(f"✓ 分成 {stats['clusters']} 家公司，{stats['merged']} 筆將合併到標準公司")
+    print_clusters(resolved)
+
+    merges = resolved[resolved['match'].notna()]
+    merges[['company_id', 'company_name', 'canonical_id', 'canonical_name', 'match']].to_csv(
+        args.output, index=False, encoding='utf-8-sig')
+    print(f"✓ 對應表 -> {args.output}")
+
+    if supabase is None or args.dry_run:
+        print(f"\n（未寫入，耗時 {time.perf_counter() - start:.2f}s）")
+        return
+
+    results = apply_merges(supabase, resolved, companies, delete_merged=args.delete_merged,
+                           batch_size=args.batch_size, workers=args.workers)
+    for name, result in results.items():
+        if name == 'deleted':
+            print(f"  company_info: 刪除 {result} 筆被合併的公司")
+            continue
+        print(f"  {name}: {result.summary()}")
+        for row, error in result.failed_rows[:3]:
+            print(f"    ✗ {row}: {error}")
+    if results:
+        print("  請執行 python job_catalog.py build 重建職缺目錄快照")
+    print(f"\n✓ 完成，耗時 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+"""
+增量、偵測內容變更的職缺匯入
+
+cleaner.ipynb 階段七每次都把整份爬蟲結果以 100 筆一批 insert（jobs_to_insert），批次失敗再逐筆 insert：
+沒有變動的職缺被重寫一次、重複資料越積越多，內容變了 is_embedded 也不會被重設。
+本模組改為比對指紋後只寫入有差異的資料：
+
+- 身分鍵（source_key）：有 source_url 時為 url，否則為 company_name + job_title + 地址
+  （與 cleaner_pipeline 的去重鍵 DEDUP_KEYS 相同；公司名稱取 company_resolver 的核心名稱），正規化後取 sha256
+- 內容指紋（content_hash）：職稱、描述、要求、薪資、地址、遠端選項與 job_details 正規化後的 sha256；
+  posted_date / scraped_at 每次爬都會變，不列入
+- 資料庫既有指紋以 keyset 分頁一次讀出（只讀身分欄位與 content_hash），不逐筆查詢
+- 新職缺 insert；內容有變的職缺以 job_id upsert 並把 is_embedded 設回 false（embedding_indexer 下一輪重新 encode）；
+  內容相同但已下架的職缺重新上架；這次沒爬到的職缺（同一個 source_platform）標為 is_active = false；
+  資料庫中身分鍵重複的職缺只保留 job_id 最小的一筆，其餘標為 is_active = false
+- 資料庫沒有完全相同名稱的公司，先以 company_resolver 對應到既有公司的其他寫法，仍找不到才建立
+- 所有寫入都是 bulk_writer.bulk_write 的批次 insert / upsert
+- ingest_job_batches 逐批比對與寫入（scrawler/crawl.py --ingest），記憶體中不保留整份爬蟲結果
+
+content_hash 存在 job_posting 的專用欄位（不放進前端會讀到的 job_details），第一次執行前需要新增欄位:
+
+    ALTER TABLE job_posting ADD COLUMN content_hash character varying;
+
+尚未有指紋的舊資料第一次執行時會被視為內容有變而更新一次，舊版寫在 job_details._ingest 的指紋也隨之被覆蓋。
+
+執行方式:
+    python incremental_ingest.py jobs_cleaned.csv --companies companies_cleaned.csv
+    python incremental_ingest.py jobs_cleaned.csv --dry-run          # 只比對與統計，不寫入
+    python incremental_ingest.py jobs_cleaned.csv --keep-missing     # 不下架這次沒爬到的職缺
+    python incremental_ingest.py jobs_cleaned.csv --unchanged jobs_unchanged.txt   # scrawler 未重新解析的職缺
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from bulk_writer import BulkWriteResult, bulk_write
+from company_resolver import CompanyMatcher, normalize_company_name
+from perf_metrics import stage, start_run
+from skill_extractor import normalize_text
+from table_stream import frame_records, read_table
+
+
+DEFAULT_SOURCE_PLATFORM = '104人力銀行'
+
+CONTENT_FIELDS = ['job_title', 'job_description', 'requirements', 'salary_min', 'salary_max',
+                  'full_address', 'remote_option', 'job_details']
+WRITE_COLUMNS = ['company_id', 'job_title', 'job_description', 'requirements', 'salary_min', 'salary_max',
+                 'location', 'city', 'district', 'full_address', 'remote_option', 'job_details',
+                 'source_platform', 'source_url', 'posted_date', 'scraped_at', 'is_active', 'is_embedded',
+                 'content_hash']
+STORED_COLUMNS = 'job_id, company_id, job_title, location, full_address, source_url, is_active, content_hash'
+
+
+# ============================================
+# 指紋
+# ============================================
+
+def _is_missing(value):
+    return value is None or (not isinstance(value, (dict, list)) and pd.isna(value))
+
+
+def _normalize(value):
+    if _is_missing(value):
+        return ''
+    if isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return normalize_text(value)
+
+
+def _digest(parts):
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def source_key(source_url, company_name, job_title, address):
+    """
+    職缺身分鍵：有 source_url 時以 url 為準，否則為公司 + 職稱 + 地址
+
+    公司名稱取 company_resolver 的核心名稱：company_resolver 合併公司後，資料庫中的職缺改掛在標準公司名下，
+    爬到的仍是原本的寫法，兩者的身分鍵必須相同
+    """
+    if not _is_missing(source_url) and str(source_url).strip():
+        return _digest(['url', _normalize(source_url)])
+    return _digest(['job', normalize_company_name(company_name), _normalize(job_title), _normalize(address)])
+
+
+def content_hash(row):
+    """職缺內容指紋（row 為 dict，job_details 可為 dict 或 JSON 字串）"""
+    return _digest([_normalize(row.get(name)) for name in CONTENT_FIELDS])
+
+
+def _address(frame):
+    # update_location 會把 location 清成 NULL、完整地址留在 full_address
+    full = frame['full_address'] if 'full_address' in frame.columns else pd.Series(None, index=frame.index)
+    return full.where(full.notna(), frame['location'] if 'location' in frame.columns else None)
+
+
+def _parse_job_details(value):
+    if _is_missing(value) or isinstance(value, dict):
+        return None if _is_missing(value) else value
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+# ============================================
+# 讀取
+# ============================================
+
+def load_scraped_jobs(path):
+    """讀取 cleaner_pipeline 輸出的職缺 CSV（見 prepare_scraped_jobs）"""
+    jobs = pd.read_csv(path, dtype=str, encoding='utf-8-sig', keep_default_na=False, na_values=[''])
+    return prepare_scraped_jobs(jobs)
+
+
+def prepare_scraped_jobs(jobs):
+    """
+    cleaner_pipeline 輸出的職缺（CSV 讀入或 iter_clean_batches 產生的 DataFrame），加上 source_key 與 content_hash
+
+    同一個身分鍵出現多次時保留最後一筆。
+    """
+    jobs = jobs.astype(object).where(jobs.notna(), None)
+    for name in ('posted_date', 'scraped_at'):   # 與讀 CSV 時相同的字串表示
+        if name in jobs.columns:
+            jobs[name] = jobs[name].map(lambda value: None if value is None else str(value))
+    for name in ('salary_min', 'salary_max'):
+        if name in jobs.columns:
+            jobs[name] = pd.to_numeric(jobs[name], errors='coerce').astype('Int64').astype(object)
+            jobs[name] = jobs[name].where(jobs[name].notna(), None)
+    jobs['job_details'] = jobs['job_details'].map(_parse_job_details) if 'job_details' in jobs.columns else None
+
+    address = _address(jobs)
+    jobs['source_key'] = [
+        source_key(url, company, title, addr)
+        for url, company, title, addr in zip(jobs.get('source_url', [None] * len(jobs)), jobs['company_name'],
+                                              jobs['job_title'], address)
+    ]
+    jobs['content_hash'] = [content_hash(row) for row in jobs[[c for c in CONTENT_FIELDS if c in jobs.columns]]
+                            .to_dict('records')]
+    return jobs.drop_duplicates('source_key', keep='last').reset_index(drop=True)
+
+
+def load_company_ids(supabase):
+    """company_info 的 company_name -> company_id 與 company_id -> company_name（同名公司取最小的 id）"""
+    existing = read_table(supabase, 'company_info', 'company_id, company_name', 'company_id')
+    id_to_name = dict(zip(existing['company_id'], existing['company_name']))
+    name_to_id = {}
+    for company_id, name in id_to_name.items():   # 依 company_id 排序
+        name_to_id.setdefault(name, company_id)
+    return name_to_id, id_to_name
+
+
+def resolve_company_ids(supabase, company_names, companies=None, batch_size=500, workers=4, match_variants=True,
+                        known=None, matcher=None):
+    """
+    company_name -> company_id；資料庫沒有的公司以批次 insert 建立
+
+    參數:
+        company_names (iterable[str]): 需要 company_id 的公司名稱
+        companies (DataFrame, optional): cleaner_pipeline 的公司資料（新公司以此建立，否則只寫入名稱）
+        match_variants (bool): 以 company_resolver 把名稱的其他寫法（括號標籤、分公司、外商前綴…）
+            對應到既有公司；同一家公司的多種新寫法只建立一筆
+        known (tuple, optional): 已讀出的 load_company_ids() 結果，會就地加入新的對應；None 時重新讀取
+        matcher (CompanyMatcher, optional): 以 known 的既有公司建立的比對索引，會就地加入新建立的公司；
+            逐批呼叫時重複使用，不必每批重新正規化與雜湊所有既有公司。None 時臨時建立
+
+    返回:
+        (dict, dict, int): company_name -> company_id、company_id -> company_name、新建立的公司數
+    """
+    name_to_id, id_to_name = known if known is not None else load_company_ids(supabase)
+    missing = sorted({n for n in company_names if n is not None} - set(name_to_id))
+    aliases = {}
+    if missing and match_variants:
+        if matcher is None:
+            matcher = CompanyMatcher(id_to_name)
+        matched, aliases = matcher.match(missing)
+        name_to_id.update(matched)
+        missing = [n for n in missing if n not in matched and n not in aliases]
+    if not missing:
+        return name_to_id, id_to_name, 0
+
+    if companies is not None and not companies.empty:
+        rows = companies[companies['company_name'].isin(missing)].drop_duplicates('company_name')
+        known = set(rows['company_name'])
+        records = frame_records(rows) + [{'company_name': n} for n in missing if n not in known]
+    else:
+        records = [{'company_name': n} for n in missing]
+    result = bulk_write(supabase, 'company_info', records, mode='insert', returning=True,
+                        default_to_null=False, batch_size=batch_size, max_workers=workers, progress=False)
+    for row in result.returned:
+        name_to_id.setdefault(row['company_name'], row['company_id'])
+        id_to_name[row['company_id']] = row['company_name']
+    if matcher is not None:
+        matcher.add((row['company_id'], row['company_name']) for row in result.returned)
+    for name, canonical_name in aliases.items():
+        if canonical_name in name_to_id:
+            name_to_id[name] = name_to_id[canonical_name]
+    return name_to_id, id_to_name, len(result.returned)
+
+
+def load_stored_fingerprints(supabase, id_to_name, source_platform=DEFAULT_SOURCE_PLATFORM, page_size=1000):
+    """
+    以 keyset 分頁讀取同一個來源平台既有職缺的身分欄位與指紋
+
+    返回:
+        DataFrame: job_id、source_key、content_hash（沒有指紋時為 None）、is_active
+    """
+    stored = read_table(supabase, 'job_posting', STORED_COLUMNS, 'job_id', page_size=page_size,
+                        filters=[('eq', ('source_platform', source_platform))])
+    stored = stored.astype(object).where(stored.notna(), None)
+    stored['is_active'] = stored['is_active'].map(lambda value: value is not False)   # NULL 視為上架（欄位預設 true）
+    company_names = stored['company_id'].map(id_to_name)
+    address = _address(stored)
+    stored['source_key'] = [
+        source_key(url, company, title, addr)
+        for url, company, title, addr in zip(stored['source_url'], company_names, stored['job_title'], address)
+    ]
+    return stored[['job_id', 'source_key', 'content_hash', 'is_active']]
+
+
+# ============================================
+# 比對
+# ============================================
+
+@dataclass
+class IngestPlan:
+    """比對結果：各類要寫入的資料"""
+    inserts: pd.DataFrame                          # 新職缺（scraped 資料列）
+    updates: pd.DataFrame                          # 內容有變的職缺（scraped 資料列 + job_id）
+    reactivate: list = field(default_factory=list)  # 內容相同、重新上架的 job_id
+    deactivate: list = field(default_factory=list)  # 這次沒爬到的 job_id
+    duplicates: list = field(default_factory=list)  # 資料庫中身分鍵重複的 job_id
+    unchanged: int = 0
+
+    def summary(self):
+        return (f"新增 {len(self.inserts)} 筆、內容變更 {len(self.updates)} 筆、未變更 {self.unchanged} 筆"
+                f"（重新上架 {len(self.reactivate)} 筆）、下架 {len(self.deactivate)} 筆、"
+                f"重複 {len(self.duplicates)} 筆")
+
+
+def split_duplicates(stored):
+    """
+    資料庫中身分鍵重複的職缺只保留 job_id 最小的一筆
+
+    返回:
+        (DataFrame, list): 去重後的既有指紋、其餘仍上架的重複 job_id
+    """
+    stored = stored.sort_values('job_id', kind='stable')
+    is_duplicate = stored['source_key'].duplicated(keep='first')
+    return stored[~is_duplicate], stored.loc[is_duplicate & stored['is_active'], 'job_id'].tolist()
+
+
+def plan_batch(scraped, stored):
+    """
+    比對一批爬蟲結果與既有指紋（stored 需先經過 split_duplicates）：新增、內容變更與重新上架，不處理下架
+    """
+    merged = scraped.merge(stored.rename(columns={'content_hash': 'stored_hash', 'is_active': 'stored_active'}),
+                           on='source_key', how='left', indicator=True)
+    found = merged['_merge'] == 'both'
+    changed = found & (merged['content_hash'] != merged['stored_hash'])
+    unchanged = found & ~changed
+    return IngestPlan(
+        inserts=scraped[~found.to_numpy()].reset_index(drop=True),
+        updates=merged[changed].drop(columns=['stored_hash', 'stored_active', '_merge']).reset_index(drop=True),
+        reactivate=merged.loc[unchanged & merged['stored_active'].eq(False), 'job_id'].tolist(),
+        unchanged=int(unchanged.sum()),
+    )
+
+
+def plan_missing(stored, scraped_keys, deactivate_missing=True, seen_keys=()):
+    """
+    這次沒有重新解析的既有職缺（stored 需先經過 split_duplicates）：
+    有爬到但頁面未變更者（seen_keys）視為未變更、必要時重新上架，其餘沒爬到的職缺下架
+    """
+    not_scraped = ~stored['source_key'].isin(scraped_keys)
+    seen = not_scraped & stored['source_key'].isin(set(seen_keys))
+    missing = stored[not_scraped & ~seen & stored['is_active']]
+    return IngestPlan(
+        inserts=pd.DataFrame(),
+        updates=pd.DataFrame(),
+        reactivate=stored.loc[seen & ~stored['is_active'], 'job_id'].tolist(),
+        deactivate=missing['job_id'].tolist() if deactivate_missing else [],
+        unchanged=int(seen.sum()),
+    )
+
+
+def plan_ingest(scraped, stored, deactivate_missing=True, seen_keys=()):
+    """
+    比對爬蟲結果與資料庫既有指紋
+
+    參數:
+        scraped (DataFrame): load_scraped_jobs() 的結果
+        stored (DataFrame): load_stored_fingerprints() 的結果
+        deactivate_missing (bool): 是否下架這次沒爬到的職缺
+        seen_keys (iterable[str]): 這次有爬到、但頁面未變更而沒有重新解析的身分鍵
+            （爬蟲條件式請求 304 / 內容 hash 相同）；視為未變更，不會被下架
+    """
+    stored, duplicates = split_duplicates(stored)
+    plan = plan_batch(scraped, stored)
+    rest = plan_missing(stored, scraped['source_key'], deactivate_missing, seen_keys)
+    plan.reactivate += rest.reactivate
+    plan.deactivate = rest.deactivate
+    plan.duplicates = duplicates
+    plan.unchanged += rest.unchanged
+    return plan
+
+
+# ============================================
+# 寫入
+# ============================================
+
+def _job_records(jobs, name_to_id, include_id=False, skipped=None):
+    """scraped 資料列 -> job_posting 資料列（含 content_hash；找不到公司的職缺略過，並加入 skipped）"""
+    for row in jobs.to_dict('records'):
+        company_id = name_to_id.get(row.get('company_name'))
+        if company_id is None:
+            if skipped is not None:
+                skipped.append((row, f"找不到公司: {row.get('company_name')}"))
+            continue
+        record = {name: row.get(name) for name in WRITE_COLUMNS}
+        record['company_id'] = int(company_id)
+        record['is_active'] = True
+        record['is_embedded'] = False   # 新職缺或內容變更：需要（重新）建立向量
+        for name, value in record.items():
+            if not isinstance(value, dict) and _is_missing(value):
+                record[name] = None
+        if include_id:
+            record['job_id'] = int(row['job_id'])
+        yield record
+
+
+def apply_plan(supabase, plan, name_to_id, batch_size=500, workers=4):
+    """
+    依 IngestPlan 批次寫入 job_posting
+
+    返回:
+        dict: 各類寫入的 BulkWriteResult；找不到公司而沒有寫入的職缺也列在 inserted / updated 的 failed_rows
+    """
+    options = dict(batch_size=batch_size, max_workers=workers, progress=False)
+    skipped_inserts, skipped_updates = [], []
+    results = {
+        'inserted': bulk_write(supabase, 'job_posting', _job_records(plan.inserts, name_to_id, skipped=skipped_inserts),
+                               mode='insert', **options),
+        'updated': bulk_write(supabase, 'job_posting',
+                              _job_records(plan.updates, name_to_id, include_id=True, skipped=skipped_updates),
+                              on_conflict='job_id', **options),
+    }
+    results['inserted'].failed_rows.extend(skipped_inserts)
+    results['updated'].failed_rows.extend(skipped_updates)
+    # 只改 is_active：每一類各自一次 upsert，批次內欄位一致，其他欄位不會被改成預設值
+    for name, job_ids, active in (('reactivated', plan.reactivate, True),
+                                  ('deactivated', plan.deactivate + plan.duplicates, False)):
+        results[name] = bulk_write(supabase, 'job_posting',
+                                   ({'job_id': int(i), 'is_active': active} for i in job_ids),
+                                   on_conflict='job_id', default_to_null=False, **options)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='增量匯入爬蟲職缺（只寫入新增與變更的資料）')
+    parser.add_argument('jobs', help='cleaner_pipeline 輸出的職缺 CSV，例如 jobs_cleaned.csv')
+    parser.add_argument('--companies', default=None, help='cleaner_pipeline 輸出的公司 CSV（用於建立新公司）')
+    parser.add_argument('--source-platform', default=DEFAULT_SOURCE_PLATFORM, help='這次爬蟲的來源平台')
+    parser.add_argument('--keep-missing', action='store_true', help='不下架這次沒爬到的職缺')
+    parser.add_argument('--unchanged', default=None,
+                        help='爬蟲（scrawler/crawl.py）輸出的未變更職缺網址清單，這些職缺不會被下架')
+    parser.add_argument('--batch-size', type=int, default=500, help='每個寫入批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    parser.add_argument('--dry-run', action='store_true', help='只比對與統計，不寫入資料庫')
+    return parser.parse_args(argv)
+
+
+def ingest_jobs(supabase, scraped, companies=None, source_platform=DEFAULT_SOURCE_PLATFORM,
+                deactivate_missing=True, seen_keys=(), dry_run=False, batch_size=500, workers=4):
+    """
+    比對並寫入（印出各步驟進度）；scraped 為 prepare_scraped_jobs() 的結果
+
+    各步驟以 perf_metrics.stage 計時：resolve_companies、load_fingerprints、plan、upsert
+
+    返回:
+        (IngestPlan, dict): 比對結果與各類寫入的 BulkWriteResult（dry run 時為空 dict）
+    """
+    with stage('resolve_companies', rows=len(scraped)):
+        if dry_run:
+            (name_to_id, id_to_name), created = load_company_ids(supabase), 0
+        else:
+            name_to_id, id_to_name, created = resolve_company_ids(supabase, scraped['company_name'], companies,
+                                                                  batch_size, workers)
+    print(f"✓ 公司對應表 {len(name_to_id)} 家（新建立 {created} 家）")
+
+    with stage('load_fingerprints') as s:
+        stored = load_stored_fingerprints(supabase, id_to_name, source_platform)
+        s.rows = len(stored)
+    print(f"✓ 讀取 {len(stored)} 筆既有職缺指紋")
+
+    with stage('plan', rows=len(scraped)):
+        plan = plan_ingest(scraped, stored, deactivate_missing=deactivate_missing, seen_keys=seen_keys)
+    print(f"✓ 比對結果：{plan.summary()}")
+    if dry_run:
+        return plan, {}
+
+    with stage('upsert') as s:
+        results = apply_plan(supabase, plan, name_to_id, batch_size, workers)
+        s.rows = sum(result.written for result in results.values())
+    print_results(results)
+    return plan, results
+
+
+def print_results(results):
+    print()
+    for name, result in results.items():
+        if not result.batches and not result.failed_rows:
+            continue
+        print(f"  {name}: {result.summary()}")
+        for row, error in result.failed_rows[:3]:
+            print(f"    ✗ {row.get('job_id', row.get('job_title'))}: {error}")
+
+
+def _add_results(totals, results):
+    for name, result in results.items():
+        total = totals.setdefault(name, BulkWriteResult(result.table))
+        total.written += result.written
+        total.batches += result.batches
+        total.retries += result.retries
+        total.elapsed += result.elapsed
+        total.failed_rows.extend(result.failed_rows)
+
+
+def ingest_job_batches(supabase, batches, companies=None, source_platform=DEFAULT_SOURCE_PLATFORM,
+                       deactivate_missing=True, seen_keys=(), dry_run=False, batch_size=500, workers=4):
+    """
+    逐批比對並寫入：batches 為逐批產生的清理後職缺（例如 cleaner_pipeline.iter_clean_batches），
+    每批寫入後即釋放，整個過程只保留既有職缺指紋與這次爬到的身分鍵。
+    下架（沒爬到的職缺與重複職缺）在所有批次處理完之後才進行；同一個身分鍵只匯入第一次出現的資料列。
+
+    參數:
+        companies (callable, optional): 回傳目前為止的公司資料 DataFrame（新公司以此建立）
+        seen_keys (iterable[str]): 同 plan_ingest；在所有批次處理完之後才讀取，
+            可傳入爬蟲過程中才逐漸產生的清單
+
+    返回:
+        (dict, dict): 各類筆數（與 IngestPlan 相同的名稱）與合計的 BulkWriteResult（dry run 時為空 dict）；
+            沒有任何職缺時為 None，不會下架
+    """
+    known = load_company_ids(supabase)
+    matcher = None
+    with stage('load_fingerprints') as s:
+        stored, duplicates = split_duplicates(load_stored_fingerprints(supabase, known[1], source_platform))
+        s.rows = len(stored)
+    print(f"✓ 讀取 {len(stored)} 筆既有職缺指紋")
+
+    counts = dict.fromkeys(['inserts', 'updates', 'reactivate', 'deactivate', 'duplicates', 'unchanged'], 0)
+    totals = {}
+    scraped_keys = set()
+    for jobs in batches:
+        if jobs.empty:
+            continue
+        scraped = prepare_scraped_jobs(jobs)
+        scraped = scraped[~scraped['source_key'].isin(scraped_keys)]
+        if scraped.empty:
+            continue
+        scraped_keys.update(scraped['source_key'])
+        if not dry_run:
+            with stage('resolve_companies', rows=len(scraped)):
+                if matcher is None:
+                    matcher = CompanyMatcher(known[1])   # 既有公司只正規化、雜湊一次，之後隨新公司更新
+                resolve_company_ids(supabase, scraped['company_name'], companies() if companies else None,
+                                    batch_size, workers, known=known, matcher=matcher)
+        with stage('plan', rows=len(scraped)):
+            plan = plan_batch(scraped, stored)
+        for name in ('inserts', 'updates', 'reactivate'):
+            counts[name] += len(getattr(plan, name))
+        counts['unchanged'] += plan.unchanged
+        if not dry_run:
+            with stage('upsert') as s:
+                results = apply_plan(supabase, plan, known[0], batch_size, workers)
+                s.rows = sum(result.written for result in results.values())
+            _add_results(totals, results)
+        print(f"  已處理 {len(scraped_keys)} 筆：新增 {counts['inserts']}、內容變更 {counts['updates']}")
+
+    seen_keys = set(seen_keys)
+    if not scraped_keys and not seen_keys:
+        print("✗ 沒有任何職缺，停止（避免把所有職缺下架）")
+        return None
+    with stage('plan', rows=len(stored)):
+        plan = plan_missing(stored, scraped_keys, deactivate_missing, seen_keys)
+        plan.duplicates = duplicates
+    for name in ('reactivate', 'deactivate', 'duplicates'):
+        counts[name] += len(getattr(plan, name))
+    counts['unchanged'] += plan.unchanged
+    print(f"✓ 比對結果：新增 {counts['inserts']} 筆、內容變更 {counts['updates']} 筆、未變更 {counts['unchanged']} 筆"
+          f"（重新上架 {counts['reactivate']} 筆）、下架 {counts['deactivate']} 筆、重複 {counts['duplicates']} 筆")
+    if dry_run:
+        return counts, {}
+    with stage('upsert') as s:
+        results = apply_plan(supabase, plan, known[0], batch_size, workers)
+        s.rows = sum(result.written for result in results.values())
+    _add_results(totals, results)
+    print_results(totals)
+    return counts, totals
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+    start_run('incremental_ingest')
+
+    print("=" * 60)
+    print("增量匯入職缺（job_posting）")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    with stage('load') as s:
+        scraped = load_scraped_jobs(args.jobs)
+        s.rows = len(scraped)
+    if 'source_platform' in scraped.columns:
+        scraped = scraped[scraped['source_platform'].isna() | (scraped['source_platform'] == args.source_platform)]
+    seen_keys = []
+    if args.unchanged:
+        with open(args.unchanged, encoding='utf-8') as f:
+            seen_keys = [source_key(line.strip(), None, None, None) for line in f if line.strip()]
+    print(f"✓ 讀取 {len(scraped)} 筆爬蟲職缺（{args.source_platform}），未變更 {len(seen_keys)} 筆")
+    if scraped.empty and not seen_keys:
+        print("✗ 沒有任何職缺，停止（避免把所有職缺下架）")
+        return
+
+    supabase = connect_to_supabase()
+    companies = pd.read_csv(args.companies, encoding='utf-8-sig') if args.companies else None
+    ingest_jobs(supabase, scraped, companies, args.source_platform, deactivate_missing=not args.keep_missing,
+                seen_keys=seen_keys, dry_run=args.dry_run, batch_size=args.batch_size, workers=args.workers)
+    if args.dry_run:
+        print(f"\n（dry run，未寫入，耗時 {time.perf_counter() - start:.2f}s）")
+        return
+    print(f"\n✓ 完成，耗時 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
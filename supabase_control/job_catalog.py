@@ -0,0 +1,633 @@
+"""
+職缺目錄快照（唯讀、欄位式、可 memory-map）
+
+依縣市、區域、薪資、遠端選項、產業或技能篩選職缺，原本每個請求都要對 job_posting / company_info /
+job_skill_requirement 發 PostgREST 查詢。本模組把上架中的職缺載入成欄位式陣列並寫成單一檔案：
+
+- 縣市、區域、產業、遠端選項：字典編碼（int16 代碼，-1 表示缺值）
+- 薪資：int32 陣列（-1 表示缺值），另存依薪資上限排序的列索引供範圍查詢
+- 技能：每個職缺一列 uint64 bitset
+- 倒排索引：每個類別值 / 技能一段已排序的列索引（CSR）
+- 資料列依 scraped_at 由新到舊排序，所以倒排索引與查詢結果天然就是「最新的在前」
+
+查詢時以最短的倒排清單作為候選，其他條件直接在候選列上檢查代碼陣列、bitset 與薪資陣列，
+不需要逐一取交集，常見的篩選在數十微秒內完成。
+
+檔案格式為 JSON 標頭 + 64 bytes 對齊的原始陣列，以 mmap 唯讀開啟：同一台機器上的所有 worker
+共用同一份 page cache。重建時先寫暫存檔再 os.replace，開著舊檔的 worker 不受影響。
+
+增量更新（refresh）：只讀取 scraped_at >= 上次快照水位的職缺與新上架職缺的產業、技能，
+再加上上架中職缺的 job_id 清單（移除已下架的），合併後重建索引；build 則整份重新讀取。
+
+執行方式:
+    python job_catalog.py build                          # 整份重建
+    python job_catalog.py refresh                        # 增量更新
+    python job_catalog.py query --city 台北市 --skill 12 --salary-min 50000
+    python job_catalog.py bench --jobs 200000            # 以合成資料比較查詢速度（不需連線）
+"""
+
+import argparse
+import json
+import mmap
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from table_stream import read_table
+
+
+FORMAT_MAGIC = b'JOBCAT01'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.job_catalog.bin')
+
+CATEGORICAL_FIELDS = ['city', 'district', 'industry', 'remote_option']
+JOB_COLUMNS = 'job_id, company_id, city, district, salary_min, salary_max, remote_option, scraped_at'
+ID_CHUNK_SIZE = 500
+MISSING = -1
+
+
+# ============================================
+# 建立
+# ============================================
+
+def _encode(values):
+    """字串 Series -> (字典, int16 代碼)；字典依字串排序"""
+    values = values.astype(object).where(values.notna(), None)
+    dictionary = sorted({str(v) for v in values if v is not None and v != ''})
+    codes = pd.Categorical(values.map(lambda v: None if v is None else str(v)),
+                           categories=dictionary).codes.astype(np.int16)
+    return dictionary, codes
+
+
+def _postings(codes, n_values):
+    """代碼陣列 -> CSR 倒排索引（offsets: int64[n_values + 1]，rows: int32，每段依列順序排序）"""
+    rows = np.flatnonzero(codes >= 0)
+    order = np.argsort(codes[rows], kind='stable')
+    offsets = np.zeros(n_values + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes[rows], minlength=n_values), out=offsets[1:])
+    return offsets, rows[order].astype(np.int32)
+
+
+def _salary_array(values):
+    values = pd.to_numeric(values, errors='coerce')
+    return values.fillna(MISSING).astype(np.int64).clip(MISSING, np.iinfo(np.int32).max).to_numpy(np.int32)
+
+
+def build_arrays(frame):
+    """
+    把職缺 DataFrame 轉成快照的陣列與標頭資訊
+
+    參數:
+        frame (DataFrame): job_id、company_id、city、district、industry、remote_option、
+            salary_min、salary_max、scraped_at、skills（skill_id 清單）
+
+    返回:
+        (dict[str, np.ndarray], dict): 陣列、標頭（dictionaries、watermark 等）
+    """
+    frame = frame.copy()
+    frame['scraped_at'] = pd.to_datetime(frame['scraped_at'], errors='coerce', utc=True)
+    frame = frame.sort_values(['scraped_at', 'job_id'], ascending=[False, False], na_position='last',
+                              kind='stable', ignore_index=True)
+    n = len(frame)
+
+    scraped = frame['scraped_at']
+    arrays = {
+        'job_id': frame['job_id'].to_numpy(np.int64),
+        'company_id': pd.to_numeric(frame['company_id'], errors='coerce').fillna(MISSING).to_numpy(np.int64),
+        'scraped_at': np.where(scraped.notna(), scraped.astype('int64') // 10**9, MISSING).astype(np.int64)
+        if n else np.zeros(0, dtype=np.int64),
+        'salary_min': _salary_array(frame['salary_min']),
+        'salary_max': _salary_array(frame['salary_max']),
+    }
+
+    dictionaries = {}
+    for name in CATEGORICAL_FIELDS:
+        dictionary, codes = _encode(frame[name])
+        dictionaries[name] = dictionary
+        arrays[name] = codes
+        arrays[f'{name}_offsets'], arrays[f'{name}_rows'] = _postings(codes, len(dictionary))
+
+    # 薪資範圍：上限（沒有時用下限）與下限（沒有時用上限）
+    top = np.where(arrays['salary_max'] >= 0, arrays['salary_max'], arrays['salary_min'])
+    bottom = np.where(arrays['salary_min'] >= 0, arrays['salary_min'], arrays['salary_max'])
+    arrays['salary_top'], arrays['salary_bottom'] = top.astype(np.int32), bottom.astype(np.int32)
+    with_salary = np.flatnonzero(top >= 0)
+    order = with_salary[np.argsort(top[with_salary], kind='stable')]
+    arrays['salary_order'] = order.astype(np.int32)
+    arrays['salary_sorted'] = top[order].astype(np.int32)
+
+    # 技能：bitset + 倒排索引
+    skill_lists = frame['skills'] if 'skills' in frame.columns else pd.Series([[]] * n)
+    counts = np.fromiter((len(s) if isinstance(s, (list, tuple, np.ndarray)) else 0 for s in skill_lists),
+                         dtype=np.int64, count=n)
+    flat = np.fromiter((int(x) for s in skill_lists if isinstance(s, (list, tuple, np.ndarray)) for x in s),
+                       dtype=np.int64, count=int(counts.sum()))
+    entry_rows = np.repeat(np.arange(n, dtype=np.int64), counts)
+    skill_ids = np.unique(flat)
+    skill_index = np.searchsorted(skill_ids, flat)
+    words = max(1, (len(skill_ids) + 63) // 64)
+    bits = np.zeros((n, words), dtype=np.uint64)
+    np.bitwise_or.at(bits, (entry_rows, skill_index // 64),
+                     np.left_shift(np.uint64(1), (skill_index % 64).astype(np.uint64)))
+    arrays['skill_ids'] = skill_ids
+    arrays['skill_bits'] = bits
+    order = np.lexsort((entry_rows, skill_index))
+    pairs = np.unique(np.stack([skill_index[order], entry_rows[order]]), axis=1) if len(order) else \
+        np.zeros((2, 0), dtype=np.int64)
+    arrays['skill_offsets'] = np.zeros(len(skill_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[0], minlength=len(skill_ids)), out=arrays['skill_offsets'][1:])
+    arrays['skill_rows'] = pairs[1].astype(np.int32)
+
+    watermark = scraped.max() if n and scraped.notna().any() else None
+    header = {
+        'version': FORMAT_VERSION,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'watermark': watermark.isoformat() if watermark is not None else None,
+        'rows': n,
+        'dictionaries': dictionaries,
+    }
+    return arrays, header
+
+
+def write_snapshot(path, magic, header, arrays):
+    """
+    把陣列寫成「magic + JSON 標頭 + 64 bytes 對齊的原始陣列」並以原子方式取代 path
+    （先寫暫存檔再 os.replace，開著舊檔的 mmap 不受影響）
+
+    返回:
+        dict: 標頭（加上 arrays 的位置資訊）
+    """
+    layout, offset = {}, 0
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = dict(header, arrays=layout)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(len(magic) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path).lstrip(".")}.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(magic)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header
+
+
+def map_snapshot(path, magic, version):
+    """
+    以 mmap 唯讀開啟 write_snapshot 寫出的檔案
+
+    返回:
+        (dict, dict[str, np.ndarray], mmap.mmap): 標頭、指向 mmap 的唯讀陣列、mmap（關閉前須先釋放陣列）
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(magic)] != magic:
+        mapped.close()
+        raise ValueError(f'檔案格式不符: {path}')
+    header_length = int.from_bytes(mapped[len(magic):len(magic) + 8], 'little')
+    header_end = len(magic) + 8 + header_length
+    header = json.loads(mapped[len(magic) + 8:header_end].decode('utf-8'))
+    if header.get('version') != version:
+        mapped.close()
+        raise ValueError(f'快照版本不符: {header.get("version")}')
+    data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+    return header, arrays, mapped
+
+
+def write_catalog(frame, path=DEFAULT_CATALOG_PATH):
+    """
+    建立快照並以原子方式寫入 path
+
+    返回:
+        dict: 標頭
+    """
+    arrays, header = build_arrays(frame)
+    return write_snapshot(path, FORMAT_MAGIC, header, arrays)
+
+
+# ============================================
+# 查詢
+# ============================================
+
+class JobCatalog:
+    """
+    以 mmap 開啟的職缺目錄快照
+
+    使用方式:
+        catalog = JobCatalog.open(path)
+        result = catalog.search(city='台北市', skills=[12, 40], salary_min=50000, limit=20)
+    """
+
+    def __init__(self, header, arrays, path=None, mapped=None):
+        self.header = header
+        self.path = path
+        self._mapped = mapped
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.dictionaries = header['dictionaries']
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.dictionaries.items()}
+        self._skill_positions = {int(s): i for i, s in enumerate(self.skill_ids)}
+
+    @classmethod
+    def open(cls, path=DEFAULT_CATALOG_PATH):
+        header, arrays, mapped = map_snapshot(path, FORMAT_MAGIC, FORMAT_VERSION)
+        return cls(header, arrays, path=path, mapped=mapped)
+
+    def __len__(self):
+        return len(self.job_id)
+
+    @property
+    def watermark(self):
+        return self.header.get('watermark')
+
+    def _value_rows(self, field, values):
+        """某個類別欄位任一值的列（已排序）；不存在的值回傳空陣列"""
+        offsets, rows = getattr(self, f'{field}_offsets'), getattr(self, f'{field}_rows')
+        codes = [self._codes[field][v] for v in values if v in self._codes[field]]
+        if len(codes) == 1:
+            return rows[offsets[codes[0]]:offsets[codes[0] + 1]]
+        return np.sort(np.concatenate([rows[offsets[c]:offsets[c + 1]] for c in codes] or
+                                      [np.zeros(0, dtype=np.int32)]))
+
+    def _skill_rows(self, position):
+        return self.skill_rows[self.skill_offsets[position]:self.skill_offsets[position + 1]]
+
+    def match(self, city=None, district=None, industry=None, remote_option=None, skills=None,
+              match_all_skills=True, salary_min=None, salary_max=None):
+        """
+        符合所有條件的列索引（由新到舊）
+
+        參數:
+            city / district / industry / remote_option (str | list[str], optional): 任一值相符
+            skills (list[int], optional): skill_id
+            match_all_skills (bool): True 時須具備所有技能，False 時具備任一即可
+            salary_min (int, optional): 職缺薪資上限 >= salary_min
+            salary_max (int, optional): 職缺薪資下限 <= salary_max
+            （有薪資條件時，沒有薪資資料的職缺不列入）
+        """
+        candidates = []   # (倒排清單, 清單本身已滿足的條件；None 表示仍需檢查全部條件)
+        probes = {}       # 在候選列上檢查的條件：名稱 -> callable(rows) -> bool mask
+
+        for field, values in (('city', city), ('district', district), ('industry', industry),
+                              ('remote_option', remote_option)):
+            if values is None:
+                continue
+            values = [values] if isinstance(values, str) else list(values)
+            codes = np.array([self._codes[field].get(v, -2) for v in values], dtype=np.int16)
+            candidates.append((self._value_rows(field, values), field))
+            probes[field] = lambda rows, f=field, c=codes: np.isin(getattr(self, f)[rows], c)
+
+        if skills:
+            positions = [self._skill_positions.get(int(s)) for s in skills]
+            known = [p for p in positions if p is not None]
+            if match_all_skills:
+                if len(known) < len(positions):
+                    return np.zeros(0, dtype=np.int32)
+                # 只有一個技能時倒排清單即為答案；多個技能時仍需以 bitset 檢查其他技能
+                exact = 'skills' if len(known) == 1 else None
+                candidates.extend((self._skill_rows(p), exact) for p in known)
+            else:
+                candidates.append((np.unique(np.concatenate([self._skill_rows(p) for p in known] or
+                                                            [np.zeros(0, dtype=np.int32)])), 'skills'))
+            mask = np.zeros(self.skill_bits.shape[1], dtype=np.uint64)
+            for p in known:
+                mask[p // 64] |= np.uint64(1) << np.uint64(p % 64)
+            words = np.flatnonzero(mask)
+
+            def skill_probe(rows, mask=mask, words=words):
+                hits = self.skill_bits[rows][:, words] & mask[words]
+                return (hits == mask[words]).all(axis=1) if match_all_skills else hits.any(axis=1)
+            probes['skills'] = skill_probe
+
+        if salary_min is not None or salary_max is not None:
+            low = -1 if salary_min is None else salary_min
+            high = np.iinfo(np.int32).max if salary_max is None else salary_max
+            probes['salary'] = lambda rows: ((self.salary_top[rows] >= low) & (self.salary_bottom[rows] >= 0)
+                                             & (self.salary_bottom[rows] <= high))
+            if not candidates:
+                start = np.searchsorted(self.salary_sorted, max(low, 0), side='left')
+                if len(self.salary_order) - start <= len(self) // 8:
+                    candidates.append((np.sort(self.salary_order[start:]), None))
+                else:
+                    # 符合的比例高時，直接掃描整個薪資陣列比排序候選列快
+                    return np.flatnonzero(probes['salary'](slice(None))).astype(np.int32)
+
+        if not candidates:
+            return np.arange(len(self), dtype=np.int32)
+
+        # 最短的倒排清單作為候選，其他條件以陣列查表檢查（檢查成本與候選數成正比）
+        rows, satisfied = min(candidates, key=lambda c: len(c[0]))
+        for name, probe in probes.items():
+            if name == satisfied:
+                continue
+            if not len(rows):
+                break
+            rows = rows[probe(rows)]
+        return rows
+
+    def search(self, limit=50, offset=0, **filters):
+        """
+        篩選並分頁
+
+        返回:
+            dict: total（符合筆數）、job_ids（此頁的 job_id，由新到舊）
+        """
+        rows = self.match(**filters)
+        page = rows[offset:offset + limit]
+        return {'total': int(len(rows)), 'job_ids': self.job_id[page].tolist()}
+
+    def records(self, rows):
+        """列索引 -> dict 清單（解碼後的欄位，不含技能）"""
+        rows = np.asarray(rows, dtype=np.int64)
+        decoded = {}
+        for name in CATEGORICAL_FIELDS:
+            values = np.array(self.dictionaries[name] + [None], dtype=object)
+            decoded[name] = values[getattr(self, name)[rows]]   # -1 -> 最後一個 None
+        records = []
+        for i, row in enumerate(rows):
+            record = {'job_id': int(self.job_id[row]),
+                      'company_id': int(self.company_id[row]) if self.company_id[row] >= 0 else None}
+            record.update({name: decoded[name][i] for name in CATEGORICAL_FIELDS})
+            for name in ('salary_min', 'salary_max'):
+                value = int(getattr(self, name)[row])
+                record[name] = value if value >= 0 else None
+            records.append(record)
+        return records
+
+    def to_frame(self):
+        """還原成 build_arrays 的輸入格式（增量更新時使用）"""
+        rows = np.arange(len(self))
+        frame = pd.DataFrame(self.records(rows))
+        if frame.empty:
+            frame = pd.DataFrame(columns=['job_id', 'company_id'] + CATEGORICAL_FIELDS + ['salary_min', 'salary_max'])
+        scraped = np.asarray(self.scraped_at)
+        frame['scraped_at'] = pd.Series(pd.to_datetime(scraped, unit='s', utc=True)).where(scraped >= 0)
+        skills = [[] for _ in rows]
+        entry_skill = np.repeat(np.arange(len(self.skill_ids)), np.diff(self.skill_offsets))
+        for row, position in zip(self.skill_rows.tolist(), entry_skill.tolist()):
+            skills[row].append(int(self.skill_ids[position]))
+        frame['skills'] = skills
+        return frame
+
+    def close(self):
+        if self._mapped is not None:
+            # 先釋放指向 mmap 的陣列，mmap 才能關閉
+            for name in self.header['arrays']:
+                setattr(self, name, None)
+            self._mapped.close()
+            self._mapped = None
+
+
+# ============================================
+# 從資料庫讀取
+# ============================================
+
+def _chunks(values, size=ID_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fetch_by_ids(supabase, table, columns, key, id_column, ids):
+    """以 in_ 分塊讀取指定 id 的資料列"""
+    frames = [read_table(supabase, table, columns, key, filters=[('in_', (id_column, chunk))])
+              for chunk in _chunks(ids)]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=[c.strip() for c in columns.split(',')])
+    return pd.concat(frames, ignore_index=True)
+
+
+def attach_details(jobs, companies, skills):
+    """補上產業（company_info.industry）與技能清單（job_skill_requirement.skill_id）"""
+    jobs = jobs.merge(companies[['company_id', 'industry']].drop_duplicates('company_id'),
+                      on='company_id', how='left')
+    skills = skills.dropna(subset=['skill_id'])
+    skill_lists = skills.groupby('job_id')['skill_id'].agg(lambda s: sorted({int(x) for x in s}))
+    jobs['skills'] = [s if isinstance(s, list) else [] for s in jobs['job_id'].map(skill_lists)]
+    return jobs
+
+
+def fetch_catalog_frame(supabase, page_size=1000):
+    """整份讀取上架中的職缺、公司產業與技能（keyset 分頁、只讀需要的欄位）"""
+    jobs = read_table(supabase, 'job_posting', JOB_COLUMNS, 'job_id', page_size=page_size,
+                      filters=[('eq', ('is_active', True))])
+    companies = read_table(supabase, 'company_info', 'company_id, industry', 'company_id', page_size=page_size)
+    skills = read_table(supabase, 'job_skill_requirement', 'requirement_id, job_id, skill_id', 'requirement_id',
+                        page_size=page_size)
+    return attach_details(jobs, companies, skills)
+
+
+def build_catalog(supabase, path=DEFAULT_CATALOG_PATH):
+    """整份重建快照；回傳標頭"""
+    return write_catalog(fetch_catalog_frame(supabase), path)
+
+
+def refresh_catalog(supabase, path=DEFAULT_CATALOG_PATH):
+    """
+    增量更新快照：只讀取 scraped_at >= 水位的職缺、快照中沒有的上架職缺與它們的產業、技能，
+    並移除已下架的職缺；沒有既有快照時整份重建
+
+    返回:
+        dict: 標頭加上 changed（重新讀取）/ removed（已下架）筆數
+    """
+    if not os.path.exists(path):
+        header = build_catalog(supabase, path)
+        return dict(header, changed=header['rows'], removed=0)
+
+    catalog = JobCatalog.open(path)
+    try:
+        old = catalog.to_frame()
+        watermark = catalog.watermark
+    finally:
+        catalog.close()
+
+    active = [('eq', ('is_active', True))]
+    active_ids = set(read_table(supabase, 'job_posting', 'job_id', 'job_id', filters=active)['job_id'].tolist())
+    since = [('gte', ('scraped_at', watermark))] if watermark is not None else []
+    changed = read_table(supabase, 'job_posting', JOB_COLUMNS, 'job_id', filters=active + since)
+    changed_ids = set(changed['job_id'].tolist())
+
+    keep = old[old['job_id'].isin(active_ids) & ~old['job_id'].isin(changed_ids)]
+    # 快照沒有、也不在變更清單的上架職缺（例如重新上架、scraped_at 為 NULL）
+    missing_ids = sorted(active_ids - set(keep['job_id'].tolist()) - changed_ids)
+    if missing_ids:
+        missing = _fetch_by_ids(supabase, 'job_posting', JOB_COLUMNS, 'job_id', 'job_id', missing_ids)
+        changed = pd.concat([changed, missing], ignore_index=True)
+
+    frame = keep
+    if not changed.empty:
+        companies = _fetch_by_ids(supabase, 'company_info', 'company_id, industry', 'company_id', 'company_id',
+                                  changed['company_id'].dropna().astype(int).unique().tolist())
+        skills = _fetch_by_ids(supabase, 'job_skill_requirement', 'requirement_id, job_id, skill_id',
+                               'requirement_id', 'job_id', changed['job_id'].astype(int).tolist())
+        frame = pd.concat([keep, attach_details(changed, companies, skills)], ignore_index=True)
+    header = write_catalog(frame, path)
+    return dict(header, changed=len(changed), removed=int((~old['job_id'].isin(active_ids)).sum()))
+
+
+# ============================================
+# 合成資料效能比較
+# ============================================
+
+def synthetic_frame(n_jobs, n_skills=400, seed=42):
+    rng = np.random.default_rng(seed)
+    cities = ['台北市', '新北市', '桃園市', '台中市', '台南市', '高雄市', '新竹市', '新竹縣']
+    districts = [f'第{i}區' for i in range(40)]
+    industries = ['資訊科技', '半導體', '金融', '電子商務', '製造', '未分類']
+    remote = ['無', '部分遠端', '完全遠端']
+    salary_min = rng.integers(28, 120, n_jobs) * 1000
+    return pd.DataFrame({
+        'job_id': np.arange(1, n_jobs + 1),
+        'company_id': rng.integers(1, n_jobs // 10 + 2, n_jobs),
+        'city': rng.choice(cities, n_jobs, p=[.3, .2, .1, .15, .08, .1, .04, .03]),
+        'district': rng.choice(districts, n_jobs),
+        'industry': rng.choice(industries, n_jobs),
+        'remote_option': rng.choice(remote, n_jobs, p=[.7, .2, .1]),
+        'salary_min': np.where(rng.random(n_jobs) < 0.2, np.nan, salary_min),
+        'salary_max': np.where(rng.random(n_jobs) < 0.3, np.nan, salary_min + rng.integers(0, 40, n_jobs) * 1000),
+        'scraped_at': pd.Timestamp('2026-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 86400 * 200, n_jobs),
+                                                                             unit='s'),
+        # 技能出現頻率呈長尾（少數技能很常見）
+        'skills': [sorted(set(rng.zipf(1.6, rng.integers(0, 12)) % n_skills + 1)) for _ in range(n_jobs)],
+    })
+
+
+def _pandas_filter(frame, city=None, industry=None, remote_option=None, skills=None, salary_min=None, **_):
+    """以 DataFrame 布林遮罩篩選（對照組）"""
+    mask = np.ones(len(frame), dtype=bool)
+    if city is not None:
+        mask &= (frame['city'] == city).to_numpy()
+    if industry is not None:
+        mask &= (frame['industry'] == industry).to_numpy()
+    if remote_option is not None:
+        mask &= (frame['remote_option'] == remote_option).to_numpy()
+    if salary_min is not None:
+        top = frame['salary_max'].fillna(frame['salary_min'])
+        mask &= (top >= salary_min).to_numpy()
+    if skills:
+        wanted = set(skills)
+        mask &= frame['skills'].map(wanted.issubset).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def run_bench(n_jobs, repeat, path):
+    print(f"合成 {n_jobs} 筆職缺...")
+    frame = synthetic_frame(n_jobs)
+    start = time.perf_counter()
+    header = write_catalog(frame, path)
+    print(f"✓ 建立快照 {time.perf_counter() - start:.2f}s，檔案 {os.path.getsize(path) / 1e6:.1f} MB")
+    start = time.perf_counter()
+    catalog = JobCatalog.open(path)
+    print(f"✓ mmap 開啟 {(time.perf_counter() - start) * 1000:.2f} ms（{header['rows']} 筆）\n")
+
+    queries = [
+        ('城市', dict(city='台北市')),
+        ('城市 + 技能', dict(city='台北市', skills=[1])),
+        ('城市 + 產業 + 薪資', dict(city='新竹市', industry='半導體', salary_min=60000)),
+        ('遠端 + 兩個技能', dict(remote_option='完全遠端', skills=[1, 2])),
+        ('冷門技能', dict(skills=[150])),
+        ('只有薪資', dict(salary_min=110000)),
+    ]
+    print(f"{'查詢':<16}{'符合':>8}{'快照 µs':>12}{'pandas µs':>14}{'倍數':>8}")
+    for label, query in queries:
+        rows = catalog.match(**query)
+        expected = _pandas_filter(frame.sort_values(['scraped_at', 'job_id'], ascending=False,
+                                                    ignore_index=True), **query)
+        assert np.array_equal(np.sort(rows), expected), label
+        start = time.perf_counter()
+        for _ in range(repeat):
+            catalog.search(limit=20, **query)
+        fast = (time.perf_counter() - start) / repeat * 1e6
+        start = time.perf_counter()
+        for _ in range(max(1, repeat // 100)):
+            _pandas_filter(frame, **query)
+        slow = (time.perf_counter() - start) / max(1, repeat // 100) * 1e6
+        print(f"{label:<16}{len(rows):>8}{fast:>12.1f}{slow:>14.0f}{slow / fast:>8.0f}x")
+    catalog.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='職缺目錄快照')
+    parser.add_argument('command', choices=['build', 'refresh', 'query', 'bench'])
+    parser.add_argument('--path', default=DEFAULT_CATALOG_PATH, help='快照檔案路徑')
+    parser.add_argument('--city', action='append', help='縣市（可重複）')
+    parser.add_argument('--district', action='append', help='區域（可重複）')
+    parser.add_argument('--industry', action='append', help='產業（可重複）')
+    parser.add_argument('--remote-option', action='append', help='遠端選項（可重複）')
+    parser.add_argument('--skill', type=int, action='append', help='skill_id（可重複）')
+    parser.add_argument('--any-skill', action='store_true', help='具備任一技能即可（預設須全部具備）')
+    parser.add_argument('--salary-min', type=int, default=None)
+    parser.add_argument('--salary-max', type=int, default=None)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--jobs', type=int, default=200000, help='bench 的合成職缺數')
+    parser.add_argument('--repeat', type=int, default=2000, help='bench 每個查詢的重複次數')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print(f"職缺目錄快照（{args.command}）")
+    print("=" * 60)
+
+    if args.command == 'bench':
+        path = os.path.join(tempfile.mkdtemp(prefix='job_catalog_'), 'catalog.bin')
+        run_bench(args.jobs, args.repeat, path)
+        return
+
+    if args.command == 'query':
+        catalog = JobCatalog.open(args.path)
+        start = time.perf_counter()
+        rows = catalog.match(city=args.city, district=args.district, industry=args.industry,
+                             remote_option=args.remote_option, skills=args.skill,
+                             match_all_skills=not args.any_skill,
+                             salary_min=args.salary_min, salary_max=args.salary_max)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"✓ 符合 {len(rows)} 筆（{elapsed:.0f} µs，快照水位 {catalog.watermark}）")
+        for record in catalog.records(rows[:args.limit]):
+            print(f"  {record}")
+        return
+
+    from supabase_connection import connect_to_supabase
+
+    supabase = connect_to_supabase()
+    start = time.perf_counter()
+    if args.command == 'build':
+        header = build_catalog(supabase, args.path)
+        print(f"✓ 重建快照 {header['rows']} 筆")
+    else:
+        header = refresh_catalog(supabase, args.path)
+        print(f"✓ 增量更新：變更 {header['changed']} 筆、移除 {header['removed']} 筆，共 {header['rows']} 筆")
+    print(f"✓ 水位 {header['watermark']}，耗時 {time.perf_counter() - start:.2f}s -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
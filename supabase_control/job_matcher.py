@@ -0,0 +1,583 @@
+"""
+職缺媒合引擎（JOB_MATCHING / MATCH_SCORE）
+
+把職缺與履歷載入成 NumPy 陣列後，以向量化運算一次替所有職缺（或一批職缺 × 所有履歷）評分，
+每份履歷只保留分數最高的 top-K，最後批次寫回 job_matching 與 match_score。
+
+資料來源:
+    職缺: job_posting（salary_min/max、city、remote_option、requirements 中的工作經驗）
+          job_skill_requirement（importance = required 權重 2，其餘權重 1）
+    履歷: resume -> user_skill（技能）、career_survey（期望薪資、地點偏好）、
+          user_profile（所在地、年資）
+
+子分數（皆為 0~1；資料不足時給中性分 0.5，技能資料不足時為 0）:
+    skill      履歷擁有的技能 / 職缺要求的技能（依 importance 加權）
+    location   同縣市 1、同區域 0.6、不同區域 0.2；遠端職缺 1
+    salary     職缺薪資上限 / 期望薪資下限（上限 1）
+    experience 年資 / 職缺要求年資（上限 1；不拘為 1）
+overall = 各子分數依 DEFAULT_WEIGHTS 加權平均
+
+陣列結構:
+    職缺技能為 CSR（每個職缺一段 skill 欄位索引與權重）；
+    單一履歷評分用 gather + bincount，多份履歷 × 一批職缺用稠密矩陣乘法（BLAS）。
+
+執行方式:
+    python job_matcher.py --top-k 50                    # 所有履歷
+    python job_matcher.py --resume-ids 1 2 3 --dry-run  # 指定履歷、只計算不寫入
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import bulk_write
+from perf_metrics import stage, start_run
+from table_stream import read_table
+from tw_address import CITIES, parse_codes
+
+
+MATCHING_ALGORITHM = 'weighted_rules_v1'
+
+DEFAULT_WEIGHTS = {'skill': 0.5, 'location': 0.2, 'salary': 0.15, 'experience': 0.15}
+NEUTRAL_SCORE = 0.5
+
+IMPORTANCE_WEIGHTS = {'required': 2.0}
+DEFAULT_IMPORTANCE_WEIGHT = 1.0
+
+REGIONS = {
+    '北部': ['台北市', '新北市', '基隆市', '桃園市', '新竹市', '新竹縣', '宜蘭縣'],
+    '中部': ['苗栗縣', '台中市', '彰化縣', '南投縣', '雲林縣'],
+    '南部': ['嘉義市', '嘉義縣', '台南市', '高雄市', '屏東縣'],
+    '東部': ['花蓮縣', '台東縣'],
+    '離島': ['澎湖縣', '金門縣', '連江縣'],
+}
+_CITY_REGION = np.array([
+    next(i for i, cities in enumerate(REGIONS.values()) if city in cities) for city in CITIES
+], dtype=np.int8)
+
+SAME_REGION_SCORE = 0.6
+OTHER_REGION_SCORE = 0.2
+
+_EXPERIENCE_PATTERN = r'工作經驗:\s*(\d+(?:\.\d+)?)\s*年'
+_EXPERIENCE_ANY = '工作經驗: 不拘'
+
+
+# ============================================
+# 陣列結構
+# ============================================
+
+@dataclass
+class JobArrays:
+    """所有職缺的欄位陣列（長度皆為職缺數 n；技能為 CSR）"""
+    job_ids: np.ndarray          # int64
+    skill_indptr: np.ndarray     # int64, n + 1
+    skill_row: np.ndarray        # int32, nnz（所屬職缺的列索引）
+    skill_index: np.ndarray      # int32, nnz（技能欄位索引）
+    skill_weight: np.ndarray     # float32, nnz
+    skill_total: np.ndarray      # float32, 每個職缺的技能權重總和
+    salary_top: np.ndarray       # float32, 薪資上限（沒有時用下限），缺值 NaN
+    city_code: np.ndarray        # int16, -1 表示未知
+    region_code: np.ndarray      # int8, -1 表示未知
+    is_remote: np.ndarray        # bool
+    required_years: np.ndarray   # float32, 缺值 NaN
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def dense_skills(self, start, stop, n_skills):
+        """職缺 [start, stop) 的稠密技能權重矩陣（(stop-start) x n_skills, float32）"""
+        lo, hi = self.skill_indptr[start], self.skill_indptr[stop]
+        dense = np.zeros((stop - start, n_skills), dtype=np.float32)
+        dense[self.skill_row[lo:hi] - start, self.skill_index[lo:hi]] = self.skill_weight[lo:hi]
+        return dense
+
+
+@dataclass
+class ResumeArrays:
+    """所有履歷的欄位陣列（長度皆為履歷數 m）"""
+    resume_ids: np.ndarray       # int64
+    skill_mask: np.ndarray       # float32, m x n_skills（0/1）
+    salary_min: np.ndarray       # float32, 期望薪資下限，缺值 NaN
+    city_code: np.ndarray        # int16
+    region_code: np.ndarray      # int8
+    years: np.ndarray            # float32, 缺值 NaN
+
+    def __len__(self):
+        return len(self.resume_ids)
+
+
+class SkillVocabulary:
+    """skill_id <-> 矩陣欄位索引"""
+
+    def __init__(self, skill_ids):
+        self.skill_ids = np.unique(np.asarray(list(skill_ids), dtype=np.int64))
+
+    def __len__(self):
+        return len(self.skill_ids)
+
+    def encode(self, skill_ids):
+        """skill_id -> 欄位索引；不在詞彙表中的為 -1"""
+        skill_ids = np.asarray(skill_ids, dtype=np.int64)
+        if len(self.skill_ids) == 0:
+            return np.full(len(skill_ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.skill_ids, skill_ids), len(self.skill_ids) - 1)
+        return np.where(self.skill_ids[pos] == skill_ids, pos, -1)
+
+
+def _city_codes(location):
+    """縣市名稱或地址 -> 代碼（int16，即 CITIES 中的位置）與區域代碼（int8），未知為 -1"""
+    codes, _ = parse_codes(location)
+    regions = np.where(codes >= 0, _CITY_REGION[np.maximum(codes, 0)], -1).astype(np.int8)
+    return codes, regions
+
+
+def _column(df, name):
+    """取得欄位；不存在時回傳全為 None 的 Series"""
+    return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+
+def _float_array(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float32)
+
+
+def parse_required_years(requirements):
+    """從 requirements 的「工作經驗: N年以上」取出要求年資；不拘為 0，沒有資訊為 NaN"""
+    text = pd.Series(requirements, dtype=object).astype(object)
+    text = text.where(text.notna(), '')
+    years = pd.to_numeric(text.str.extract(_EXPERIENCE_PATTERN)[0], errors='coerce')
+    years = years.where(~text.str.contains(_EXPERIENCE_ANY, regex=False), 0.0)
+    return years.to_numpy(dtype=np.float32)
+
+
+def build_job_arrays(jobs, requirements, vocab):
+    """
+    參數:
+        jobs (DataFrame): job_id, salary_min, salary_max, city, remote_option, requirements
+        requirements (DataFrame): job_skill_requirement 的 job_id, skill_id, importance
+        vocab (SkillVocabulary)
+    """
+    jobs = jobs.sort_values('job_id').reset_index(drop=True)
+    job_ids = jobs['job_id'].to_numpy(dtype=np.int64)
+
+    req = requirements.dropna(subset=['job_id', 'skill_id'])
+    req = req[req['job_id'].isin(job_ids)]
+    skill_index = vocab.encode(req['skill_id'].to_numpy())
+    req = req.assign(_skill=skill_index)[skill_index >= 0]
+    req = req.assign(_weight=req['importance'].map(IMPORTANCE_WEIGHTS).fillna(DEFAULT_IMPORTANCE_WEIGHT))
+    # 同一職缺重複的技能只算一次（取較高的權重）
+    req = req.sort_values('_weight', ascending=False).drop_duplicates(['job_id', '_skill'])
+    row = np.searchsorted(job_ids, req['job_id'].to_numpy(dtype=np.int64))
+    order = np.argsort(row, kind='stable')
+    row = row[order]
+
+    indptr = np.zeros(len(job_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row, minlength=len(job_ids)), out=indptr[1:])
+    skill_weight = req['_weight'].to_numpy(dtype=np.float32)[order]
+    skill_total = np.bincount(row, weights=skill_weight, minlength=len(job_ids)).astype(np.float32)
+
+    salary_max = _float_array(_column(jobs, 'salary_max'))
+    salary_min = _float_array(_column(jobs, 'salary_min'))
+    city_code, region_code = _city_codes(_column(jobs, 'city'))
+    remote = _column(jobs, 'remote_option').astype(object)
+
+    return JobArrays(
+        job_ids=job_ids,
+        skill_indptr=indptr,
+        skill_row=row.astype(np.int32),
+        skill_index=req['_skill'].to_numpy(dtype=np.int32)[order],
+        skill_weight=skill_weight,
+        skill_total=skill_total,
+        salary_top=np.where(np.isnan(salary_max), salary_min, salary_max),
+        city_code=city_code,
+        region_code=region_code,
+        is_remote=(remote == 'remote').to_numpy(dtype=bool),
+        required_years=parse_required_years(_column(jobs, 'requirements')),
+    )
+
+
+def build_resume_arrays(resumes, user_skills, vocab):
+    """
+    參數:
+        resumes (DataFrame): resume_id, user_id, salary_min, location（縣市或地址）, years_of_experience
+        user_skills (DataFrame): user_skill 的 user_id, skill_id
+        vocab (SkillVocabulary)
+    """
+    resumes = resumes.reset_index(drop=True)
+    mask = np.zeros((len(resumes), len(vocab)), dtype=np.float32)
+    if len(resumes) and len(user_skills):
+        pairs = resumes[['user_id']].reset_index().merge(
+            user_skills[['user_id', 'skill_id']].dropna(), on='user_id')
+        cols = vocab.encode(pairs['skill_id'].to_numpy())
+        keep = cols >= 0
+        mask[pairs['index'].to_numpy()[keep], cols[keep]] = 1.0
+
+    city_code, region_code = _city_codes(_column(resumes, 'location'))
+    return ResumeArrays(
+        resume_ids=resumes['resume_id'].to_numpy(dtype=np.int64),
+        skill_mask=mask,
+        salary_min=_float_array(_column(resumes, 'salary_min')),
+        city_code=city_code,
+        region_code=region_code,
+        years=_float_array(_column(resumes, 'years_of_experience')),
+    )
+
+
+# ============================================
+# 子分數（可廣播：單一履歷 x 全部職缺，或 m x 1 對 1 x n）
+# ============================================
+
+def skill_score_from_covered(covered, skill_total):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(skill_total > 0, covered / skill_total, 0.0).astype(np.float32)
+
+
+def location_score(user_city, user_region, job_city, job_region, job_remote):
+    score = np.where(user_city == job_city, 1.0,
+                     np.where(user_region == job_region, SAME_REGION_SCORE, OTHER_REGION_SCORE))
+    unknown = (user_city < 0) | (job_city < 0)
+    score = np.where(unknown, NEUTRAL_SCORE, score)
+    return np.where(job_remote, 1.0, score).astype(np.float32)
+
+
+def salary_score(user_min, job_top):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(user_min > 0, job_top / user_min, 1.0)
+    score = np.clip(ratio, 0.0, 1.0)
+    return np.where(np.isnan(user_min) | np.isnan(job_top), NEUTRAL_SCORE, score).astype(np.float32)
+
+
+def experience_score(user_years, job_years):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(job_years > 0, user_years / job_years, 1.0)
+    score = np.clip(ratio, 0.0, 1.0)
+    return np.where(np.isnan(user_years) | np.isnan(job_years), NEUTRAL_SCORE, score).astype(np.float32)
+
+
+def combine_scores(scores, weights=DEFAULT_WEIGHTS):
+    total = sum(weights.values())
+    return sum(scores[name] * (weight / total) for name, weight in weights.items())
+
+
+# ============================================
+# 評分
+# ============================================
+
+def score_resume(jobs, resumes, i, weights=DEFAULT_WEIGHTS):
+    """
+    單一履歷 x 全部職缺
+
+    返回:
+        dict: overall / skill / location / salary / experience，各為長度 n 的 float32 陣列
+    """
+    user_mask = resumes.skill_mask[i]
+    covered = np.bincount(jobs.skill_row, weights=jobs.skill_weight * user_mask[jobs.skill_index],
+                          minlength=len(jobs))
+    scores = {
+        'skill': skill_score_from_covered(covered, jobs.skill_total),
+        'location': location_score(resumes.city_code[i], resumes.region_code[i],
+                                   jobs.city_code, jobs.region_code, jobs.is_remote),
+        'salary': salary_score(resumes.salary_min[i], jobs.salary_top),
+        'experience': experience_score(resumes.years[i], jobs.required_years),
+    }
+    scores['overall'] = combine_scores(scores, weights)
+    return scores
+
+
+def top_k_indices(scores, k):
+    """取分數最高的 k 個索引（由高到低排序）"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def top_k_for_resume(jobs, resumes, i, k=50, weights=DEFAULT_WEIGHTS):
+    """單一履歷的 top-K 職缺：回傳 (職缺索引, 各子分數 dict)"""
+    scores = score_resume(jobs, resumes, i, weights)
+    idx = top_k_indices(scores['overall'], k)
+    return idx, {name: values[idx] for name, values in scores.items()}
+
+
+def top_k_for_resumes(jobs, resumes, k=50, job_batch_size=4096, weights=DEFAULT_WEIGHTS):
+    """
+    所有履歷 x 全部職缺，職缺分批以矩陣乘法評分，每份履歷維護 running top-K
+
+    返回:
+        (np.ndarray, np.ndarray): m x K 的職缺索引與 overall 分數（由高到低）
+    """
+    m, n = len(resumes), len(jobs)
+    n_skills = resumes.skill_mask.shape[1]
+    best_idx = np.empty((m, 0), dtype=np.int64)
+    best_score = np.empty((m, 0), dtype=np.float32)
+
+    user = {
+        'city': resumes.city_code[:, None], 'region': resumes.region_code[:, None],
+        'salary': resumes.salary_min[:, None], 'years': resumes.years[:, None],
+    }
+    for start in range(0, n, job_batch_size):
+        stop = min(start + job_batch_size, n)
+        dense = jobs.dense_skills(start, stop, n_skills)
+        covered = resumes.skill_mask @ dense.T                      # m x B
+        scores = {
+            'skill': skill_score_from_covered(covered, jobs.skill_total[start:stop]),
+            'location': location_score(user['city'], user['region'], jobs.city_code[start:stop],
+                                       jobs.region_code[start:stop], jobs.is_remote[start:stop]),
+            'salary': salary_score(user['salary'], jobs.salary_top[start:stop]),
+            'experience': experience_score(user['years'], jobs.required_years[start:stop]),
+        }
+        overall = np.broadcast_to(combine_scores(scores, weights), (m, stop - start))
+
+        cand_idx = np.concatenate([best_idx, np.broadcast_to(np.arange(start, stop), (m, stop - start))], axis=1)
+        cand_score = np.concatenate([best_score, overall], axis=1)
+        keep = top_k_indices(cand_score, k)
+        best_idx = np.take_along_axis(cand_idx, keep, axis=1)
+        best_score = np.take_along_axis(cand_score, keep, axis=1)
+    return best_idx, best_score
+
+
+def score_pairs(jobs, resumes, job_idx, resume_idx, weights=DEFAULT_WEIGHTS):
+    """對指定的 (職缺, 履歷) 配對計算所有子分數（用於寫回 top-K 結果的明細）"""
+    job_idx = np.asarray(job_idx, dtype=np.int64)
+    resume_idx = np.asarray(resume_idx, dtype=np.int64)
+    starts = jobs.skill_indptr[job_idx]
+    counts = jobs.skill_indptr[job_idx + 1] - starts
+    pair = np.repeat(np.arange(len(job_idx)), counts)
+    nnz = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    has = resumes.skill_mask[resume_idx[pair], jobs.skill_index[nnz]]
+    covered = np.bincount(pair, weights=jobs.skill_weight[nnz] * has, minlength=len(job_idx))
+
+    scores = {
+        'skill': skill_score_from_covered(covered, jobs.skill_total[job_idx]),
+        'location': location_score(resumes.city_code[resume_idx], resumes.region_code[resume_idx],
+                                   jobs.city_code[job_idx], jobs.region_code[job_idx],
+                                   jobs.is_remote[job_idx]),
+        'salary': salary_score(resumes.salary_min[resume_idx], jobs.salary_top[job_idx]),
+        'experience': experience_score(resumes.years[resume_idx], jobs.required_years[job_idx]),
+    }
+    scores['overall'] = combine_scores(scores, weights)
+    return scores
+
+
+def skill_breakdown(jobs, resumes, vocab, job_i, resume_i):
+    """單一配對的技能明細：符合與缺少的 skill_id"""
+    lo, hi = jobs.skill_indptr[job_i], jobs.skill_indptr[job_i + 1]
+    cols = jobs.skill_index[lo:hi]
+    has = resumes.skill_mask[resume_i, cols] > 0
+    return {
+        'matched_skill_ids': vocab.skill_ids[cols[has]].tolist(),
+        'missing_skill_ids': vocab.skill_ids[cols[~has]].tolist(),
+    }
+
+
+# ============================================
+# 資料庫讀寫
+# ============================================
+
+def _fetch_rows(supabase, table, columns, key, batch_size=1000, filters=None):
+    """以 key 欄位 keyset 分頁讀取整張表"""
+    return read_table(supabase, table, columns, key, page_size=batch_size, filters=filters)
+
+
+def _fetch_rows_by_ids(supabase, table, columns, key, id_column, ids=None, chunk_size=500):
+    """
+    讀取 id_column 在 ids 中的資料列；ids 為 None 時讀取整張表
+
+    in_ 篩選會放在 GET 的 URL 中，因此 ids 每 chunk_size 個分成一次讀取，避免超過 URL 長度上限。
+    """
+    if ids is None:
+        return _fetch_rows(supabase, table, columns, key)
+    ids = list(ids)
+    frames = [_fetch_rows(supabase, table, columns, key, filters=[('in_', (id_column, ids[i:i + chunk_size]))])
+              for i in range(0, len(ids), chunk_size)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values(key, ignore_index=True)
+
+
+def load_jobs(supabase):
+    jobs = _fetch_rows(supabase, 'job_posting',
+                       'job_id, salary_min, salary_max, city, remote_option, requirements',
+                       'job_id', filters=[('eq', ('is_active', True))])
+    requirements = _fetch_rows(supabase, 'job_skill_requirement',
+                               'requirement_id, job_id, skill_id, importance', 'requirement_id')
+    return jobs, requirements
+
+
+def load_resumes(supabase, resume_ids=None, skill_columns='user_skill_id, user_id, skill_id'):
+    """
+    讀取履歷與對應使用者的技能（skill_columns 欄位）、最新問卷（survey_id、期望薪資、地點偏好）與個人檔案
+
+    沒有指定 resume_ids 時讀取全部履歷，使用者相關的表也整張讀取後再篩選（不帶 user_id 清單）。
+    """
+    resume_ids = list(resume_ids) if resume_ids else None
+    resumes = _fetch_rows_by_ids(supabase, 'resume', 'resume_id, user_id', 'resume_id', 'resume_id', resume_ids)
+    if resumes.empty:
+        return resumes, pd.DataFrame(columns=['user_id', 'skill_id'])
+
+    user_ids = resumes['user_id'].dropna().astype(int).unique().tolist()
+    by_user = user_ids if resume_ids is not None else None
+
+    def user_rows(table, columns, key):
+        rows = _fetch_rows_by_ids(supabase, table, columns, key, 'user_id', by_user)
+        return rows[rows['user_id'].isin(user_ids)] if not rows.empty else rows
+
+    skills = user_rows('user_skill', skill_columns, 'user_skill_id')
+    surveys = user_rows('career_survey', 'survey_id, user_id, salary_min, location_preference, updated_at',
+                        'survey_id')
+    profiles = user_rows('user_profile', 'profile_id, user_id, location, years_of_experience', 'profile_id')
+
+    if not surveys.empty:
+        surveys = surveys.sort_values('updated_at').drop_duplicates('user_id', keep='last')
+        resumes = resumes.merge(surveys[['user_id', 'survey_id', 'salary_min', 'location_preference']],
+                                on='user_id', how='left')
+    if not profiles.empty:
+        profiles = profiles.drop_duplicates('user_id', keep='last')
+        resumes = resumes.merge(profiles[['user_id', 'location', 'years_of_experience']],
+                                on='user_id', how='left')
+    # 地點：優先使用問卷的地點偏好，其次是個人檔案的所在地
+    preference = _column(resumes, 'location_preference')
+    resumes['location'] = preference.where(preference.notna(), _column(resumes, 'location'))
+    if skills.empty:
+        skills = pd.DataFrame(columns=['user_id', 'skill_id'])
+    return resumes, skills
+
+
+def previous_matches(supabase, resume_ids, algorithm=MATCHING_ALGORITHM, chunk_size=500):
+    """這些履歷先前以同一演算法產生的 job_matching（matching_id、resume_id）"""
+    resume_ids = [int(r) for r in resume_ids]
+    frames = [_fetch_rows(supabase, 'job_matching', 'matching_id, resume_id', 'matching_id',
+                          filters=[('in_', ('resume_id', resume_ids[i:i + chunk_size])),
+                                   ('eq', ('matching_algorithm', algorithm))])
+              for i in range(0, len(resume_ids), chunk_size)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=['matching_id', 'resume_id'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def delete_matches(supabase, matching_ids, chunk_size=500):
+    """刪除 job_matching 與對應的 match_score；返回刪除的 job_matching 筆數"""
+    matching_ids = [int(i) for i in matching_ids]
+    for i in range(0, len(matching_ids), chunk_size):
+        supabase.table('match_score').delete().in_('matching_id', matching_ids[i:i + chunk_size]).execute()
+        supabase.table('job_matching').delete().in_('matching_id', matching_ids[i:i + chunk_size]).execute()
+    return len(matching_ids)
+
+
+def incomplete_resumes(matching, score):
+    """新的媒合結果沒有完整寫入（job_matching 或 match_score 有失敗資料列）的 resume_id"""
+    resume_of = {row['matching_id']: row['resume_id'] for row in matching.returned}
+    failed = {int(row['resume_id']) for row, _ in matching.failed_rows}
+    failed.update(int(resume_of[row['matching_id']]) for row, _ in score.failed_rows if row['matching_id'] in resume_of)
+    return failed
+
+
+def write_matches(supabase, jobs, resumes, vocab, best_idx, algorithm=MATCHING_ALGORITHM,
+                  weights=DEFAULT_WEIGHTS, batch_size=500, max_workers=4):
+    """將每份履歷的 top-K 寫入 job_matching，再以回傳的 matching_id 寫入 match_score"""
+    m, k = best_idx.shape
+    resume_idx = np.repeat(np.arange(m), k)
+    job_idx = best_idx.ravel()
+    scores = score_pairs(jobs, resumes, job_idx, resume_idx, weights)
+
+    matching_rows = [
+        {
+            'resume_id': int(resumes.resume_ids[r]),
+            'job_id': int(jobs.job_ids[j]),
+            'matching_algorithm': algorithm,
+            'overall_match_score': round(float(s), 4),
+        }
+        for r, j, s in zip(resume_idx, job_idx, scores['overall'])
+    ]
+    matching = bulk_write(supabase, 'job_matching', matching_rows, mode='insert', returning=True,
+                          batch_size=batch_size, max_workers=max_workers, progress=False)
+    matching_ids = {(row['resume_id'], row['job_id']): row['matching_id'] for row in matching.returned}
+
+    def score_rows():
+        for p, (r, j) in enumerate(zip(resume_idx, job_idx)):
+            matching_id = matching_ids.get((int(resumes.resume_ids[r]), int(jobs.job_ids[j])))
+            if matching_id is None:
+                continue
+            breakdown = {'algorithm': algorithm, 'weights': weights}
+            breakdown.update(skill_breakdown(jobs, resumes, vocab, j, r))
+            yield {
+                'matching_id': matching_id,
+                'skill_match_score': round(float(scores['skill'][p]), 4),
+                'location_match_score': round(float(scores['location'][p]), 4),
+                'salary_match_score': round(float(scores['salary'][p]), 4),
+                'experience_match_score': round(float(scores['experience'][p]), 4),
+                'score_breakdown': breakdown,
+            }
+
+    score = bulk_write(supabase, 'match_score', score_rows(), mode='insert',
+                       batch_size=batch_size, max_workers=max_workers, progress=False)
+    return matching, score
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='計算履歷與職缺的媒合分數並寫入 job_matching / match_score')
+    parser.add_argument('--top-k', type=int, default=50, help='每份履歷保留的職缺數')
+    parser.add_argument('--resume-ids', type=int, nargs='*', help='只計算指定的 resume_id')
+    parser.add_argument('--job-batch-size', type=int, default=4096, help='矩陣評分時每批的職缺數')
+    parser.add_argument('--batch-size', type=int, default=500, help='每個 insert 批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    parser.add_argument('--dry-run', action='store_true', help='只計算，不寫入資料庫')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+    start_run('job_matcher')
+
+    print("=" * 60)
+    print("職缺媒合（job_matching / match_score）")
+    print("=" * 60)
+
+    supabase = connect_to_supabase()
+    with stage('load') as s:
+        jobs_df, requirements_df = load_jobs(supabase)
+        resumes_df, user_skills_df = load_resumes(supabase, args.resume_ids)
+        s.rows = len(jobs_df) + len(resumes_df)
+    print(f"✓ 讀取 {len(jobs_df)} 筆職缺、{len(requirements_df)} 筆技能需求、{len(resumes_df)} 份履歷"
+          f"（{s.seconds:.2f}s）")
+    if jobs_df.empty or resumes_df.empty:
+        print("❌ 沒有可媒合的職缺或履歷")
+        return
+
+    with stage('prepare'):
+        vocab = SkillVocabulary(pd.concat([requirements_df['skill_id'], user_skills_df['skill_id']]).dropna())
+        jobs = build_job_arrays(jobs_df, requirements_df, vocab)
+        resumes = build_resume_arrays(resumes_df, user_skills_df, vocab)
+
+    with stage('match', rows=len(resumes)) as s:
+        best_idx, best_score = top_k_for_resumes(jobs, resumes, args.top_k, args.job_batch_size)
+    print(f"✓ 評分完成：{len(resumes)} 份履歷 x {len(jobs)} 筆職缺（{s.seconds:.2f}s）")
+    if len(best_score):
+        print(f"📊 各履歷最高分平均 {best_score[:, 0].mean():.3f}")
+
+    if args.dry_run:
+        return
+    with stage('upsert') as s:
+        # 先寫入新的結果、再以舊的 matching_id 刪除上一次的結果：寫入中途失敗時履歷不會沒有任何媒合結果；
+        # 新結果沒有完整寫入的履歷保留舊的結果
+        previous = previous_matches(supabase, resumes.resume_ids)
+        matching, score = write_matches(supabase, jobs, resumes, vocab, best_idx,
+                                        batch_size=args.batch_size, max_workers=args.workers)
+        incomplete = incomplete_resumes(matching, score)
+        deleted = delete_matches(supabase, previous.loc[~previous['resume_id'].isin(incomplete), 'matching_id'])
+        s.rows = matching.written + score.written
+    print(f"✓ {matching.summary()}")
+    print(f"✓ {score.summary()}")
+    kept = f"（{len(incomplete)} 份履歷寫入不完整，保留舊結果）" if incomplete else ""
+    print(f"✓ 刪除上一次的媒合結果 {deleted} 筆{kept}")
+
+
+if __name__ == "__main__":
+    main()
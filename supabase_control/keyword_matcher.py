@@ -0,0 +1,253 @@
+"""
+多關鍵字比對模組（Aho-Corasick）
+
+cleaner.ipynb 的 is_tech_related / extract_industry / extract_industry_from_company_name
+都是「對每個關鍵字做一次 keyword in text」，成本是 關鍵字數 × 文字長度，
+而且每個分類器都要把同一段文字重新掃一遍。
+
+本模組把所有對照表的關鍵字編譯成一個自動機，每段文字只掃描一次就取得全部命中的關鍵字，
+三個分類器共用同一次掃描結果：
+- 有安裝 pyahocorasick 時使用其 C 實作的 Aho-Corasick 自動機
+- 否則退回以關鍵字 trie 編譯成的單一正規表示式（每個起點取最長的關鍵字，
+  再以「子字串閉包」補上被包含的較短關鍵字），結果與 Aho-Corasick 相同
+
+掃描結果以 bitmask（每個關鍵字一個 bit）表示。短文字（job_category、company_name 等分類欄位）
+以文字內容快取，在整份資料中只會被掃描一次；長文字（job_description）不進快取，
+只在同一批（scan_series 的 factorize）內去重，記憶體用量不隨資料量成長。
+
+關鍵字對照表定義在 keyword_tables.json，清單順序即優先順序。
+
+使用方式:
+    from keyword_matcher import get_cleaner_matcher
+
+    matcher = get_cleaner_matcher()
+    industry = matcher.classify_series(df['job_category'], 'job_category_industry', default='其他')
+    is_tech = matcher.any_match_frame(df, ['job_category', 'job_name', 'job_description'],
+                                      'tech_keywords')
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick 為選用套件
+    ahocorasick = None
+
+
+KEYWORD_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keyword_tables.json')
+
+BACKEND_AHOCORASICK = 'ahocorasick'
+BACKEND_REGEX = 'regex'
+
+
+def load_keyword_tables(path=KEYWORD_TABLES_PATH):
+    """
+    讀取關鍵字對照表
+
+    返回:
+        dict: 表名 -> [(keyword, value), ...]；純關鍵字清單的 value 為 True
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    tables = {}
+    for name, entries in data.items():
+        if name.startswith('_'):
+            continue
+        tables[name] = [tuple(entry) if isinstance(entry, list) else (entry, True)
+                        for entry in entries]
+    return tables
+
+
+def _trie_pattern(words):
+    """將關鍵字編譯成 trie 形狀的正規表示式（同一位置優先比對到最長的關鍵字）"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child)
+                    for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # 走到這裡已經是完整關鍵字，後續延伸為選擇性（貪婪 -> 最長）
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    將多個關鍵字對照表編譯成單一自動機
+
+    參數:
+        tables (dict): 表名 -> [(keyword, value), ...]，順序即優先順序
+        backend (str, optional): 'ahocorasick' 或 'regex'；預設有安裝 pyahocorasick 就使用它
+        cache_size (int): 掃描結果快取的筆數上限（以文字內容為鍵）
+        cache_max_length (int): 只快取長度不超過此字數的文字（分類欄位），快取最多約
+            cache_size × cache_max_length 個字元
+    """
+
+    def __init__(self, tables, backend=None, cache_size=50000, cache_max_length=64):
+        if backend is None:
+            backend = BACKEND_AHOCORASICK if ahocorasick is not None else BACKEND_REGEX
+        if backend == BACKEND_AHOCORASICK and ahocorasick is None:
+            raise ImportError("未安裝 pyahocorasick，請改用 backend='regex'")
+        if backend not in (BACKEND_AHOCORASICK, BACKEND_REGEX):
+            raise ValueError(f"不支援的 backend: {backend}")
+
+        self.backend = backend
+        self.cache_size = cache_size
+        self.cache_max_length = cache_max_length
+        self._cache = {}
+
+        # 所有表共用一組關鍵字編號
+        self.keywords = []
+        keyword_ids = {}
+        self.tables = {}
+        self._table_masks = {}
+        for name, entries in tables.items():
+            priority = []
+            mask = 0
+            for keyword, value in entries:
+                keyword = keyword.lower()
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                bit = 1 << keyword_ids[keyword]
+                priority.append((bit, value))
+                mask |= bit
+            self.tables[name] = priority
+            self._table_masks[name] = mask
+        self._keyword_ids = keyword_ids
+
+        if backend == BACKEND_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, kid in keyword_ids.items():
+                self._automaton.add_word(keyword, 1 << kid)
+            self._automaton.make_automaton()
+        else:
+            self._pattern = re.compile(_trie_pattern(self.keywords))
+            # 比對到某個關鍵字時，被它包含的較短關鍵字也一定出現在文字中
+            self._closure = {}
+            for keyword in self.keywords:
+                mask = 0
+                for other, kid in keyword_ids.items():
+                    if other in keyword:
+                        mask |= 1 << kid
+                self._closure[keyword] = mask
+
+    # ------------------------------------------
+    # 單一文字
+    # ------------------------------------------
+
+    def scan(self, text):
+        """掃描一段文字（不分大小寫），回傳命中關鍵字的 bitmask"""
+        if text is None:
+            return 0
+        mask = self._cache.get(text)
+        if mask is not None:
+            return mask
+
+        lowered = str(text).lower()
+        mask = 0
+        if self.backend == BACKEND_AHOCORASICK:
+            for _, bit in self._automaton.iter(lowered):
+                mask |= bit
+        else:
+            # 每次從上一個命中位置的下一個字元繼續找，重疊的關鍵字也不會漏掉
+            search = self._pattern.search
+            closure = self._closure
+            m = search(lowered)
+            while m is not None:
+                mask |= closure[m.group()]
+                m = search(lowered, m.start() + 1)
+
+        if len(lowered) <= self.cache_max_length:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[text] = mask
+        return mask
+
+    def first_match(self, mask, table, default=None):
+        """依對照表的優先順序，回傳 mask 中第一個命中的關鍵字所對應的值"""
+        if not mask & self._table_masks[table]:
+            return default
+        for bit, value in self.tables[table]:
+            if mask & bit:
+                return value
+        return default
+
+    def matched_keywords(self, mask, table=None):
+        """將 bitmask 還原成關鍵字清單（除錯用）"""
+        if table is not None:
+            mask &= self._table_masks[table]
+        return [kw for kw, kid in self._keyword_ids.items() if mask >> kid & 1]
+
+    # ------------------------------------------
+    # pandas 批次 API
+    # ------------------------------------------
+
+    def scan_series(self, series):
+        """
+        掃描整個 Series；相同內容只掃描一次
+
+        返回:
+            np.ndarray[object]: 每一列的 bitmask（缺值為 0）
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        unique_masks = np.empty(len(uniques) + 1, dtype=object)
+        unique_masks[:-1] = [self.scan(value) for value in uniques]
+        unique_masks[-1] = 0  # codes == -1（缺值）對應最後一格
+        return unique_masks[codes]
+
+    def classify_series(self, series, table, default=None):
+        """
+        對每一列取對照表中第一個命中的值；缺值回傳 None，沒有命中回傳 default
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        values = np.empty(len(uniques) + 1, dtype=object)
+        values[:-1] = [self.first_match(self.scan(value), table, default) for value in uniques]
+        values[-1] = None
+        return pd.Series(values[codes], index=series.index, dtype=object)
+
+    def any_match_frame(self, df, columns, table):
+        """
+        多個欄位中任一欄命中對照表的任一關鍵字即為 True
+
+        欄位依序掃描，前面欄位已命中的列不再掃描後面的欄位（例如長篇 job_description）。
+        關鍵字不含空白，因此分欄掃描與把欄位以空白串接後再掃描的結果相同。
+        """
+        table_mask = self._table_masks[table]
+        hit = np.zeros(len(df), dtype=bool)
+        for column in columns:
+            if column not in df.columns:
+                continue
+            todo = ~hit
+            if not todo.any():
+                break
+            masks = self.scan_series(df[column][todo])
+            hit[todo] = [bool(m & table_mask) for m in masks]
+        return pd.Series(hit, index=df.index)
+
+
+_cleaner_matcher = None
+
+
+def get_cleaner_matcher():
+    """取得以 keyword_tables.json 建立的共用 KeywordMatcher（第一次呼叫時編譯）"""
+    global _cleaner_matcher
+    if _cleaner_matcher is None:
+        _cleaner_matcher = KeywordMatcher(load_keyword_tables())
+    return _cleaner_matcher
@@ -0,0 +1,537 @@
+"""
+職缺市場統計快照（技能需求數、各技能薪資分位數、技能共現）
+
+career_analysis_report（skill_gap_analysis、market_insights、career_readiness_score）與
+skill_gap（skill_roi_score、priority_rank、time_investment_hours）都需要知道三件事：
+市場上有多少職缺要求某個技能、這些職缺的薪資多少、哪些技能常一起被要求。原本每份報告都要掃過所有職缺。
+本模組從 job_catalog 的職缺目錄快照預先彙總這些統計，寫成一個小型快照。
+目錄快照包含上架中的 job_posting、job_skill_requirement 與 company_info.industry。
+career_report.py 再用這個快照一次替所有履歷產生報告。
+
+分群（segment）:
+    all              全部職缺
+    city:<縣市>       例如 city:台北市
+    industry:<產業>   例如 industry:半導體
+分群代碼只會新增、不會改變，所以增量更新後舊代碼仍然有效。
+
+統計都以稀疏格式儲存：已排序的 int64 key 加上 int64 次數，只保留不為 0 的項。
+    demand    key 為 (分群, skill_id)，值是要求該技能的職缺數。
+              skill_id = 0（ALL_JOBS）時是該分群的職缺總數。
+    salary    key 為 (分群, skill_id, 薪資級距)，是薪資直方圖，每 SALARY_BIN 元一格，用來計算分位數。
+              skill_id = 0 時涵蓋該分群所有有薪資的職缺。
+    cooccur   key 為 (分群, skill_a, skill_b)，其中 skill_a < skill_b。
+              值是同時要求這兩個技能的職缺數。
+
+增量更新:
+    每個統計都是各職缺的貢獻相加，因此可以增量更新。
+    上次彙總所用的職缺目錄快照以 hard link 保留在 <快照>.source。
+    refresh 比對它與目前的快照：新增或內容變更的職缺加進統計，已下架或變更前的職缺從統計減掉。
+    不需要重新彙總全部職缺。
+
+執行方式:
+    python market_stats.py build                  # 以目前的職缺目錄快照整份彙總
+    python market_stats.py refresh                # 先增量更新職缺目錄快照（job_catalog refresh），再增量更新統計
+    python market_stats.py refresh --no-catalog   # 只依目前的職缺目錄快照增量更新
+    python market_stats.py show --city 台北市 --top 20
+"""
+
+import argparse
+import os
+import shutil
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from job_catalog import DEFAULT_CATALOG_PATH, JobCatalog, map_snapshot, write_snapshot
+
+
+FORMAT_MAGIC = b'MKTSTA01'
+FORMAT_VERSION = 1
+DEFAULT_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.market_stats.bin')
+SOURCE_SUFFIX = '.source'
+
+STATISTICS = ['demand', 'salary', 'cooccur']
+SEGMENT_ALL = 'all'
+SEGMENT_FIELDS = ['city', 'industry']
+ALL_JOBS = 0                  # skill_id = 0 代表「該分群的所有職缺」
+
+SALARY_BIN = 1000
+SALARY_BINS = 300             # 0 ~ 299,999；更高的薪資歸到最後一格
+MIN_MONTHLY_SALARY = 20000    # 時薪、日薪等明顯不是月薪的資料不列入薪資統計
+
+# key 的位元配置：skill_id < 2^24、薪資級距 < 2^12
+_SKILL_BITS = 24
+_BIN_BITS = 12
+
+
+def segment_name(field, value):
+    return SEGMENT_ALL if field is None else f'{field}:{value}'
+
+
+class SegmentDictionary:
+    """分群名稱 <-> 代碼（只會新增）"""
+
+    def __init__(self, names=(SEGMENT_ALL,)):
+        self.names = list(names)
+        self._codes = {name: code for code, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+# ============================================
+# 彙總
+# ============================================
+
+def _sum_by_key(keys, counts):
+    """相同 key 的次數相加並移除為 0 的項；返回已排序的 (keys, counts)"""
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    total = np.zeros(len(unique), dtype=np.int64)
+    np.add.at(total, inverse, counts)
+    keep = total != 0
+    return unique[keep], total[keep]
+
+
+class MarketCounts:
+    """各統計的稀疏次數 {名稱: (已排序的 keys, counts)}，可相加減"""
+
+    def __init__(self, tables=None):
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self.tables = {name: (tables or {}).get(name, empty) for name in STATISTICS}
+
+    def combine(self, other, sign=1):
+        tables = {}
+        for name in STATISTICS:
+            keys, counts = self.tables[name]
+            other_keys, other_counts = other.tables[name]
+            tables[name] = _sum_by_key(np.concatenate([keys, other_keys]),
+                                       np.concatenate([counts, sign * other_counts]))
+        return MarketCounts(tables)
+
+    def equals(self, other):
+        return all(np.array_equal(a, b) for name in STATISTICS
+                   for a, b in zip(self.tables[name], other.tables[name]))
+
+
+def _segment_codes(catalog, rows, segments):
+    """每列所屬的分群代碼（len(rows) x (1 + len(SEGMENT_FIELDS))，-1 表示缺值）"""
+    columns = [np.full(len(rows), segments.code(SEGMENT_ALL), dtype=np.int64)]
+    for field in SEGMENT_FIELDS:
+        lookup = np.array([segments.code(segment_name(field, value)) for value in catalog.dictionaries[field]]
+                          + [-1], dtype=np.int64)
+        columns.append(lookup[getattr(catalog, field)[rows]])   # 缺值 -1 -> 最後一個 -1
+    return np.stack(columns, axis=1)
+
+
+def _row_skills(catalog, rows):
+    """選取列的技能項 (rows 中的位置, skill_id)，依 (位置, skill_id) 排序"""
+    position = np.full(len(catalog), -1, dtype=np.int64)
+    position[rows] = np.arange(len(rows))
+    entry_skill = np.repeat(np.asarray(catalog.skill_ids, dtype=np.int64), np.diff(catalog.skill_offsets))
+    entry_row = position[np.asarray(catalog.skill_rows)]
+    keep = entry_row >= 0
+    entry_row, entry_skill = entry_row[keep], entry_skill[keep]
+    order = np.lexsort((entry_skill, entry_row))
+    return entry_row[order], entry_skill[order]
+
+
+def _skill_pairs(entry_row, entry_skill):
+    """同一列內的所有技能配對（技能項已依 (列, skill_id) 排序，所以 skill_a < skill_b）"""
+    pair_rows, skill_a, skill_b = [], [], []
+    for distance in range(1, len(entry_row)):
+        same = entry_row[distance:] == entry_row[:-distance]
+        if not same.any():
+            break
+        pair_rows.append(entry_row[distance:][same])
+        skill_a.append(entry_skill[:-distance][same])
+        skill_b.append(entry_skill[distance:][same])
+    if not pair_rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(pair_rows), np.concatenate(skill_a), np.concatenate(skill_b)
+
+
+def salary_bins(catalog, rows):
+    """每列的薪資級距（薪資上下限的中點），沒有薪資或不像月薪的為 -1"""
+    top = np.asarray(catalog.salary_top)[rows].astype(np.int64)
+    bottom = np.asarray(catalog.salary_bottom)[rows].astype(np.int64)
+    salary = (top + bottom) // 2
+    valid = (bottom >= 0) & (salary >= MIN_MONTHLY_SALARY)
+    return np.where(valid, np.minimum(salary // SALARY_BIN, SALARY_BINS - 1), -1)
+
+
+def count_jobs(catalog, rows, segments):
+    """
+    指定職缺對各統計的貢獻
+
+    參數:
+        catalog (JobCatalog)
+        rows (np.ndarray): 目錄快照的列索引
+        segments (SegmentDictionary): 遇到新的縣市 / 產業時會新增分群
+
+    返回:
+        MarketCounts
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(catalog.skill_ids) and int(catalog.skill_ids[-1]) >= 1 << _SKILL_BITS:
+        raise ValueError(f'skill_id 超出範圍（須小於 {1 << _SKILL_BITS}）')
+    segment_columns = _segment_codes(catalog, rows, segments)
+    entry_row, entry_skill = _row_skills(catalog, rows)
+    # 每個職缺再加一個 skill_id = 0 的項，統計分群的職缺總數與整體薪資
+    all_rows = np.concatenate([np.arange(len(rows)), entry_row])
+    all_skills = np.concatenate([np.full(len(rows), ALL_JOBS, dtype=np.int64), entry_skill])
+    job_bins = salary_bins(catalog, rows)[all_rows]
+    pair_rows, skill_a, skill_b = _skill_pairs(entry_row, entry_skill)
+
+    keys = {name: [] for name in STATISTICS}
+    for column in segment_columns.T:
+        segment = column[all_rows]
+        valid = segment >= 0
+        skill_keys = (segment << _SKILL_BITS) | all_skills
+        keys['demand'].append(skill_keys[valid])
+        valid &= job_bins >= 0
+        keys['salary'].append((skill_keys[valid] << _BIN_BITS) | job_bins[valid])
+        segment = column[pair_rows]
+        valid = segment >= 0
+        keys['cooccur'].append((((segment[valid] << _SKILL_BITS) | skill_a[valid]) << _SKILL_BITS) | skill_b[valid])
+
+    tables = {}
+    for name in STATISTICS:
+        unique, counts = np.unique(np.concatenate(keys[name]), return_counts=True)
+        tables[name] = (unique.astype(np.int64), counts.astype(np.int64))
+    return MarketCounts(tables)
+
+
+# ============================================
+# 增量更新：比對兩個目錄快照
+# ============================================
+
+def _mix64(values):
+    """splitmix64 finalizer（uint64 陣列，溢位即回繞）"""
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def row_fingerprints(catalog):
+    """每列會影響統計的欄位（縣市、產業、薪資、技能）的 64-bit 指紋"""
+    n = len(catalog)
+    fingerprint = np.zeros(n, dtype=np.uint64)
+    for i, field in enumerate(SEGMENT_FIELDS):
+        hashes = np.array([zlib.crc32(value.encode('utf-8')) for value in catalog.dictionaries[field]]
+                          + [1 << 32], dtype=np.uint64)   # 缺值 -1 -> 最後一個
+        fingerprint ^= _mix64(hashes[getattr(catalog, field)] + np.uint64((i + 1) << 40))
+    salary = (np.asarray(catalog.salary_top).astype(np.int64) << 32) ^ np.asarray(catalog.salary_bottom)
+    fingerprint ^= _mix64(salary.astype(np.uint64) ^ np.uint64(0xA5A5A5A5))
+    skills = np.zeros(n, dtype=np.uint64)
+    entry_skill = np.repeat(np.asarray(catalog.skill_ids, dtype=np.int64), np.diff(catalog.skill_offsets))
+    np.bitwise_xor.at(skills, np.asarray(catalog.skill_rows), _mix64(entry_skill.astype(np.uint64)))
+    return fingerprint ^ _mix64(skills)
+
+
+def diff_catalogs(old, new):
+    """
+    返回:
+        (np.ndarray, np.ndarray): old 中要減掉的列（已下架或內容變更）、new 中要加上的列（新上架或內容變更）
+    """
+    old_ids, new_ids = np.asarray(old.job_id), np.asarray(new.job_id)
+    old_fp, new_fp = row_fingerprints(old), row_fingerprints(new)
+    in_new = pd.Index(new_ids).get_indexer(old_ids)
+    unchanged_old = (in_new >= 0) & (new_fp[np.maximum(in_new, 0)] == old_fp)
+    in_old = pd.Index(old_ids).get_indexer(new_ids)
+    unchanged_new = (in_old >= 0) & (old_fp[np.maximum(in_old, 0)] == new_fp)
+    return np.flatnonzero(~unchanged_old), np.flatnonzero(~unchanged_new)
+
+
+# ============================================
+# 快照
+# ============================================
+
+class MarketStats:
+    """
+    以 mmap 開啟的市場統計快照
+
+    使用方式:
+        stats = MarketStats.open(path)
+        segment = stats.segment('city', '台北市')
+        skill_ids, counts = stats.demand(segment)
+        percentiles = stats.salary_percentiles(segment, skill_ids[:10])
+    """
+
+    def __init__(self, header, arrays, path=None, mapped=None):
+        self.header = header
+        self.path = path
+        self._mapped = mapped
+        self.arrays = arrays
+        self.segments = header['segments']
+        self._segment_codes = {name: code for code, name in enumerate(self.segments)}
+
+    @classmethod
+    def open(cls, path=DEFAULT_STATS_PATH):
+        header, arrays, mapped = map_snapshot(path, FORMAT_MAGIC, FORMAT_VERSION)
+        return cls(header, arrays, path=path, mapped=mapped)
+
+    @property
+    def source(self):
+        """彙總時所依據的職缺目錄快照資訊（built_at、watermark、rows）"""
+        return self.header.get('source', {})
+
+    def counts(self):
+        return MarketCounts({name: (np.array(self.arrays[f'{name}_keys']), np.array(self.arrays[f'{name}_counts']))
+                             for name in STATISTICS})
+
+    def segment(self, field=None, value=None):
+        """分群代碼；field 為 None 時是全部職缺，不存在的分群回傳 None"""
+        return self._segment_codes.get(segment_name(field, value))
+
+    def _block(self, name, prefix, shift):
+        """key >> shift == prefix 的連續區段"""
+        keys = self.arrays[f'{name}_keys']
+        start, stop = np.searchsorted(keys, [prefix << shift, (prefix + 1) << shift])
+        return keys[start:stop], self.arrays[f'{name}_counts'][start:stop]
+
+    def job_count(self, segment):
+        keys, counts = self._block('demand', segment, _SKILL_BITS)
+        return int(counts[0]) if len(keys) and keys[0] & ((1 << _SKILL_BITS) - 1) == ALL_JOBS else 0
+
+    def demand(self, segment):
+        """
+        返回:
+            (np.ndarray, np.ndarray): skill_id 與要求該技能的職缺數（依職缺數由多到少）
+        """
+        keys, counts = self._block('demand', segment, _SKILL_BITS)
+        skill_ids = keys & ((1 << _SKILL_BITS) - 1)
+        skill = skill_ids != ALL_JOBS
+        skill_ids, counts = skill_ids[skill], counts[skill]
+        order = np.lexsort((skill_ids, -counts))
+        return skill_ids[order], counts[order]
+
+    def salary_histograms(self, segment, skill_ids):
+        """len(skill_ids) x SALARY_BINS 的薪資直方圖（skill_id = 0 為整個分群）"""
+        skill_ids = np.asarray(skill_ids, dtype=np.int64)
+        histograms = np.zeros((len(skill_ids), SALARY_BINS), dtype=np.int64)
+        keys, counts = self._block('salary', segment, _SKILL_BITS + _BIN_BITS)
+        position = pd.Index(skill_ids).get_indexer((keys >> _BIN_BITS) & ((1 << _SKILL_BITS) - 1))
+        found = position >= 0
+        histograms[position[found], keys[found] & ((1 << _BIN_BITS) - 1)] = counts[found]
+        return histograms
+
+    def salary_percentiles(self, segment, skill_ids, percentiles=(25, 50, 75)):
+        """
+        返回:
+            (np.ndarray, np.ndarray): len(skill_ids) x len(percentiles) 的薪資（級距中點，沒有資料為 NaN）
+                與每個技能有薪資的職缺數
+        """
+        histograms = self.salary_histograms(segment, skill_ids)
+        return histogram_percentiles(histograms, percentiles), histograms.sum(axis=1)
+
+    def cooccurrence(self, segment, skill_ids):
+        """len(skill_ids) x len(skill_ids) 的對稱共現次數矩陣（對角線為要求該技能的職缺數）"""
+        skill_ids = np.asarray(skill_ids, dtype=np.int64)
+        n = len(skill_ids)
+        matrix = np.zeros((n, n), dtype=np.int64)
+        if not n:
+            return matrix
+        mask = (1 << _SKILL_BITS) - 1
+        keys, counts = self._block('cooccur', segment, 2 * _SKILL_BITS)
+        column = pd.Index(skill_ids)
+        a = column.get_indexer((keys >> _SKILL_BITS) & mask)
+        b = column.get_indexer(keys & mask)
+        found = (a >= 0) & (b >= 0)
+        matrix[a[found], b[found]] = counts[found]
+        matrix[b[found], a[found]] = counts[found]
+        demand_keys, demand_counts = self._block('demand', segment, _SKILL_BITS)
+        diagonal = column.get_indexer(demand_keys & mask)
+        found = diagonal >= 0
+        matrix[diagonal[found], diagonal[found]] = demand_counts[found]
+        return matrix
+
+    def close(self):
+        if self._mapped is not None:
+            self.arrays = None
+            self._mapped.close()
+            self._mapped = None
+
+
+def histogram_percentiles(histograms, percentiles=(25, 50, 75)):
+    """直方圖（每列一個）-> 分位數（級距中點；沒有資料為 NaN）"""
+    histograms = np.atleast_2d(histograms)
+    totals = histograms.sum(axis=1, keepdims=True)
+    cumulative = np.cumsum(histograms, axis=1)
+    result = np.full((len(histograms), len(percentiles)), np.nan)
+    for j, p in enumerate(percentiles):
+        # 第一個累計數 >= p% 的級距
+        bins = (cumulative < totals * (p / 100)).sum(axis=1)
+        result[:, j] = (np.minimum(bins, SALARY_BINS - 1) + 0.5) * SALARY_BIN
+    result[totals[:, 0] == 0] = np.nan
+    return result
+
+
+def write_stats(path, counts, segments, catalog):
+    """寫入統計快照；返回標頭"""
+    header = {
+        'version': FORMAT_VERSION,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'segments': segments.names,
+        'source': {'built_at': catalog.header.get('built_at'), 'watermark': catalog.watermark, 'rows': len(catalog)},
+        'salary_bin': SALARY_BIN,
+    }
+    arrays = {}
+    for name in STATISTICS:
+        keys, values = counts.tables[name]
+        arrays[f'{name}_keys'] = keys.astype(np.int64)
+        arrays[f'{name}_counts'] = values.astype(np.int64)
+    return write_snapshot(path, FORMAT_MAGIC, header, arrays)
+
+
+def _link_catalog(catalog_path, stats_path):
+    """
+    把目前的目錄快照 hard link（不支援時複製）到暫存路徑再開啟：
+    彙總期間目錄快照被替換也不影響，彙總完成後改名為 <快照>.source
+    """
+    pending = stats_path + SOURCE_SUFFIX + '.pending'
+    if os.path.exists(pending):
+        os.remove(pending)
+    try:
+        os.link(catalog_path, pending)
+    except OSError:
+        shutil.copyfile(catalog_path, pending)
+    return pending
+
+
+def build_stats(catalog_path=DEFAULT_CATALOG_PATH, stats_path=DEFAULT_STATS_PATH):
+    """以目錄快照整份彙總；返回標頭（加上 added / removed 筆數）"""
+    pending = _link_catalog(catalog_path, stats_path)
+    catalog = JobCatalog.open(pending)
+    try:
+        segments = SegmentDictionary()
+        counts = count_jobs(catalog, np.arange(len(catalog)), segments)
+        header = write_stats(stats_path, counts, segments, catalog)
+        rows = len(catalog)
+    finally:
+        catalog.close()
+    os.replace(pending, stats_path + SOURCE_SUFFIX)
+    return dict(header, added=rows, removed=0, full=True)
+
+
+def refresh_stats(catalog_path=DEFAULT_CATALOG_PATH, stats_path=DEFAULT_STATS_PATH):
+    """
+    依目錄快照的差異增量更新統計；沒有既有統計或上次的目錄快照時整份彙總
+
+    返回:
+        dict: 標頭加上 added（加上的職缺數）/ removed（減掉的職缺數）
+    """
+    source = stats_path + SOURCE_SUFFIX
+    if not (os.path.exists(stats_path) and os.path.exists(source)):
+        return build_stats(catalog_path, stats_path)
+
+    pending = _link_catalog(catalog_path, stats_path)
+    if os.path.samefile(pending, source):
+        os.remove(pending)
+        stats = MarketStats.open(stats_path)
+        stats.close()
+        return dict(stats.header, added=0, removed=0, full=False)
+
+    old, new, stats = JobCatalog.open(source), JobCatalog.open(pending), MarketStats.open(stats_path)
+    try:
+        removed, added = diff_catalogs(old, new)
+        segments = SegmentDictionary(stats.segments)
+        added_counts = count_jobs(new, added, segments)
+        removed_counts = count_jobs(old, removed, segments)
+        counts = stats.counts().combine(added_counts).combine(removed_counts, sign=-1)
+        header = write_stats(stats_path, counts, segments, new)
+    finally:
+        stats.close()
+        old.close()
+        new.close()
+    os.replace(pending, source)
+    return dict(header, added=len(added), removed=len(removed), full=False)
+
+
+# ============================================
+# 主程式
+# ============================================
+
+def print_segment(stats, segment, top):
+    skill_ids, counts = stats.demand(segment)
+    skill_ids, counts = skill_ids[:top], counts[:top]
+    jobs = stats.job_count(segment)
+    market, _ = stats.salary_percentiles(segment, [ALL_JOBS])
+    print(f"【{stats.segments[segment]}】 {jobs:,} 筆職缺，薪資中位數 {market[0, 1]:,.0f}")
+    if not len(skill_ids):
+        return
+    percentiles, samples = stats.salary_percentiles(segment, skill_ids)
+    matrix = stats.cooccurrence(segment, skill_ids)
+    np.fill_diagonal(matrix, 0)
+    for i, (skill_id, count) in enumerate(zip(skill_ids, counts)):
+        partner = int(np.argmax(matrix[i]))
+        partner_text = (f"，常與 skill {skill_ids[partner]} 一起出現"
+                        f"（{matrix[i, partner] / count:.0%}）" if matrix[i, partner] else '')
+        salary = (f"薪資 P25/P50/P75 {percentiles[i, 0]:,.0f} / {percentiles[i, 1]:,.0f} / {percentiles[i, 2]:,.0f}"
+                  f"（{samples[i]:,} 筆）" if samples[i] else '沒有薪資資料')
+        print(f"  skill {skill_id}: {count:,} 筆（{count / jobs:.1%}），{salary}{partner_text}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='職缺市場統計快照（技能需求、薪資分位數、技能共現）')
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, help='職缺目錄快照路徑')
+    parser.add_argument('--path', default=DEFAULT_STATS_PATH, help='統計快照路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='以目前的職缺目錄快照整份彙總')
+    refresh = sub.add_parser('refresh', help='增量更新')
+    refresh.add_argument('--no-catalog', action='store_true', help='不先更新職缺目錄快照')
+    show = sub.add_parser('show', help='顯示分群的熱門技能')
+    show.add_argument('--city', help='縣市')
+    show.add_argument('--industry', help='產業')
+    show.add_argument('--top', type=int, default=20, help='顯示的技能數')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("職缺市場統計快照")
+    print("=" * 60)
+
+    if args.command == 'show':
+        stats = MarketStats.open(args.path)
+        field, value = ('city', args.city) if args.city else ('industry', args.industry) if args.industry else \
+            (None, None)
+        segment = stats.segment(field, value)
+        if segment is None:
+            print(f"❌ 沒有這個分群: {segment_name(field, value)}")
+            return
+        print_segment(stats, segment, args.top)
+        return
+
+    start = time.perf_counter()
+    if args.command == 'refresh' and not args.no_catalog:
+        from job_catalog import refresh_catalog
+        from supabase_connection import connect_to_supabase
+
+        catalog = refresh_catalog(connect_to_supabase(), args.catalog)
+        print(f"✓ 職缺目錄快照：{catalog['rows']:,} 筆（重新讀取 {catalog['changed']:,} 筆、"
+              f"移除 {catalog['removed']:,} 筆）")
+    header = (build_stats if args.command == 'build' else refresh_stats)(args.catalog, args.path)
+    mode = '整份彙總' if header['full'] else '增量更新'
+    print(f"✓ {mode}：加上 {header['added']:,} 筆、減掉 {header['removed']:,} 筆職缺，"
+          f"{len(header['segments'])} 個分群（{time.perf_counter() - start:.2f}s）")
+    print(f"   {args.path}（{os.path.getsize(args.path) / 1024:.0f} KB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,605 @@
+"""
+效能量測：Supabase 呼叫計時、流程階段計時、Prometheus / JSON 報告與取樣式 profiler
+
+/api/auth/login 變慢或匯入跑很久時，需要知道時間花在 Supabase Auth、users 更新、pandas 清理還是網路上：
+
+- Supabase 呼叫：supabase_connection 的共用 httpx 連線池掛上 InstrumentedTransport，
+  每個 HTTP 請求依 URL 與 method 歸類為 (service, table, operation)，記錄次數、延遲分布與請求 / 回應大小
+  （所有 Client 共用同一個連線池，backend 與 supabase_control 腳本不需要各自修改查詢）
+- 請求層級：begin_request() / end_request() 記錄每個路由的耗時與其中花在 Supabase 的時間
+  （backend/core/request_metrics.py 以 Flask / Quart middleware 呼叫，並提供 /metrics）
+- 流程階段：with stage('clean'): ... 記錄 clean / match / upsert / embed 等階段的耗時與筆數
+- 報告：REGISTRY.to_prometheus() 為 Prometheus 文字格式；腳本 main() 呼叫 start_run() 後，
+  設定 PERF_REPORT 時行程結束會寫出 JSON 執行報告
+- SamplingProfiler：背景執行緒定時讀取 sys._current_frames() 的取樣式 profiler，
+  輸出 flamegraph.pl / speedscope 可讀的 folded stacks；只在有取樣對象時才有執行緒在跑
+
+指標存在行程內（多個 worker 行程各自一份）。
+
+環境變數（皆為選填）:
+    PERF_METRICS   設為 0 時完全停用（不掛 transport、不記錄任何指標），預設啟用
+    PERF_REPORT    JSON 執行報告的路徑；為既有目錄時寫成 <目錄>/<pipeline>_<時間>.json
+
+使用方式:
+    from perf_metrics import stage, start_run
+
+    start_run('incremental_ingest')
+    with stage('clean') as s:
+        jobs = clean(raw)
+        s.rows = len(jobs)
+"""
+
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+import httpx
+
+
+ENABLED = os.getenv('PERF_METRICS', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+HELP = {
+    'supabase_requests_total': 'Supabase HTTP 請求數',
+    'supabase_request_seconds': 'Supabase HTTP 請求耗時（送出到讀完回應）',
+    'supabase_request_bytes': 'Supabase HTTP 請求 body 大小',
+    'supabase_response_bytes': 'Supabase HTTP 回應 body 大小',
+    'http_request_seconds': '路由的請求耗時',
+    'http_request_supabase_seconds': '路由的請求中等待 Supabase 的時間',
+    'pipeline_stage_seconds': '流程階段耗時',
+    'pipeline_stage_rows_total': '流程階段處理的筆數',
+    'profiles_written_total': '寫出的取樣 profile 數',
+}
+
+
+# ============================================
+# 指標
+# ============================================
+
+class Histogram:
+    """固定 bucket 的分布（與 Prometheus histogram 相同：le 為上界）"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 最後一格為 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """以 bucket 內線性內插估計分位數（落在 +Inf 的部分以最大值代替）"""
+        if not self.count:
+            return None
+        rank, seen, lower = q * self.count, 0, 0.0
+        for upper, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = upper
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """行程內的 counter 與 histogram（以 (名稱, labels) 為鍵，可跨執行緒使用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}      # name -> {label key: value}
+        self._histograms = {}    # name -> {label key: Histogram}
+
+    def inc(self, name, labels=None, value=1):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counters(self, name):
+        """返回 {labels dict 的 tuple: 值}"""
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def histograms(self, name):
+        with self._lock:
+            return {key: histogram.to_dict() for key, histogram in self._histograms.get(name, {}).items()}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format（0.0.4）"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines += [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} counter']
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{_format_labels(key)} {_format_number(value)}')
+            for name in sorted(self._histograms):
+                lines += [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} histogram']
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for upper, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(key, [("le", upper)])} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(key)} {_format_number(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """所有指標的 dict（JSON 報告使用；labels 攤平成 key=value,key=value 字串）"""
+        def flat(key):
+            return ','.join(f'{name}={value}' for name, value in key)
+
+        with self._lock:
+            return {
+                'counters': {name: {flat(key): value for key, value in series.items()}
+                             for name, series in self._counters.items()},
+                'histograms': {name: {flat(key): histogram.to_dict() for key, histogram in series.items()}
+                               for name, series in self._histograms.items()},
+            }
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ============================================
+# Supabase 呼叫（httpx transport）
+# ============================================
+
+_REST_METHODS = {'GET': 'select', 'HEAD': 'count', 'PATCH': 'update', 'DELETE': 'delete'}
+
+
+def classify_request(method, path, query=b'', prefer=''):
+    """
+    依 URL 把 Supabase 請求歸類為 (service, table, operation)
+
+    - /rest/v1/<table>：GET select、HEAD count、POST insert（Prefer 有 resolution= 時為 upsert）、
+      PATCH update、DELETE delete；/rest/v1/rpc/<函數> 為 (rest, <函數>, rpc)
+    - /auth/v1/<路徑>：table 為路徑（admin/users/<id> 只取前兩段），operation 為 grant_type 或 method
+    - 其他（storage 等）：table 為 /v1/ 之後的第一段
+    """
+    parts = [part for part in path.split('/') if part]
+    if len(parts) >= 3 and parts[0] == 'rest' and parts[1] == 'v1':
+        if parts[2] == 'rpc' and len(parts) > 3:
+            return 'rest', parts[3], 'rpc'
+        if method == 'POST':
+            return 'rest', parts[2], 'upsert' if 'resolution=' in prefer else 'insert'
+        return 'rest', parts[2], _REST_METHODS.get(method, method.lower())
+    if len(parts) >= 3 and parts[0] == 'auth' and parts[1] == 'v1':
+        table = '/'.join(parts[2:4] if parts[2] == 'admin' else parts[2:3])
+        grant = parse_qs(query.decode('ascii', 'ignore')).get('grant_type') if query else None
+        return 'auth', table, grant[0] if grant else method.lower()
+    if len(parts) >= 3 and parts[1] == 'v1':
+        return parts[0], parts[2], method.lower()
+    return 'other', parts[0] if parts else '', method.lower()
+
+
+class _Call:
+    """一次 Supabase 請求的計時狀態（讀完或關閉回應時記錄）"""
+
+    __slots__ = ('registry', 'labels', 'request_bytes', 'timer', 'start', 'done')
+
+    def __init__(self, request, registry):
+        url = request.url
+        service, table, operation = classify_request(request.method, url.path, url.query,
+                                                     request.headers.get('prefer', ''))
+        self.registry = registry
+        self.labels = {'service': service, 'table': table, 'operation': operation}
+        self.request_bytes = int(request.headers.get('content-length') or 0)
+        self.timer = _current_request.get()
+        self.done = False
+        self.start = time.perf_counter()
+
+    def finish(self, status, response_bytes=0):
+        if self.done:
+            return
+        self.done = True
+        elapsed = time.perf_counter() - self.start
+        registry = self.registry
+        registry.inc('supabase_requests_total', dict(self.labels, status=status))
+        registry.observe('supabase_request_seconds', elapsed, self.labels)
+        registry.observe('supabase_request_bytes', self.request_bytes, self.labels, SIZE_BUCKETS)
+        registry.observe('supabase_response_bytes', response_bytes, self.labels, SIZE_BUCKETS)
+        if self.timer is not None:
+            self.timer.add_supabase(elapsed)
+
+
+class _TimedStream(httpx.SyncByteStream):
+    def __init__(self, stream, call, status):
+        self._stream = stream
+        self._call = call
+        self._status = status
+        self._bytes = 0
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        self._call.finish(self._status, self._bytes)
+        self._stream.close()
+
+
+class _AsyncTimedStream(httpx.AsyncByteStream):
+    def __init__(self, stream, call, status):
+        self._stream = stream
+        self._call = call
+        self._status = status
+        self._bytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        self._call.finish(self._status, self._bytes)
+        await self._stream.aclose()
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """包住實際的 transport，記錄每個請求從送出到回應讀完的時間與大小"""
+
+    def __init__(self, transport, registry=REGISTRY):
+        self._transport = transport
+        self._registry = registry
+
+    def handle_request(self, request):
+        call = _Call(request, self._registry)
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            call.finish('error')
+            raise
+        response.stream = _TimedStream(response.stream, call, str(response.status_code))
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """InstrumentedTransport 的非同步版本"""
+
+    def __init__(self, transport, registry=REGISTRY):
+        self._transport = transport
+        self._registry = registry
+
+    async def handle_async_request(self, request):
+        call = _Call(request, self._registry)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            call.finish('error')
+            raise
+        response.stream = _AsyncTimedStream(response.stream, call, str(response.status_code))
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def instrument_transport(transport):
+    """PERF_METRICS 啟用時以 (Async)InstrumentedTransport 包住 transport，否則原樣返回"""
+    if not ENABLED:
+        return transport
+    if isinstance(transport, httpx.AsyncBaseTransport):
+        return AsyncInstrumentedTransport(transport)
+    return InstrumentedTransport(transport)
+
+
+def supabase_summary(registry=REGISTRY):
+    """
+    各 (service, table, operation) 的呼叫統計
+
+    返回:
+        list[dict]: 依總耗時由大到小排序；每筆含 calls、errors、seconds、p50 / p95 / max、request_bytes、response_bytes
+    """
+    errors = Counter()
+    for key, value in registry.counters('supabase_requests_total').items():
+        labels = dict(key)
+        if not labels.pop('status', '').startswith('2'):
+            errors[_label_key(labels)] += value
+    request_bytes = registry.histograms('supabase_request_bytes')
+    response_bytes = registry.histograms('supabase_response_bytes')
+    rows = []
+    for key, latency in registry.histograms('supabase_request_seconds').items():
+        rows.append(dict(key, calls=latency['count'], errors=errors[key], seconds=latency['sum'],
+                         p50=latency['p50'], p95=latency['p95'], max=latency['max'],
+                         request_bytes=int(request_bytes.get(key, {}).get('sum', 0)),
+                         response_bytes=int(response_bytes.get(key, {}).get('sum', 0))))
+    return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+
+# ============================================
+# 請求層級計時
+# ============================================
+
+class RequestTimer:
+    """一個請求的計時狀態；請求期間同一個 context 中的 Supabase 呼叫會累加到 supabase_seconds"""
+
+    __slots__ = ('start', 'supabase_seconds', 'supabase_calls', 'profiling')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.supabase_seconds = 0.0
+        self.supabase_calls = 0
+        self.profiling = False
+
+    def add_supabase(self, seconds):
+        self.supabase_seconds += seconds
+        self.supabase_calls += 1
+
+
+_current_request = contextvars.ContextVar('perf_request', default=None)
+
+
+def begin_request():
+    """開始計時目前 context（Flask 的請求執行緒、Quart 的請求 task）的請求"""
+    timer = RequestTimer()
+    _current_request.set(timer)
+    return timer
+
+
+def end_request(timer, method, route, status, registry=REGISTRY):
+    """
+    記錄請求耗時並結束計時
+
+    route 請用路由規則（例如 /api/jobs/<int:job_id>），不要用實際路徑，避免 label 數量無限成長。
+
+    返回:
+        float: 請求耗時（秒）
+    """
+    _current_request.set(None)
+    elapsed = time.perf_counter() - timer.start
+    labels = {'method': method, 'route': route, 'status': str(status)}
+    registry.observe('http_request_seconds', elapsed, labels)
+    registry.observe('http_request_supabase_seconds', timer.supabase_seconds, {'method': method, 'route': route})
+    return elapsed
+
+
+def server_timing(timer, elapsed):
+    """Server-Timing header（瀏覽器開發者工具可直接看到 Supabase 與其餘時間的拆分）"""
+    return (f'supabase;dur={timer.supabase_seconds * 1000:.1f};desc="{timer.supabase_calls} calls", '
+            f'app;dur={(elapsed - timer.supabase_seconds) * 1000:.1f}, total;dur={elapsed * 1000:.1f}')
+
+
+# ============================================
+# 流程階段與 JSON 執行報告
+# ============================================
+
+class Stage:
+    """stage() 產生的計時物件；rows 可在區塊內設定處理的筆數，離開區塊後 seconds 為耗時"""
+
+    __slots__ = ('name', 'pipeline', 'rows', 'seconds')
+
+    def __init__(self, name, pipeline, rows=None):
+        self.name = name
+        self.pipeline = pipeline
+        self.rows = rows
+        self.seconds = 0.0
+
+
+_run = {'pipeline': None, 'started_at': None, 'start': None, 'report': None, 'stages': {}}
+_run_lock = threading.Lock()
+
+
+def _pipeline_name():
+    return _run['pipeline'] or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+
+@contextmanager
+def stage(name, rows=None, pipeline=None, registry=REGISTRY):
+    """
+    記錄一個流程階段的耗時（同名階段可重複進入，例如每個 chunk 一次，報告中會加總）
+
+    參數:
+        name (str): 階段名稱，例如 clean / match / upsert / embed
+        rows (int, optional): 處理的筆數；也可在區塊內設定 s.rows
+        pipeline (str, optional): 預設為 start_run() 的名稱或腳本檔名
+    """
+    current = Stage(name, pipeline or _pipeline_name(), rows)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        if ENABLED:
+            _record_stage(current, registry)
+
+
+def _record_stage(current, registry):
+    labels = {'pipeline': current.pipeline, 'stage': current.name}
+    registry.observe('pipeline_stage_seconds', current.seconds, labels, STAGE_BUCKETS)
+    if current.rows is not None:
+        registry.inc('pipeline_stage_rows_total', labels, current.rows)
+    with _run_lock:
+        totals = _run['stages'].setdefault((current.pipeline, current.name), {'calls': 0, 'seconds': 0.0, 'rows': 0})
+        totals['calls'] += 1
+        totals['seconds'] += current.seconds
+        totals['rows'] += current.rows or 0
+
+
+def start_run(pipeline, report_path=None):
+    """
+    標記一次腳本執行的開始（在 main() 開頭呼叫）
+
+    report_path 或 PERF_REPORT 有設定時，行程結束會以 write_report() 寫出 JSON 執行報告。
+    """
+    _run.update(pipeline=pipeline, start=time.perf_counter(),
+                started_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    path = report_path or os.getenv('PERF_REPORT')
+    if path and ENABLED:
+        if os.path.isdir(path):
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(path, f'{pipeline}_{stamp}.json')
+        if _run['report'] is None:
+            atexit.register(_write_report_at_exit)
+        _run['report'] = path
+    return _run['report']
+
+
+def run_report(registry=REGISTRY):
+    """
+    目前為止的執行報告
+
+    返回:
+        dict: pipeline、耗時、各階段加總（依第一次出現的順序）、Supabase 各表各操作的統計與全部指標
+    """
+    with _run_lock:
+        stages = [dict(pipeline=pipeline, stage=name, **totals)
+                  for (pipeline, name), totals in _run['stages'].items()]
+    return {
+        'pipeline': _pipeline_name(),
+        'argv': sys.argv[1:],
+        'started_at': _run['started_at'],
+        'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'elapsed': time.perf_counter() - _run['start'] if _run['start'] is not None else None,
+        'stages': stages,
+        'supabase': supabase_summary(registry),
+        'metrics': registry.snapshot(),
+    }
+
+
+def write_report(path, registry=REGISTRY):
+    """把 run_report() 寫成 JSON（utf-8，保留中文）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run_report(registry), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _write_report_at_exit():
+    if _run['report']:
+        print(f"✓ 效能報告 -> {write_report(_run['report'])}")
+
+
+# ============================================
+# 取樣式 profiler
+# ============================================
+
+_frame_labels = {}   # code 物件 -> "函數 (檔名:行號)"
+
+
+def _folded_stack(frame, max_depth=128):
+    parts = []
+    while frame is not None and len(parts) < max_depth:
+        code = frame.f_code
+        label = _frame_labels.get(code)
+        if label is None:
+            label = _frame_labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+        parts.append(label)
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class SamplingProfiler:
+    """
+    取樣式 profiler：背景執行緒每 interval 秒讀取一次目標執行緒的呼叫堆疊並計數
+
+    start() / stop() 以執行緒為單位；沒有任何目標時背景執行緒會自行結束，
+    因此未使用時沒有額外成本。結果為 {folded stack: 取樣次數}，可用 write_folded() 輸出。
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._targets = {}   # thread id -> Counter
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        thread_id = thread_id or threading.get_ident()
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='perf-sampler', daemon=True)
+                self._thread.start()
+        return thread_id
+
+    def stop(self, thread_id=None):
+        """停止取樣並返回該執行緒的 Counter（沒有在取樣時返回 None）"""
+        with self._lock:
+            return self._targets.pop(thread_id or threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, counts in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[_folded_stack(frame)] += 1
+
+
+def write_folded(counts, path):
+    """以 folded stacks 格式（每行「堆疊 次數」）寫出，可用 flamegraph.pl 或 speedscope 開啟"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in counts.most_common():
+            f.write(f'{stack} {count}\n')
+    return path
@@ -0,0 +1,393 @@
+"""
+職缺技能提取引擎（JOB_SKILL_REQUIREMENT）
+
+cleaner步驟_v2.md 階段九只把 skills / tools 欄位以逗號拆開後，對 synonym_to_skill_id
+做精確 dict.get 查找，只出現在 job_description 或 requirements 裡的技能完全找不到。
+
+本模組把 skill_master 的 skill_name 與 synonyms 編譯成單一、不分大小寫的多模式比對器，
+直接掃描職缺全文：
+- 英數字開頭/結尾的詞條需符合詞邊界（'java' 不會命中 'javascript'，'go' 不會命中 'google'），
+  但中文前後不需要空白（'熟悉python與機器學習' 可同時命中 python、機器學習）
+- 同一位置取最長的詞條（'sql server' 優先於 'sql'），詞條以 trie 形狀的正規表示式編譯
+- 文字先做 NFKC 正規化（全形英數 -> 半形）與空白壓縮
+- 編譯結果存到磁碟，下次執行只有在 skill_master 內容改變（指紋不同）時才重新編譯
+
+產出的 job_skill_requirement 每個 (job_id, skill_id) 只有一筆：
+出現在 requirements（含技能、工具要求）的技能 importance 為 'required'，
+只出現在 job_description 的技能為 'preferred'。
+重新執行時逐頁比對既有資料：內容相同的技能需求保留不動，先 insert 新的資料，
+全部寫入成功的職缺才刪除過時的舊資料（寫入失敗或中斷時職缺不會失去原有的技能需求）。
+
+執行方式:
+    python skill_extractor.py --batch-size 1000 --workers 4
+    python skill_extractor.py --dry-run          # 只統計，不寫入資料庫
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+import unicodedata
+
+import pandas as pd
+
+from bulk_writer import bulk_write
+from table_stream import iter_frames, iter_records
+
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.skill_index.pkl')
+
+IMPORTANCE_REQUIRED = 'required'
+IMPORTANCE_PREFERRED = 'preferred'
+
+# 依序掃描的欄位與其 importance（前面的欄位優先）
+TEXT_FIELDS = [('requirements', IMPORTANCE_REQUIRED), ('job_description', IMPORTANCE_PREFERRED)]
+
+MIN_TERM_LENGTH = 2   # 與階段九相同：忽略過短的詞條
+_WORD_BOUNDARY_BEFORE = '(?<![a-z0-9])'
+_WORD_BOUNDARY_AFTER = '(?![a-z0-9])'
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """比對前的正規化：NFKC（全形 -> 半形）、小寫、空白壓縮成單一空格"""
+    if text is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+def _parse_synonyms(synonyms_raw):
+    """synonyms 可能是 JSON 字串或已解析的列表（與階段九相同的處理）"""
+    if not synonyms_raw:
+        return []
+    if isinstance(synonyms_raw, str):
+        try:
+            synonyms_raw = json.loads(synonyms_raw)
+        except json.JSONDecodeError:
+            synonyms_raw = synonyms_raw.split(',')
+    if isinstance(synonyms_raw, str):
+        return [synonyms_raw]
+    return [s for s in synonyms_raw if isinstance(s, str)]
+
+
+def skill_master_fingerprint(skill_rows):
+    """skill_master 內容的指紋（與資料列順序無關），用於判斷已存的索引是否過期"""
+    canonical = sorted(
+        (int(row['skill_id']), row.get('skill_name') or '', sorted(_parse_synonyms(row.get('synonyms'))))
+        for row in skill_rows
+    )
+    payload = json.dumps([INDEX_VERSION, canonical], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_term_map(skill_rows):
+    """
+    建立「正規化詞條 -> skill_id」對照表（skill_name 與所有 synonyms）
+
+    同一個詞條對應到多個技能時，與階段九相同以後出現者為準。
+    """
+    term_to_skill = {}
+    for row in skill_rows:
+        skill_id = int(row['skill_id'])
+        for term in [row.get('skill_name')] + _parse_synonyms(row.get('synonyms')):
+            term = normalize_text(term)
+            if len(term) >= MIN_TERM_LENGTH:
+                term_to_skill[term] = skill_id
+    return term_to_skill
+
+
+def build_skill_pattern(terms):
+    """
+    將詞條編譯成 trie 形狀的正規表示式
+
+    - 同一起點優先延伸到最長的詞條，延伸失敗時退回較短的詞條
+    - 英數字開頭的詞條前面、英數字結尾的詞條後面需為詞邊界
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node, last_char):
+        branches = [re.escape(ch) + build(child, ch) for ch, child in sorted(node.items()) if ch != '']
+        end = None
+        if '' in node:
+            end = _WORD_BOUNDARY_AFTER if _is_word_char(last_char) else ''
+        if not branches:
+            return end
+        if end is None:
+            return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # 先嘗試延伸成更長的詞條，失敗才在這裡結束
+        return '(?:' + '|'.join(branches) + '|' + end + ')'
+
+    top = []
+    for ch, child in sorted(trie.items()):
+        branch = re.escape(ch) + build(child, ch)
+        top.append(_WORD_BOUNDARY_BEFORE + branch if _is_word_char(ch) else branch)
+    if not top:
+        return '(?!)'
+    # 開頭的字元集合讓 re 能先快速跳過不可能是詞條起點的位置（中文長文約快 5 倍）
+    first_chars = ''.join(re.escape(ch) for ch in sorted(trie))
+    return '(?=[' + first_chars + '])(?:' + '|'.join(top) + ')'
+
+
+class SkillIndex:
+    """
+    編譯好的技能比對器
+
+    參數:
+        term_to_skill (dict): 正規化詞條 -> skill_id，通常由 build_term_map() 建立
+        fingerprint (str): 來源 skill_master 的指紋
+    """
+
+    def __init__(self, term_to_skill, fingerprint=None, pattern=None):
+        self.term_to_skill = term_to_skill
+        self.fingerprint = fingerprint
+        self.pattern_source = pattern or build_skill_pattern(term_to_skill)
+        self._pattern = re.compile(self.pattern_source)
+
+    @classmethod
+    def from_skill_master(cls, skill_rows):
+        return cls(build_term_map(skill_rows), fingerprint=skill_master_fingerprint(skill_rows))
+
+    def __len__(self):
+        return len(self.term_to_skill)
+
+    def extract(self, text):
+        """
+        找出文字中提到的技能
+
+        返回:
+            list[int]: skill_id（依第一次出現的位置排序，不重複）
+        """
+        normalized = normalize_text(text)
+        if not normalized:
+            return []
+        term_to_skill = self.term_to_skill
+        found = {}
+        for m in self._pattern.finditer(normalized):
+            found.setdefault(term_to_skill[m.group()], None)
+        return list(found)
+
+    def save(self, path):
+        payload = {
+            'version': INDEX_VERSION,
+            'fingerprint': self.fingerprint,
+            'term_to_skill': self.term_to_skill,
+            'pattern': self.pattern_source,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """讀取已存的索引；檔案不存在或版本不符時回傳 None"""
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if payload.get('version') != INDEX_VERSION:
+            return None
+        return cls(payload['term_to_skill'], fingerprint=payload['fingerprint'],
+                   pattern=payload['pattern'])
+
+
+# ============================================
+# 資料庫讀寫
+# ============================================
+
+def fetch_skill_master(supabase):
+    return list(iter_records(supabase, 'skill_master', 'skill_id, skill_name, synonyms', 'skill_id'))
+
+
+def load_or_build_index(supabase, index_path=DEFAULT_INDEX_PATH, verbose=True):
+    """
+    取得技能索引：skill_master 指紋與磁碟上的索引相同時直接載入，否則重新編譯並存檔
+    """
+    skill_rows = fetch_skill_master(supabase)
+    fingerprint = skill_master_fingerprint(skill_rows)
+
+    index = SkillIndex.load(index_path)
+    if index is not None and index.fingerprint == fingerprint:
+        if verbose:
+            print(f"✓ 載入已編譯的技能索引（{len(skill_rows)} 個技能，{len(index)} 個詞條）")
+        return index
+
+    start = time.perf_counter()
+    index = SkillIndex.from_skill_master(skill_rows)
+    index.save(index_path)
+    if verbose:
+        print(f"✓ skill_master 已變更，重新編譯技能索引（{len(skill_rows)} 個技能，"
+              f"{len(index)} 個詞條，{time.perf_counter() - start:.2f}s）")
+    return index
+
+
+def iter_job_batches(supabase, batch_size=1000, columns='job_id, job_description, requirements'):
+    """以 job_id keyset 分頁讀取 job_posting，每次回傳一個 DataFrame"""
+    return iter_frames(supabase, 'job_posting', columns, 'job_id', page_size=batch_size)
+
+
+def extract_job_skills(index, jobs):
+    """
+    對一批職缺提取技能
+
+    參數:
+        jobs (DataFrame): 需含 job_id 與 TEXT_FIELDS 中的欄位（缺少的欄位略過）
+
+    返回:
+        list[dict]: job_skill_requirement 資料列，每個 (job_id, skill_id) 一筆
+    """
+    fields = [(name, importance) for name, importance in TEXT_FIELDS if name in jobs.columns]
+    records = []
+    for values in jobs[['job_id'] + [name for name, _ in fields]].itertuples(index=False):
+        job_id = int(values[0])
+        seen = set()
+        for (_, importance), text in zip(fields, values[1:]):
+            if text is None or (isinstance(text, float) and pd.isna(text)):
+                continue
+            for skill_id in index.extract(text):
+                if skill_id in seen:
+                    continue
+                seen.add(skill_id)
+                records.append({
+                    'job_id': job_id,
+                    'skill_id': skill_id,
+                    'importance': importance,
+                    'proficiency_level': None,  # 原始資料無此資訊
+                })
+    return records
+
+
+def _requirement_key(row):
+    return int(row['job_id']), int(row['skill_id']), row['importance']
+
+
+def load_existing_requirements(supabase, job_ids, chunk_size=500):
+    """讀取這些職缺既有的技能需求（requirement_id, job_id, skill_id, importance）"""
+    job_ids = [int(i) for i in job_ids]
+    rows = []
+    for i in range(0, len(job_ids), chunk_size):
+        rows.extend(iter_records(supabase, 'job_skill_requirement', 'requirement_id, job_id, skill_id, importance',
+                                 'requirement_id', filters=[('in_', ('job_id', job_ids[i:i + chunk_size]))]))
+    return rows
+
+
+def diff_requirements(existing, records):
+    """
+    比對既有資料與這次提取的結果
+
+    (job_id, skill_id, importance) 相同的既有資料保留不動（重複的既有資料只留一筆）。
+
+    返回:
+        (list[dict], list[tuple]): 要 insert 的資料列、要刪除的 (requirement_id, job_id)
+    """
+    wanted = {_requirement_key(record) for record in records}
+    kept, stale = set(), []
+    for row in existing:
+        key = _requirement_key(row)
+        if key in wanted and key not in kept:
+            kept.add(key)
+        else:
+            stale.append((row['requirement_id'], int(row['job_id'])))
+    inserts = [record for record in records if _requirement_key(record) not in kept]
+    return inserts, stale
+
+
+def delete_requirements(supabase, requirement_ids, chunk_size=500):
+    """以 requirement_id 刪除技能需求"""
+    requirement_ids = list(requirement_ids)
+    for i in range(0, len(requirement_ids), chunk_size):
+        (supabase.table('job_skill_requirement').delete()
+         .in_('requirement_id', requirement_ids[i:i + chunk_size]).execute())
+
+
+def sync_requirements(supabase, job_ids, records, batch_size=500, workers=4, append=False):
+    """
+    寫入一頁職缺的技能需求：先 insert 新資料，再刪除過時的舊資料
+
+    有資料列寫入失敗的職缺不刪除舊資料（保留原有的技能需求，下次執行再補寫）。
+
+    返回:
+        (BulkWriteResult, int): insert 結果與刪除筆數
+    """
+    if append:
+        inserts, stale = records, []
+    else:
+        inserts, stale = diff_requirements(load_existing_requirements(supabase, job_ids), records)
+    result = bulk_write(supabase, 'job_skill_requirement', inserts, mode='insert',
+                        batch_size=batch_size, max_workers=workers, progress=False)
+    failed_jobs = {int(row['job_id']) for row, _ in result.failed_rows}
+    stale_ids = [requirement_id for requirement_id, job_id in stale if job_id not in failed_jobs]
+    delete_requirements(supabase, stale_ids)
+    return result, len(stale_ids)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='從職缺全文提取技能並寫入 job_skill_requirement')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每次讀取的職缺筆數')
+    parser.add_argument('--write-batch-size', type=int, default=500, help='每個 insert 批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    parser.add_argument('--index-path', default=DEFAULT_INDEX_PATH, help='編譯後技能索引的存放路徑')
+    parser.add_argument('--append', action='store_true',
+                        help='不比對也不刪除職缺既有的技能需求（預設以這次的結果取代舊資料）')
+    parser.add_argument('--dry-run', action='store_true', help='只提取與統計，不寫入資料庫')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("職缺技能提取（job_skill_requirement）")
+    print("=" * 60)
+
+    supabase = connect_to_supabase()
+    index = load_or_build_index(supabase, args.index_path)
+
+    stats = {'jobs': 0, 'jobs_with_skills': 0, 'records': 0, 'inserted': 0, 'deleted': 0}
+    failed_rows = []
+    start = time.perf_counter()
+
+    for jobs in iter_job_batches(supabase, args.batch_size):
+        records = extract_job_skills(index, jobs)
+        stats['jobs'] += len(jobs)
+        stats['jobs_with_skills'] += len({r['job_id'] for r in records})
+        stats['records'] += len(records)
+        if args.dry_run:
+            continue
+        result, deleted = sync_requirements(supabase, jobs['job_id'].tolist(), records, args.write_batch_size,
+                                            args.workers, append=args.append)
+        stats['inserted'] += result.written
+        stats['deleted'] += deleted
+        failed_rows.extend(result.failed_rows)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✓ 掃描 {stats['jobs']} 筆職缺，{stats['jobs_with_skills']} 筆找到技能，"
+          f"共 {stats['records']} 筆技能需求（{elapsed:.2f}s）")
+    if stats['jobs']:
+        print(f"📊 平均每個職缺有 {stats['records'] / stats['jobs']:.1f} 個技能")
+    if not args.dry_run:
+        print(f"✓ 新增 {stats['inserted']} 筆、刪除過時的 {stats['deleted']} 筆，失敗 {len(failed_rows)} 筆"
+              f"（內容相同的 {stats['records'] - stats['inserted'] - len(failed_rows)} 筆保留不動）")
+        if failed_rows:
+            print(f"❌ 失敗資料列範例：{failed_rows[:3]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
 """
 Supabase 資料庫連線模組
 
-這個模組提供連線到 Supabase 資料庫的函數，供所有組員使用。
+這個模組提供連線到 Supabase 資料庫的函數，供所有組員使用（backend 也透過這裡取得 Client）。
+
+- get_supabase_client(url, key): 行程內共用的 Client 工廠，依 (URL, key) 快取，
+  所有 Client 共用同一個 keep-alive 的 HTTP 連線池，重複呼叫幾乎沒有成本
+- connect_to_supabase(): 從 .env 讀取連線資訊後呼叫工廠；連線測試每個行程最多只做一次
+- get_async_supabase_client(url, key): 非同步版本（AsyncClient），每個 event loop 共用
+  一個 httpx.AsyncClient 連線池，供 backend 的 ASGI 模式使用
+
+連線池設定（環境變數，皆為選填）:
+    SUPABASE_POOL_MAX_CONNECTIONS   連線數上限，預設 20
+    SUPABASE_POOL_MAX_KEEPALIVE     保持 keep-alive 的閒置連線數上限，預設 10
+    SUPABASE_POOL_KEEPALIVE_EXPIRY  閒置連線保留秒數，預設 30
+    SUPABASE_HTTP_TIMEOUT           單次請求逾時秒數，預設 30
+    SUPABASE_HTTP_CONNECT_TIMEOUT   建立連線逾時秒數，預設 5
+    SUPABASE_ASYNC_POOL_MAX_CONNECTIONS
+                                    非同步連線池（每個 event loop）的連線數上限，預設 20；
+                                    非同步連線池的 keep-alive 上限與連線數相同，避免同時請求多時反覆重建連線
+    PERF_METRICS                    設為 0 時不記錄每個 Supabase 請求的次數、延遲與大小（見 perf_metrics.py）
 
 使用方式:
     from supabase_connection import connect_to_supabase
@@ -10,16 +27,173 @@ Supabase 資料庫連線模組
     result = supabase.table('company_info').select('*').limit(10).execute()
 """
 
-import sys
+import asyncio
 import os
+import threading
+import weakref
+
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+from supabase import acreate_client, AsyncClientOptions
+
+from perf_metrics import instrument_transport
+
+
+_clients = {}              # (url, key) -> Client
+_health_checked = set()    # 已做過連線測試的 (url, key)
+_loaded_env_paths = {}     # env_path -> 已載入（load_dotenv 只做一次）
+_http_pool = None
+_async_state = weakref.WeakKeyDictionary()   # event loop -> {'pool': httpx.AsyncClient, 'clients': {...}}
+_lock = threading.RLock()
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def get_http_pool():
+    """
+    取得行程內共用的 httpx 連線池（第一次呼叫時建立）
+
+    所有 Supabase Client（PostgREST / Auth / Storage）共用這個連線池，
+    避免每個 Client 各自建立 TCP/TLS 連線；每個請求經過 perf_metrics 的 transport 記錄耗時與大小。
+    """
+    global _http_pool
+    if _http_pool is None:
+        with _lock:
+            if _http_pool is None:
+                transport = instrument_transport(httpx.HTTPTransport(limits=_pool_limits()))
+                _http_pool = httpx.Client(transport=transport, timeout=_pool_timeout())
+    return _http_pool
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=int(_env_float('SUPABASE_POOL_MAX_CONNECTIONS', 20)),
+        max_keepalive_connections=int(_env_float('SUPABASE_POOL_MAX_KEEPALIVE', 10)),
+        keepalive_expiry=_env_float('SUPABASE_POOL_KEEPALIVE_EXPIRY', 30.0),
+    )
+
+
+def _async_pool_limits():
+    max_connections = int(_env_float('SUPABASE_ASYNC_POOL_MAX_CONNECTIONS', 20))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=_env_float('SUPABASE_POOL_KEEPALIVE_EXPIRY', 30.0),
+    )
+
+
+def _pool_timeout():
+    return httpx.Timeout(
+        _env_float('SUPABASE_HTTP_TIMEOUT', 30.0),
+        connect=_env_float('SUPABASE_HTTP_CONNECT_TIMEOUT', 5.0),
+    )
+
+
+def get_supabase_client(url, key, health_check_table=None):
+    """
+    取得 (url, key) 對應的共用 Supabase Client
+
+    第一次呼叫時才建立 Client（不在 import 時建立），之後直接回傳快取；
+    所有 Client 共用 get_http_pool() 的連線池。
+
+    參數:
+        url (str): Supabase Project URL
+        key (str): API key（後端請用 service_role key）
+        health_check_table (str, optional): 指定時，對該表做一次輕量查詢確認連線；
+            每個 (url, key) 在同一個行程內最多只測試一次
+
+    返回:
+        Client: Supabase 客戶端物件
+    """
+    if not url or not key:
+        raise ValueError("缺少 Supabase 連線資訊：url 或 key")
+
+    cache_key = (url, key)
+    client = _clients.get(cache_key)
+    if client is None:
+        with _lock:
+            client = _clients.get(cache_key)
+            if client is None:
+                options = ClientOptions(httpx_client=get_http_pool())
+                client = create_client(url, key, options=options)
+                _clients[cache_key] = client
+
+    if health_check_table and cache_key not in _health_checked:
+        client.table(health_check_table).select('*').limit(1).execute()
+        _health_checked.add(cache_key)
+
+    return client
+
+
+async def get_async_supabase_client(url, key):
+    """
+    取得 (url, key) 對應的共用 AsyncClient（必須在 event loop 中呼叫）
+
+    httpx.AsyncClient 綁定建立它的 event loop，因此連線池與 Client 以 event loop 為單位快取：
+    同一個 loop（例如一個 ASGI worker）內的所有請求共用同一組 keep-alive 連線。
+
+    返回:
+        AsyncClient: 非同步 Supabase 客戶端物件
+    """
+    if not url or not key:
+        raise ValueError("缺少 Supabase 連線資訊：url 或 key")
+
+    loop = asyncio.get_running_loop()
+    state = _async_state.get(loop)
+    if state is None:
+        transport = instrument_transport(httpx.AsyncHTTPTransport(limits=_async_pool_limits()))
+        state = {'pool': httpx.AsyncClient(transport=transport, timeout=_pool_timeout()),
+                 'clients': {}, 'lock': asyncio.Lock()}
+        _async_state[loop] = state
+
+    cache_key = (url, key)
+    client = state['clients'].get(cache_key)
+    if client is None:
+        async with state['lock']:
+            client = state['clients'].get(cache_key)
+            if client is None:
+                options = AsyncClientOptions(httpx_client=state['pool'])
+                client = await acreate_client(url, key, options=options)
+                state['clients'][cache_key] = client
+    return client
+
+
+async def close_async_clients():
+    """關閉目前 event loop 的 AsyncClient 連線池（ASGI 服務關閉時呼叫）"""
+    state = _async_state.pop(asyncio.get_running_loop(), None)
+    if state is not None:
+        await state['pool'].aclose()
+
+
+def _find_env_path(current_dir):
+    possible_paths = [
+        os.path.join(current_dir, '.env'),  # supabase_control/.env
+        os.path.join(current_dir, 'Erd', '.env'),  # supabase_control/Erd/.env
+        '.env'  # 當前目錄
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+
+    raise FileNotFoundError(
+        "找不到 .env 檔案。請確認以下位置之一存在 .env 檔案：\n"
+        f"  - {possible_paths[0]}\n"
+        f"  - {possible_paths[1]}\n"
+        f"  - {possible_paths[2]}"
+    )
 
 
 def connect_to_supabase(env_path=None, test_connection=True):
     """
     連線到 Supabase 資料庫
 
+    重複呼叫會取得同一個 Client；.env 每個路徑只載入一次，連線測試每個行程最多只做一次。
+
     參數:
         env_path (str, optional): .env 檔案路徑。如果為 None，會依序嘗試：
             1. supabase_control/.env
@@ -47,44 +221,16 @@ def connect_to_supabase(env_path=None, test_connection=True):
         ValueError: 當無法從 .env 檔案讀取連線資訊時
         ConnectionError: 當 Supabase 連線失敗時
     """
-    # 1. 清除模組快取中的 supabase（如果已導入，避免與本地 supabase.py 衝突）
-    if 'supabase' in sys.modules:
-        del sys.modules['supabase']
-
-    # 2. 暫時重命名本地 supabase.py 以避免衝突
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    supabase_py_path = os.path.join(current_dir, 'supabase.py')
-    supabase_bak_path = os.path.join(current_dir, 'supabase.py.bak')
+    # 1. 載入環境變數（同一個 .env 只載入一次）
+    if env_path is None:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        env_path = _find_env_path(current_dir)
 
-    if os.path.exists(supabase_py_path) and not os.path.exists(supabase_bak_path):
-        os.rename(supabase_py_path, supabase_bak_path)
+    if env_path not in _loaded_env_paths:
+        load_dotenv(env_path)
+        _loaded_env_paths[env_path] = True
 
-    # 3. 載入環境變數
-    if env_path is None:
-        # 自動尋找 .env 檔案
-        possible_paths = [
-            os.path.join(current_dir, '.env'),  # supabase_control/.env
-            os.path.join(current_dir, 'Erd', '.env'),  # supabase_control/Erd/.env
-            '.env'  # 當前目錄
-        ]
-
-        env_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                env_path = path
-                break
-
-        if env_path is None:
-            raise FileNotFoundError(
-                "找不到 .env 檔案。請確認以下位置之一存在 .env 檔案：\n"
-                f"  - {possible_paths[0]}\n"
-                f"  - {possible_paths[1]}\n"
-                f"  - {possible_paths[2]}"
-            )
-
-    load_dotenv(env_path)
-
-    # 4. 取得 Supabase 連線資訊
+    # 2. 取得 Supabase 連線資訊
     SUPABASE_URL = os.getenv('project_url')
     SUPABASE_KEY = os.getenv('service_role_key')
 
@@ -102,16 +248,15 @@ def connect_to_supabase(env_path=None, test_connection=True):
             "  - SUPABASE_URL 和 SUPABASE_KEY (或 SUPABASE_SERVICE_ROLE_KEY)"
         )
 
-    # 5. 建立 Supabase 客戶端
+    # 3. 取得共用的 Supabase 客戶端（可選：每個行程只測試一次連線）
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-        # 6. 測試連線（可選）
-        if test_connection:
-            test_result = supabase.table('company_info').select('company_id').limit(1).execute()
-            print(f"✓ Supabase 連線成功！資料庫中現有 {len(test_result.data)} 筆公司資料（測試查詢）")
-        else:
-            print("✓ Supabase 連線成功！")
+        first_check = test_connection and (SUPABASE_URL, SUPABASE_KEY) not in _health_checked
+        supabase: Client = get_supabase_client(
+            SUPABASE_URL, SUPABASE_KEY,
+            health_check_table='company_info' if test_connection else None,
+        )
+        if first_check:
+            print("✓ Supabase 連線成功！（連線測試通過）")
 
         return supabase
 
@@ -0,0 +1,311 @@
+"""
+以 keyset 分頁串流讀寫整張表
+
+原本的腳本以一次沒有上限的 .select(...).execute() 讀整張表（會被 PostgREST 的 max-rows 靜默截斷），
+或是先從後台手動匯出 job_posting_rows.csv 再讀回來。本模組提供共用的串流讀取與分塊寫入：
+
+- 以主鍵 keyset 分頁（WHERE key > 上一頁最後一筆 ORDER BY key LIMIT n），每頁成本固定，
+  不像 offset 分頁越後面越慢；讀到空頁才結束，因此 page_size 大於伺服器的 max-rows 時也不會漏資料
+- 只 select 呼叫端指定的欄位（主鍵會自動補上；可用 PostgREST 的別名與 JSON 路徑，例如 'h:job_details->>h'）
+- 以 generator 逐頁回傳 dict 清單、pandas DataFrame 或（選用）pyarrow Table，不會一次載入全部資料
+- parallel > 1 且主鍵為整數時，先查出主鍵範圍並切成數段，各段同時分頁讀取
+- write_chunks() 把 DataFrame / dict 清單的分塊串流交給 bulk_writer.bulk_write 寫回
+
+filters 與 job_matcher 相同，為 [(方法名稱, 參數 tuple), ...]，例如 [('eq', ('is_active', True))]。
+
+使用方式:
+    from table_stream import iter_frames, read_table, write_chunks
+
+    companies = read_table(supabase, 'company_info', 'company_id, company_name', 'company_id')
+    for jobs in iter_frames(supabase, 'job_posting', 'job_id, job_title', 'job_id', parallel=4):
+        ...
+
+執行方式（取代手動匯出 / 匯入 CSV）:
+    python table_stream.py export job_posting job_posting_rows.csv --columns job_id,job_title,company_id
+    python table_stream.py import job_posting job_posting_rows.csv --on-conflict job_id
+"""
+
+import argparse
+import queue
+import re
+import threading
+import time
+
+import pandas as pd
+
+from bulk_writer import bulk_write
+
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def _column_list(columns, key):
+    """欄位字串 / 清單 -> 欄位清單（keyset 分頁需要主鍵，缺少時補在最前面）"""
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+    columns = list(columns)
+    if '*' not in columns and key not in columns:
+        columns.insert(0, key)
+    return columns
+
+
+def _output_name(column):
+    """select 欄位在回傳資料中的名稱：'別名:欄位' 取別名，JSON 路徑（a->b->>c）取最後一段，去掉 ::型別"""
+    column = column.split('::')[0]
+    if ':' in column:
+        return column.split(':')[0].strip()
+    return re.split(r'->>?', column)[-1].strip()
+
+
+def _apply_filters(query, filters):
+    for method, args in (filters or []):
+        query = getattr(query, method)(*args)
+    return query
+
+
+def iter_pages(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None,
+               start_after=None, end_at=None):
+    """
+    以 key 欄位 keyset 分頁讀取，每次回傳一頁 dict 清單
+
+    參數:
+        supabase: Supabase Client
+        table (str): 資料表名稱
+        columns (str | list[str]): 要讀取的欄位
+        key (str): 分頁用的主鍵（需唯一且可排序）
+        page_size (int): 每頁筆數
+        filters (list, optional): [(方法名稱, 參數 tuple), ...]
+        start_after (optional): 只讀 key 大於此值的資料列
+        end_at (optional): 只讀 key 小於等於此值的資料列
+    """
+    select = ', '.join(_column_list(columns, key))
+    last = start_after
+    while True:
+        query = _apply_filters(supabase.table(table).select(select), filters)
+        if last is not None:
+            query = query.gt(key, last)
+        if end_at is not None:
+            query = query.lte(key, end_at)
+        page = query.order(key).limit(page_size).execute().data or []
+        if not page:
+            return
+        yield page
+        last = page[-1][key]
+
+
+def key_range(supabase, table, key, filters=None):
+    """符合條件的資料列中 key 的最小值與最大值；沒有資料時回傳 (None, None)"""
+    def edge(desc):
+        query = _apply_filters(supabase.table(table).select(key), filters)
+        rows = query.order(key, desc=desc).limit(1).execute().data or []
+        return rows[0][key] if rows else None
+    return edge(False), edge(True)
+
+
+def split_key_range(low, high, parts):
+    """
+    把整數主鍵範圍 [low, high] 切成最多 parts 段
+
+    返回:
+        list[(start_after, end_at)]: 可直接傳給 iter_pages 的區段
+    """
+    if low is None or high is None:
+        return []
+    low, high = int(low), int(high)
+    parts = max(1, min(parts, high - low + 1))
+    step = (high - low + 1) / parts
+    bounds = [low - 1] + [low - 1 + round(step * i) for i in range(1, parts)] + [high]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _iter_pages_parallel(supabase, table, columns, key, page_size, filters, parallel):
+    """各主鍵區段各用一個執行緒分頁讀取；頁面依完成順序回傳，最多 2 * parallel 頁在記憶體中等待"""
+    low, high = key_range(supabase, table, key, filters)
+    ranges = split_key_range(low, high, parallel)
+    if len(ranges) <= 1:
+        yield from iter_pages(supabase, table, columns, key, page_size, filters)
+        return
+
+    pages = queue.Queue(maxsize=parallel * 2)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(start_after, end_at):
+        try:
+            for page in iter_pages(supabase, table, columns, key, page_size, filters, start_after, end_at):
+                if not put(page):
+                    return
+            put(done)
+        except Exception as e:
+            put(e)
+
+    threads = [threading.Thread(target=fetch, args=r, name=f'table-stream-{table}-{i}', daemon=True)
+               for i, r in enumerate(ranges)]
+    for thread in threads:
+        thread.start()
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # 呼叫端提早結束或發生錯誤時，讓其他執行緒停止讀取
+        stopped.set()
+
+
+def stream_pages(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """iter_pages 加上選用的平行區段讀取（parallel > 1 時 key 必須是整數）"""
+    if parallel > 1:
+        return _iter_pages_parallel(supabase, table, columns, key, page_size, filters, parallel)
+    return iter_pages(supabase, table, columns, key, page_size, filters)
+
+
+def iter_records(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """逐筆回傳 dict；parallel > 1 時不保證依 key 排序"""
+    for page in stream_pages(supabase, table, columns, key, page_size, filters, parallel):
+        yield from page
+
+
+def iter_frames(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """每頁回傳一個 DataFrame（欄位順序與 columns 相同）"""
+    names = [_output_name(c) for c in _column_list(columns, key)]
+    for page in stream_pages(supabase, table, columns, key, page_size, filters, parallel):
+        frame = pd.DataFrame(page)
+        yield frame if '*' in names else frame.reindex(columns=names)
+
+
+def iter_arrow(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """每頁回傳一個 pyarrow.Table（需安裝 pyarrow）"""
+    import pyarrow as pa
+
+    for frame in iter_frames(supabase, table, columns, key, page_size, filters, parallel):
+        yield pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def read_table(supabase, table, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """
+    讀取整張表（或符合 filters 的部分）為一個 DataFrame，依 key 排序
+
+    沒有資料時回傳只有欄位名稱的空 DataFrame。
+    """
+    names = [_output_name(c) for c in _column_list(columns, key)]
+    frames = list(iter_frames(supabase, table, columns, key, page_size, filters, parallel))
+    if not frames:
+        return pd.DataFrame(columns=[] if '*' in names else names)
+    frame = pd.concat(frames, ignore_index=True)
+    if parallel > 1:
+        frame = frame.sort_values(key, kind='stable', ignore_index=True)
+    return frame
+
+
+def frame_records(frame):
+    """DataFrame -> dict 清單，NaN / NaT 轉為 None（JSON 才能序列化）"""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def iter_chunk_records(chunks):
+    """把 DataFrame / dict 清單的分塊串流攤平成 dict 串流"""
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            yield from frame_records(chunk)
+        else:
+            yield from chunk
+
+
+def write_chunks(supabase, table, chunks, **kwargs):
+    """
+    把分塊串流（DataFrame 或 dict 清單，例如 iter_frames / pd.read_csv(chunksize=...) 的結果）
+    寫入資料表；一次只會有 bulk_write 正在處理的批次在記憶體中
+
+    其他參數與 bulk_writer.bulk_write 相同（mode、on_conflict、batch_size、max_workers ...）。
+
+    返回:
+        BulkWriteResult
+    """
+    return bulk_write(supabase, table, iter_chunk_records(chunks), **kwargs)
+
+
+def export_table(supabase, table, path, columns, key, page_size=DEFAULT_PAGE_SIZE, filters=None, parallel=1):
+    """
+    串流匯出成 CSV（每頁 append 一次）
+
+    返回:
+        int: 匯出的筆數
+    """
+    total = 0
+    for frame in iter_frames(supabase, table, columns, key, page_size, filters, parallel):
+        frame.to_csv(path, mode='w' if total == 0 else 'a', header=total == 0, index=False)
+        total += len(frame)
+    if total == 0:
+        pd.DataFrame(columns=[_output_name(c) for c in _column_list(columns, key)]).to_csv(path, index=False)
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='以 keyset 分頁串流匯出 / 匯入資料表')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help='資料表 -> CSV')
+    export.add_argument('table')
+    export.add_argument('path')
+    export.add_argument('--columns', default='*', help='逗號分隔的欄位，預設全部')
+    export.add_argument('--key', default=None, help='分頁用的主鍵，預設為 <table>_id')
+    export.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help='每頁筆數')
+    export.add_argument('--parallel', type=int, default=1, help='同時讀取的主鍵區段數（主鍵需為整數）')
+
+    load = sub.add_parser('import', help='CSV -> 資料表（分塊 upsert）')
+    load.add_argument('table')
+    load.add_argument('path')
+    load.add_argument('--on-conflict', default=None, help='upsert 的衝突鍵；未指定時改用 insert')
+    load.add_argument('--chunk-size', type=int, default=5000, help='每次從 CSV 讀取的筆數')
+    load.add_argument('--batch-size', type=int, default=500, help='每個寫入批次的筆數')
+    load.add_argument('--workers', type=int, default=4, help='同時進行的寫入請求數')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from supabase_connection import connect_to_supabase
+
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print(f"串流{'匯出' if args.command == 'export' else '匯入'} {args.table}")
+    print("=" * 60)
+
+    supabase = connect_to_supabase()
+    start = time.perf_counter()
+
+    if args.command == 'export':
+        key = args.key or f'{args.table}_id'
+        total = export_table(supabase, args.table, args.path, args.columns, key,
+                             page_size=args.page_size, parallel=args.parallel)
+        elapsed = time.perf_counter() - start
+        print(f"✓ 匯出 {total} 筆到 {args.path}（{elapsed:.2f}s，{total / max(elapsed, 1e-9):,.0f} rows/s）")
+        return
+
+    chunks = pd.read_csv(args.path, chunksize=args.chunk_size)
+    result = write_chunks(supabase, args.table, chunks,
+                          mode='upsert' if args.on_conflict else 'insert', on_conflict=args.on_conflict,
+                          batch_size=args.batch_size, max_workers=args.workers, progress=False)
+    print(f"✓ {result.summary()}")
+    for row, error in result.failed_rows[:5]:
+        print(f"  ✗ {row}: {error}")
+
+
+if __name__ == "__main__":
+    main()
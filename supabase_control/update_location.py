@@ -3,63 +3,96 @@
 更新現有 job_posting 資料的 location 欄位
 
 此腳本會：
-1. 讀取 job_posting_rows.csv（資料庫 export 的資料）
-2. 讀取 clear_data_rows.csv（原始 CSV）
-3. 使用 job_title + company_name 匹配
-4. 更新 location（設為 NULL 刪除）、city, district, full_address 欄位
+1. 讀取 clear_data_rows.csv（原始 CSV）
+2. 以 keyset 分頁串流讀取 company_info 與 job_posting（只讀需要的欄位，不再需要手動匯出 job_posting_rows.csv）
+3. 每頁職缺使用 job_title + company_name 匹配（pandas merge，向量化）
+4. 以 job_id 為鍵批次 upsert location（設為 NULL 刪除）、city, district, full_address 欄位
 5. 其他資料會保留不變
 
+執行方式:
+    python update_location.py --batch-size 500 --workers 4 --retries 3
+    python update_location.py --page-size 1000 --parallel 4   # 以 4 段 job_id 範圍同時讀取
+
 更新邏輯：
 - location = NULL（刪除，避免與 full_address 重複）
 - full_address = clear_data_rows.csv 的 location（原始完整地址）
-- city = 從 full_address 拆分出來
+- city = 從 full_address 拆分出來（tw_address，臺/台 視為相同、可由鄉鎮市區反查縣市）
 - district = 從 full_address 拆分出來
 """
 
+import argparse
 import pandas as pd
-import re
 from supabase_connection import connect_to_supabase
+from bulk_writer import bulk_write
+from perf_metrics import stage, start_run
+from table_stream import iter_frames, read_table
+from tw_address import parse_location_frame
 
-# 定義清理函數（從 cleaner.ipynb 複製）
-def clean_text(text):
-    """清理文字：移除多餘空白、換行符、特殊字元"""
-    if pd.isna(text) or text is None:
-        return None
-    text = str(text)
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    text = re.sub(r'<[^>]+>', '', text)
-    return text if text else None
-
-def parse_location_to_city_district(full_address):
-    """從完整地址拆分出 city 和 district"""
-    if pd.isna(full_address) or not str(full_address).strip():
-        return (None, None)
-    
-    address = str(full_address).strip()
-    
-    cities = [
-        '台北市', '新北市', '桃園市', '台中市', '台南市', '高雄市',
-        '基隆市', '新竹市', '嘉義市',
-        '新竹縣', '苗栗縣', '彰化縣', '南投縣', '雲林縣', 
-        '嘉義縣', '屏東縣', '宜蘭縣', '花蓮縣', '台東縣', '澎湖縣', '金門縣', '連江縣'
-    ]
-    
-    city = None
-    district = None
-    
-    for c in cities:
-        if address.startswith(c):
-            city = c
-            remaining = address[len(c):]
-            district_match = re.match(r'^([^區鄉鎮市]*[區鄉鎮市])', remaining)
-            if district_match:
-                district = district_match.group(1)
-            break
-    
-    return (city, district)
+# 定義清理函數（cleaner.ipynb 的 clean_text 向量化版本）
+def clean_text_series(series):
+    """清理文字（移除多餘空白、換行符、HTML 標籤）：對整個 Series 一次處理，空值與空字串回傳 None"""
+    result = pd.Series(None, index=series.index, dtype=object)
+    mask = series.notna()
+    # 轉為 object dtype，確保正則表達式使用 Python re 的語意（\s 含全形空白）
+    text = series[mask].astype(str).astype(object)
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+    text = text.str.replace(r'<[^>]+>', '', regex=True)
+    result[mask] = text.where(text != '', None)
+    return result
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='批次更新 job_posting 的 location 相關欄位')
+    parser.add_argument('--batch-size', type=int, default=500, help='每個 upsert 批次的筆數')
+    parser.add_argument('--workers', type=int, default=4, help='同時進行的批次請求數上限')
+    parser.add_argument('--retries', type=int, default=3, help='批次失敗後的重試次數')
+    parser.add_argument('--page-size', type=int, default=1000, help='每次從 job_posting 讀取的筆數')
+    parser.add_argument('--parallel', type=int, default=1, help='同時讀取 job_posting 的 job_id 區段數')
+    return parser.parse_args(argv)
+
+def build_csv_keys(df):
+    """原始 CSV 的匹配鍵與 location 欄位；同一組鍵出現多次時以最後一筆為準（與原本 dict 覆寫的行為一致）"""
+    csv_keys = pd.DataFrame({
+        'job_title_clean': df['job_title_clean'],
+        'company_name_clean': df['company_name_clean'],
+        'city': df['city'],
+        'district': df['district'],
+        'full_address': df['full_address'].where(df['full_address'].notna() & (df['full_address'] != 'nan')),
+    })
+    return csv_keys.drop_duplicates(subset=['job_title_clean', 'company_name_clean'], keep='last')
+
+def build_location_updates(existing_jobs, csv_keys):
+    """
+    以 (job_title, company_name) 清理後的鍵，將一批資料庫職缺與原始 CSV 合併
+
+    參數:
+        existing_jobs (DataFrame): 需含 job_id、job_title、company_name
+        csv_keys (DataFrame): build_csv_keys() 的結果
+
+    返回:
+        (DataFrame, int): 可直接 upsert 的更新資料列（job_id + location 欄位）、找不到匹配的筆數
+    """
+    jobs = pd.DataFrame({
+        'job_id': existing_jobs['job_id'],
+        'job_title_clean': clean_text_series(existing_jobs['job_title']),
+        'company_name_clean': clean_text_series(existing_jobs['company_name']),
+    })
+    jobs = jobs[jobs['job_title_clean'].notna() & jobs['company_name_clean'].notna()]
+
+    matched = jobs.merge(csv_keys, on=['job_title_clean', 'company_name_clean'], how='inner')
+    updates = pd.DataFrame({
+        'job_id': matched['job_id'],
+        'location': None,  # 設為 NULL，刪除原先的 location
+        'city': matched['city'],
+        'district': matched['district'],
+        'full_address': matched['full_address'],
+    }).astype(object)
+    updates = updates.where(updates.notna(), None)
+    return updates, len(existing_jobs) - len(updates)
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_run('update_location')
 
-def main():
     print("=" * 60)
     print("更新現有 job_posting 的 location 欄位")
     print("=" * 60)
@@ -74,73 +107,71 @@ def main():
         print(f"✗ 連線失敗: {e}")
         return
     
-    # 2. 讀取 job_posting_rows.csv（資料庫 export 的資料）
-    print("\n【步驟 2】讀取 job_posting_rows.csv（資料庫 export 的資料）...")
-    print("-" * 60)
-    try:
-        existing_jobs = pd.read_csv('job_posting_rows.csv')
-        print(f"✓ 已讀取 {len(existing_jobs)} 筆資料庫資料")
-        
-        # 讀取 company_info 建立 company_id -> company_name 對應表
-        companies_result = supabase.table('company_info').select('company_id, company_name').execute()
-        company_id_to_name = {row['company_id']: row['company_name'] for row in companies_result.data}
-        print(f"✓ 已建立 {len(company_id_to_name)} 家公司的 ID 對應表")
-        
-        # 將 company_id 轉換為 company_name（用於匹配）
-        existing_jobs['company_name'] = existing_jobs['company_id'].map(company_id_to_name)
-        
-    except Exception as e:
-        print(f"✗ 讀取資料失敗: {e}")
-        return
-    
-    # 3. 讀取 clear_data_rows.csv（原始 CSV）
-    print("\n【步驟 3】讀取 clear_data_rows.csv（原始 CSV）...")
+    # 2. 讀取 clear_data_rows.csv（原始 CSV）
+    print("\n【步驟 2】讀取 clear_data_rows.csv（原始 CSV）...")
     print("-" * 60)
     try:
-        df = pd.read_csv('clear_data_rows.csv')
+        with stage('read_csv') as s:
+            df = pd.read_csv('clear_data_rows.csv')
+            s.rows = len(df)
         print(f"✓ 已讀取 {len(df)} 筆原始資料")
     except Exception as e:
         print(f"✗ 讀取 CSV 失敗: {e}")
         return
     
-    # 4. 處理原始 CSV 的 location 資料
-    print("\n【步驟 4】處理原始 CSV 的 location 資料...")
+    # 3. 處理原始 CSV 的 location 資料
+    print("\n【步驟 3】處理原始 CSV 的 location 資料...")
     print("-" * 60)
     
-    # 清理 CSV 中的公司名稱和職缺名稱（用於匹配）
-    df['company_name_clean'] = df['company_name'].apply(clean_text)
-    df['job_title_clean'] = df['job_name'].apply(clean_text)
-    
-    # 處理 location：保留原始 CSV 的 location 作為 full_address
-    # full_address = clear_data_rows.csv 的 location（原始完整地址，不清理）
-    df['full_address'] = df['location'].astype(str)
-    
-    # 從 full_address 拆分出 city 和 district
-    location_parsed = df['full_address'].apply(parse_location_to_city_district)
-    df['city'] = location_parsed.apply(lambda x: x[0] if x else None)
-    df['district'] = location_parsed.apply(lambda x: x[1] if x else None)
-    
+    with stage('clean', rows=len(df)):
+        # 清理 CSV 中的公司名稱和職缺名稱（用於匹配）
+        df['company_name_clean'] = clean_text_series(df['company_name'])
+        df['job_title_clean'] = clean_text_series(df['job_name'])
+
+        # 處理 location：保留原始 CSV 的 location 作為 full_address
+        # full_address = clear_data_rows.csv 的 location（原始完整地址，不清理）
+        df['full_address'] = df['location'].astype(str)
+
+        # 從 full_address 拆分出 city 和 district
+        df[['city', 'district']] = parse_location_frame(df['full_address'])
+        csv_keys = build_csv_keys(df)
+
     print(f"✓ 已處理 {len(df)} 筆原始資料的 location 資訊")
     print(f"  - 有 city 的資料: {df['city'].notna().sum()} 筆")
     print(f"  - 有 district 的資料: {df['district'].notna().sum()} 筆")
     
-    # 5. 建立匹配表（使用 job_title + company_name 匹配）
-    print("\n【步驟 5】建立匹配表（使用 job_title + company_name）...")
+    # 4. 讀取 company_info 建立 company_id -> company_name 對應表（keyset 分頁，不會被 max-rows 截斷）
+    print("\n【步驟 4】讀取 company_info...")
     print("-" * 60)
+    try:
+        with stage('load_companies') as s:
+            companies = read_table(supabase, 'company_info', 'company_id, company_name', 'company_id')
+            s.rows = len(companies)
+        company_id_to_name = dict(zip(companies['company_id'], companies['company_name']))
+        print(f"✓ 已建立 {len(company_id_to_name)} 家公司的 ID 對應表")
+    except Exception as e:
+        print(f"✗ 讀取資料失敗: {e}")
+        return
     
-    csv_location_map = {}
-    for idx, row in df.iterrows():
-        key = (row['job_title_clean'], row['company_name_clean'])
-        csv_location_map[key] = {
-            'city': row['city'] if pd.notna(row['city']) else None,
-            'district': row['district'] if pd.notna(row['district']) else None,
-            'full_address': row['full_address'] if pd.notna(row['full_address']) and str(row['full_address']) != 'nan' else None
-        }
-    
-    print(f"✓ 已建立 {len(csv_location_map)} 筆匹配資料")
-    
-    # 6. 匹配並更新 location 資料
-    print("\n【步驟 6】匹配並更新 location 資料...")
+    # 5. 串流讀取 job_posting，每頁合併匹配（使用 job_title + company_name）
+    print("\n【步驟 5】串流讀取 job_posting 並合併匹配（使用 job_title + company_name）...")
+    print("-" * 60)
+    stats = {'jobs': 0, 'matched': 0, 'not_found': 0}
+
+    def generate_updates():
+        for jobs in iter_frames(supabase, 'job_posting', 'job_id, job_title, company_id', 'job_id',
+                                page_size=args.page_size, parallel=args.parallel):
+            # 將 company_id 轉換為 company_name（用於匹配）
+            jobs['company_name'] = jobs['company_id'].map(company_id_to_name)
+            with stage('match', rows=len(jobs)):
+                updates, not_found = build_location_updates(jobs, csv_keys)
+            stats['jobs'] += len(jobs)
+            stats['matched'] += len(updates)
+            stats['not_found'] += not_found
+            yield from updates.to_dict('records')
+    
+    # 6. 批次更新 location 資料（與步驟 5 同時進行，一次只有一頁職缺在記憶體中）
+    print("\n【步驟 6】批次更新 location 資料...")
     print("-" * 60)
     print("⚠️  注意：此步驟會更新現有資料的 location 相關欄位")
     print("   更新邏輯：")
@@ -149,55 +180,28 @@ def main():
     print("   - city = 從 full_address 拆分出來")
     print("   - district = 從 full_address 拆分出來")
     print("   其他欄位（如 job_title, job_description 等）會保留不變")
-    
-    updated_count = 0
-    not_found_count = 0
-    error_count = 0
-    
-    for idx, job in existing_jobs.iterrows():
-        job_id = job['job_id']
-        job_title = job['job_title']
-        company_name = job['company_name']
-        
-        # 清理用於匹配
-        job_title_clean = clean_text(job_title) if pd.notna(job_title) else None
-        company_name_clean = clean_text(company_name) if pd.notna(company_name) else None
-        
-        if not job_title_clean or not company_name_clean:
-            not_found_count += 1
-            continue
-        
-        # 嘗試匹配
-        key = (job_title_clean, company_name_clean)
-        if key in csv_location_map:
-            location_data = csv_location_map[key]
-            
-            # 更新資料庫（只更新 location 相關欄位，其他欄位保留）
-            # location 設為 NULL（刪除，避免與 full_address 重複）
-            try:
-                update_data = {
-                    'location': None,  # 設為 NULL，刪除原先的 location
-                    'city': location_data['city'],
-                    'district': location_data['district'],
-                    'full_address': location_data['full_address']
-                }
-                
-                result = supabase.table('job_posting').update(update_data).eq('job_id', job_id).execute()
-                updated_count += 1
-                
-                if updated_count % 100 == 0:
-                    print(f"  已更新 {updated_count} 筆...")
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"  ✗ 更新 job_id {job_id} 失敗: {e}")
-        else:
-            not_found_count += 1
-    
-    print(f"\n✓ 更新完成！")
-    print(f"  - 成功更新: {updated_count} 筆")
-    print(f"  - 找不到匹配: {not_found_count} 筆")
-    print(f"  - 更新錯誤: {error_count} 筆")
+    print(f"   批次大小 {args.batch_size}、並行 {args.workers}、重試 {args.retries} 次")
+    
+    # 以 job_id 為衝突鍵 upsert：只會覆寫有送出的欄位，其他欄位保留
+    # upsert 階段包含串流讀取與每頁匹配（match 階段另外計時）
+    with stage('upsert') as s:
+        result = bulk_write(
+            supabase, 'job_posting', generate_updates(),
+            on_conflict='job_id',
+            batch_size=args.batch_size,
+            max_workers=args.workers,
+            max_retries=args.retries,
+        )
+        s.rows = result.written
+    
+    print("\n✓ 更新完成！")
+    print(f"  - 讀取職缺: {stats['jobs']} 筆，匹配到 {stats['matched']} 筆")
+    print(f"  - 成功更新: {result.written} 筆")
+    print(f"  - 找不到匹配: {stats['not_found']} 筆")
+    print(f"  - 更新錯誤: {result.failed} 筆")
+    print(f"  - 速度: {result.rows_per_second:,.0f} rows/s（耗時 {result.elapsed:.2f}s）")
+    for row, error in result.failed_rows:
+        print(f"  ✗ 更新 job_id {row['job_id']} 失敗: {error}")
     
     # 7. 驗證更新結果
     print("\n【步驟 7】驗證更新結果...")
@@ -214,7 +218,7 @@ def main():
         print(f"  - 有 full_address 的職缺: {sample_df['full_address'].notna().sum()} ({sample_df['full_address'].notna().sum()/len(sample_df)*100:.1f}%)")
         
         # 顯示前 3 筆範例
-        print(f"\n【前 3 筆更新後的資料範例】")
+        print("\n【前 3 筆更新後的資料範例】")
         for idx, row in sample_df.head(3).iterrows():
             print(f"  {idx + 1}. location: {row['location']} (應為 NULL)")
             print(f"     city: {row['city']}, district: {row['district']}")
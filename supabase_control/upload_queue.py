@@ -0,0 +1,854 @@
+"""
+upload_event 佇列 worker
+
+upload_event.status 原本沒有任何程式消化，OCR 與履歷解析只能在 HTTP 請求裡同步執行。
+本模組把 upload_event 當成工作佇列：
+
+1. 認領：以原子的狀態轉換 pending -> processing 一次認領一批事件；
+   多個 worker 同時執行時，同一筆事件只會被其中一個 worker 認領
+   - Supabase：對每筆候選事件做 compare-and-set（UPDATE ... WHERE status = 'pending'）
+   - Postgres：UPDATE ... FROM (SELECT ... FOR UPDATE SKIP LOCKED)
+2. 處理：以有上限的並行數呼叫 OCR 服務（ocr_service 的 POST /ocr），再以 skill_extractor
+   的技能索引解析 email、電話與技能；已認領但尚未完成的事件數有上限（backpressure），
+   處理不完時不會繼續認領
+3. 寫回：完成的事件累積成批次寫回。upload_event 以 compare-and-set 從 processing 改為 done
+   （status 與認領時的 lease_until 都要相符），租約已被回收的事件不會被覆寫；
+   ocr_result 以 event_id 去重，同一事件重新處理也不會寫出第二筆
+4. 失敗：可重試的錯誤以指數退避（加上隨機抖動）排回 pending，超過次數上限改為 failed；
+   無法處理的檔案（OCR 服務回 4xx）直接標為 failed；同樣以租約做 compare-and-set，租約已被回收時不寫回
+5. 租約：認領時記錄 lease_until，worker 中斷而卡在 processing 的事件在租約到期後被重新認領
+
+佇列狀態記錄在 upload_event.metadata['queue']（attempts、worker、lease_until、next_attempt_at、
+last_error），不影響上傳時寫入的其他 metadata 欄位。
+
+指標（佇列深度、處理中數量、完成 / 重試 / 失敗數、處理延遲與上傳到完成延遲的 p50 / p95）
+每輪印出一次，並可用 --metrics-port 以 HTTP GET /metrics 取得 JSON。
+
+執行方式:
+    python upload_queue.py                                  # Supabase，持續執行
+    python upload_queue.py --once                           # 處理完目前的事件後結束
+    python upload_queue.py --store postgres --database-url postgresql://localhost/final
+    python upload_queue.py --concurrency 8 --metrics-port 9101
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from postgrest.types import CountMethod
+
+from bulk_writer import bulk_write
+
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+OCR_RESULT_COLUMNS = ['event_id', 'resume_id', 'ocr_status', 'raw_text', 'extracted_data',
+                      'confidence_score', 'is_manual_review_needed']
+
+DEFAULT_OCR_URL = 'http://localhost:5001'   # docker-compose: ocr_service 5001 -> 5000
+DEFAULT_BUCKET = 'uploads'
+
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_PHONE = re.compile(r'(?:\+?886[-\s]?|0)9\d{2}[-\s]?\d{3}[-\s]?\d{3}|\(?0\d{1,2}\)?[-\s]?\d{3,4}[-\s]?\d{4}')
+
+
+class PermanentError(Exception):
+    """重試也不會成功的錯誤（例如無法辨識的檔案），事件直接標為 failed"""
+
+
+# ============================================
+# 時間與 metadata['queue']
+# ============================================
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def format_time(value):
+    """固定長度的 UTC ISO 字串，可直接以字串比較先後"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def parse_time(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def queue_meta(event):
+    return dict((event.get('metadata') or {}).get('queue') or {})
+
+
+def with_queue_meta(event, status=None, **changes):
+    """回傳修改過 status 與 metadata['queue'] 的事件副本（值為 None 的鍵會被移除）"""
+    event = copy.deepcopy(event)
+    meta = queue_meta(event)
+    meta.update(changes)
+    event['metadata'] = dict(event.get('metadata') or {}, queue={k: v for k, v in meta.items() if v is not None})
+    if status is not None:
+        event['status'] = status
+    return event
+
+
+def claimed_event(event, worker_id, lease_seconds, now=None):
+    now = now or utc_now()
+    return with_queue_meta(
+        event, status=STATUS_PROCESSING,
+        attempts=queue_meta(event).get('attempts', 0) + 1,
+        worker=worker_id,
+        claimed_at=format_time(now),
+        lease_until=format_time(now + timedelta(seconds=lease_seconds)),
+        next_attempt_at=None,
+    )
+
+
+def finished_event(event):
+    return with_queue_meta(event, status=STATUS_DONE, lease_until=None, last_error=None)
+
+
+def expired_event(event, max_attempts):
+    """租約到期：次數未滿排回 pending，否則標為 failed"""
+    attempts = queue_meta(event).get('attempts', 0)
+    status = STATUS_FAILED if attempts >= max_attempts else STATUS_PENDING
+    return with_queue_meta(event, status=status, lease_until=None, worker=None, last_error='lease expired')
+
+
+def backoff_delay(attempts, base, maximum):
+    """第 n 次失敗後等待 base * 2^(n-1) 秒（上限 maximum），再乘上 0.5~1 的隨機抖動"""
+    delay = min(maximum, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ============================================
+# 佇列儲存
+# ============================================
+
+class InMemoryQueueStore:
+    """
+    記憶體中的 upload_event / ocr_result（測試與本機開發用），與資料庫版本有相同的介面與語意
+    """
+
+    def __init__(self):
+        self.events = {}
+        self.ocr_results = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def add(self, file_name, file_path, upload_type='resume', user_id=None, metadata=None, uploaded_at=None):
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            self.events[event_id] = {
+                'event_id': event_id, 'status': STATUS_PENDING, 'file_name': file_name,
+                'file_path': file_path, 'upload_type': upload_type, 'user_id': user_id,
+                'metadata': metadata or {}, 'uploaded_at': format_time(uploaded_at or utc_now()),
+            }
+            return event_id
+
+    def claim(self, limit, worker_id, lease_seconds):
+        now = format_time(utc_now())
+        claimed = []
+        with self._lock:
+            for event_id in sorted(self.events):
+                if len(claimed) >= limit:
+                    break
+                event = self.events[event_id]
+                if event['status'] != STATUS_PENDING or queue_meta(event).get('next_attempt_at', '') > now:
+                    continue
+                self.events[event_id] = claimed_event(event, worker_id, lease_seconds)
+                claimed.append(copy.deepcopy(self.events[event_id]))
+        return claimed
+
+    def reclaim_expired(self, max_attempts):
+        now = format_time(utc_now())
+        count = 0
+        with self._lock:
+            for event_id, event in self.events.items():
+                if event['status'] == STATUS_PROCESSING and queue_meta(event).get('lease_until', '') < now:
+                    self.events[event_id] = expired_event(event, max_attempts)
+                    count += 1
+        return count
+
+    def complete(self, events, ocr_rows):
+        with self._lock:
+            existing = {row['event_id'] for row in self.ocr_results}
+            self.ocr_results.extend(copy.deepcopy(row) for row in ocr_rows if row['event_id'] not in existing)
+            finished = []
+            for event in events:
+                if self._holds_lease(event):
+                    self.events[event['event_id']] = finished_event(event)
+                    finished.append(event['event_id'])
+        return finished
+
+    def _holds_lease(self, event):
+        current = self.events[event['event_id']]
+        return (current['status'] == STATUS_PROCESSING
+                and queue_meta(current).get('lease_until') == queue_meta(event).get('lease_until'))
+
+    def release(self, event, updated):
+        with self._lock:
+            if not self._holds_lease(event):
+                return False
+            self.events[event['event_id']] = copy.deepcopy(updated)
+            return True
+
+    def depth(self):
+        with self._lock:
+            statuses = [e['status'] for e in self.events.values()]
+        return {STATUS_PENDING: statuses.count(STATUS_PENDING), STATUS_PROCESSING: statuses.count(STATUS_PROCESSING)}
+
+
+class SupabaseQueueStore:
+    """
+    以 Supabase（PostgREST）為佇列
+
+    PostgREST 沒有 SELECT ... FOR UPDATE，因此先讀出候選事件，再對每筆做
+    UPDATE ... WHERE event_id = ? AND status = 'pending'：只有真正把狀態從 pending 改掉的
+    worker 會拿到回傳的資料列，其他 worker 拿到空結果，達成原子認領。
+
+    參數:
+        supabase: Supabase Client
+        workers (int): 認領時並行的請求數
+        batch_size (int): 寫回時每個批次的筆數
+    """
+
+    table = 'upload_event'
+
+    def __init__(self, supabase, workers=8, batch_size=500):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _compare_and_set(self, old, new):
+        query = self.supabase.table(self.table).update({'status': new['status'], 'metadata': new['metadata']})
+        query = query.eq('event_id', old['event_id']).eq('status', old['status'])
+        lease_until = queue_meta(old).get('lease_until')
+        if old['status'] == STATUS_PROCESSING and lease_until:
+            query = query.eq('metadata->queue->>lease_until', lease_until)
+        rows = query.execute().data or []
+        return rows[0] if rows else None
+
+    def _compare_and_set_many(self, pairs):
+        results = self._executor.map(lambda pair: self._compare_and_set(*pair), pairs)
+        return [row for row in results if row is not None]
+
+    def claim(self, limit, worker_id, lease_seconds):
+        now = format_time(utc_now())
+        candidates = (
+            self.supabase.table(self.table).select('*')
+            .eq('status', STATUS_PENDING)
+            .or_(f'metadata->queue->>next_attempt_at.is.null,metadata->queue->>next_attempt_at.lte."{now}"')
+            .order('event_id').limit(limit).execute().data or []
+        )
+        return self._compare_and_set_many(
+            [(event, claimed_event(event, worker_id, lease_seconds)) for event in candidates])
+
+    def reclaim_expired(self, max_attempts):
+        now = format_time(utc_now())
+        expired = (
+            self.supabase.table(self.table).select('*')
+            .eq('status', STATUS_PROCESSING)
+            .lt('metadata->queue->>lease_until', now)
+            .order('event_id').limit(self.batch_size).execute().data or []
+        )
+        return len(self._compare_and_set_many([(event, expired_event(event, max_attempts)) for event in expired]))
+
+    def _existing_results(self, event_ids):
+        existing = set()
+        for start in range(0, len(event_ids), self.batch_size):
+            chunk = event_ids[start:start + self.batch_size]
+            rows = self.supabase.table('ocr_result').select('event_id').in_('event_id', chunk).execute().data or []
+            existing.update(row['event_id'] for row in rows)
+        return existing
+
+    def complete(self, events, ocr_rows):
+        """
+        寫回完成的事件（events 為認領時的事件）
+
+        PostgREST 無法把兩張表包在同一個交易裡，因此先寫 ocr_result 再改事件狀態：
+        ocr_result 沒有 event_id 的唯一鍵，寫入前先查出已存在的 event_id 跳過，
+        事件改狀態失敗而重新處理時不會重複寫入。
+
+        返回:
+            list: 成功改為 done 的 event_id（租約已被回收的事件不在其中）
+        """
+        existing = self._existing_results([row['event_id'] for row in ocr_rows])
+        ocr_rows = [row for row in ocr_rows if row['event_id'] not in existing]
+        if ocr_rows:
+            result = bulk_write(self.supabase, 'ocr_result', ocr_rows, mode='insert',
+                                batch_size=self.batch_size, progress=False)
+            if result.failed:
+                raise RuntimeError(f'ocr_result 寫入失敗 {len(result.failed_rows)} 筆')
+        # processing -> done 的 compare-and-set；請求失敗時例外往上拋，事件維持 processing
+        rows = self._compare_and_set_many([(event, finished_event(event)) for event in events])
+        return [row['event_id'] for row in rows]
+
+    def release(self, event, updated):
+        """
+        把認領的事件（event）改為 updated（排回 pending 或標為 failed）；與 complete 相同以租約做 compare-and-set
+
+        返回:
+            bool: False 表示租約已被回收（其他 worker 已重新認領或完成），這次寫回被捨棄
+        """
+        return self._compare_and_set(event, updated) is not None
+
+    def depth(self):
+        depth = {}
+        for status in (STATUS_PENDING, STATUS_PROCESSING):
+            response = (self.supabase.table(self.table).select('event_id', count=CountMethod.exact)
+                        .eq('status', status).limit(1).execute())
+            depth[status] = response.count or 0
+        return depth
+
+
+class PostgresQueueStore:
+    """
+    直接連線 Postgres（本機開發或 Supabase 的 direct connection），需要 psycopg 3
+
+    認領以單一 UPDATE ... FROM (SELECT ... FOR UPDATE SKIP LOCKED) 完成，
+    多個 worker 同時認領時互不等待也不會重複。
+    """
+
+    CLAIM_SQL = """
+        WITH picked AS (
+            SELECT event_id FROM upload_event
+            WHERE status = %(pending)s
+              AND COALESCE((metadata -> 'queue' ->> 'next_attempt_at')::timestamptz, '-infinity') <= now()
+            ORDER BY event_id
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE upload_event e
+        SET status = %(processing)s,
+            metadata = jsonb_set(
+                COALESCE(e.metadata, '{}'::jsonb), '{queue}',
+                (COALESCE(e.metadata -> 'queue', '{}'::jsonb) - 'next_attempt_at') || jsonb_build_object(
+                    'attempts', COALESCE((e.metadata -> 'queue' ->> 'attempts')::int, 0) + 1,
+                    'worker', %(worker)s::text,
+                    'claimed_at', to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'),
+                    'lease_until', to_char((now() + make_interval(secs => %(lease)s)) AT TIME ZONE 'UTC',
+                                           'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')))
+        FROM picked
+        WHERE e.event_id = picked.event_id
+        RETURNING e.*
+    """
+
+    RECLAIM_SQL = """
+        SELECT * FROM upload_event
+        WHERE status = %(processing)s
+          AND (metadata -> 'queue' ->> 'lease_until')::timestamptz < now()
+        FOR UPDATE SKIP LOCKED
+    """
+
+    def __init__(self, dsn):
+        import psycopg
+        from psycopg.rows import dict_row
+        from psycopg.types.json import Jsonb
+
+        self._Jsonb = Jsonb
+        self._conn = psycopg.connect(dsn, row_factory=dict_row, autocommit=False)
+        self._lock = threading.Lock()
+
+    def _event(self, row):
+        row = dict(row)
+        for key in ('uploaded_at',):
+            if isinstance(row.get(key), datetime):
+                row[key] = format_time(row[key])
+        return row
+
+    def claim(self, limit, worker_id, lease_seconds):
+        params = {'pending': STATUS_PENDING, 'processing': STATUS_PROCESSING,
+                  'limit': limit, 'worker': worker_id, 'lease': lease_seconds}
+        with self._lock, self._conn.transaction():
+            rows = self._conn.execute(self.CLAIM_SQL, params).fetchall()
+        return [self._event(row) for row in sorted(rows, key=lambda r: r['event_id'])]
+
+    def _write_events(self, events):
+        self._conn.cursor().executemany(
+            'UPDATE upload_event SET status = %s, metadata = %s WHERE event_id = %s',
+            [(e['status'], self._Jsonb(e['metadata']), e['event_id']) for e in events])
+
+    def reclaim_expired(self, max_attempts):
+        with self._lock, self._conn.transaction():
+            rows = self._conn.execute(self.RECLAIM_SQL, {'processing': STATUS_PROCESSING}).fetchall()
+            self._write_events([expired_event(self._event(row), max_attempts) for row in rows])
+        return len(rows)
+
+    LEASED_UPDATE_SQL = """
+        UPDATE upload_event SET status = %s, metadata = %s
+        WHERE event_id = %s AND status = %s AND metadata -> 'queue' ->> 'lease_until' = %s
+        RETURNING event_id
+    """
+
+    def complete(self, events, ocr_rows):
+        """在同一個交易裡把仍持有租約的事件改為 done，只替這些事件寫入 ocr_result；返回完成的 event_id"""
+        columns = ', '.join(OCR_RESULT_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(OCR_RESULT_COLUMNS))
+        finished = []
+        with self._lock, self._conn.transaction():
+            for event in events:
+                if self._leased_update(event, finished_event(event)):
+                    finished.append(event['event_id'])
+            finished_ids = set(finished)
+            self._conn.cursor().executemany(
+                f'INSERT INTO ocr_result ({columns}) SELECT {placeholders} '
+                f'WHERE NOT EXISTS (SELECT 1 FROM ocr_result WHERE event_id = %s)',
+                [tuple(self._Jsonb(row.get(c)) if c == 'extracted_data' else row.get(c)
+                       for c in OCR_RESULT_COLUMNS) + (row['event_id'],)
+                 for row in ocr_rows if row['event_id'] in finished_ids])
+        return finished
+
+    def _leased_update(self, event, updated):
+        row = self._conn.execute(self.LEASED_UPDATE_SQL, (
+            updated['status'], self._Jsonb(updated['metadata']), event['event_id'],
+            STATUS_PROCESSING, queue_meta(event).get('lease_until'))).fetchone()
+        return row is not None
+
+    def release(self, event, updated):
+        with self._lock, self._conn.transaction():
+            return self._leased_update(event, updated)
+
+    def depth(self):
+        with self._lock, self._conn.transaction():
+            rows = self._conn.execute(
+                'SELECT status, count(*) AS n FROM upload_event WHERE status IN (%s, %s) GROUP BY status',
+                (STATUS_PENDING, STATUS_PROCESSING)).fetchall()
+        depth = {STATUS_PENDING: 0, STATUS_PROCESSING: 0}
+        depth.update({row['status']: row['n'] for row in rows})
+        return depth
+
+
+# ============================================
+# 指標
+# ============================================
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class QueueMetrics:
+    """佇列指標；延遲只保留最近 window 筆樣本"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.counters = {'claimed': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'reclaimed': 0}
+        self.depth = {STATUS_PENDING: 0, STATUS_PROCESSING: 0}
+        self.in_flight = 0
+        self.processing_ms = deque(maxlen=window)
+        self.end_to_end_ms = deque(maxlen=window)
+        self.started_at = time.time()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, processing_ms, end_to_end_ms=None):
+        with self._lock:
+            self.processing_ms.append(processing_ms)
+            if end_to_end_ms is not None:
+                self.end_to_end_ms.append(end_to_end_ms)
+
+    def snapshot(self):
+        with self._lock:
+            processing = list(self.processing_ms)
+            end_to_end = list(self.end_to_end_ms)
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'queue_depth': dict(self.depth),
+                'in_flight': self.in_flight,
+                **self.counters,
+                'processing_ms': {'p50': _percentile(processing, 0.5), 'p95': _percentile(processing, 0.95)},
+                'end_to_end_ms': {'p50': _percentile(end_to_end, 0.5), 'p95': _percentile(end_to_end, 0.95)},
+            }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"佇列 pending {s['queue_depth'][STATUS_PENDING]}、processing {s['queue_depth'][STATUS_PROCESSING]}；"
+                f"完成 {s['completed']}、重試 {s['retried']}、失敗 {s['failed']}、租約回收 {s['reclaimed']}；"
+                f"處理延遲 p50 {s['processing_ms']['p50']} ms / p95 {s['processing_ms']['p95']} ms")
+
+
+def serve_metrics(metrics, port, host='0.0.0.0'):
+    """以背景執行緒提供 GET /metrics（JSON）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================
+# OCR 與履歷解析
+# ============================================
+
+def parse_resume_text(text, skill_index=None):
+    """從 OCR 文字取出 email、電話與技能（skill_extractor.SkillIndex）"""
+    text = text or ''
+    parsed = {
+        'emails': sorted(set(_EMAIL.findall(text))),
+        'phones': sorted(set(_PHONE.findall(text))),
+    }
+    if skill_index is not None:
+        parsed['skill_ids'] = skill_index.extract(text)
+    return parsed
+
+
+class UploadProcessor:
+    """
+    下載上傳的檔案、送到 OCR 服務，並解析辨識結果
+
+    參數:
+        ocr_url (str): ocr_service 的位址
+        supabase: 設定時從 Supabase Storage 下載 file_path（bucket 見 bucket 參數）
+        bucket (str): Storage bucket 名稱
+        skill_index: skill_extractor.SkillIndex，None 時不解析技能
+        timeout (float): 呼叫 OCR 服務的逾時秒數
+    """
+
+    def __init__(self, ocr_url=DEFAULT_OCR_URL, supabase=None, bucket=DEFAULT_BUCKET, skill_index=None,
+                 timeout=120.0):
+        self.ocr_url = ocr_url.rstrip('/')
+        self.supabase = supabase
+        self.bucket = bucket
+        self.skill_index = skill_index
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def fetch(self, event):
+        path = event['file_path']
+        if path.startswith(('http://', 'https://')):
+            response = await self._client.get(path)
+            response.raise_for_status()
+            return response.content
+        if os.path.exists(path):
+            return await asyncio.to_thread(_read_file, path)
+        if self.supabase is None:
+            raise PermanentError(f'找不到檔案: {path}')
+        return await asyncio.to_thread(self.supabase.storage.from_(self.bucket).download, path)
+
+    async def recognize(self, event, content):
+        response = await self._client.post(
+            f'{self.ocr_url}/ocr',
+            files={'file': (event['file_name'], content)},
+            data={'event_id': str(event['event_id'])},
+        )
+        if 400 <= response.status_code < 500:
+            raise PermanentError(f'OCR 服務拒絕檔案（{response.status_code}）: {response.text[:200]}')
+        response.raise_for_status()
+        return response.json()
+
+    async def __call__(self, event):
+        """處理一筆事件，回傳要寫入 ocr_result 的資料列"""
+        content = await self.fetch(event)
+        result = await self.recognize(event, content)
+        extracted = dict(result.get('extracted_data') or {})
+        if result.get('ocr_status') == 'completed':
+            extracted['parsed'] = await asyncio.to_thread(parse_resume_text, result.get('raw_text'),
+                                                          self.skill_index)
+        return {
+            'event_id': event['event_id'],
+            'resume_id': (event.get('metadata') or {}).get('resume_id'),
+            'ocr_status': result.get('ocr_status', 'completed'),
+            'raw_text': result.get('raw_text'),
+            'extracted_data': extracted,
+            'confidence_score': result.get('confidence_score'),
+            'is_manual_review_needed': bool(result.get('is_manual_review_needed', True)),
+        }
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# ============================================
+# Worker
+# ============================================
+
+class UploadQueueWorker:
+    """
+    參數:
+        store: InMemoryQueueStore / SupabaseQueueStore / PostgresQueueStore
+        processor: async callable(event) -> ocr_result 資料列
+        concurrency (int): 同時處理的事件數
+        max_outstanding (int): 已認領但尚未完成的事件數上限（預設 concurrency 的 2 倍）
+        lease_seconds (float): 認領的租約秒數；單一事件的處理時間上限為租約的 80%
+        max_attempts (int): 最多嘗試次數
+        backoff_base (float): 第一次重試前的等待秒數，之後每次加倍
+        backoff_max (float): 重試等待秒數上限
+        flush_size (int): 累積多少筆完成的事件就寫回一次
+        flush_interval (float): 最久多少秒寫回一次
+        poll_interval (float): 佇列為空時多久再查一次
+        metrics (QueueMetrics)
+    """
+
+    def __init__(self, store, processor, concurrency=4, max_outstanding=None, lease_seconds=300,
+                 max_attempts=5, backoff_base=30, backoff_max=3600, flush_size=50, flush_interval=2.0,
+                 poll_interval=2.0, worker_id=None, metrics=None):
+        self.store = store
+        self.processor = processor
+        self.concurrency = concurrency
+        self.max_outstanding = max_outstanding or concurrency * 2
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.metrics = metrics or QueueMetrics()
+
+        self._queue = None
+        self._capacity = None
+        self._outstanding = 0
+        self._buffer = []
+        self._flush_lock = None
+        self._stopping = False
+
+    # ---------- 認領 ----------
+
+    async def _claim_loop(self, until_idle):
+        while not self._stopping:
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: self._outstanding < self.max_outstanding)
+                free = self.max_outstanding - self._outstanding
+            events = await asyncio.to_thread(self.store.claim, free, self.worker_id, self.lease_seconds)
+            if events:
+                self.metrics.incr('claimed', len(events))
+                async with self._capacity:
+                    self._outstanding += len(events)
+                for event in events:
+                    self._queue.put_nowait((event, time.monotonic()))
+                continue
+            if until_idle:
+                async with self._capacity:
+                    if self._outstanding == 0:
+                        return
+                    # 等處理中的事件結束後再認領一次：失敗的事件可能已排回 pending
+                    await self._capacity.wait_for(lambda: self._outstanding == 0)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    # ---------- 處理 ----------
+
+    async def _consume(self):
+        while True:
+            event, claimed_at = await self._queue.get()
+            try:
+                try:
+                    row = await asyncio.wait_for(self.processor(event), timeout=self.lease_seconds * 0.8)
+                except Exception as e:
+                    await self._handle_failure(event, e)
+                else:
+                    self._buffer.append((event, row, claimed_at))
+                    if len(self._buffer) >= self.flush_size:
+                        await self.flush()
+            finally:
+                self._queue.task_done()
+                async with self._capacity:
+                    self._outstanding -= 1
+                    self.metrics.in_flight = self._outstanding
+                    self._capacity.notify_all()
+
+    async def _handle_failure(self, event, error):
+        attempts = queue_meta(event).get('attempts', 1)
+        message = f'{type(error).__name__}: {error}'[:500]
+        if isinstance(error, PermanentError) or attempts >= self.max_attempts:
+            updated = with_queue_meta(event, status=STATUS_FAILED, lease_until=None, last_error=message)
+            counter = 'failed'
+        else:
+            retry_at = utc_now() + timedelta(seconds=backoff_delay(attempts, self.backoff_base, self.backoff_max))
+            updated = with_queue_meta(event, status=STATUS_PENDING, lease_until=None, worker=None,
+                                      next_attempt_at=format_time(retry_at), last_error=message)
+            counter = 'retried'
+        try:
+            released = await asyncio.to_thread(self.store.release, event, updated)
+        except Exception as e:
+            # 寫回失敗時事件維持 processing，租約到期後會被重新認領
+            print(f"⚠️ 更新事件 {event['event_id']} 狀態失敗: {e}")
+            return
+        if not released:
+            print(f"⚠️ 事件 {event['event_id']} 的租約已被回收，不更新狀態")
+            return
+        self.metrics.incr(counter)
+
+    # ---------- 寫回 ----------
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            events = [event for event, _, _ in batch]
+            try:
+                finished = await asyncio.to_thread(self.store.complete, events, [row for _, row, _ in batch])
+            except Exception as e:
+                # 不重送：事件維持 processing，租約到期後重新處理
+                print(f"⚠️ 寫回 {len(batch)} 筆完成的事件失敗: {e}")
+                return
+            finished = set(finished)
+            if len(finished) < len(batch):
+                print(f"⚠️ {len(batch) - len(finished)} 筆事件的租約已被回收，未標為完成")
+            now_monotonic = time.monotonic()
+            now = utc_now()
+            for event, _, claimed_at in batch:
+                if event['event_id'] not in finished:
+                    continue
+                uploaded_at = parse_time(event.get('uploaded_at'))
+                end_to_end = (now - uploaded_at).total_seconds() * 1000 if uploaded_at else None
+                self.metrics.observe((now_monotonic - claimed_at) * 1000, end_to_end)
+            self.metrics.incr('completed', len(finished))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    # ---------- 租約與指標 ----------
+
+    async def _maintenance_loop(self, report_interval):
+        last_report = 0.0
+        while True:
+            reclaimed = await asyncio.to_thread(self.store.reclaim_expired, self.max_attempts)
+            if reclaimed:
+                self.metrics.incr('reclaimed', reclaimed)
+            self.metrics.depth = await asyncio.to_thread(self.store.depth)
+            if report_interval and time.monotonic() - last_report >= report_interval:
+                print(f"  {self.metrics.summary()}")
+                last_report = time.monotonic()
+            await asyncio.sleep(min(self.lease_seconds / 2, self.poll_interval * 5))
+
+    async def run(self, until_idle=False, report_interval=30.0):
+        """
+        執行 worker
+
+        參數:
+            until_idle (bool): True 時處理完目前可處理的事件就結束
+            report_interval (float): 每隔幾秒印出一次指標（0 表示不印）
+        """
+        self._queue = asyncio.Queue()
+        self._capacity = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        background = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        background.append(asyncio.create_task(self._flush_loop()))
+        background.append(asyncio.create_task(self._maintenance_loop(report_interval)))
+        try:
+            await self._claim_loop(until_idle)
+        finally:
+            self._stopping = True
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            await self.flush()
+            self.metrics.depth = await asyncio.to_thread(self.store.depth)
+
+
+# ============================================
+# 執行
+# ============================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='upload_event 佇列 worker')
+    parser.add_argument('--store', choices=['supabase', 'postgres'], default='supabase', help='佇列儲存')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help='--store postgres 的連線字串')
+    parser.add_argument('--ocr-url', default=os.getenv('OCR_SERVICE_URL', DEFAULT_OCR_URL), help='OCR 服務位址')
+    parser.add_argument('--bucket', default=os.getenv('UPLOAD_BUCKET', DEFAULT_BUCKET), help='Storage bucket')
+    parser.add_argument('--concurrency', type=int, default=4, help='同時處理的事件數')
+    parser.add_argument('--max-outstanding', type=int, default=None, help='已認領未完成的事件數上限')
+    parser.add_argument('--lease', type=float, default=300, help='租約秒數')
+    parser.add_argument('--max-attempts', type=int, default=5, help='最多嘗試次數')
+    parser.add_argument('--backoff', type=float, default=30, help='第一次重試前的等待秒數')
+    parser.add_argument('--flush-size', type=int, default=50, help='累積多少筆完成的事件寫回一次')
+    parser.add_argument('--no-parse', action='store_true', help='不解析技能')
+    parser.add_argument('--once', action='store_true', help='處理完目前的事件後結束')
+    parser.add_argument('--metrics-port', type=int, default=None, help='提供 GET /metrics 的埠號')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("upload_event 佇列 worker")
+    print("=" * 60)
+
+    supabase = None
+    if args.store == 'postgres':
+        if not args.database_url:
+            raise SystemExit("❌ --store postgres 需要 --database-url 或環境變數 DATABASE_URL")
+        store = PostgresQueueStore(args.database_url)
+    else:
+        from supabase_connection import connect_to_supabase
+        supabase = connect_to_supabase()
+        store = SupabaseQueueStore(supabase)
+
+    skill_index = None
+    if not args.no_parse:
+        from skill_extractor import DEFAULT_INDEX_PATH, SkillIndex, load_or_build_index
+        skill_index = load_or_build_index(supabase) if supabase is not None else SkillIndex.load(DEFAULT_INDEX_PATH)
+
+    metrics = QueueMetrics()
+    if args.metrics_port:
+        serve_metrics(metrics, args.metrics_port)
+        print(f"✓ 指標：http://localhost:{args.metrics_port}/metrics")
+
+    async def run():
+        processor = UploadProcessor(args.ocr_url, supabase=supabase, bucket=args.bucket, skill_index=skill_index)
+        worker = UploadQueueWorker(store, processor, concurrency=args.concurrency,
+                                   max_outstanding=args.max_outstanding, lease_seconds=args.lease,
+                                   max_attempts=args.max_attempts, backoff_base=args.backoff,
+                                   flush_size=args.flush_size, metrics=metrics)
+        print(f"worker {worker.worker_id}，並行 {worker.concurrency}，OCR 服務 {args.ocr_url}")
+        try:
+            await worker.run(until_idle=args.once)
+        finally:
+            await processor.aclose()
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    print(f"\n✓ {metrics.summary()}（{time.perf_counter() - start:.2f}s）")
+
+
+if __name__ == "__main__":
+    main()